@@ -6,6 +6,7 @@ This script ensures the entire database schema is complete and correct:
 - Creates all missing tables
 - Adds all missing columns to existing tables
 - Validates column types and constraints
+- Creates indexes declared on the models
 - Preserves all existing data
 
 Usage:
@@ -177,6 +178,48 @@ class DatabaseMigrator:
         
         return True
     
+    def create_indexes(self):
+        """Create indexes declared on the models that existing tables lack."""
+        print("\n" + "=" * 70)
+        print("STEP 3: Creating Missing Indexes")
+        print("=" * 70)
+        
+        with self.app.app_context():
+            for table in self.db.metadata.sorted_tables:
+                for index in table.indexes:
+                    try:
+                        index.create(bind=self.db.engine, checkfirst=True)
+                        self.log_success(f"Index {index.name} exists")
+                    except Exception as e:
+                        self.log_error(f"Failed to create index {index.name}: {e}")
+            
+            from services.equipment_search import ensure_search_index
+            if ensure_search_index(self.db.engine):
+                self.log_success("Equipment search index (FTS5) exists")
+            elif self.db.engine.dialect.name == 'sqlite':
+                self.log_warning("FTS5 unavailable — equipment search will use LIKE")
+        
+        return True
+    
+    def collapse_recurring_events(self):
+        """Fold per-occurrence rows of recurring series back into their rule."""
+        print("\n" + "=" * 70)
+        print("STEP 4: Collapsing Recurring Event Instances")
+        print("=" * 70)
+        
+        with self.app.app_context():
+            from services.recurrence import collapse_instances
+            try:
+                kept, removed = collapse_instances()
+            except Exception as e:
+                self.db.session.rollback()
+                self.log_error(f"Failed to collapse recurring events: {e}")
+                return False
+            self.log_success(f"Recurring instances: {removed} removed (now generated on read), "
+                             f"{kept} kept with their own crew or details")
+        
+        return True
+    
     def run_migration(self):
         """Run the complete migration process."""
         print("\n")
@@ -197,6 +240,16 @@ class DatabaseMigrator:
             print("\n✗ Migration failed at column validation step")
             return False
         
+        # Step 3: Create indexes
+        if not self.create_indexes():
+            print("\n✗ Migration failed at index creation step")
+            return False
+        
+        # Step 4: Recurring series are expanded on read
+        if not self.collapse_recurring_events():
+            print("\n✗ Migration failed at recurring event step")
+            return False
+        
         # Summary
         print("\n" + "=" * 70)
         print("Migration Summary")
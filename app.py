@@ -15,8 +15,13 @@ from routes import register_blueprints
 from services.email_service import init_email_service
 
 
-def create_app(config_name: str | None = None):
-    """Application factory."""
+def create_app(config_name: str | None = None, background_services: bool = True):
+    """Application factory.
+
+    With ``background_services=False`` (e.g. the Discord bot's in-process
+    mode) only the kill-switch monitor is started; heartbeats, reminders and
+    Rocket.Chat stay with the web app process.
+    """
     app = Flask(__name__, static_folder='static', static_url_path='/static')
 
     # Load config
@@ -73,10 +78,10 @@ def create_app(config_name: str | None = None):
         if request.path.startswith('/static'):
             return
         try:
-            from backend_integration import get_backend_client
-            backend = get_backend_client()
-            if backend:
-                enabled, reason = backend.check_kill_switch()
+            from backend_integration import get_kill_switch_monitor
+            monitor = get_kill_switch_monitor()
+            if monitor:
+                enabled, reason = monitor.state
                 if enabled:
                     return render_template('suspended.html', reason=reason), 503
         except Exception:
@@ -103,7 +108,9 @@ def create_app(config_name: str | None = None):
         try:
             from backend_integration import init_backend_client
             backend = init_backend_client(app)
-            if backend:
+            if backend and not background_services:
+                _start_kill_switch_monitor(app, backend)
+            elif backend:
                 backend.log_info('Application starting', 'system', {'version': '1.0.0'})
                 org_config = backend.get_organization()
                 if org_config:
@@ -112,15 +119,25 @@ def create_app(config_name: str | None = None):
                     app.config['PRIMARY_COLOR'] = org_config.get('primary_color')
                     print(f"✓ Loaded config for: {org_config.get('name')}")
                 _start_heartbeat(app, backend)
+                _start_kill_switch_monitor(app, backend)
         except Exception as exc:
             print(f"⚠️  Backend init error: {exc}")
 
-        # Rocket.Chat
+        if not background_services:
+            return app
+
+        # Event reminders (Discord)
+        from services.notification_service import DISCORD_WEBHOOK_URL
+        if DISCORD_WEBHOOK_URL and not app.testing:
+            _start_reminder_scheduler(app)
+
+        # Rocket.Chat (logs in on first use; accounts are provisioned in the background)
         try:
             from rocketchat_client import init_rocketchat
             rc = init_rocketchat()
-            if rc.is_connected():
-                print(f"✓ Connected to Rocket.Chat at {rc.server_url}")
+            if rc.is_configured() and not app.testing:
+                _start_rocketchat_sync(app, rc)
+                print(f"✓ Rocket.Chat at {rc.server_url}")
         except Exception:
             pass
 
@@ -150,6 +167,47 @@ def _start_heartbeat(app, backend):
     print("✓ Uptime tracking enabled")
 
 
+def _start_kill_switch_monitor(app, backend):
+    from backend_integration import init_kill_switch_monitor
+
+    monitor = init_kill_switch_monitor(app, backend)
+    monitor.start()
+    atexit.register(monitor.stop)
+    print(f"✓ Kill switch polling every {monitor.poll_interval}s (fail {monitor.fail_mode})")
+
+
+def _start_reminder_scheduler(app):
+    from services.notification_service import start_reminder_scheduler
+
+    scheduler = start_reminder_scheduler(app)
+    atexit.register(scheduler.stop)
+    print("✓ Event reminder scheduler running")
+
+
+def _start_rocketchat_sync(app, rc):
+    from datetime import datetime, timedelta
+    from apscheduler.schedulers.background import BackgroundScheduler
+    from services.rocketchat_sync import sync_rocketchat_users
+
+    def sync():
+        with app.app_context():
+            try:
+                counts = sync_rocketchat_users(rc)
+                if any(counts.values()):
+                    print(f"✓ Rocket.Chat users synced: {counts}")
+            except Exception as exc:
+                print(f"⚠️  Rocket.Chat user sync failed: {exc}")
+            finally:
+                db.session.remove()
+
+    scheduler = BackgroundScheduler()
+    scheduler.add_job(sync, 'interval', hours=app.config.get('ROCKETCHAT_SYNC_HOURS', 6),
+                      next_run_time=datetime.now() + timedelta(seconds=30),
+                      max_instances=1, coalesce=True)
+    scheduler.start()
+    atexit.register(lambda: scheduler.shutdown(wait=False))
+
+
 def init_db(app):
     """Create tables and default admin if missing."""
     from models import User
@@ -158,6 +216,8 @@ def init_db(app):
 
     with app.app_context():
         db.create_all()
+        from services.equipment_search import ensure_search_index
+        ensure_search_index()
         if not User.query.filter_by(username='admin').first():
             chars    = string.ascii_letters + string.digits + string.punctuation
             safe     = ''.join(c for c in chars if c not in 'l1LO0|`~')
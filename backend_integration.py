@@ -13,16 +13,108 @@ Version: 1.0.0
 """
 
 import os
+import json
+import time
+import queue
+import atexit
+import tempfile
+import threading
 import requests
+from requests.adapters import HTTPAdapter
+from collections import deque
+from contextlib import contextmanager
 from datetime import datetime
 from functools import wraps
 from typing import Dict, Any, Optional, List
 import logging
 
+try:
+    import fcntl
+except ImportError:  # Windows — no cross-process lock, per-worker polling only
+    fcntl = None
+
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# (connect, read) timeouts in seconds by endpoint prefix; the first match wins.
+# Calls made on a background thread can afford to wait longer than the
+# ones a page render might be waiting on.
+ENDPOINT_TIMEOUTS = (
+    ('/api/kill-switch/',    (2, 3)),
+    ('/api/organizations/',  (2, 3)),
+    ('/api/uptime/ping',     (3, 10)),
+    ('/api/log',             (3, 10)),
+)
+DEFAULT_TIMEOUT = (3, 5)
+STALE_MAX_AGE = 24 * 3600  # seconds a cached GET may stand in for a failed one
+
+
+def endpoint_timeout(endpoint: str) -> tuple:
+    """(connect, read) timeout for a backend endpoint"""
+    for prefix, timeout in ENDPOINT_TIMEOUTS:
+        if endpoint.startswith(prefix):
+            return timeout
+    return DEFAULT_TIMEOUT
+
+
+# ==================== CIRCUIT BREAKER ====================
+
+class CircuitBreaker:
+    """
+    Stops calling an unreachable backend for a while
+    
+    After ``failure_threshold`` consecutive failures the breaker opens and
+    every call is refused without touching the network for ``cooldown``
+    seconds. Then a single trial call is let through (half-open): success
+    closes the breaker, failure opens it for another cooldown.
+    """
+    
+    def __init__(self, failure_threshold: int = 5, cooldown: float = 30.0):
+        self.failure_threshold = max(1, failure_threshold)
+        self.cooldown = cooldown
+        self._lock = threading.Lock()
+        self._failures = 0
+        self._opened_at = None
+        self._trial = False
+    
+    @property
+    def state(self) -> str:
+        """'closed', 'open' or 'half-open'"""
+        with self._lock:
+            if self._opened_at is None:
+                return 'closed'
+            if self._trial or time.monotonic() - self._opened_at >= self.cooldown:
+                return 'half-open'
+            return 'open'
+    
+    def allow(self) -> bool:
+        """True if a call may go out now"""
+        with self._lock:
+            if self._opened_at is None:
+                return True
+            if self._trial or time.monotonic() - self._opened_at < self.cooldown:
+                return False
+            self._trial = True
+            return True
+    
+    def record_success(self):
+        with self._lock:
+            if self._opened_at is not None:
+                logger.info("Backend reachable again - circuit closed")
+            self._failures = 0
+            self._opened_at = None
+            self._trial = False
+    
+    def record_failure(self):
+        with self._lock:
+            self._failures += 1
+            if self._trial or (self._opened_at is None and self._failures >= self.failure_threshold):
+                if self._opened_at is None:
+                    logger.error(f"Backend failing - pausing calls for {self.cooldown:.0f}s")
+                self._opened_at = time.monotonic()
+                self._trial = False
+
 
 class ShowWiseBackend:
     """
@@ -31,7 +123,8 @@ class ShowWiseBackend:
     This class provides all methods needed to integrate with ShowWise Backend.
     """
     
-    def __init__(self, backend_url: str, api_key: str, org_slug: str):
+    def __init__(self, backend_url: str, api_key: str, org_slug: str,
+                 failure_threshold: int = 5, cooldown: float = 30.0, pool_size: int = 10):
         """
         Initialize the backend client
         
@@ -39,22 +132,37 @@ class ShowWiseBackend:
             backend_url: Base URL of the backend (e.g., http://localhost:5001)
             api_key: Your API key from the backend dashboard
             org_slug: Your organization slug identifier
+            failure_threshold: Consecutive failures before the circuit opens
+            cooldown: Seconds the circuit stays open before a trial call
+            pool_size: Keep-alive connections kept per host
         """
         self.backend_url = backend_url.rstrip('/')
         self.api_key = api_key
         self.org_slug = org_slug
-        self.timeout = 5  # seconds
         
-        # Cache for organization data
-        self._org_cache = None
-        self._org_cache_time = None
-        self._cache_duration = 300  # 5 minutes
+        # One pooled session, so heartbeats, polls and logs reuse connections
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=2, pool_maxsize=pool_size)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+        self.session.headers['Content-Type'] = 'application/json'
+        if api_key:
+            self.session.headers['X-API-Key'] = api_key
+        self.breaker = CircuitBreaker(failure_threshold, cooldown)
+        self._stale = {}  # endpoint -> (fetched_at, response JSON) for stale-on-error GETs
+        
+        # Organization config, shared with the other workers on this host
+        self.org_cache = OrgConfigCache(self)
+        
+        # Set by init_backend_client when logs are shipped in the background
+        self.shipper = None
         
         logger.info(f"ShowWise Backend client initialized for {org_slug}")
     
     def _make_request(self, method: str, endpoint: str, 
                      data: Optional[Dict] = None,
-                     use_api_key: bool = True) -> Optional[Dict]:
+                     use_api_key: bool = True,
+                     stale_on_error: bool = False) -> Optional[Dict]:
         """
         Make HTTP request to backend
         
@@ -63,65 +171,89 @@ class ShowWiseBackend:
             endpoint: API endpoint path
             data: JSON data to send
             use_api_key: Whether to include API key header
+            stale_on_error: For GETs, fall back to the last good response
+                (up to STALE_MAX_AGE old) if this call fails or is refused
             
         Returns:
             Response JSON or None on error
         """
-        url = f"{self.backend_url}{endpoint}"
-        headers = {'Content-Type': 'application/json'}
-        
-        if use_api_key and self.api_key:
-            headers['X-API-Key'] = self.api_key
+        result = self._request(method, endpoint, data, use_api_key)
+        if method != 'GET' or not stale_on_error:
+            return result
+        if result is not None:
+            self._stale[endpoint] = (time.time(), result)
+            return result
+        cached = self._stale.get(endpoint)
+        if cached and time.time() - cached[0] <= STALE_MAX_AGE:
+            logger.warning(f"Backend unavailable - serving cached {endpoint}")
+            return cached[1]
+        return None
+    
+    def _request(self, method: str, endpoint: str, data: Optional[Dict],
+                 use_api_key: bool) -> Optional[Dict]:
+        if not self.breaker.allow():
+            return None
         
+        headers = None if use_api_key or not self.api_key else {'X-API-Key': None}
         try:
-            response = requests.request(
+            response = self.session.request(
                 method=method,
-                url=url,
+                url=f"{self.backend_url}{endpoint}",
                 json=data,
                 headers=headers,
-                timeout=self.timeout
+                timeout=endpoint_timeout(endpoint)
             )
-            
-            if response.status_code == 200:
-                return response.json()
-            else:
-                logger.warning(f"Backend request failed: {response.status_code}")
-                return None
-                
         except requests.exceptions.Timeout:
+            self.breaker.record_failure()
             logger.error(f"Backend request timeout: {endpoint}")
             return None
-        except requests.exceptions.RequestException as e:
+        except Exception as e:  # RequestException, or a payload requests can't encode
+            self.breaker.record_failure()
             logger.error(f"Backend request error: {e}")
             return None
+        
+        # 4xx means the backend is up and answering, so only 5xx trips the breaker
+        if response.status_code >= 500:
+            self.breaker.record_failure()
+        else:
+            self.breaker.record_success()
+        
+        if response.status_code == 200:
+            try:
+                return response.json()
+            except ValueError:
+                logger.warning(f"Backend returned invalid JSON: {endpoint}")
+                return None
+        logger.warning(f"Backend request failed: {response.status_code}")
+        return None
     
     # ==================== ORGANIZATION API ====================
     
     def get_organization(self, force_refresh: bool = False) -> Optional[Dict]:
         """
-        Get organization configuration from backend
+        Get organization configuration
+        
+        Served from the shared org config cache: an expired copy is returned
+        straight away while one worker refreshes it in the background.
         
         Args:
-            force_refresh: Force refresh cache
+            force_refresh: Fetch from the backend now and wait for the result
             
         Returns:
             Organization configuration dict or None
         """
-        # Check cache
-        if not force_refresh and self._org_cache:
-            if self._org_cache_time:
-                age = (datetime.now() - self._org_cache_time).total_seconds()
-                if age < self._cache_duration:
-                    return self._org_cache
-        
-        # Fetch from backend
+        if force_refresh:
+            return self.org_cache.refresh()
+        return self.org_cache.get()
+    
+    def fetch_organization(self) -> Optional[Dict]:
+        """Fetch organization configuration from the backend (blocking, uncached)"""
         result = self._make_request('GET', f'/api/organizations/{self.org_slug}', use_api_key=False)
         
-        if result and result.get('success'):
-            self._org_cache = result.get('organization')
-            self._org_cache_time = datetime.now()
-            logger.info(f"Organization config loaded: {self._org_cache.get('name')}")
-            return self._org_cache
+        if result and result.get('success') and result.get('organization'):
+            org = result['organization']
+            logger.info(f"Organization config loaded: {org.get('name')}")
+            return org
         
         logger.error("Failed to load organization config")
         return None
@@ -140,7 +272,7 @@ class ShowWiseBackend:
             metadata: Additional metadata dict
             
         Returns:
-            True if logged successfully
+            True if logged successfully (or queued, when a shipper is attached)
         """
         data = {
             'type': log_type,
@@ -150,6 +282,12 @@ class ShowWiseBackend:
             'metadata': metadata or {}
         }
         
+        if self.shipper is not None:
+            return self.shipper.submit(data)
+        return self.send_log(data)
+    
+    def send_log(self, data: Dict) -> bool:
+        """POST one prepared log entry to the backend (blocking)"""
         result = self._make_request('POST', '/api/log', data=data)
         return result is not None and result.get('success', False)
     
@@ -199,12 +337,12 @@ class ShowWiseBackend:
     
     # ==================== KILL SWITCH API ====================
     
-    def check_kill_switch(self) -> tuple:
+    def fetch_kill_switch(self) -> Optional[tuple]:
         """
-        Check if kill switch is enabled
+        Fetch kill switch state from backend
         
         Returns:
-            Tuple of (is_enabled, reason)
+            Tuple of (is_enabled, reason), or None if the backend is unreachable
         """
         result = self._make_request('GET', f'/api/kill-switch/{self.org_slug}', use_api_key=False)
         
@@ -217,10 +355,529 @@ class ShowWiseBackend:
             
             return enabled, reason
         
+        return None
+    
+    def check_kill_switch(self) -> tuple:
+        """
+        Check if kill switch is enabled
+        
+        Returns:
+            Tuple of (is_enabled, reason)
+        """
+        state = self.fetch_kill_switch()
+        if state is not None:
+            return state
+        
         # If backend is unreachable, allow access (fail open)
         logger.warning("Could not check kill switch - allowing access")
         return False, ''
 
+
+# ==================== ORGANIZATION CONFIG CACHE ====================
+
+class OrgConfigCache:
+    """
+    Organization config shared by every worker on the host, stale-while-revalidate
+    
+    The last good config is kept in memory and in ``cache_file`` (JSON), so
+    a restarted worker, or one that starts while the backend is down, has it
+    immediately. Once it is older than ``ttl`` seconds, callers still get
+    the old copy at once. Meanwhile one worker, the one holding the file lock,
+    fetches a new copy on a background thread and writes it to the file, and
+    the others pick it up from there. The only blocking fetch is the very
+    first one on a host that has never had a copy (normally during
+    ``create_app``).
+    """
+    
+    RETRY_INTERVAL = 30   # seconds between refresh attempts while the backend fails
+    DISK_CHECK = 1.0      # seconds between re-reads of the file while expired
+    
+    def __init__(self, backend: 'ShowWiseBackend', ttl: int = 300, cache_file: Optional[str] = None):
+        """
+        Initialize the cache
+        
+        Args:
+            backend: Client whose ``fetch_organization()`` is called to refresh
+            ttl: Seconds a copy counts as fresh
+            cache_file: JSON file shared between workers (defaults to the temp dir)
+        """
+        self.backend = backend
+        self.ttl = ttl
+        self.cache_file = cache_file or os.path.join(
+            tempfile.gettempdir(), f'showwise_org_{backend.org_slug}.json'
+        )
+        self._lock = threading.Lock()
+        self._record = None           # {'org': {...}, 'fetched_at': epoch seconds}
+        self._checked_disk = 0.0
+        self._attempted = False
+        self._next_attempt = 0.0       # no background refresh before this (epoch seconds)
+        self._refreshing = False
+    
+    def get(self) -> Optional[Dict]:
+        """Current config without waiting on the backend (None if never fetched)"""
+        now = time.time()
+        record = self._record
+        if record and now - record['fetched_at'] < self.ttl:
+            return record['org']
+        
+        if now - self._checked_disk >= self.DISK_CHECK:
+            self._checked_disk = now
+            shared = self._read_shared()
+            if shared and (not record or shared['fetched_at'] > record['fetched_at']):
+                self._record = record = shared
+                if now - record['fetched_at'] < self.ttl:
+                    return record['org']
+        
+        if record is None and not self._attempted:
+            return self.refresh()            # first ever fetch on this host
+        self._refresh_in_background()
+        return record['org'] if record else None
+    
+    def refresh(self) -> Optional[Dict]:
+        """Fetch now; on failure keep (and return) the last good copy"""
+        self._attempted = True
+        org = self.backend.fetch_organization()
+        if org is None:
+            self._next_attempt = time.time() + self.RETRY_INTERVAL
+            return self._record['org'] if self._record else None
+        self._next_attempt = 0.0
+        self._record = {'org': org, 'fetched_at': time.time()}
+        self._write_shared(self._record)
+        return org
+    
+    def _refresh_in_background(self):
+        with self._lock:
+            if self._refreshing or time.time() < self._next_attempt:
+                return
+            self._refreshing = True
+        threading.Thread(target=self._background_refresh, name='org-config-refresh', daemon=True).start()
+    
+    def _background_refresh(self):
+        try:
+            with self._refresh_lock() as owner:
+                if not owner:
+                    # Another worker is already on it; its result arrives through the file
+                    self._next_attempt = time.time() + self.DISK_CHECK
+                    return
+                shared = self._read_shared()
+                if shared and time.time() - shared['fetched_at'] < self.ttl:
+                    self._record = shared    # refreshed while we waited
+                    return
+                self.refresh()
+        except Exception as e:
+            logger.error(f"Organization config refresh error: {e}")
+        finally:
+            self._refreshing = False
+    
+    @contextmanager
+    def _refresh_lock(self):
+        """Yield True if this process holds the cross-worker refresh lock"""
+        if fcntl is None:
+            yield True
+            return
+        try:
+            fh = open(self.cache_file + '.lock', 'a')
+        except OSError:
+            yield True
+            return
+        try:
+            try:
+                fcntl.flock(fh, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except OSError:
+                yield False
+                return
+            yield True
+        finally:
+            fh.close()
+    
+    def _read_shared(self) -> Optional[Dict]:
+        try:
+            with open(self.cache_file, 'r') as f:
+                record = json.load(f)
+            if isinstance(record.get('org'), dict) and isinstance(record.get('fetched_at'), (int, float)):
+                return record
+        except (OSError, ValueError, AttributeError):
+            pass
+        return None
+    
+    def _write_shared(self, record: Dict):
+        try:
+            directory = os.path.dirname(self.cache_file) or '.'
+            fd, tmp_path = tempfile.mkstemp(dir=directory, suffix='.tmp')
+            with os.fdopen(fd, 'w') as f:
+                json.dump(record, f)
+            os.replace(tmp_path, self.cache_file)
+        except OSError as e:
+            logger.warning(f"Could not write organization config cache: {e}")
+
+
+# ==================== LOG SHIPPER ====================
+
+class LogShipper:
+    """
+    Ships backend log entries from a background thread
+    
+    ``submit()`` only puts the entry on a bounded in-memory queue, so a login
+    or a decorated route never waits on the backend. The flusher sends a
+    batch once ``batch_size`` entries are waiting or ``flush_interval``
+    seconds after the first one arrived, back to back over the client's
+    connection; the backend takes one entry per call, so a batch is a burst
+    rather than a single request.
+    
+    When the queue is full, or the backend fails part-way through a batch,
+    entries are appended to ``spill_file`` (JSON lines) and replayed once the
+    backend is answering again. Without a spill file, or once it reaches
+    ``max_spill_bytes``, they are dropped and counted.
+    """
+    
+    MAX_ATTEMPTS = 5        # failed sends of one entry before it is dropped
+    UNHEALTHY_REPLAY = 30   # seconds between replays while the backend is failing
+    
+    def __init__(self, send, max_queue: int = 1000, batch_size: int = 50,
+                 flush_interval: float = 2.0, spill_file: Optional[str] = None,
+                 max_spill_bytes: int = 10 * 1024 * 1024):
+        """
+        Initialize the shipper
+        
+        Args:
+            send: Callable taking one log entry dict, returning True on success
+            max_queue: Entries held in memory before spilling or dropping
+            batch_size: Send as soon as this many entries are waiting
+            flush_interval: Longest an entry waits before its batch is sent
+            spill_file: JSON-lines overflow file (None = drop under backpressure)
+            max_spill_bytes: Stop spilling once the file is this large
+        """
+        self.send = send
+        self.batch_size = max(1, batch_size)
+        self.flush_interval = flush_interval
+        self.spill_file = spill_file
+        self.max_spill_bytes = max_spill_bytes
+        self._queue = queue.Queue(maxsize=max(1, max_queue))
+        self._lock = threading.Lock()
+        self._counters = {'sent': 0, 'failed': 0, 'spilled': 0, 'replayed': 0,
+                          'dropped': 0, 'batches': 0}
+        self._latency = deque(maxlen=500)  # seconds from submit to sent
+        self._busy = 0
+        self._healthy = True
+        self._last_replay = 0.0
+        self._stopping = threading.Event()
+        self._thread = None
+        self._pid = None
+    
+    # -- producer side -------------------------------------------------------
+    
+    def submit(self, entry: Dict) -> bool:
+        """Queue *entry*; False only if it had to be dropped"""
+        self._ensure_worker()
+        try:
+            self._queue.put_nowait((time.monotonic(), 0, entry))
+            return True
+        except queue.Full:
+            return self._spill([(time.monotonic(), 0, entry)])
+    
+    def stats(self) -> Dict:
+        """Counters plus queue depth and submit-to-sent latency"""
+        with self._lock:
+            lat = sorted(self._latency)
+            return {
+                **self._counters,
+                'queue_depth': self._queue.qsize(),
+                'in_flight': self._busy,
+                'spill_bytes': self._spill_size(),
+                'avg_latency_ms': round(1000 * sum(lat) / len(lat), 1) if lat else None,
+                'p95_latency_ms': round(1000 * lat[int(0.95 * (len(lat) - 1))], 1) if lat else None,
+                'worker_alive': bool(self._thread and self._thread.is_alive()),
+            }
+    
+    def flush(self, timeout: float = 10.0) -> bool:
+        """Block until everything queued has been handled; False on timeout"""
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            with self._lock:
+                if self._queue.unfinished_tasks == 0 and not self._busy:
+                    return True
+            time.sleep(0.01)
+        return False
+    
+    def stop(self, timeout: float = 5.0):
+        """Send what is queued, spill whatever is left, then stop the flusher"""
+        if self._thread and self._thread.is_alive():
+            self.flush(timeout)
+            self._stopping.set()
+            self._thread.join(timeout=1.0)
+        leftover = []
+        while True:
+            try:
+                leftover.append(self._queue.get_nowait())
+                self._queue.task_done()
+            except queue.Empty:
+                break
+        if leftover:
+            self._spill(leftover)
+    
+    # -- flusher side --------------------------------------------------------
+    
+    def _ensure_worker(self):
+        with self._lock:
+            # A flusher started before a fork doesn't exist in the child
+            if self._thread and self._thread.is_alive() and self._pid == os.getpid():
+                return
+            self._pid = os.getpid()
+            self._stopping.clear()
+            self._thread = threading.Thread(target=self._run, name='backend-log-shipper', daemon=True)
+            self._thread.start()
+    
+    def _run(self):
+        while not self._stopping.is_set():
+            batch = self._next_batch()
+            if batch:
+                try:
+                    self._ship(batch)
+                finally:
+                    with self._lock:
+                        self._busy -= len(batch)
+            elif self.spill_file:
+                self._replay()
+    
+    def _next_batch(self) -> list:
+        try:
+            first = self._queue.get(timeout=self.flush_interval)
+        except queue.Empty:
+            return []
+        with self._lock:
+            self._busy += 1
+        self._queue.task_done()
+        batch = [first]
+        deadline = time.monotonic() + self.flush_interval
+        while len(batch) < self.batch_size and not self._stopping.is_set():
+            try:
+                item = self._queue.get(timeout=max(0.0, deadline - time.monotonic()))
+            except queue.Empty:
+                break
+            with self._lock:
+                self._busy += 1
+            self._queue.task_done()
+            batch.append(item)
+        return batch
+    
+    def _ship(self, batch: list):
+        with self._lock:
+            self._counters['batches'] += 1
+        for i, (queued_at, attempts, entry) in enumerate(batch):
+            try:
+                ok = self.send(entry)
+            except Exception as e:
+                logger.error(f"Log shipper send error: {e}")
+                ok = False
+            if not ok:
+                # Backend is struggling; keep the rest for a replay instead of hammering it.
+                # Only the entry that failed is charged an attempt.
+                self._healthy = False
+                rest = [(queued_at, attempts + 1, entry)] + batch[i + 1:]
+                with self._lock:
+                    self._counters['failed'] += 1
+                self._spill(rest)
+                return
+            self._healthy = True
+            with self._lock:
+                self._counters['sent'] += 1
+                self._latency.append(time.monotonic() - queued_at)
+    
+    def _spill(self, items: list) -> bool:
+        """Append *items* to the spill file; count them as dropped if that isn't possible"""
+        keep = [item for item in items if item[1] < self.MAX_ATTEMPTS]
+        dropped = len(items) - len(keep)
+        written = False
+        if keep and self.spill_file and self._spill_size() < self.max_spill_bytes:
+            lines = ''.join(json.dumps({'attempts': a, 'entry': e}) + '\n' for _, a, e in keep)
+            try:
+                with open(self.spill_file, 'a', encoding='utf-8') as f:
+                    f.write(lines)
+                written = True
+            except OSError as e:
+                logger.warning(f"Could not write log spill file: {e}")
+        if not written:
+            dropped += len(keep)
+        with self._lock:
+            if written:
+                self._counters['spilled'] += len(keep)
+            self._counters['dropped'] += dropped
+        return written and not dropped
+    
+    def _spill_size(self) -> int:
+        try:
+            return os.path.getsize(self.spill_file) if self.spill_file else 0
+        except OSError:
+            return 0
+    
+    def _replay(self):
+        """Move spilled entries back onto the queue (throttled while the backend is failing)"""
+        now = time.monotonic()
+        interval = self.flush_interval if self._healthy else self.UNHEALTHY_REPLAY
+        if now - self._last_replay < interval or not self._spill_size():
+            return
+        self._last_replay = now
+        # Claim the file by renaming it, so two workers never replay the same entries
+        claimed = f"{self.spill_file}.{os.getpid()}.replay"
+        try:
+            os.replace(self.spill_file, claimed)
+            with open(claimed, 'r', encoding='utf-8') as f:
+                lines = f.readlines()
+            os.remove(claimed)
+        except OSError:
+            return
+        overflow = []
+        for line in lines:
+            try:
+                record = json.loads(line)
+                item = (now, record.get('attempts', 0), record['entry'])
+            except (ValueError, KeyError, TypeError, AttributeError):
+                continue
+            try:
+                self._queue.put_nowait(item)
+                with self._lock:
+                    self._counters['replayed'] += 1
+            except queue.Full:
+                overflow.append(item)
+        if overflow:
+            self._spill(overflow)
+
+
+# ==================== KILL SWITCH MONITOR ====================
+
+class KillSwitchMonitor:
+    """
+    Kill switch state held in memory and refreshed by a background poller
+    
+    Request hooks only read ``state``; the backend call happens in ``refresh()``,
+    which runs every ``poll_interval`` seconds. Each result is also written to
+    ``state_file`` under a file lock, so gunicorn workers on the same host
+    share it: a worker whose poll finds a fresh result adopts it instead of
+    calling the backend again.
+    
+    If the backend cannot be reached, the last verified state is kept for up
+    to ``STALE_INTERVALS`` poll intervals. After that the fail mode decides:
+    'open' allows access, 'closed' serves the suspended page.
+    """
+    
+    STALE_INTERVALS = 3
+    
+    def __init__(self, backend: ShowWiseBackend, poll_interval: int = 30,
+                 fail_mode: str = 'open', state_file: Optional[str] = None):
+        """
+        Initialize the monitor
+        
+        Args:
+            backend: Backend client used for polling
+            poll_interval: Seconds between polls
+            fail_mode: 'open' or 'closed' once the last verified state is stale
+            state_file: JSON file shared between workers (defaults to the temp dir)
+        """
+        self.backend = backend
+        self.poll_interval = max(1, int(poll_interval))
+        self.fail_mode = 'closed' if fail_mode == 'closed' else 'open'
+        self.state_file = state_file or os.path.join(
+            tempfile.gettempdir(), f'showwise_kill_switch_{backend.org_slug}.json'
+        )
+        self._lock = threading.Lock()
+        self._scheduler = None
+        self._record = self._read_shared() or {
+            'enabled': False, 'reason': '', 'checked_at': 0, 'verified_at': None,
+        }
+        self._state = self._resolve(self._record)
+    
+    @property
+    def state(self) -> tuple:
+        """Current (is_enabled, reason) — an in-memory read, never blocks"""
+        return self._state
+    
+    def refresh(self) -> tuple:
+        """
+        Poll the backend, or adopt a result another worker fetched recently
+        
+        Returns:
+            The new (is_enabled, reason) state
+        """
+        with self._shared_lock():
+            now = time.time()
+            shared = self._read_shared()
+            if shared and now - shared.get('checked_at', 0) < self.poll_interval / 2:
+                record = shared
+            else:
+                result = self.backend.fetch_kill_switch()
+                if result is not None:
+                    record = {'enabled': bool(result[0]), 'reason': result[1] or '',
+                              'checked_at': now, 'verified_at': now}
+                else:
+                    record = {**(shared or self._record), 'checked_at': now}
+                self._write_shared(record)
+            self._record = record
+            self._state = self._resolve(record)
+        return self._state
+    
+    def start(self):
+        """Start background polling (first poll runs immediately)"""
+        from apscheduler.schedulers.background import BackgroundScheduler
+        
+        self._scheduler = BackgroundScheduler()
+        self._scheduler.add_job(self._safe_refresh, 'interval', seconds=self.poll_interval,
+                                next_run_time=datetime.now(), max_instances=1, coalesce=True)
+        self._scheduler.start()
+    
+    def stop(self):
+        """Stop background polling"""
+        if self._scheduler:
+            self._scheduler.shutdown(wait=False)
+            self._scheduler = None
+    
+    def _safe_refresh(self):
+        try:
+            self.refresh()
+        except Exception as e:
+            logger.error(f"Kill switch poll error: {e}")
+    
+    def _resolve(self, record: Dict) -> tuple:
+        verified_at = record.get('verified_at')
+        max_age = self.poll_interval * self.STALE_INTERVALS
+        if verified_at and time.time() - verified_at <= max_age:
+            return record.get('enabled', False), record.get('reason', '')
+        if self.fail_mode == 'closed':
+            return True, 'Service status could not be verified'
+        return False, ''
+    
+    @contextmanager
+    def _shared_lock(self):
+        with self._lock:
+            fh = None
+            if fcntl is not None:
+                try:
+                    fh = open(self.state_file + '.lock', 'a')
+                    fcntl.flock(fh, fcntl.LOCK_EX)
+                except OSError:
+                    fh = None
+            try:
+                yield
+            finally:
+                if fh:
+                    fh.close()
+    
+    def _read_shared(self) -> Optional[Dict]:
+        try:
+            with open(self.state_file, 'r') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+    
+    def _write_shared(self, record: Dict):
+        try:
+            directory = os.path.dirname(self.state_file) or '.'
+            fd, tmp_path = tempfile.mkstemp(dir=directory, suffix='.tmp')
+            with os.fdopen(fd, 'w') as f:
+                json.dump(record, f)
+            os.replace(tmp_path, self.state_file)
+        except OSError as e:
+            logger.warning(f"Could not write kill switch state file: {e}")
+
 # ==================== FLASK DECORATORS ====================
 
 def log_route(log_type: str = 'api'):
@@ -270,9 +927,84 @@ def init_backend_client(app):
         logger.error("Backend configuration incomplete - integration disabled")
         return None
     
-    _backend_client = ShowWiseBackend(backend_url, api_key, org_slug)
+    _backend_client = ShowWiseBackend(
+        backend_url, api_key, org_slug,
+        failure_threshold=app.config.get('BACKEND_BREAKER_FAILURES', 5),
+        cooldown=app.config.get('BACKEND_BREAKER_COOLDOWN', 30),
+    )
+    _backend_client.org_cache = OrgConfigCache(
+        _backend_client,
+        ttl=app.config.get('ORG_CONFIG_TTL', 300),
+        cache_file=app.config.get('ORG_CONFIG_CACHE_FILE') or None,
+    )
+    if app.config.get('BACKEND_LOG_ASYNC', True):
+        _backend_client.shipper = init_log_shipper(app, _backend_client)
     return _backend_client
 
 def get_backend_client() -> Optional[ShowWiseBackend]:
     """Get the global backend client instance"""
     return _backend_client
+
+
+_log_shipper = None
+
+def init_log_shipper(app, backend: ShowWiseBackend) -> LogShipper:
+    """
+    Create the process log shipper from Flask app config
+    
+    Reads BACKEND_LOG_QUEUE_SIZE, BACKEND_LOG_BATCH_SIZE,
+    BACKEND_LOG_FLUSH_SECONDS and BACKEND_LOG_SPILL_FILE. The shipper starts
+    on the first submitted entry and drains on interpreter exit.
+    """
+    global _log_shipper
+    
+    if _log_shipper is not None:
+        _log_shipper.stop()
+    spill_file = app.config.get('BACKEND_LOG_SPILL_FILE', '')
+    if spill_file.lower() == 'off':
+        spill_file = None
+    elif not spill_file:
+        spill_file = os.path.join(tempfile.gettempdir(), f'showwise_log_spill_{backend.org_slug}.jsonl')
+    _log_shipper = LogShipper(
+        backend.send_log,
+        max_queue=app.config.get('BACKEND_LOG_QUEUE_SIZE', 1000),
+        batch_size=app.config.get('BACKEND_LOG_BATCH_SIZE', 50),
+        flush_interval=app.config.get('BACKEND_LOG_FLUSH_SECONDS', 2.0),
+        spill_file=spill_file,
+    )
+    return _log_shipper
+
+def log_shipper_stats() -> Dict:
+    """Shipper counters, or ``{'enabled': False}`` when logs are sent inline"""
+    if _log_shipper is None:
+        return {'enabled': False}
+    return {'enabled': True, **_log_shipper.stats()}
+
+@atexit.register
+def _drain_log_shipper():
+    if _log_shipper is not None:
+        _log_shipper.stop()
+
+
+_kill_switch_monitor = None
+
+def init_kill_switch_monitor(app, backend: ShowWiseBackend) -> KillSwitchMonitor:
+    """
+    Initialize the kill switch monitor from Flask app config
+    
+    Reads KILL_SWITCH_POLL_SECONDS, KILL_SWITCH_FAIL_MODE and
+    KILL_SWITCH_STATE_FILE. Call ``start()`` on the result to begin polling.
+    """
+    global _kill_switch_monitor
+    
+    _kill_switch_monitor = KillSwitchMonitor(
+        backend,
+        poll_interval=app.config.get('KILL_SWITCH_POLL_SECONDS', 30),
+        fail_mode=app.config.get('KILL_SWITCH_FAIL_MODE', 'open'),
+        state_file=app.config.get('KILL_SWITCH_STATE_FILE') or None,
+    )
+    return _kill_switch_monitor
+
+def get_kill_switch_monitor() -> Optional[KillSwitchMonitor]:
+    """Get the global kill switch monitor instance"""
+    return _kill_switch_monitor
@@ -0,0 +1,131 @@
+"""benchmarks/bench_availability.py — /api/unavailabilities-week, old loop vs availability engine.
+
+Seeds synthetic crew (one-off unavailability plus daily, weekly and monthly
+rules each) into an in-memory database, then times the original per-user,
+day-by-day expansion (reproduced below as the reference) against
+services.availability for windows from a week to a year, and checks both
+return the same intervals.
+
+    python benchmarks/bench_availability.py [crew] [repeats]
+"""
+
+import os, random, sys, time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app import create_app                                                  # noqa: E402
+from extensions import db                                                   # noqa: E402
+from models import RecurringUnavailability, User, UserUnavailability       # noqa: E402
+from services.availability import busy_intervals, to_dict                   # noqa: E402
+
+BASE = datetime(2025, 1, 6)
+
+
+# ---------------------------------------------------------------------------
+# Reference: the endpoint body as it was before the engine
+# ---------------------------------------------------------------------------
+
+def legacy_unavailabilities(start_date, end_date):
+    crew_users = User.query.filter_by(user_role='crew').all()
+    unavailabilities = []
+    for user in crew_users:
+        for u in UserUnavailability.query.filter(
+            UserUnavailability.user_id == user.id,
+            UserUnavailability.start_date <= end_date,
+            UserUnavailability.end_date   >= start_date,
+        ).all():
+            unavailabilities.append({
+                'id': u.id, 'username': user.username, 'title': u.title,
+                'start': u.start_date.isoformat(), 'end': u.end_date.isoformat(),
+                'description': u.description, 'is_all_day': u.is_all_day,
+                'type': 'unavailability',
+            })
+        for rec in RecurringUnavailability.query.filter(
+            RecurringUnavailability.user_id   == user.id,
+            RecurringUnavailability.is_active == True,
+            RecurringUnavailability.start_date <= end_date,
+            (RecurringUnavailability.end_date >= start_date) | (RecurringUnavailability.end_date == None),
+        ).all():
+            current = start_date
+            while current < end_date:
+                should = False
+                if rec.pattern_type == 'daily':
+                    should = True
+                elif rec.pattern_type == 'weekly':
+                    days   = list(map(int, rec.days_of_week.split(','))) if rec.days_of_week else []
+                    form_d = (current.weekday() + 1) % 7
+                    should = form_d in days
+                elif rec.pattern_type == 'monthly':
+                    should = current.day == rec.day_of_month
+                if should and current.date() >= rec.start_date.date():
+                    if rec.end_date is None or current.date() <= rec.end_date.date():
+                        sh, sm = map(int, rec.start_time.split(':'))
+                        eh, em = map(int, rec.end_time.split(':'))
+                        unavailabilities.append({
+                            'id': f'rec-{rec.id}-{current.date()}',
+                            'username': user.username, 'title': rec.title,
+                            'start': current.replace(hour=sh, minute=sm, second=0).isoformat(),
+                            'end':   current.replace(hour=eh, minute=em, second=0).isoformat(),
+                            'description': rec.description, 'is_all_day': False,
+                            'type': 'recurring_unavailability',
+                        })
+                current += timedelta(days=1)
+    return unavailabilities
+
+
+def engine_unavailabilities(start_date, end_date):
+    busy = busy_intervals(start_date, end_date, role='crew')
+    return [to_dict(b) for user_id in sorted(busy) for b in busy[user_id]]
+
+
+def seed(crew: int) -> None:
+    rng = random.Random(7)
+    users = [User(username=f'crew{i:03d}', user_role='crew') for i in range(crew)]
+    db.session.add_all(users)
+    db.session.flush()
+    for u in users:
+        for _ in range(3):
+            start = BASE + timedelta(days=rng.randrange(365), hours=rng.randrange(24))
+            db.session.add(UserUnavailability(user_id=u.id, title='Away', start_date=start,
+                                              end_date=start + timedelta(hours=rng.randrange(2, 72))))
+        rules = [('daily', None, None), ('weekly', ','.join(map(str, rng.sample(range(7), 2))), None),
+                 ('monthly', None, rng.randrange(1, 29))]
+        for pattern, days, dom in rules:
+            sh = rng.randrange(6, 20)
+            db.session.add(RecurringUnavailability(
+                user_id=u.id, title=f'{pattern} block', start_time=f'{sh:02d}:00',
+                end_time=f'{sh + 2:02d}:30', pattern_type=pattern, days_of_week=days, day_of_month=dom,
+                start_date=BASE - timedelta(days=rng.randrange(60)),
+                end_date=None if rng.random() < 0.5 else BASE + timedelta(days=rng.randrange(120, 400)),
+            ))
+    db.session.commit()
+
+
+def best_of(fn, repeats, *args):
+    best = float('inf')
+    for _ in range(repeats):
+        db.session.expire_all()
+        t0 = time.perf_counter()
+        result = fn(*args)
+        best = min(best, time.perf_counter() - t0)
+    return best, result
+
+
+def main(crew: int = 100, repeats: int = 3) -> None:
+    app = create_app('testing')
+    with app.app_context():
+        db.create_all()
+        seed(crew)
+        print(f"{crew} crew, 3 one-off + 3 recurring rules each; best of {repeats}\n")
+        print(f"{'window':<8} {'intervals':>9} {'legacy ms':>10} {'engine ms':>10} {'speed-up':>9}")
+        for label, days in (('week', 7), ('month', 31), ('season', 92), ('year', 365)):
+            start, end = BASE + timedelta(days=14), BASE + timedelta(days=14 + days)
+            old_t, old = best_of(legacy_unavailabilities, repeats, start, end)
+            new_t, new = best_of(engine_unavailabilities, repeats, start, end)
+            assert old == new, f'results differ for {label}'
+            print(f"{label:<8} {len(new):>9} {old_t * 1e3:>10.1f} {new_t * 1e3:>10.1f} {old_t / new_t:>8.1f}x")
+
+
+if __name__ == '__main__':
+    main(*(int(a) for a in sys.argv[1:3]))
@@ -0,0 +1,104 @@
+"""benchmarks/bench_conflicts.py — Conflict checks against the cached schedule index.
+
+Seeds synthetic crew with shift assignments, event crew assignments,
+one-off and recurring unavailability over two months, builds the index
+once, then times single-user conflict checks and "who is free" lookups
+against it, next to the fresh per-user check the assignment endpoints make.
+
+    python benchmarks/bench_conflicts.py [crew] [queries]
+"""
+
+import os, random, statistics, sys, time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app import create_app                                                  # noqa: E402
+from extensions import db                                                   # noqa: E402
+from models import (                                                        # noqa: E402
+    CrewAssignment, Event, RecurringUnavailability, Shift, ShiftAssignment, User,
+    UserUnavailability,
+)
+from services.conflicts import booking_conflicts, build_index              # noqa: E402
+
+BASE = datetime(2025, 3, 3)
+DAYS = 60
+
+
+def seed(crew: int) -> list:
+    rng = random.Random(11)
+    users = [User(username=f'crew{i:03d}', user_role='crew') for i in range(crew)]
+    events = [Event(title=f'Show {d}', event_date=BASE + timedelta(days=d, hours=19),
+                    event_end_date=BASE + timedelta(days=d, hours=22, minutes=30)) for d in range(DAYS)]
+    db.session.add_all(users + events)
+    db.session.flush()
+    shifts = []
+    for ev in events:
+        for h, title in ((14, 'Load-in'), (18, 'Show call'), (22, 'Get-out')):
+            shifts.append(Shift(event_id=ev.id, title=title, created_by='bench', positions_needed=6,
+                                shift_date=ev.event_date.replace(hour=h),
+                                shift_end_date=ev.event_date.replace(hour=h) + timedelta(hours=4)))
+    db.session.add_all(shifts)
+    db.session.flush()
+    for u in users:
+        for ev in rng.sample(events, 12):
+            db.session.add(CrewAssignment(event_id=ev.id, crew_member=u.username))
+        for sh in rng.sample(shifts, 20):
+            db.session.add(ShiftAssignment(shift_id=sh.id, user_id=u.id, status='accepted'))
+        for _ in range(4):
+            start = BASE + timedelta(days=rng.randrange(DAYS), hours=rng.randrange(24))
+            db.session.add(UserUnavailability(user_id=u.id, title='Away', start_date=start,
+                                              end_date=start + timedelta(hours=rng.randrange(2, 48))))
+        db.session.add(RecurringUnavailability(
+            user_id=u.id, title='Class', start_time='09:00', end_time='12:00', pattern_type='weekly',
+            days_of_week=','.join(map(str, rng.sample(range(7), 2))), start_date=BASE))
+    db.session.commit()
+    return shifts
+
+
+def timed(fn, n):
+    samples = []
+    for _ in range(n):
+        t0 = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - t0)
+    samples.sort()
+    return statistics.median(samples) * 1e3, samples[int(0.95 * (n - 1))] * 1e3
+
+
+def main(crew: int = 200, queries: int = 2000) -> None:
+    app = create_app('testing')
+    with app.app_context():
+        db.create_all()
+        shifts = seed(crew)
+        rng = random.Random(5)
+        user_ids = [uid for (uid,) in db.session.query(User.id)]
+
+        t0 = time.perf_counter()
+        index = build_index(BASE, BASE + timedelta(days=DAYS))
+        build_ms = (time.perf_counter() - t0) * 1e3
+        commitments = sum(len(i) for i in index.by_user.values())
+
+        def one_check():
+            sh = rng.choice(shifts)
+            index.conflicts(rng.choice(user_ids), sh.shift_date, sh.shift_end_date, sh.event_id, sh.id)
+
+        def who_is_free():
+            sh = rng.choice(shifts)
+            index.availability(sh.shift_date, sh.shift_end_date, ('crew',), sh.event_id, sh.id)
+
+        def fresh_check():
+            sh = rng.choice(shifts)
+            booking_conflicts(rng.choice(user_ids), sh.shift_date, sh.shift_end_date, sh.event_id, sh.id)
+
+        print(f"{crew} crew, {DAYS} days, {commitments} commitments; index built in {build_ms:.0f} ms\n")
+        print(f"{'query':<34} {'median ms':>10} {'p95 ms':>8}")
+        for label, fn, n in (('conflict check (cached index)', one_check, queries),
+                             (f'who is free, {crew} crew (cached)', who_is_free, queries // 10),
+                             ('fresh single-user check (DB)', fresh_check, queries // 20)):
+            med, p95 = timed(fn, n)
+            print(f"{label:<34} {med:>10.4f} {p95:>8.4f}")
+
+
+if __name__ == '__main__':
+    main(*(int(a) for a in sys.argv[1:3]))
@@ -0,0 +1,152 @@
+"""benchmarks/bench_discord_bot_modes.py — Bot command latency, HTTP vs in-process.
+
+Seeds a throwaway SQLite database, serves the app on a loopback port and
+times the calls each bot command makes, first over HTTP (what a remote bot
+does) and then through discord_client.InProcessClient (DISCORD_BOT_MODE=
+inprocess). Caching is off so every call reaches the service layer.
+
+HTTP mode uses discord_client.WebAppClient when aiohttp is installed; without
+it, a urllib client (one keep-alive-less request per call, run on a thread)
+stands in and the report says so.
+
+    python benchmarks/bench_discord_bot_modes.py [iterations]
+"""
+
+import asyncio, json, logging, os, statistics, sys, tempfile, threading, time
+import urllib.error, urllib.request
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import config                                                          # noqa: E402
+import discord_client                                                  # noqa: E402
+from discord_client import InProcessClient, WebAppClient, _CachedClient  # noqa: E402
+
+
+class _UrllibClient(_CachedClient):
+    """Stand-in for WebAppClient when aiohttp isn't installed."""
+
+    def __init__(self, base_url: str):
+        super().__init__(concurrency=10, cache_ttl=0)
+        self.base_url = base_url
+
+    async def _request(self, method, path, json=None):
+        return await asyncio.get_running_loop().run_in_executor(None, self._fetch, method, path, json)
+
+    def _fetch(self, method, path, payload):
+        body = None if payload is None else _dumps(payload)
+        req = urllib.request.Request(self.base_url + path, data=body, method=method,
+                                     headers={'Content-Type': 'application/json'})
+        try:
+            with urllib.request.urlopen(req, timeout=5) as r:
+                return r.status, json_loads(r.read())
+        except urllib.error.HTTPError as exc:
+            return exc.code, json_loads(exc.read())
+
+
+def _dumps(obj) -> bytes:
+    return json.dumps(obj).encode()
+
+
+def json_loads(raw: bytes) -> dict:
+    try:
+        data = json.loads(raw or b'{}')
+    except ValueError:
+        return {}
+    return data if isinstance(data, dict) else {}
+
+
+def seed(app) -> int:
+    from extensions import db
+    from models import CrewAssignment, Equipment, Event, PickListItem, User
+    with app.app_context():
+        db.create_all()
+        users = [User(username=f'crew{i}', password_hash='x', discord_id=str(1000 + i)) for i in range(50)]
+        db.session.add_all(users)
+        events = [Event(title=f'Show {i}', created_by='admin', location='Main hall',
+                        event_date=datetime.now() + timedelta(days=i + 1)) for i in range(30)]
+        db.session.add_all(events)
+        db.session.add_all(Equipment(barcode=f'EQ{i:05d}', name=f'Lamp {i}', category='Lighting')
+                           for i in range(300))
+        db.session.flush()
+        for ev in events:
+            db.session.add_all(CrewAssignment(event_id=ev.id, crew_member=u.username)
+                               for u in users[:12])
+            db.session.add_all(PickListItem(event_id=ev.id, item_name=f'Item {n}', quantity=2)
+                               for n in range(20))
+        db.session.commit()
+        return events[0].id
+
+
+def commands(event_id: int, secret: str):
+    """(label, coroutine factory) for each bot command's web-app call."""
+    toggle = {'secret': secret, 'event_id': event_id, 'discord_id': '1049'}
+    return [
+        ('/list',       lambda c: c.get_json('/discord/list-events')),
+        ('/crew',       lambda c: c.get_json(f'/discord/event-crew/{event_id}')),
+        ('/picklist',   lambda c: c.get_json(f'/discord/pick-list/{event_id}')),
+        ('/myevents',   lambda c: c.get_json('/discord/user-events/1001')),
+        ('/find',       lambda c: c.get_json('/discord/search-equipment/Lamp%201')),
+        ('/join+leave', lambda c: _join_leave(c, toggle)),
+    ]
+
+
+async def _join_leave(client, payload):
+    status, _ = await client.post_json('/discord/join-event', payload)
+    assert status == 200, status
+    return await client.post_json('/discord/leave-event', payload)
+
+
+async def measure(client, cmds, iterations: int) -> dict:
+    results = {}
+    for label, call in cmds:
+        status, _ = await call(client)                 # warm-up, and a sanity check
+        assert status == 200, (label, status)
+        samples = []
+        for _ in range(iterations):
+            start = time.perf_counter()
+            await call(client)
+            samples.append(time.perf_counter() - start)
+        samples.sort()
+        results[label] = (statistics.median(samples), samples[int(0.95 * (len(samples) - 1))])
+    await client.close()
+    return results
+
+
+def main(iterations: int = 200) -> None:
+    from werkzeug.serving import make_server
+
+    tmp = tempfile.mkdtemp(prefix='showwise-bench-')
+    config.TestingConfig.SQLALCHEMY_DATABASE_URI = f"sqlite:///{os.path.join(tmp, 'bench.db')}"
+
+    from app import create_app
+    from routes.discord import DISCORD_BOT_SECRET
+    web = create_app('testing')
+    event_id = seed(web)
+    cmds = commands(event_id, DISCORD_BOT_SECRET)
+
+    logging.getLogger('werkzeug').setLevel(logging.WARNING)
+    server = make_server('127.0.0.1', 0, web, threaded=True)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base_url = f'http://127.0.0.1:{server.server_port}'
+
+    if discord_client.aiohttp is not None:
+        http_label, http_client = 'http (aiohttp)', WebAppClient(base_url, cache_ttl=0)
+    else:
+        http_label, http_client = 'http (urllib stand-in)', _UrllibClient(base_url)
+    over_http = asyncio.run(measure(http_client, cmds, iterations))
+    server.shutdown()
+
+    bot_app = create_app('testing', background_services=False)
+    in_process = asyncio.run(measure(InProcessClient(bot_app, cache_ttl=0), cmds, iterations))
+
+    print(f"{iterations} calls per command; median / p95 in ms\n")
+    print(f"{'command':<12} {http_label:>24} {'in-process':>18} {'speed-up':>9}")
+    for label, _ in cmds:
+        h, p = over_http[label], in_process[label]
+        print(f"{label:<12} {h[0] * 1e3:>11.2f} / {h[1] * 1e3:>8.2f} "
+              f"{p[0] * 1e3:>7.2f} / {p[1] * 1e3:>8.2f} {h[0] / p[0]:>8.1f}x")
+
+
+if __name__ == '__main__':
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 200)
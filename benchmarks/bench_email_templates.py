@@ -0,0 +1,101 @@
+"""benchmarks/bench_email_templates.py — Per-render cost of each email template.
+
+Compares the original renderer (file read plus regex passes on every send,
+reproduced below as the reference) with the compiled, cached renderer in
+services.email_service, and checks that both produce the same HTML. (The
+original leaked a literal ``{% endif %}`` whenever an if-block was true;
+that artefact is ignored in the comparison.)
+
+    python benchmarks/bench_email_templates.py [iterations]
+"""
+
+import os, re, sys, timeit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from services import email_service                                  # noqa: E402
+from services.email_service import TEMPLATES_DIR, _render, _org_defaults  # noqa: E402
+
+
+# ---------------------------------------------------------------------------
+# Reference: the renderer as it was before templates were compiled
+# ---------------------------------------------------------------------------
+
+def legacy_render(template_name, context):
+    with open(os.path.join(TEMPLATES_DIR, template_name), "r", encoding="utf-8") as f:
+        html = f.read()
+
+    def replace_for(match):
+        var, iterable_name, body = match.group(1), match.group(2), match.group(3)
+        return "".join(_legacy_sub(body, {**context, var: item})
+                       for item in context.get(iterable_name, []))
+
+    html = re.sub(r"\{%-?\s*for\s+(\w+)\s+in\s+(\w+)\s*-?%\}(.*?)\{%-?\s*endfor\s*-?%\}",
+                  replace_for, html, flags=re.DOTALL)
+
+    def replace_if(match):
+        full = match.group(0)
+        conds = [c[0] or c[1] for c in re.findall(
+            r"\{%-?\s*if\s+(.*?)\s*-?%\}|\{%-?\s*elif\s+(.*?)\s*-?%\}", full)]
+        for idx, cond in enumerate(conds):
+            if _legacy_cond(cond, context):
+                parts = re.split(r"\{%-?\s*(?:elif\b.*?|else)\s*-?%\}",
+                                 full[full.index("%}") + 2:], flags=re.DOTALL)
+                return parts[idx] if idx < len(parts) else ""
+        else_match = re.search(r"\{%-?\s*else\s*-?%\}(.*?)\{%-?\s*endif\s*-?%\}", full, flags=re.DOTALL)
+        return else_match.group(1) if else_match else ""
+
+    html = re.sub(r"\{%-?\s*if\b.*?\{%-?\s*endif\s*-?%\}", replace_if, html, flags=re.DOTALL)
+    return _legacy_sub(html, context)
+
+
+def _legacy_sub(text, ctx):
+    def replacer(m):
+        val = ctx.get(m.group(1).strip(), "")
+        return str(val) if val is not None else ""
+    return re.sub(r"\{\{\s*(\w+)\s*\}\}", replacer, text)
+
+
+def _legacy_cond(cond, ctx):
+    cond = cond.strip()
+    if cond.startswith("not "):
+        return not bool(ctx.get(cond[4:].strip()))
+    return bool(ctx.get(cond))
+
+
+# ---------------------------------------------------------------------------
+
+SAMPLE_CONTEXT = {
+    **_org_defaults({"name": "Riverside Theatre"}),
+    "recipient_name": "Sam", "username": "sam", "password": "correct-horse",
+    "signup_url": "https://showwise.app/signup?code=ABC123",
+    "signup_url_base": "https://showwise.app/signup", "signup_url_short": "showwise.app/signup",
+    "invite_code": "ABC123", "role_label": "Crew", "expires_str": "January 01, 2030 at 09:00 AM UTC",
+    "event_title": "Opening Night", "event_date": "January 01, 2030 at 07:30 PM",
+    "event_location": "Main Stage", "role": "Lighting", "event_description": "Full dress run.",
+    "shift_title": "Bump in", "shift_date": "January 01, 2030 09:00", "shift_end_time": "17:00",
+    "location": "Loading dock", "positions_needed": "4", "description": "Bring gloves.",
+    "character_name": "Puck", "role_type": "Lead", "reset_url": "https://showwise.app/reset/xyz",
+    "changed_at": "January 01, 2030 at 10:00 AM", "reminder_type": "tomorrow",
+}
+
+
+def main(iterations: int = 2000) -> None:
+    names = sorted(n for n in os.listdir(TEMPLATES_DIR) if n.endswith(".html"))
+    print(f"{'template':<24}{'before µs':>12}{'after µs':>12}{'speedup':>10}")
+    for name in names:
+        expected = re.sub(r"\{%-?\s*endif\s*-?%\}", "", legacy_render(name, SAMPLE_CONTEXT))
+        assert _render(name, SAMPLE_CONTEXT) == expected, name
+        before = timeit.timeit(lambda: legacy_render(name, SAMPLE_CONTEXT), number=iterations)
+        after  = timeit.timeit(lambda: _render(name, SAMPLE_CONTEXT), number=iterations)
+        print(f"{name:<24}{before / iterations * 1e6:>12.1f}{after / iterations * 1e6:>12.1f}"
+              f"{before / after:>9.1f}x")
+
+    email_service.clear_template_cache()
+    cold = timeit.timeit(lambda: (email_service.clear_template_cache(),
+                                  _render("invite.html", SAMPLE_CONTEXT)), number=200)
+    print(f"\ncold compile + render (invite.html): {cold / 200 * 1e6:.1f} µs")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 2000)
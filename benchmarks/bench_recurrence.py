@@ -0,0 +1,80 @@
+"""benchmarks/bench_recurrence.py — Recurring series as rows vs. as a rule.
+
+Creates the same daily series twice: once the old way, one Event row per
+occurrence (as routes/events.py used to write them), and once as a single
+rule row expanded on read. Reports table size, creation time, and the time
+for a one-month calendar window and for the shared ICS feed.
+
+    python benchmarks/bench_recurrence.py [series] [occurrences]
+"""
+
+import os, statistics, sys, time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app import create_app                                                  # noqa: E402
+from extensions import db                                                   # noqa: E402
+from models import Event                                                    # noqa: E402
+from services.calendar_service import get_calendar_window                   # noqa: E402
+from services.ics_service import _generate                                  # noqa: E402
+
+BASE = datetime(2025, 3, 3, 19)
+
+
+def seed_rows(series: int, count: int) -> None:
+    for i in range(series):
+        parent = Event(title=f'Series {i}', event_date=BASE + timedelta(minutes=i),
+                       event_end_date=BASE + timedelta(minutes=i, hours=2), created_by='bench')
+        db.session.add(parent)
+        db.session.flush()
+        for n in range(1, count):
+            start = parent.event_date + timedelta(days=n)
+            db.session.add(Event(title=parent.title, event_date=start, event_end_date=start + timedelta(hours=2),
+                                 created_by='bench', is_recurring_instance=True, recurring_event_id=parent.id))
+    db.session.commit()
+
+
+def seed_rules(series: int, count: int) -> None:
+    db.session.add_all(Event(title=f'Series {i}', event_date=BASE + timedelta(minutes=i),
+                             event_end_date=BASE + timedelta(minutes=i, hours=2), created_by='bench',
+                             recurrence_pattern='daily', recurrence_count=count)
+                       for i in range(series))
+    db.session.commit()
+
+
+def timed(fn, n=20):
+    samples = []
+    for _ in range(n):
+        t0 = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - t0)
+    return statistics.median(samples) * 1e3
+
+
+def run(label: str, seed, series: int, count: int) -> None:
+    app = create_app('testing')
+    with app.app_context():
+        db.create_all()
+        t0 = time.perf_counter()
+        seed(series, count)
+        create_ms = (time.perf_counter() - t0) * 1e3
+        rows   = Event.query.count()
+        lo     = BASE + timedelta(days=count // 2)
+        window = timed(lambda: get_calendar_window(lo, lo + timedelta(days=31)))
+        feed   = timed(lambda: sum(len(c) for c in _generate(None, BASE)), 5)
+        shown  = len(get_calendar_window(lo, lo + timedelta(days=31))['events'])
+        print(f"{label:<22} {rows:>8} {create_ms:>10.0f} {window:>12.1f} {shown:>7} {feed:>10.0f}")
+        db.session.remove()
+        db.drop_all()
+
+
+def main(series: int = 20, count: int = 1000) -> None:
+    print(f"{series} daily series x {count} occurrences\n")
+    print(f"{'storage':<22} {'rows':>8} {'create ms':>10} {'month ms':>12} {'events':>7} {'ICS ms':>10}")
+    run('row per occurrence', seed_rows, series, count)
+    run('rule, expanded on read', seed_rules, series, count)
+
+
+if __name__ == '__main__':
+    main(*(int(a) for a in sys.argv[1:3]))
@@ -71,17 +71,63 @@ class BaseConfig:
     MAIL_PASSWORD       = os.environ.get('MAIL_PASSWORD', '')
     MAIL_DEFAULT_SENDER = os.environ.get('MAIL_DEFAULT_SENDER', 'noreply@prodcrew.local')
 
+    # Outbound mail is queued and sent in batches by a background thread (0 = send inline)
+    MAIL_ASYNC         = os.environ.get('MAIL_ASYNC', '1').lower() not in ('0', 'false', 'no')
+    MAIL_QUEUE_SIZE    = int(os.environ.get('MAIL_QUEUE_SIZE', 1000))
+    MAIL_BATCH_SIZE    = int(os.environ.get('MAIL_BATCH_SIZE', 50))
+    MAIL_MAX_RETRIES   = int(os.environ.get('MAIL_MAX_RETRIES', 4))
+    MAIL_RETRY_BACKOFF = float(os.environ.get('MAIL_RETRY_BACKOFF', 2.0))   # seconds, doubles per attempt
+
     # Organisation
     ORGANIZATION_SLUG = os.environ.get('ORGANIZATION_SLUG', '')
     MAIN_SERVER_URL   = os.environ.get('MAIN_SERVER_URL', 'https://showwise.app')
     SIGNUP_BASE_URL   = os.environ.get('SIGNUP_BASE_URL', os.environ.get('MAIN_SERVER_URL', ''))
 
+    # Per-user dashboard cache (seconds, 0 = off). Per process, cleared on local changes.
+    DASHBOARD_CACHE_SECONDS = int(os.environ.get('DASHBOARD_CACHE_SECONDS', 0))
+
+    # Schedule index behind the "who is free" / conflict APIs (seconds, 0 = rebuild per request).
+    # Per process, cleared on local changes; assignment endpoints always check fresh.
+    CONFLICT_INDEX_SECONDS = int(os.environ.get('CONFLICT_INDEX_SECONDS', 60))
+    CONFLICT_INDEX_DAYS    = int(os.environ.get('CONFLICT_INDEX_DAYS', 45))   # horizon loaded per build
+
+    # ShowWise backend kill switch (polled in the background, shared across workers)
+    KILL_SWITCH_POLL_SECONDS = int(os.environ.get('KILL_SWITCH_POLL_SECONDS', 30))
+    KILL_SWITCH_FAIL_MODE    = os.environ.get('KILL_SWITCH_FAIL_MODE', 'open')   # 'open' | 'closed'
+    KILL_SWITCH_STATE_FILE   = os.environ.get('KILL_SWITCH_STATE_FILE', '')
+
+    # Backend log entries are queued and shipped by a background thread (0 = send inline).
+    # Overflow spills to a JSON-lines file ('' = system temp dir, 'off' = drop instead).
+    BACKEND_LOG_ASYNC         = os.environ.get('BACKEND_LOG_ASYNC', '1').lower() not in ('0', 'false', 'no')
+    BACKEND_LOG_QUEUE_SIZE    = int(os.environ.get('BACKEND_LOG_QUEUE_SIZE', 1000))
+    BACKEND_LOG_BATCH_SIZE    = int(os.environ.get('BACKEND_LOG_BATCH_SIZE', 50))
+    BACKEND_LOG_FLUSH_SECONDS = float(os.environ.get('BACKEND_LOG_FLUSH_SECONDS', 2.0))
+    BACKEND_LOG_SPILL_FILE    = os.environ.get('BACKEND_LOG_SPILL_FILE', '')
+
+    # Stop calling an unreachable backend for a cooldown after this many failures in a row
+    BACKEND_BREAKER_FAILURES = int(os.environ.get('BACKEND_BREAKER_FAILURES', 5))
+    BACKEND_BREAKER_COOLDOWN = float(os.environ.get('BACKEND_BREAKER_COOLDOWN', 30))   # seconds
+
+    # Organisation config from the backend, shared by workers via a JSON file ('' = system temp dir).
+    # Expired copies are served while one worker refreshes in the background.
+    ORG_CONFIG_TTL        = int(os.environ.get('ORG_CONFIG_TTL', 300))
+    ORG_CONFIG_CACHE_FILE = os.environ.get('ORG_CONFIG_CACHE_FILE', '')
+
+    # Processes used to encode QR codes for large tag sheets (0 = one per CPU, 1 = inline)
+    QR_WORKERS = int(os.environ.get('QR_WORKERS', 0))
+
+    # Rendered event briefs, keyed by content version (default: system temp dir)
+    REPORT_CACHE_DIR = os.environ.get('REPORT_CACHE_DIR', '')
+
     # Discord
     DISCORD_BOT_TOKEN   = os.environ.get('DISCORD_BOT_TOKEN', '')
     DISCORD_WEBHOOK_URL = os.environ.get('DISCORD_WEBHOOK_URL', '')
     DISCORD_GUILD_ID    = os.environ.get('DISCORD_GUILD_ID', '')
     DISCORD_BOT_SECRET  = os.environ.get('DISCORD_BOT_SECRET', 'change-this-secret')
 
+    # Rocket.Chat: hours between runs that provision chat accounts for unmapped users
+    ROCKETCHAT_SYNC_HOURS = float(os.environ.get('ROCKETCHAT_SYNC_HOURS', 6))
+
     # Google OAuth
     GOOGLE_CLIENT_ID     = os.environ.get('GOOGLE_CLIENT_ID', '')
     GOOGLE_CLIENT_SECRET = os.environ.get('GOOGLE_CLIENT_SECRET', '')
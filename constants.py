@@ -21,3 +21,11 @@ USER_ROLES = ('crew', 'staff', 'cast')
 SHIFT_STATUSES = ('pending', 'accepted', 'rejected', 'confirmed')
 
 RECURRENCE_PATTERNS = ('daily', 'weekly', 'biweekly', 'monthly', 'yearly')
+
+# Code128 label presets: (label width mm, label height mm, name font size pt).
+# Bars are vector and scaled to the label width, so any preset prints crisply.
+BARCODE_SIZES = {
+    'small':  (50, 25, 8),
+    'medium': (70, 35, 10),
+    'large':  (90, 45, 12),
+}
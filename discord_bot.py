@@ -1,22 +1,44 @@
 # Updated discord_bot.py - Replace your existing file with this
 
+import os
+from urllib.parse import quote
+
 import discord
 from discord.ext import commands
-import os
-import requests
 from dotenv import load_dotenv
 
+from discord_client import WebAppClient, InProcessClient
+
 load_dotenv()
 
 DISCORD_BOT_TOKEN = os.environ.get('DISCORD_BOT_TOKEN')
 WEB_APP_URL = os.environ.get('WEB_APP_URL', 'http://localhost:5000')
 DISCORD_BOT_SECRET = os.environ.get('DISCORD_BOT_SECRET', 'change-this-secret')
+# 'http' talks to WEB_APP_URL; 'inprocess' opens the app's database directly
+# (only when the bot runs on the same host as the app, see start.sh)
+DISCORD_BOT_MODE = os.environ.get('DISCORD_BOT_MODE', 'http').lower()
+
+
+class ShowWiseBot(commands.Bot):
+    async def setup_hook(self):
+        if DISCORD_BOT_MODE == 'inprocess':
+            from app import create_app
+            self.web = InProcessClient(create_app(background_services=False))
+            print("✓ Calling ShowWise in-process")
+        else:
+            self.web = WebAppClient(WEB_APP_URL)
+
+    async def close(self):
+        if getattr(self, 'web', None) is not None:
+            await self.web.close()
+        await super().close()
+
 
 intents = discord.Intents.default()
 intents.message_content = True
 intents.members = True
 
-bot = commands.Bot(command_prefix='!', intents=intents)
+bot = ShowWiseBot(command_prefix='!', intents=intents)
 
 @bot.event
 async def on_ready():
@@ -33,12 +55,11 @@ async def on_ready():
 async def create_account(interaction: discord.Interaction, username: str, password: str):
     """Create new account in web app"""
     try:
-        response = requests.post(
-            f"{WEB_APP_URL}/discord/create-account",
-            json={"username": username, "password": password, "secret": DISCORD_BOT_SECRET},
-            timeout=5
+        status, data = await bot.web.post_json(
+            "/discord/create-account",
+            {"username": username, "password": password, "secret": DISCORD_BOT_SECRET},
         )
-        if response.status_code == 200:
+        if status == 200:
             embed = discord.Embed(
                 title="✅ Account Created!",
                 description=f"Account **{username}** created successfully!\n\nYou can now use `/link-account` to link your Discord.",
@@ -46,7 +67,7 @@ async def create_account(interaction: discord.Interaction, username: str, passwo
             )
             await interaction.response.send_message(embed=embed, ephemeral=True)
         else:
-            embed = discord.Embed(title="❌ Error", description=response.json().get('error', 'Failed'), color=discord.Color.red())
+            embed = discord.Embed(title="❌ Error", description=data.get('error', 'Failed'), color=discord.Color.red())
             await interaction.response.send_message(embed=embed, ephemeral=True)
     except Exception as e:
         embed = discord.Embed(title="❌ Error", description=str(e), color=discord.Color.red())
@@ -60,18 +81,17 @@ async def link_account(interaction: discord.Interaction, username: str, password
     discord_username = user.name
     
     try:
-        response = requests.post(
-            f"{WEB_APP_URL}/discord/link-existing",
-            json={
+        status, data = await bot.web.post_json(
+            "/discord/link-existing",
+            {
                 "discord_id": discord_id,
                 "discord_username": discord_username,
                 "username": username,
                 "password": password,
                 "secret": DISCORD_BOT_SECRET
             },
-            timeout=5
         )
-        if response.status_code == 200:
+        if status == 200:
             embed = discord.Embed(
                 title="✅ Account Linked!",
                 description=f"Your Discord is linked to **{username}**",
@@ -79,7 +99,7 @@ async def link_account(interaction: discord.Interaction, username: str, password
             )
             await interaction.response.send_message(embed=embed, ephemeral=True)
         else:
-            embed = discord.Embed(title="❌ Error", description=response.json().get('error', 'Failed'), color=discord.Color.red())
+            embed = discord.Embed(title="❌ Error", description=data.get('error', 'Failed'), color=discord.Color.red())
             await interaction.response.send_message(embed=embed, ephemeral=True)
     except Exception as e:
         embed = discord.Embed(title="❌ Error", description=str(e), color=discord.Color.red())
@@ -91,9 +111,9 @@ async def link_account(interaction: discord.Interaction, username: str, password
 async def find_equipment(interaction: discord.Interaction, query: str):
     """Find equipment by name"""
     try:
-        response = requests.get(f"{WEB_APP_URL}/discord/search-equipment/{query}", timeout=5)
-        if response.status_code == 200:
-            equipment = response.json().get('equipment', [])
+        status, data = await bot.web.get_json(f"/discord/search-equipment/{quote(query, safe='')}")
+        if status == 200:
+            equipment = data.get('equipment', [])
             if not equipment:
                 embed = discord.Embed(title="❌ Not Found", description=f"No equipment found for '{query}'", color=discord.Color.red())
             else:
@@ -113,9 +133,9 @@ async def find_equipment(interaction: discord.Interaction, query: str):
 async def list_events(interaction: discord.Interaction):
     """List upcoming events"""
     try:
-        response = requests.get(f"{WEB_APP_URL}/discord/list-events", timeout=5)
-        if response.status_code == 200:
-            events = response.json().get('events', [])
+        status, data = await bot.web.get_json("/discord/list-events", cache=True)
+        if status == 200:
+            events = data.get('events', [])
             if not events:
                 embed = discord.Embed(title="📅 Events", description="No upcoming events", color=discord.Color.blue())
             else:
@@ -135,9 +155,8 @@ async def list_events(interaction: discord.Interaction):
 async def list_crew(interaction: discord.Interaction, event_id: int):
     """List crew assigned to event"""
     try:
-        response = requests.get(f"{WEB_APP_URL}/discord/event-crew/{event_id}", timeout=5)
-        if response.status_code == 200:
-            data = response.json()
+        status, data = await bot.web.get_json(f"/discord/event-crew/{event_id}", cache=True)
+        if status == 200:
             event_title = data.get('event_title', 'Event')
             crew = data.get('crew', [])
             
@@ -157,9 +176,8 @@ async def list_crew(interaction: discord.Interaction, event_id: int):
 async def pick_list(interaction: discord.Interaction, event_id: int):
     """View pick list items - FIXED VERSION"""
     try:
-        response = requests.get(f"{WEB_APP_URL}/discord/pick-list/{event_id}", timeout=5)
-        if response.status_code == 200:
-            data = response.json()
+        status, data = await bot.web.get_json(f"/discord/pick-list/{event_id}", cache=True)
+        if status == 200:
             event_title = data.get('event_title', 'Event')
             items = data.get('items', [])
             
@@ -192,20 +210,19 @@ async def pick_list(interaction: discord.Interaction, event_id: int):
 # EVENT MANAGEMENT
 
 @bot.tree.command(name="join-event", description="Join event by ID")
-async def join_event(interaction: discord.Interaction, event_id: int):
+async def join_event(interaction: discord.Interaction, event_id: str):
     """Join an event"""
     discord_id = str(interaction.user.id)
     try:
-        response = requests.post(
-            f"{WEB_APP_URL}/discord/join-event",
-            json={"discord_id": discord_id, "event_id": event_id, "secret": DISCORD_BOT_SECRET},
-            timeout=5
+        status, data = await bot.web.post_json(
+            "/discord/join-event",
+            {"discord_id": discord_id, "event_id": event_id, "secret": DISCORD_BOT_SECRET},
         )
-        if response.status_code == 200:
+        if status == 200:
             embed = discord.Embed(title="✅ Joined!", description=f"Added to event #{event_id}", color=discord.Color.green())
             await interaction.response.send_message(embed=embed, ephemeral=True)
         else:
-            embed = discord.Embed(title="❌ Error", description=response.json().get('error', 'Failed'), color=discord.Color.red())
+            embed = discord.Embed(title="❌ Error", description=data.get('error', 'Failed'), color=discord.Color.red())
             await interaction.response.send_message(embed=embed, ephemeral=True)
     except Exception as e:
         embed = discord.Embed(title="❌ Error", description=str(e), color=discord.Color.red())
@@ -216,16 +233,15 @@ async def leave_event(interaction: discord.Interaction, event_id: int):
     """Leave an event"""
     discord_id = str(interaction.user.id)
     try:
-        response = requests.post(
-            f"{WEB_APP_URL}/discord/leave-event",
-            json={"discord_id": discord_id, "event_id": event_id, "secret": DISCORD_BOT_SECRET},
-            timeout=5
+        status, data = await bot.web.post_json(
+            "/discord/leave-event",
+            {"discord_id": discord_id, "event_id": event_id, "secret": DISCORD_BOT_SECRET},
         )
-        if response.status_code == 200:
+        if status == 200:
             embed = discord.Embed(title="✅ Left Event", description=f"Removed from event #{event_id}", color=discord.Color.green())
             await interaction.response.send_message(embed=embed, ephemeral=True)
         else:
-            embed = discord.Embed(title="❌ Error", description=response.json().get('error', 'Failed'), color=discord.Color.red())
+            embed = discord.Embed(title="❌ Error", description=data.get('error', 'Failed'), color=discord.Color.red())
             await interaction.response.send_message(embed=embed, ephemeral=True)
     except Exception as e:
         embed = discord.Embed(title="❌ Error", description=str(e), color=discord.Color.red())
@@ -236,9 +252,9 @@ async def my_events(interaction: discord.Interaction):
     """Show your events"""
     discord_id = str(interaction.user.id)
     try:
-        response = requests.get(f"{WEB_APP_URL}/discord/user-events/{discord_id}", timeout=5)
-        if response.status_code == 200:
-            events = response.json().get('events', [])
+        status, data = await bot.web.get_json(f"/discord/user-events/{discord_id}", cache=True)
+        if status == 200:
+            events = data.get('events', [])
             if not events:
                 embed = discord.Embed(title="📅 Your Events", description="Not assigned to any events", color=discord.Color.blue())
             else:
@@ -282,16 +298,15 @@ async def on_reaction_add(reaction, user):
         if footer and "Event ID:" in footer.text:
             try:
                 event_id = int(footer.text.split("Event ID: ")[1])
-                response = requests.post(
-                    f"{WEB_APP_URL}/discord/join-event",
-                    json={
+                status, _ = await bot.web.post_json(
+                    "/discord/join-event",
+                    {
                         "discord_id": str(user.id),
                         "event_id": event_id,
                         "secret": DISCORD_BOT_SECRET
                     },
-                    timeout=5
                 )
-                if response.status_code == 200:
+                if status == 200:
                     try:
                         embed = discord.Embed(title="✅ Added!", description=f"You've joined event #{event_id}", color=discord.Color.green())
                         await user.send(embed=embed)
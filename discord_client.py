@@ -0,0 +1,194 @@
+"""discord_client.py — How the Discord bot reaches ShowWise.
+
+``WebAppClient`` talks to the ``/discord/*`` routes over HTTP and works
+wherever the bot runs. ``InProcessClient`` is for a bot on the same host as
+the app (``DISCORD_BOT_MODE=inprocess``): it opens the app's database itself
+and calls services/discord_service.py directly on a small thread pool,
+skipping JSON, WSGI dispatch and request hooks. Both answer ``(status, data)``
+for the same paths, so bot commands don't care which one they have.
+"""
+
+import asyncio
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import unquote
+
+try:
+    import aiohttp
+except ImportError:          # only WebAppClient needs it
+    aiohttp = None
+
+WEB_APP_TIMEOUT     = float(os.environ.get('WEB_APP_TIMEOUT', 5))        # seconds per request
+WEB_APP_POOL_SIZE   = int(os.environ.get('WEB_APP_POOL_SIZE', 20))       # open connections
+WEB_APP_CONCURRENCY = int(os.environ.get('WEB_APP_CONCURRENCY', 10))     # requests in flight
+WEB_APP_CACHE_TTL   = float(os.environ.get('WEB_APP_CACHE_TTL', 15))     # seconds, read-only lookups
+
+
+class _CachedClient:
+    """Shared ``get_json``/``post_json`` behaviour.
+
+    Read-only lookups can be cached for a few seconds; concurrent identical
+    lookups share one request. Any successful write clears the cache so a
+    user sees their own change straight away. Subclasses provide
+    ``_request(method, path, json=None) -> (status, data)``.
+    """
+
+    def __init__(self, concurrency: int, cache_ttl: float):
+        self.cache_ttl = cache_ttl
+        self._limit    = asyncio.Semaphore(concurrency)
+        self._cache    = {}    # path -> (expires_at, status, data)
+        self._inflight = {}    # path -> Future shared by concurrent identical GETs
+
+    async def get_json(self, path: str, cache: bool = False):
+        """GET *path*; returns ``(status, data)``. With *cache*, 200s are reused for ``cache_ttl``."""
+        if cache:
+            hit = self._cache.get(path)
+            if hit and hit[0] > time.monotonic():
+                return hit[1], hit[2]
+            if path in self._inflight:
+                return await asyncio.shield(self._inflight[path])
+
+        future = asyncio.get_running_loop().create_future() if cache else None
+        if future is not None:
+            self._inflight[path] = future
+        try:
+            result = await self._request('GET', path)
+            if future is not None:
+                if result[0] == 200:
+                    self._cache[path] = (time.monotonic() + self.cache_ttl, *result)
+                future.set_result(result)
+            return result
+        except Exception as exc:
+            if future is not None:
+                future.set_exception(exc)
+                future.exception()          # mark retrieved; waiters re-raise it themselves
+            raise
+        finally:
+            if future is not None:
+                if not future.done():   # the leading call was cancelled; don't strand the waiters
+                    future.cancel()
+                self._inflight.pop(path, None)
+
+    async def post_json(self, path: str, payload: dict):
+        """POST *payload* as JSON; returns ``(status, data)``."""
+        result = await self._request('POST', path, json=payload)
+        if 200 <= result[0] < 300:
+            self._cache.clear()
+        return result
+
+    async def close(self) -> None:
+        pass
+
+
+class WebAppClient(_CachedClient):
+    """Non-blocking calls to the ShowWise web app over one pooled aiohttp session."""
+
+    def __init__(self, base_url: str, timeout: float = WEB_APP_TIMEOUT,
+                 pool_size: int = WEB_APP_POOL_SIZE, concurrency: int = WEB_APP_CONCURRENCY,
+                 cache_ttl: float = WEB_APP_CACHE_TTL):
+        if aiohttp is None:
+            raise RuntimeError('aiohttp is required for the HTTP web-app client')
+        super().__init__(concurrency, cache_ttl)
+        self.base_url  = base_url.rstrip('/')
+        self.timeout   = aiohttp.ClientTimeout(total=timeout, connect=min(timeout, 2))
+        self.pool_size = pool_size
+        self._session  = None
+
+    async def _get_session(self):
+        if self._session is None or self._session.closed:
+            self._session = aiohttp.ClientSession(
+                timeout=self.timeout,
+                connector=aiohttp.TCPConnector(limit=self.pool_size, ttl_dns_cache=300),
+            )
+        return self._session
+
+    async def close(self) -> None:
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+
+    async def _request(self, method: str, path: str, **kwargs):
+        session = await self._get_session()
+        async with self._limit:
+            async with session.request(method, f"{self.base_url}{path}", **kwargs) as response:
+                try:
+                    data = await response.json(content_type=None)
+                except (aiohttp.ContentTypeError, ValueError):
+                    data = {}
+                return response.status, data if isinstance(data, dict) else {}
+
+
+class InProcessClient(_CachedClient):
+    """Calls the Discord service layer directly inside *app* (a ``create_app`` instance).
+
+    Paths are resolved against the app's own URL map, so only routes listed
+    in ``routes.discord.BOT_ENDPOINTS`` are reachable, with the same secret
+    check as over HTTP. The kill switch is honoured from the shared state the
+    web app's monitor keeps.
+    """
+
+    def __init__(self, app, concurrency: int = WEB_APP_CONCURRENCY,
+                 cache_ttl: float = WEB_APP_CACHE_TTL):
+        from routes.discord import BOT_ENDPOINTS, _auth
+        super().__init__(concurrency, cache_ttl)
+        self.app        = app
+        self._endpoints = BOT_ENDPOINTS
+        self._auth      = _auth
+        self._urls      = app.url_map.bind('localhost')
+        self._pool      = ThreadPoolExecutor(max_workers=concurrency,
+                                             thread_name_prefix='discord-inprocess')
+
+    async def close(self) -> None:
+        self._pool.shutdown(wait=False, cancel_futures=True)
+
+    async def _request(self, method: str, path: str, json: dict | None = None):
+        async with self._limit:
+            return await asyncio.get_running_loop().run_in_executor(
+                self._pool, self.call, method, path, json)
+
+    def call(self, method: str, path: str, payload: dict | None = None):
+        """Run one bot request synchronously; returns ``(status, data)``."""
+        from werkzeug.exceptions import HTTPException
+        from extensions import db
+
+        path = unquote(path)
+        try:
+            endpoint, url_args = self._urls.match(path, method=method)
+        except HTTPException as exc:
+            return exc.code, {'error': exc.name}
+        if endpoint not in self._endpoints:
+            return 404, {'error': 'Not Found'}
+        func, needs_auth = self._endpoints[endpoint]
+        payload = payload or {}
+
+        suspended = _suspension()
+        if suspended is not None:
+            return 503, {'error': 'Service suspended', 'reason': suspended}
+        if needs_auth and not self._auth(payload):
+            return 401, {'error': 'Unauthorized'}
+
+        # A request context (not just an app context) so url_for works in to_dict()
+        with self.app.test_request_context(path, method=method):
+            try:
+                data, status = func(payload, **url_args)
+            except Exception as exc:
+                db.session.rollback()
+                print(f"❌ Discord in-process call {method} {path} failed: {exc}")
+                return 500, {}
+            finally:
+                db.session.remove()
+        return status, data
+
+
+def _suspension() -> str | None:
+    """The kill-switch reason if the instance is suspended, else None."""
+    try:
+        from backend_integration import get_kill_switch_monitor
+        monitor = get_kill_switch_monitor()
+        if monitor:
+            enabled, reason = monitor.state
+            if enabled:
+                return reason or ''
+    except Exception:
+        pass
+    return None
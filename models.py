@@ -28,6 +28,7 @@ class User(UserMixin, db.Model):
     profile_picture       = db.Column(db.String(300), nullable=True)
     password_reset_token  = db.Column(db.String(100), nullable=True)
     password_reset_expiry = db.Column(db.DateTime, nullable=True)
+    calendar_token        = db.Column(db.String(64), unique=True, index=True, nullable=True)
 
 
 class TwoFactorAuth(db.Model):
@@ -148,11 +149,12 @@ class Event(db.Model):
     id                    = db.Column(db.Integer, primary_key=True)
     title                 = db.Column(db.String(200), nullable=False)
     description           = db.Column(db.Text)
-    event_date            = db.Column(db.DateTime, nullable=False)
+    event_date            = db.Column(db.DateTime, nullable=False, index=True)
     event_end_date        = db.Column(db.DateTime, nullable=True)
     location              = db.Column(db.String(200))
     created_by            = db.Column(db.String(80))
     created_at            = db.Column(db.DateTime, default=datetime.utcnow)
+    updated_at            = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     discord_message_id    = db.Column(db.String(50), nullable=True)
     cast_description      = db.Column(db.Text)
     recurrence_pattern    = db.Column(db.String(50), nullable=True)
@@ -161,20 +163,34 @@ class Event(db.Model):
     recurrence_count      = db.Column(db.Integer, nullable=True)
     is_recurring_instance = db.Column(db.Boolean, default=False)
     recurring_event_id    = db.Column(db.Integer, nullable=True)
+    # Series are stored as a rule on the first event and expanded on read
+    # (services/recurrence.py). An occurrence only gets its own row, keyed by
+    # the slot it was generated for, once it needs one; cancelled slots are
+    # listed on the series.
+    recurrence_id         = db.Column(db.DateTime, nullable=True)
+    recurrence_exdates    = db.Column(db.Text, nullable=True)
     crew_assignments = db.relationship('CrewAssignment', backref='event', lazy=True, cascade='all, delete-orphan')
     pick_list_items  = db.relationship('PickListItem',   backref='event', lazy=True, cascade='all, delete-orphan')
     stage_plans      = db.relationship('StagePlan',      backref='event', lazy=True, cascade='all, delete-orphan')
 
 
+# At most one materialised row per occurrence of a series
+db.Index('ix_event_series_slot', Event.recurring_event_id, Event.recurrence_id, unique=True)
+
+
 class CrewAssignment(db.Model):
     id           = db.Column(db.Integer, primary_key=True)
-    event_id     = db.Column(db.Integer, db.ForeignKey('event.id'), nullable=False)
+    event_id     = db.Column(db.Integer, db.ForeignKey('event.id'), nullable=False, index=True)
     crew_member  = db.Column(db.String(80), nullable=False)
     role         = db.Column(db.String(100))
     assigned_at  = db.Column(db.DateTime, default=datetime.utcnow)
     assigned_via = db.Column(db.String(20), default='webapp')
 
 
+# Case-insensitive username lookups (dashboard, schedules)
+db.Index('ix_crew_assignment_crew_member_lower', db.func.lower(CrewAssignment.crew_member))
+
+
 class EventSchedule(db.Model):
     id             = db.Column(db.Integer, primary_key=True)
     event_id       = db.Column(db.Integer, db.ForeignKey('event.id'), nullable=False)
@@ -195,6 +211,61 @@ class EventNote(db.Model):
     event = db.relationship('Event', backref=db.backref('notes', cascade='all, delete-orphan'))
 
 
+class EventReminder(db.Model):
+    """A pending or delivered Discord reminder for an event; one row per kind."""
+    __table_args__ = (db.UniqueConstraint('event_id', 'kind', name='uq_event_reminder_kind'),)
+    id         = db.Column(db.Integer, primary_key=True)
+    event_id   = db.Column(db.Integer, db.ForeignKey('event.id'), nullable=False, index=True)
+    kind       = db.Column(db.String(20), nullable=False)   # 1_week_before | 1_day_before | event_today
+    due_at     = db.Column(db.DateTime, nullable=False, index=True)
+    status     = db.Column(db.String(20), default='pending', nullable=False, index=True)
+    # pending | claimed | sent | failed | skipped
+    claimed_by = db.Column(db.String(64))
+    claimed_at = db.Column(db.DateTime)
+    sent_at    = db.Column(db.DateTime)
+    attempts   = db.Column(db.Integer, default=0, nullable=False)
+    last_error = db.Column(db.Text)
+    event = db.relationship('Event', backref=db.backref('reminders', cascade='all, delete-orphan'))
+
+
+class OccurrenceReminder(db.Model):
+    """An EventReminder for an occurrence of a recurring series that has no Event row yet.
+
+    Keyed by the series and the occurrence's slot; handed over to the row's
+    own reminders if the occurrence is materialised.
+    """
+    __table_args__ = (db.UniqueConstraint('series_id', 'slot', 'kind', name='uq_occurrence_reminder_kind'),)
+    id         = db.Column(db.Integer, primary_key=True)
+    series_id  = db.Column(db.Integer, db.ForeignKey('event.id'), nullable=False, index=True)
+    slot       = db.Column(db.DateTime, nullable=False)
+    kind       = db.Column(db.String(20), nullable=False)
+    due_at     = db.Column(db.DateTime, nullable=False, index=True)
+    status     = db.Column(db.String(20), default='pending', nullable=False, index=True)
+    claimed_by = db.Column(db.String(64))
+    claimed_at = db.Column(db.DateTime)
+    sent_at    = db.Column(db.DateTime)
+    attempts   = db.Column(db.Integer, default=0, nullable=False)
+    last_error = db.Column(db.Text)
+    series = db.relationship('Event', backref=db.backref('occurrence_reminders', cascade='all, delete-orphan'))
+
+
+class DiscordDeadLetter(db.Model):
+    """A Discord webhook payload that could not be delivered after retries."""
+    id         = db.Column(db.Integer, primary_key=True)
+    payload    = db.Column(db.Text, nullable=False)        # JSON body as posted
+    error      = db.Column(db.Text)
+    attempts   = db.Column(db.Integer, default=0)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+
+class RocketChatUser(db.Model):
+    """Rocket.Chat account id for a ShowWise username, so chat pages need no lookup."""
+    id         = db.Column(db.Integer, primary_key=True)
+    username   = db.Column(db.String(80), unique=True, nullable=False)
+    rc_user_id = db.Column(db.String(50), nullable=False)
+    synced_at  = db.Column(db.DateTime, default=datetime.utcnow)
+
+
 class PickListItem(db.Model):
     id           = db.Column(db.Integer, primary_key=True)
     item_name    = db.Column(db.String(200), nullable=False)
@@ -218,10 +289,10 @@ class StagePlan(db.Model):
 
 class Shift(db.Model):
     id               = db.Column(db.Integer, primary_key=True)
-    event_id         = db.Column(db.Integer, db.ForeignKey('event.id'), nullable=False)
+    event_id         = db.Column(db.Integer, db.ForeignKey('event.id'), nullable=False, index=True)
     title            = db.Column(db.String(200), nullable=False)
     description      = db.Column(db.Text)
-    shift_date       = db.Column(db.DateTime, nullable=False)
+    shift_date       = db.Column(db.DateTime, nullable=False, index=True)
     shift_end_date   = db.Column(db.DateTime, nullable=False)
     location         = db.Column(db.String(200))
     positions_needed = db.Column(db.Integer, default=1)
@@ -236,8 +307,8 @@ class Shift(db.Model):
 
 class ShiftAssignment(db.Model):
     id           = db.Column(db.Integer, primary_key=True)
-    shift_id     = db.Column(db.Integer, db.ForeignKey('shift.id'), nullable=False)
-    user_id      = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
+    shift_id     = db.Column(db.Integer, db.ForeignKey('shift.id'), nullable=False, index=True)
+    user_id      = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False, index=True)
     assigned_by  = db.Column(db.String(80))
     status       = db.Column(db.String(20), default='pending')
     notes        = db.Column(db.Text)
@@ -378,7 +449,7 @@ class StagePlanObject(db.Model):
 
 class TodoItem(db.Model):
     id           = db.Column(db.Integer, primary_key=True)
-    user_id      = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
+    user_id      = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False, index=True)
     title        = db.Column(db.String(200), nullable=False)
     description  = db.Column(db.Text)
     priority     = db.Column(db.String(20), default='medium')
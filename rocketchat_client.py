@@ -4,9 +4,11 @@ Handles all communication with Rocket.Chat API for messaging
 """
 
 import os
+import time
 import requests
 import json
 import logging
+import threading
 from typing import Optional, List, Dict, Any
 from datetime import datetime
 
@@ -14,7 +16,15 @@ logger = logging.getLogger(__name__)
 
 
 class RocketChatClient:
-    """Client for Rocket.Chat API integration"""
+    """Client for Rocket.Chat API integration
+    
+    Nothing is sent to Rocket.Chat until the first API call, which logs in
+    and keeps the auth token. A 401 (expired or revoked token) triggers one
+    fresh login and a retry. After a failed login, further attempts wait
+    ``LOGIN_RETRY`` seconds so an unreachable server isn't hit on every request.
+    """
+    
+    LOGIN_RETRY = 60  # seconds
     
     def __init__(self):
         self.server_url = os.environ.get('ROCKETCHAT_URL', 'http://localhost:3000')
@@ -26,46 +36,69 @@ class RocketChatClient:
         self.auth_token = None
         self.user_id = None
         self.session = requests.Session()
-        
-        # Authenticate on init
-        self._authenticate()
+        self._auth_lock = threading.Lock()
+        self._login_failed_at = 0.0
     
     def _make_request(self, method: str, endpoint: str, data: Dict = None, headers: Dict = None) -> Dict:
         """Make HTTP request to Rocket.Chat API"""
-        url = f"{self.server_url}/api/v1{endpoint}"
-        
-        req_headers = {
-            'Content-Type': 'application/json',
-            'X-Auth-Token': self.auth_token,
-            'X-User-Id': self.user_id
-        }
-        
-        if headers:
-            req_headers.update(headers)
+        if method not in ('GET', 'POST', 'PUT', 'DELETE'):
+            raise ValueError(f"Unsupported method: {method}")
+        if not self._ensure_auth():
+            return {'success': False, 'error': 'Not authenticated with Rocket.Chat'}
         
+        url = f"{self.server_url}/api/v1{endpoint}"
         try:
-            if method == 'GET':
-                response = self.session.get(url, headers=req_headers, json=data, timeout=10)
-            elif method == 'POST':
-                response = self.session.post(url, headers=req_headers, json=data, timeout=10)
-            elif method == 'PUT':
-                response = self.session.put(url, headers=req_headers, json=data, timeout=10)
-            elif method == 'DELETE':
-                response = self.session.delete(url, headers=req_headers, json=data, timeout=10)
-            else:
-                raise ValueError(f"Unsupported method: {method}")
-            
-            response.raise_for_status()
-            return response.json()
+            for attempt in (1, 2):
+                token = self.auth_token
+                req_headers = {
+                    'Content-Type': 'application/json',
+                    'X-Auth-Token': token,
+                    'X-User-Id': self.user_id
+                }
+                if headers:
+                    req_headers.update(headers)
+                
+                response = self.session.request(method, url, headers=req_headers, json=data, timeout=10)
+                if response.status_code == 401 and attempt == 1 and self._reauthenticate(token):
+                    continue
+                response.raise_for_status()
+                return response.json()
         
         except requests.exceptions.RequestException as e:
             logger.error(f"Rocket.Chat API error: {e}")
             return {'success': False, 'error': str(e)}
     
-    def _authenticate(self):
+    def _ensure_auth(self) -> bool:
+        """Log in on first use; True once a token is held"""
+        if self.auth_token:
+            return True
+        with self._auth_lock:
+            if self.auth_token:
+                return True
+            if self._login_failed_at and time.monotonic() - self._login_failed_at < self.LOGIN_RETRY:
+                return False
+            self._authenticate()
+            if not self.auth_token:
+                self._login_failed_at = time.monotonic()
+            return bool(self.auth_token)
+    
+    def _reauthenticate(self, stale_token: str) -> bool:
+        """Replace a token the server rejected; True if there is a new one to retry with"""
+        if not (self.admin_user and self.admin_password):
+            logger.error("Rocket.Chat rejected the configured admin token")
+            return False
+        with self._auth_lock:
+            if self.auth_token == stale_token:    # another thread may have refreshed already
+                self.auth_token = None
+                self._authenticate(use_token=False)
+                if not self.auth_token:
+                    self._login_failed_at = time.monotonic()
+            return bool(self.auth_token) and self.auth_token != stale_token
+    
+    def _authenticate(self, use_token: bool = True):
         """Authenticate with Rocket.Chat using token or credentials"""
         try:
-            if self.admin_token and self.admin_user_id:
+            if use_token and self.admin_token and self.admin_user_id:
                 # Use provided token and user ID
                 self.auth_token = self.admin_token
                 self.user_id = self.admin_user_id
@@ -99,9 +132,13 @@ class RocketChatClient:
         except Exception as e:
             logger.error(f"Rocket.Chat authentication error: {e}")
     
+    def is_configured(self) -> bool:
+        """Check if credentials are set (no network call)"""
+        return bool((self.admin_token and self.admin_user_id) or (self.admin_user and self.admin_password))
+    
     def is_connected(self) -> bool:
-        """Check if authenticated with Rocket.Chat"""
-        return bool(self.auth_token and self.user_id)
+        """Check if authenticated with Rocket.Chat (logs in if not yet done)"""
+        return self._ensure_auth() and bool(self.user_id)
     
     # ==================== USER METHODS ====================
     
@@ -137,6 +174,15 @@ class RocketChatClient:
         
         return None
     
+    def list_users(self, count: int = 100, offset: int = 0) -> tuple:
+        """One page of Rocket.Chat users as ({username: user_id}, total)"""
+        fields = json.dumps({'username': 1})
+        result = self._make_request('GET', f'/users.list?count={count}&offset={offset}&fields={fields}')
+        if not result.get('success'):
+            return {}, 0
+        users = {u['username']: u['_id'] for u in result.get('users', []) if u.get('username')}
+        return users, result.get('total', 0)
+    
     # ==================== CHANNEL METHODS ====================
     
     def get_or_create_channel(self, channel_name: str, topic: str = None) -> Optional[str]:
@@ -347,7 +393,7 @@ _rc_client = None
 
 
 def init_rocketchat():
-    """Initialize Rocket.Chat client"""
+    """Initialize Rocket.Chat client (no network until first use)"""
     global _rc_client
     _rc_client = RocketChatClient()
     return _rc_client
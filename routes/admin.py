@@ -18,6 +18,7 @@ from models import (
 from decorators import crew_required
 from utils import generate_invite_code, log_security_event, get_organization
 from constants import DEFAULT_ORG
+from services import recurrence
 from services.email_service import send_invite_email
 
 admin_bp = Blueprint('admin', __name__)
@@ -56,7 +57,7 @@ def admin_overview():
         return redirect(url_for('crew.dashboard'))
     now          = datetime.now()
     week_ago     = now - timedelta(days=7)
-    upcoming     = Event.query.filter(Event.event_date >= now).order_by(Event.event_date).limit(10).all()
+    upcoming     = recurrence.upcoming(now, 10)
     active_crew  = db.session.query(CrewAssignment.crew_member).join(Event).filter(
         Event.event_date >= now).distinct().count()
     eq_usage     = db.session.query(Equipment.category,
@@ -379,3 +380,67 @@ def delete_invite(invite_id):
     db.session.delete(invite)
     db.session.commit()
     return jsonify({'success': True})
+
+
+# ---------------------------------------------------------------------------
+# Outbound mail queue
+# ---------------------------------------------------------------------------
+
+@admin_bp.route('/admin/mail-queue', methods=['GET'])
+@login_required
+def mail_queue_status():
+    """Dispatcher counters and the most recent per-message statuses."""
+    if not current_user.is_admin:
+        return jsonify({'error': 'Admin access required'}), 403
+    from services.mail_queue import get_dispatcher, mail_queue_stats
+    dispatcher = get_dispatcher()
+    limit      = min(request.args.get('limit', 50, type=int), 500)
+    return jsonify({
+        'stats':    mail_queue_stats(),
+        'messages': dispatcher.recent(limit) if dispatcher else [],
+    })
+
+
+# ---------------------------------------------------------------------------
+# Backend log shipping
+# ---------------------------------------------------------------------------
+
+@admin_bp.route('/admin/backend-logs', methods=['GET'])
+@login_required
+def backend_log_status():
+    """Log shipper counters: sent, spilled, dropped, queue depth and latency."""
+    if not current_user.is_admin:
+        return jsonify({'error': 'Admin access required'}), 403
+    from backend_integration import log_shipper_stats
+    return jsonify(log_shipper_stats())
+
+
+# ---------------------------------------------------------------------------
+# Discord webhook dead letters
+# ---------------------------------------------------------------------------
+
+@admin_bp.route('/admin/discord/dead-letters', methods=['GET'])
+@login_required
+def discord_dead_letters():
+    if not current_user.is_admin:
+        return jsonify({'error': 'Admin access required'}), 403
+    from models import DiscordDeadLetter
+    letters = DiscordDeadLetter.query.order_by(DiscordDeadLetter.id.desc()).limit(100).all()
+    return jsonify({
+        'count':   DiscordDeadLetter.query.count(),
+        'letters': [{'id': l.id, 'error': l.error, 'attempts': l.attempts,
+                     'created_at': l.created_at.isoformat() if l.created_at else None,
+                     'payload': json.loads(l.payload)} for l in letters],
+    })
+
+
+@admin_bp.route('/admin/discord/dead-letters/redeliver', methods=['POST'])
+@login_required
+def redeliver_discord_dead_letters():
+    if not current_user.is_admin:
+        return jsonify({'error': 'Admin access required'}), 403
+    from services.discord_webhook import redeliver_dead_letters
+    from services.notification_service import DISCORD_WEBHOOK_URL
+    if not DISCORD_WEBHOOK_URL:
+        return jsonify({'error': 'DISCORD_WEBHOOK_URL not configured'}), 400
+    return jsonify({'success': True, **redeliver_dead_letters(DISCORD_WEBHOOK_URL)})
@@ -1,18 +1,24 @@
 """routes/crew.py — Crew assignments, dashboard, schedule, availability."""
 
-from datetime import datetime, timedelta
+from datetime import datetime
 
 from flask import (
-    Blueprint, render_template, request, jsonify,
+    Blueprint, render_template, request, jsonify, abort,
 )
 from flask_login import login_required, current_user
+from sqlalchemy.orm import joinedload
 
 from extensions import db
 from models import (
-    Event, CrewAssignment, User, TodoItem,
+    Event, CrewAssignment, User,
     Shift, ShiftAssignment, UserUnavailability, RecurringUnavailability,
 )
 from decorators import crew_required
+from services import recurrence
+from services.availability import busy_intervals, to_dict
+from services.conflicts import (
+    booking_conflicts, conflict_payload, event_window, schedule_index, shift_window,
+)
 from services.email_service import (
     send_crew_assignment_email, send_event_reminder_email,
 )
@@ -28,38 +34,10 @@ crew_bp = Blueprint('crew', __name__)
 @login_required
 @crew_required
 def dashboard():
-    now             = datetime.now()
-    upcoming_events = Event.query.filter(Event.event_date >= now).order_by(Event.event_date).limit(10).all()
-
-    my_upcoming_events = []
-    for event in upcoming_events:
-        for a in CrewAssignment.query.filter_by(event_id=event.id).all():
-            if a.crew_member.lower() == current_user.username.lower():
-                my_upcoming_events.append(event)
-                break
-
-    pending_tasks       = TodoItem.query.filter_by(user_id=current_user.id, is_completed=False).order_by(TodoItem.due_date).all()
-    week_end            = now + timedelta(days=7)
-    events_this_week    = Event.query.filter(Event.event_date >= now, Event.event_date <= week_end).count()
-    my_events_this_week = 0
-
-    for event in Event.query.filter(Event.event_date >= now, Event.event_date <= week_end).all():
-        for a in CrewAssignment.query.filter_by(event_id=event.id).all():
-            if a.crew_member.lower() == current_user.username.lower():
-                my_events_this_week += 1
-                break
-
-    return render_template(
-        '/crew/dashboard.html',
-        upcoming_events=upcoming_events,
-        my_upcoming_events=my_upcoming_events,
-        pending_tasks_count=len(pending_tasks),
-        pending_tasks=pending_tasks,
-        my_events_this_week=my_events_this_week,
-        events_this_week=events_this_week,
-        next_event=my_upcoming_events[0] if my_upcoming_events else None,
-        now=now,
-    )
+    from flask import current_app
+    from services.dashboard_service import get_dashboard_data
+    data = get_dashboard_data(current_user, ttl=current_app.config.get('DASHBOARD_CACHE_SECONDS', 0))
+    return render_template('/crew/dashboard.html', **data)
 
 
 # ---------------------------------------------------------------------------
@@ -70,7 +48,14 @@ def dashboard():
 @login_required
 @crew_required
 def assign_crew():
-    data       = request.json
+    data  = request.json
+    user  = User.query.filter_by(username=data['crew_member']).first()
+    event = Event.query.get(data['event_id'])
+    if user and event and not data.get('override'):
+        conflicts = booking_conflicts(user.id, *event_window(event), event_id=event.id)
+        if conflicts:
+            return jsonify(conflict_payload(conflicts)), 409
+
     assignment = CrewAssignment(
         event_id=data['event_id'],
         crew_member=data['crew_member'],
@@ -80,8 +65,6 @@ def assign_crew():
     db.session.add(assignment)
     db.session.commit()
 
-    user  = User.query.filter_by(username=data['crew_member']).first()
-    event = Event.query.get(data['event_id'])
     if user and user.email and event:
         send_crew_assignment_email(
             recipient_email=user.email, username=user.username,
@@ -113,21 +96,27 @@ def assign_all_crew():
     data     = request.json
     event_id = data.get('event_id')
     event    = Event.query.get_or_404(event_id)
-    added    = 0
+    assigned = {name for (name,) in db.session.query(CrewAssignment.crew_member)
+                .filter_by(event_id=event_id)}
+    to_notify = []
     for user in User.query.filter(User.user_role.in_(['crew', 'crew_admin'])).all():
-        if not CrewAssignment.query.filter_by(event_id=event_id, crew_member=user.username).first():
+        if user.username not in assigned:
             db.session.add(CrewAssignment(event_id=event_id, crew_member=user.username,
                                           role='Crew Member', assigned_via='webapp'))
-            added += 1
-            if user.email:
-                send_crew_assignment_email(
-                    recipient_email=user.email, username=user.username,
-                    event_title=event.title,
-                    event_date=event.event_date.strftime('%B %d, %Y at %I:%M %p'),
-                    event_location=event.location or 'TBD',
-                    role='Crew Member',
-                )
+            to_notify.append(user)
     db.session.commit()
+    added = len(to_notify)
+
+    # Only queued here; the mail dispatcher sends them over one SMTP connection
+    event_date = event.event_date.strftime('%B %d, %Y at %I:%M %p')
+    for user in to_notify:
+        if user.email:
+            send_crew_assignment_email(
+                recipient_email=user.email, username=user.username,
+                event_title=event.title, event_date=event_date,
+                event_location=event.location or 'TBD',
+                role='Crew Member',
+            )
     return jsonify({'success': True, 'added': added})
 
 
@@ -166,12 +155,19 @@ def join_event_from_calendar():
     event_id = data.get('event_id')
     if not event_id:
         return jsonify({'error': 'Event ID required'}), 400
-    event = Event.query.get_or_404(event_id)
-    if CrewAssignment.query.filter_by(event_id=event_id, crew_member=current_user.username).first():
+    event = recurrence.find_occurrence(event_id)        # an event id or an occurrence ref
+    if event is None:
+        abort(404)
+    own_row = isinstance(event, Event)
+    if own_row and CrewAssignment.query.filter_by(event_id=event.id, crew_member=current_user.username).first():
         return jsonify({'error': 'You are already assigned to this event'}), 400
+    conflicts = booking_conflicts(current_user.id, *event_window(event), event_id=event.id if own_row else None)
+    if conflicts:
+        return jsonify(conflict_payload(conflicts)), 409
     try:
+        event = recurrence.materialise(event)
         db.session.add(CrewAssignment(
-            event_id=event_id, crew_member=current_user.username,
+            event_id=event.id, crew_member=current_user.username,
             role='Crew Member', assigned_via='self',
         ))
         db.session.commit()
@@ -210,40 +206,59 @@ def leave_event():
 @login_required
 @crew_required
 def my_schedule():
-    from models import Shift, ShiftAssignment, CrewAssignment, Event, User
-    from datetime import datetime
-
     now = datetime.now()
 
     # ------------------------------------------------------------------ #
-    # 1. Shift assignments for the current user
-    #    Use distinct() + explicit join to avoid row-multiplication when
-    #    a shift has multiple assignments (one row per assignment otherwise).
+    # 1. Shift assignments for the current user, with shift, event and
+    #    the event's crew list loaded up front (no per-row lookups).
     # ------------------------------------------------------------------ #
-    raw_assignments = (
+    my_shift_assignments = (
         ShiftAssignment.query
         .filter_by(user_id=current_user.id)
+        .options(
+            joinedload(ShiftAssignment.shift)
+            .joinedload(Shift.event)
+            .selectinload(Event.crew_assignments)
+        )
+        .order_by(ShiftAssignment.id)
         .all()
     )
 
-    # Deduplicate by assignment id (safety net)
-    seen_assignment_ids = set()
-    assignments = []
-    for a in raw_assignments:
-        if a.id in seen_assignment_ids:
-            continue
-        seen_assignment_ids.add(a.id)
+    # ------------------------------------------------------------------ #
+    # 2. Crew (event-level) assignments, same treatment
+    # ------------------------------------------------------------------ #
+    my_crew_assignments = (
+        CrewAssignment.query
+        .filter_by(crew_member=current_user.username)
+        .options(joinedload(CrewAssignment.event).selectinload(Event.crew_assignments))
+        .order_by(CrewAssignment.id)
+        .all()
+    )
 
-        shift = Shift.query.get(a.shift_id)
-        if not shift:
-            continue
+    # ------------------------------------------------------------------ #
+    # 3. Open shifts the user has NOT yet claimed
+    # ------------------------------------------------------------------ #
+    claimed_shift_ids = {a.shift_id for a in my_shift_assignments}
+    open_shift_rows   = (
+        Shift.query
+        .filter(Shift.is_open == True)
+        .options(joinedload(Shift.event))
+        .order_by(Shift.id)
+        .all()
+    )
+    open_shift_rows = [s for s in open_shift_rows if s.id not in claimed_shift_ids]
 
-        event = Event.query.get(shift.event_id) if shift.event_id else None
-        assigned_count = ShiftAssignment.query.filter_by(
-            shift_id=shift.id,
-            # count accepted + confirmed only
-        ).filter(ShiftAssignment.status.in_(['accepted', 'confirmed'])).count()
+    # ------------------------------------------------------------------ #
+    # 4. Accepted + confirmed counts for every shift on the page, one
+    #    GROUP BY instead of a count() per shift.
+    # ------------------------------------------------------------------ #
+    confirmed_counts = _confirmed_counts(claimed_shift_ids | {s.id for s in open_shift_rows})
 
+    assignments = []
+    for a in my_shift_assignments:
+        shift = a.shift
+        if not shift:
+            continue
         assignments.append({
             'id': a.id,
             'status': a.status,
@@ -256,92 +271,22 @@ def my_schedule():
                 'location': shift.location or '',
                 'description': shift.description or '',
                 'positions_needed': shift.positions_needed,
-                'assignments_count': assigned_count,
+                'assignments_count': confirmed_counts.get(shift.id, 0),
                 'event_id': shift.event_id,
-                'event': {
-                    'id': event.id,
-                    'title': event.title,
-                    'location': event.location or '',
-                    'description': event.description or '',
-                    'event_date': event.event_date.isoformat(),
-                    'event_end_date': event.event_end_date.isoformat() if event.event_end_date else None,
-                    'created_by': event.created_by,
-                    'crew_assignments': [
-                        {'id': ca.id, 'crew_member': ca.crew_member, 'role': ca.role}
-                        for ca in event.crew_assignments
-                    ],
-                } if event else None,
+                'event': _schedule_event_dict(shift.event) if shift.event else None,
             }
         })
 
-    # ------------------------------------------------------------------ #
-    # 2. Crew (event-level) assignments — deduplicated by assignment id
-    # ------------------------------------------------------------------ #
-    raw_crew = (
-        CrewAssignment.query
-        .filter_by(crew_member=current_user.username)
-        .all()
-    )
-
-    seen_crew_ids = set()
-    crew_assignments = []
-    for ca in raw_crew:
-        if ca.id in seen_crew_ids:
-            continue
-        seen_crew_ids.add(ca.id)
-
-        event = Event.query.get(ca.event_id) if ca.event_id else None
-        if not event:
-            continue
-
-        crew_assignments.append({
-            'id': ca.id,
-            'role': ca.role or '',
-            'event': {
-                'id': event.id,
-                'title': event.title,
-                'location': event.location or '',
-                'description': event.description or '',
-                'event_date': event.event_date.isoformat(),
-                'event_end_date': event.event_end_date.isoformat() if event.event_end_date else None,
-                'created_by': event.created_by,
-                'crew_assignments': [
-                    {'id': x.id, 'crew_member': x.crew_member, 'role': x.role}
-                    for x in event.crew_assignments
-                ],
-            }
-        })
-
-    # ------------------------------------------------------------------ #
-    # 3. Open shifts — shifts the user has NOT yet claimed, deduplicated
-    #    by shift id.
-    # ------------------------------------------------------------------ #
-    claimed_shift_ids = {a['shift']['id'] for a in assignments}
-
-    all_open = (
-        Shift.query
-        .filter_by(is_open=True)
-        .all()
-    )
+    crew_assignments = [
+        {'id': ca.id, 'role': ca.role or '', 'event': _schedule_event_dict(ca.event)}
+        for ca in my_crew_assignments if ca.event
+    ]
 
-    seen_open_ids = set()
     open_shifts = []
-    for shift in all_open:
-        if shift.id in seen_open_ids:
-            continue
-        if shift.id in claimed_shift_ids:
-            continue
-        seen_open_ids.add(shift.id)
-
-        confirmed_count = ShiftAssignment.query.filter_by(
-            shift_id=shift.id
-        ).filter(ShiftAssignment.status.in_(['accepted', 'confirmed'])).count()
-
+    for shift in open_shift_rows:
+        confirmed_count = confirmed_counts.get(shift.id, 0)
         if confirmed_count >= shift.positions_needed:
             continue  # already full
-
-        event = Event.query.get(shift.event_id) if shift.event_id else None
-
         open_shifts.append({
             'id': shift.id,
             'title': shift.title,
@@ -354,7 +299,7 @@ def my_schedule():
             'assignments_count': confirmed_count,
             'is_open': shift.is_open,
             'event_id': shift.event_id,
-            'event_title': event.title if event else '',
+            'event_title': shift.event.title if shift.event else '',
         })
 
     return render_template(
@@ -365,6 +310,35 @@ def my_schedule():
         now=now,
     )
 
+
+def _confirmed_counts(shift_ids) -> dict:
+    """Map shift id -> number of accepted/confirmed assignments, in one query."""
+    if not shift_ids:
+        return {}
+    return dict(
+        db.session.query(ShiftAssignment.shift_id, db.func.count(ShiftAssignment.id))
+        .filter(ShiftAssignment.shift_id.in_(shift_ids),
+                ShiftAssignment.status.in_(['accepted', 'confirmed']))
+        .group_by(ShiftAssignment.shift_id)
+        .all()
+    )
+
+
+def _schedule_event_dict(event) -> dict:
+    return {
+        'id': event.id,
+        'title': event.title,
+        'location': event.location or '',
+        'description': event.description or '',
+        'event_date': event.event_date.isoformat(),
+        'event_end_date': event.event_end_date.isoformat() if event.event_end_date else None,
+        'created_by': event.created_by,
+        'crew_assignments': [
+            {'id': ca.id, 'crew_member': ca.crew_member, 'role': ca.role}
+            for ca in event.crew_assignments
+        ],
+    }
+
 # ---------------------------------------------------------------------------
 # Unavailability
 # ---------------------------------------------------------------------------
@@ -483,48 +457,61 @@ def api_unavailabilities_week():
     except Exception as exc:
         return jsonify({'error': f'Invalid date format: {exc}'}), 400
 
-    crew_users    = User.query.filter_by(user_role='crew').all()
-    unavailabilities = []
-    for user in crew_users:
-        for u in UserUnavailability.query.filter(
-            UserUnavailability.user_id == user.id,
-            UserUnavailability.start_date <= end_date,
-            UserUnavailability.end_date   >= start_date,
-        ).all():
-            unavailabilities.append({
-                'id': u.id, 'username': user.username, 'title': u.title,
-                'start': u.start_date.isoformat(), 'end': u.end_date.isoformat(),
-                'description': u.description, 'is_all_day': u.is_all_day,
-                'type': 'unavailability',
-            })
-        for rec in RecurringUnavailability.query.filter(
-            RecurringUnavailability.user_id   == user.id,
-            RecurringUnavailability.is_active == True,
-            RecurringUnavailability.start_date <= end_date,
-            (RecurringUnavailability.end_date >= start_date) | (RecurringUnavailability.end_date == None),
-        ).all():
-            current = start_date
-            while current < end_date:
-                should = False
-                if rec.pattern_type == 'daily':
-                    should = True
-                elif rec.pattern_type == 'weekly':
-                    days   = list(map(int, rec.days_of_week.split(','))) if rec.days_of_week else []
-                    form_d = (current.weekday() + 1) % 7
-                    should = form_d in days
-                elif rec.pattern_type == 'monthly':
-                    should = current.day == rec.day_of_month
-                if should and current.date() >= rec.start_date.date():
-                    if rec.end_date is None or current.date() <= rec.end_date.date():
-                        sh, sm = map(int, rec.start_time.split(':'))
-                        eh, em = map(int, rec.end_time.split(':'))
-                        unavailabilities.append({
-                            'id': f'rec-{rec.id}-{current.date()}',
-                            'username': user.username, 'title': rec.title,
-                            'start': current.replace(hour=sh, minute=sm, second=0).isoformat(),
-                            'end':   current.replace(hour=eh, minute=em, second=0).isoformat(),
-                            'description': rec.description, 'is_all_day': False,
-                            'type': 'recurring_unavailability',
-                        })
-                current += timedelta(days=1)
+    busy = busy_intervals(start_date, end_date, role='crew')
+    unavailabilities = [to_dict(b) for user_id in sorted(busy) for b in busy[user_id]]
     return jsonify({'success': True, 'unavailabilities': unavailabilities})
+
+
+# ---------------------------------------------------------------------------
+# Availability / conflicts
+# ---------------------------------------------------------------------------
+
+def _booking_window(args):
+    """``(start, end, event_id, shift_id)`` from ``?shift_id=``, ``?start=&end=`` or ``?event_id=``."""
+    shift_id = args.get('shift_id', type=int)
+    event_id = args.get('event_id', type=int)
+    if shift_id:
+        shift = Shift.query.get_or_404(shift_id)
+        return (*shift_window(shift), shift.event_id, shift.id)
+    if args.get('start') and args.get('end'):
+        return datetime.fromisoformat(args['start']), datetime.fromisoformat(args['end']), event_id, None
+    if event_id:
+        event = Event.query.get_or_404(event_id)
+        return (*event_window(event), event.id, None)
+    raise ValueError('shift_id, event_id or start and end required')
+
+
+def _schedule_index(start, end):
+    from flask import current_app
+    return schedule_index(start, end, ttl=current_app.config.get('CONFLICT_INDEX_SECONDS', 0),
+                          horizon_days=current_app.config.get('CONFLICT_INDEX_DAYS', 45))
+
+
+@crew_bp.route('/api/availability/free', methods=['GET'])
+@login_required
+def api_availability_free():
+    try:
+        start, end, event_id, shift_id = _booking_window(request.args)
+    except ValueError as exc:
+        return jsonify({'error': str(exc)}), 400
+    index      = _schedule_index(start, end)
+    free, busy = index.availability(start, end, request.args.getlist('role') or None, event_id, shift_id)
+    return jsonify({
+        'success': True, 'start': start.isoformat(), 'end': end.isoformat(),
+        'free': [{'user_id': uid, 'username': index.users[uid][0]} for uid in free],
+        'busy': [{'user_id': uid, 'username': index.users[uid][0],
+                  'conflicts': [c.to_dict() for c in clash]} for uid, clash in busy],
+    })
+
+
+@crew_bp.route('/api/availability/conflicts', methods=['GET'])
+@login_required
+def api_availability_conflicts():
+    try:
+        start, end, event_id, shift_id = _booking_window(request.args)
+    except ValueError as exc:
+        return jsonify({'error': str(exc)}), 400
+    user_id   = request.args.get('user_id', current_user.id, type=int)
+    conflicts = _schedule_index(start, end).conflicts(user_id, start, end, event_id, shift_id)
+    return jsonify({'success': True, 'conflict': bool(conflicts),
+                    'conflicts': [c.to_dict() for c in conflicts]})
@@ -6,12 +6,17 @@ from datetime import datetime
 from flask import (
     Blueprint, render_template, request, redirect,
     url_for, flash, jsonify, send_file, send_from_directory,
+    Response, stream_with_context,
 )
 from flask_login import login_required, current_user
 
 from extensions import db
 from models import Equipment, PickListItem
 from decorators import crew_required
+from services.equipment_import import import_equipment_csv, CSVImportError
+from services.equipment_search import (
+    search_equipment, search_equipment_ids, equipment_facets, DEFAULT_PER_PAGE,
+)
 
 from routes import _is_mobile
 
@@ -43,10 +48,58 @@ def _remove_file(relative_path: str):
 @login_required
 @crew_required
 def equipment_list():
-    equipment      = Equipment.query.all()
-    equipment_json = [e.to_dict() for e in equipment]
     template = 'crew/equipment_mobile.html' if _is_mobile(request.user_agent.string) else 'crew/equipment.html'
-    return render_template(template, equipment=equipment, equipment_json=equipment_json)
+    return render_template(template, facets=equipment_facets())
+
+
+# ---------------------------------------------------------------------------
+# Search API
+# ---------------------------------------------------------------------------
+
+@equipment_bp.route('/api/equipment/search')
+@login_required
+@crew_required
+def equipment_search():
+    """?q=&category=&location=&sort=&dir=asc|desc&page=&per_page= — one page of matches.
+
+    With ``ids_only=1`` returns every matching id instead (for "select all").
+    """
+    args     = request.args
+    q        = args.get('q', '').strip()
+    category = args.get('category') or None
+    location = args.get('location') or None
+    if args.get('ids_only'):
+        ids = search_equipment_ids(q, category, location)
+        return jsonify({'success': True, 'ids': ids, 'total': len(ids)})
+    result = search_equipment(
+        q, category, location,
+        sort=args.get('sort'), descending=args.get('dir') == 'desc',
+        page=args.get('page', 1, type=int),
+        per_page=args.get('per_page', DEFAULT_PER_PAGE, type=int),
+    )
+    return jsonify({'success': True, **result})
+
+
+@equipment_bp.route('/equipment/export.csv')
+@login_required
+@crew_required
+def export_csv():
+    """Whole inventory as CSV, streamed in ~64 KB chunks."""
+    def generate():
+        out    = io.StringIO()
+        writer = csv.writer(out)
+        writer.writerow(['Barcode', 'Name', 'Qty', 'Category', 'Location', 'Notes'])
+        for e in Equipment.query.order_by(Equipment.name, Equipment.id).yield_per(500):
+            writer.writerow([e.barcode, e.name, e.quantity_owned or 1,
+                             e.category or '', e.location or '', e.notes or ''])
+            if out.tell() > 64 * 1024:
+                yield out.getvalue()
+                out.seek(0); out.truncate()
+        yield out.getvalue()
+
+    filename = f"equipment_{datetime.now().strftime('%Y-%m-%d')}.csv"
+    return Response(stream_with_context(generate()), mimetype='text/csv',
+                    headers={'Content-Disposition': f'attachment; filename="{filename}"'})
 
 
 # ---------------------------------------------------------------------------
@@ -298,62 +351,16 @@ def import_csv():
         return jsonify({'error': 'Admin access required'}), 403
     if 'file' not in request.files:
         return jsonify({'error': 'No file provided'}), 400
+    mode    = request.form.get('mode', 'insert')
+    dry_run = request.form.get('dry_run', '').lower() in ('1', 'true', 'on', 'yes')
     try:
-        raw = request.files['file'].stream.read()
-        try:
-            text = raw.decode('utf-8')
-        except UnicodeDecodeError:
-            text = raw.decode('latin-1')
-
-        stream     = io.StringIO(text, newline=None)
-        csv_reader = csv.DictReader(stream)
-
-        count   = 0
-        skipped = 0
-        errors  = []
-
-        for row_num, row in enumerate(csv_reader, start=2):
-            def _get(row, *keys):
-                for k in keys:
-                    for rk, rv in row.items():
-                        if rk and rk.strip().lower() == k.lower():
-                            return (rv or '').strip()
-                return ''
-
-            barcode = _get(row, 'barcode')
-            name    = _get(row, 'name')
-
-            if not barcode or not name:
-                skipped += 1
-                continue
-
-            if Equipment.query.filter_by(barcode=barcode).first():
-                skipped += 1
-                continue
-
-            qty_raw = _get(row, 'quantity_owned', 'quantity', 'qty')
-            try:
-                qty = max(1, int(qty_raw)) if qty_raw else 1
-            except ValueError:
-                qty = 1
-
-            try:
-                db.session.add(Equipment(
-                    barcode=barcode, name=name,
-                    category=_get(row, 'category'),
-                    location=_get(row, 'location'),
-                    notes=_get(row, 'notes'),
-                    quantity_owned=qty,
-                ))
-                count += 1
-            except Exception as row_exc:
-                errors.append(f"Row {row_num}: {row_exc}")
-
-        db.session.commit()
-        return jsonify({'success': True, 'imported': count, 'skipped': skipped, 'errors': errors})
+        stats = import_equipment_csv(request.files['file'].stream, mode=mode, dry_run=dry_run)
+    except CSVImportError as exc:
+        return jsonify({'error': str(exc)}), 400
     except Exception as exc:
         db.session.rollback()
         return jsonify({'error': f'Import failed: {exc}'}), 400
+    return jsonify({'success': True, **stats})
 
 
 # ---------------------------------------------------------------------------
@@ -367,9 +374,7 @@ def barcode_page():
     if not current_user.is_admin:
         flash('Admin access required')
         return redirect(url_for('equipment.equipment_list'))
-    equipment      = Equipment.query.all()
-    equipment_json = [e.to_dict() for e in equipment]
-    return render_template('crew/barcodes.html', equipment=equipment, equipment_json=equipment_json)
+    return render_template('crew/barcodes.html', facets=equipment_facets())
 
 
 @equipment_bp.route('/equipment/generate-barcodes', methods=['POST'])
@@ -381,12 +386,9 @@ def generate_barcodes():
     if not current_user.is_admin:
         return jsonify({'error': 'Admin access required'}), 403
     try:
-        import tempfile
-        import qrcode
-        from reportlab.lib.pagesizes import A4
-        from reportlab.pdfgen import canvas as rl_canvas
-        from reportlab.lib.units import mm
-        from reportlab.lib import colors
+        from flask import current_app
+        from sqlalchemy.orm import load_only
+        from services.qr_tags import render_tag_sheet
 
         data          = request.json
         equipment_ids = data.get('equipment_ids', [])
@@ -398,12 +400,14 @@ def generate_barcodes():
         if not equipment_ids:
             return jsonify({'error': 'No equipment selected'}), 400
 
-        items = Equipment.query.filter(Equipment.id.in_(equipment_ids)).all()
+        items = (Equipment.query
+                 .options(load_only(Equipment.id, Equipment.name, Equipment.barcode))
+                 .filter(Equipment.id.in_(equipment_ids))
+                 .all())
         if not items:
             return jsonify({'error': 'No equipment found'}), 404
 
         # Org name
-        from flask import current_app
         try:
             from utils import get_organization
             org = get_organization() or {}
@@ -411,220 +415,48 @@ def generate_barcodes():
             org = {}
         org_name = current_app.config.get('ORG_NAME') or org.get('name', 'ShowWise')
 
-        card_w = card_w_mm * mm
-        card_h = card_h_mm * mm
-        gap    = 4 * mm
-        margin = 8 * mm
-        pw, ph = A4
-
-        cols = max(1, int((pw - 2 * margin + gap) / (card_w + gap)))
-        rows = max(1, int((ph - 2 * margin + gap) / (card_h + gap)))
-
-        pdf_buffer = io.BytesIO()
-        c = rl_canvas.Canvas(pdf_buffer, pagesize=A4)
-
-        BLACK    = colors.black
-        WHITE    = colors.white
-        MID_GREY = colors.HexColor('#666666')
-
-        def _truncate(text, max_chars):
-            return text[:max_chars] + ('…' if len(text) > max_chars else '')
-
-        def _centred_string(text, font, size, cx, y, width):
-            c.setFont(font, size)
-            tw = c.stringWidth(text, font, size)
-            c.drawString(cx + (width - tw) / 2, y, text)
-
-        # ── PORTRAIT ────────────────────────────────────────────────────────
-        #
-        #  ┌──────────────────────┐
-        #  │                      │
-        #  │     Item Name        │  ← bold, centred, top
-        #  │                      │
-        #  │  ┌────────────────┐  │
-        #  │  │                │  │
-        #  │  │    QR CODE     │  │  ← large, centred, rounded bg
-        #  │  │                │  │
-        #  │  └────────────────┘  │
-        #  │                      │
-        #  │      # ASSET-001     │  ← centred asset number
-        #  │                      │
-        #  ├──────────────────────┤  ← thin divider
-        #  │     Organisation     │  ← small grey footer
-        #  └──────────────────────┘
-        #
-        def _draw_portrait(cx, cy, item, qr_path):
-            pad      = 3   * mm
-            footer_h = 6.5 * mm
-            name_h   = 8   * mm
-            asset_h  = 6   * mm
-            border_r = 4   * mm
-
-            # Card outline — thick enough to feel like a tag
-            c.setStrokeColor(BLACK)
-            c.setLineWidth(1.2)
-            c.roundRect(cx, cy, card_w, card_h, border_r, stroke=1, fill=0)
-
-            # ── Item name (top, bold, centred) ──
-            name_str  = _truncate(item.name, 26)
-            name_size = max(8, min(13, int(card_w / 5.5)))
-            c.setFillColor(BLACK)
-            _centred_string(name_str, 'Helvetica-Bold', name_size,
-                            cx, cy + card_h - pad - name_h + 2 * mm, card_w)
-
-            # ── QR code (centred, with rounded light-grey background) ──
-            body_h   = card_h - name_h - footer_h - asset_h - 2 * pad
-            qr_size  = min(card_w - 6 * pad, body_h - 2 * pad)
-            qr_x     = cx + (card_w - qr_size) / 2
-            qr_y     = cy + footer_h + asset_h + (body_h - qr_size) / 2 + pad * 0.5
-
-            # Rounded grey background behind QR
-            bg_pad = 2 * mm
-            c.setFillColor(colors.HexColor('#eeeeee'))
-            c.roundRect(qr_x - bg_pad, qr_y - bg_pad,
-                        qr_size + 2 * bg_pad, qr_size + 2 * bg_pad,
-                        3 * mm, stroke=0, fill=1)
-
-            c.drawImage(qr_path, qr_x, qr_y,
-                        width=qr_size, height=qr_size,
-                        preserveAspectRatio=True, mask='auto')
-
-            # ── Asset number (centred, under QR) ──
-            asset_str  = _truncate(item.barcode or f'ID-{item.id}', 24)
-            asset_label = f'# {asset_str}'
-            asset_y     = cy + footer_h + pad * 0.8
-            c.setFillColor(MID_GREY)
-            _centred_string(asset_label, 'Helvetica', 7,
-                            cx, asset_y, card_w)
-
-            # ── Divider above footer ──
-            c.setStrokeColor(colors.HexColor('#cccccc'))
-            c.setLineWidth(0.5)
-            c.line(cx + pad, cy + footer_h - 0.8 * mm,
-                   cx + card_w - pad, cy + footer_h - 0.8 * mm)
-
-            # ── Organisation footer (centred, grey) ──
-            c.setFillColor(MID_GREY)
-            _centred_string(org_name, 'Helvetica', 6.5,
-                            cx, cy + 2 * mm, card_w)
-
-        # ── LANDSCAPE ───────────────────────────────────────────────────────
-        #
-        #  ┌──────────────────────────────────────┐
-        #  │        │   Item Name (bold)           │
-        #  │   QR   │                              │
-        #  │        │   # ASSET-001 (centred-ish)  │
-        #  ├────────┴─────────────────────────────┤
-        #  │              Organisation             │
-        #  └──────────────────────────────────────┘
-        #
-        def _draw_landscape(cx, cy, item, qr_path):
-            pad      = 2.5 * mm
-            footer_h = 5.5 * mm
-            border_r = 4   * mm
-
-            body_h = card_h - footer_h
-
-            # Card outline
-            c.setStrokeColor(BLACK)
-            c.setLineWidth(1.2)
-            c.roundRect(cx, cy, card_w, card_h, border_r, stroke=1, fill=0)
-
-            # ── QR with rounded grey background (left) ──
-            qr_size = body_h - 2 * pad
-            qr_x    = cx + pad
-            qr_y    = cy + footer_h + (body_h - qr_size) / 2
-
-            bg_pad = 1.5 * mm
-            c.setFillColor(colors.HexColor('#eeeeee'))
-            c.roundRect(qr_x - bg_pad, qr_y - bg_pad,
-                        qr_size + 2 * bg_pad, qr_size + 2 * bg_pad,
-                        2.5 * mm, stroke=0, fill=1)
-
-            c.drawImage(qr_path, qr_x, qr_y,
-                        width=qr_size, height=qr_size,
-                        preserveAspectRatio=True, mask='auto')
-
-            # ── Text block (right of QR) ──
-            text_x  = cx + qr_size + 3 * pad
-            text_w  = card_w - (qr_size + 4 * pad)
-            mid_y   = cy + footer_h + body_h / 2
-
-            # Item name — bold, centred in text column
-            name_str  = _truncate(item.name, 24)
-            name_size = max(8, min(12, int(text_w / 6)))
-            c.setFillColor(BLACK)
-            _centred_string(name_str, 'Helvetica-Bold', name_size,
-                            text_x, mid_y + 2 * mm, text_w)
-
-            # Asset number — centred in text column, below name
-            asset_str   = _truncate(item.barcode or f'ID-{item.id}', 20)
-            asset_label = f'# {asset_str}'
-            c.setFillColor(MID_GREY)
-            _centred_string(asset_label, 'Helvetica', 7,
-                            text_x, mid_y - 4 * mm, text_w)
-
-            # ── Divider above footer ──
-            c.setStrokeColor(colors.HexColor('#cccccc'))
-            c.setLineWidth(0.5)
-            c.line(cx + pad, cy + footer_h - 0.5 * mm,
-                   cx + card_w - pad, cy + footer_h - 0.5 * mm)
-
-            # ── Organisation footer ──
-            c.setFillColor(MID_GREY)
-            _centred_string(org_name, 'Helvetica', 6.5,
-                            cx, cy + 1.5 * mm, card_w)
-
-        # ── Paginate and render ───────────────────────────────────────────────
-        col_idx = 0
-        row_idx = 0
-
-        for item in items:
-            try:
-                url = f"{base_url}/equipment/{item.id}/view"
-                qr  = qrcode.QRCode(version=1, box_size=10, border=2,
-                                    error_correction=qrcode.constants.ERROR_CORRECT_M)
-                qr.add_data(url)
-                qr.make(fit=True)
-                img = qr.make_image(fill_color='black', back_color='white')
-                with tempfile.NamedTemporaryFile(delete=False, suffix='.png') as tmp:
-                    img.save(tmp.name)
-                    qr_path = tmp.name
-
-                cx = margin + col_idx * (card_w + gap)
-                cy = ph - margin - card_h - row_idx * (card_h + gap)
-
-                if layout == 'landscape':
-                    _draw_landscape(cx, cy, item, qr_path)
-                else:
-                    _draw_portrait(cx, cy, item, qr_path)
-
-                try:
-                    os.remove(qr_path)
-                except Exception:
-                    pass
-
-            except Exception as exc:
-                print(f"QR tag error for item {item.id}: {exc}")
-
-            col_idx += 1
-            if col_idx >= cols:
-                col_idx = 0
-                row_idx += 1
-                if row_idx >= rows:
-                    c.showPage()
-                    row_idx = 0
-
-        c.save()
-        pdf_buffer.seek(0)
+        pdf, stats = render_tag_sheet(items, layout, card_w_mm, card_h_mm, base_url, org_name,
+                                      workers=current_app.config.get('QR_WORKERS') or None)
+        print(f"✓ QR tags: {stats['tags']} in {stats['seconds']}s ({stats['tags_per_second']} tags/s)")
+
         filename = f"equipment_tags_{layout}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.pdf"
-        return send_file(pdf_buffer, mimetype='application/pdf',
-                         as_attachment=True, download_name=filename)
+        response = send_file(io.BytesIO(pdf), mimetype='application/pdf',
+                             as_attachment=True, download_name=filename)
+        response.headers['X-Tags-Per-Second'] = str(stats['tags_per_second'])
+        return response
 
     except Exception as exc:
         import traceback; traceback.print_exc()
         return jsonify({'error': str(exc)}), 500
 
+
+@equipment_bp.route('/equipment/generate-code128', methods=['POST'])
+@login_required
+@crew_required
+def generate_code128():
+    """Streamed PDF of vector Code128 labels for the selected items, in a preset size."""
+    if not current_user.is_admin:
+        return jsonify({'error': 'Admin access required'}), 403
+    from constants import BARCODE_SIZES
+    from services.file_service import iter_barcode_pdf
+
+    data          = request.json or {}
+    equipment_ids = data.get('equipment_ids', [])
+    size          = data.get('size', 'medium')
+    if not equipment_ids:
+        return jsonify({'error': 'No equipment selected'}), 400
+    if size not in BARCODE_SIZES:
+        return jsonify({'error': f"size must be one of {', '.join(BARCODE_SIZES)}"}), 400
+
+    items = (Equipment.query
+             .filter(Equipment.id.in_(equipment_ids))
+             .order_by(Equipment.name, Equipment.id)
+             .yield_per(500))
+    filename = f"equipment_barcodes_{size}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.pdf"
+    return Response(stream_with_context(iter_barcode_pdf(items, size)), mimetype='application/pdf',
+                    headers={'Content-Disposition': f'attachment; filename="{filename}"'})
+
+
 @equipment_bp.route('/equipment/<int:id>/quantity-check', methods=['POST'])
 @login_required
 def check_equipment_quantity(id):
@@ -5,16 +5,20 @@ from datetime import datetime, timedelta
 
 from flask import (
     Blueprint, render_template, request, redirect,
-    url_for, flash, jsonify, send_file, Response,
+    url_for, flash, jsonify, send_file, Response, abort,
 )
 from flask_login import login_required, current_user
+from sqlalchemy.exc import IntegrityError
+from werkzeug.exceptions import HTTPException
 
 from extensions import db
 from models import (
     Event, CrewAssignment, EventSchedule, EventNote,
     CrewRunItem, CastRunItem, User, StagePlan,
 )
+from constants import RECURRENCE_PATTERNS
 from decorators import crew_required
+from services import recurrence
 from services.notification_service import (
     send_discord_event_announcement, schedule_event_notifications,
 )
@@ -51,32 +55,58 @@ def add_event():
 @crew_required
 def event_detail(id):
     event     = Event.query.get_or_404(id)
-    all_users = User.query.all()
+    all_users = db.session.query(User.id, User.username, User.email).order_by(User.username).all()
     schedules = EventSchedule.query.filter_by(event_id=id).order_by(EventSchedule.scheduled_time).all()
+    return render_template('/crew/event_detail.html',
+                           event=event, all_users=all_users,
+                           schedules=schedules, shifts_data=_event_shifts_data(id))
+
+
+def _event_shifts_data(event_id: int) -> list:
+    """Shifts for an event with their assignments and usernames, in two queries."""
     from models import Shift, ShiftAssignment
-    shifts     = Shift.query.filter_by(event_id=id).all()
-    shifts_data = []
-    for shift in shifts:
-        assignments  = ShiftAssignment.query.filter_by(shift_id=shift.id).all()
-        assigned_cnt = sum(1 for a in assignments if a.status in ('accepted', 'confirmed'))
-        shifts_data.append({
+
+    confirmed = (
+        db.session.query(ShiftAssignment.shift_id, db.func.count(ShiftAssignment.id).label('n'))
+        .filter(ShiftAssignment.status.in_(('accepted', 'confirmed')))
+        .group_by(ShiftAssignment.shift_id)
+        .subquery()
+    )
+    shifts = (
+        db.session.query(Shift, db.func.coalesce(confirmed.c.n, 0))
+        .outerjoin(confirmed, confirmed.c.shift_id == Shift.id)
+        .filter(Shift.event_id == event_id)
+        .order_by(Shift.id)
+        .all()
+    )
+    if not shifts:
+        return []
+
+    by_shift = {}
+    for a_id, shift_id, user_id, status, username in (
+        db.session.query(ShiftAssignment.id, ShiftAssignment.shift_id, ShiftAssignment.user_id,
+                         ShiftAssignment.status, User.username)
+        .join(Shift, Shift.id == ShiftAssignment.shift_id)
+        .outerjoin(User, User.id == ShiftAssignment.user_id)
+        .filter(Shift.event_id == event_id)
+        .order_by(ShiftAssignment.id)
+    ):
+        by_shift.setdefault(shift_id, []).append({
+            'id': a_id, 'user_id': user_id, 'status': status,
+            'username': username or 'Unknown',
+        })
+
+    return [
+        {
             'id': shift.id, 'title': shift.title, 'role': shift.role,
             'shift_date': shift.shift_date.isoformat(),
             'shift_end_date': shift.shift_end_date.isoformat() if shift.shift_end_date else None,
             'positions_needed': shift.positions_needed, 'location': shift.location,
             'assigned_count': assigned_cnt, 'is_open': shift.is_open,
-            'assignments': [
-                {
-                    'id': a.id, 'user_id': a.user_id, 'status': a.status,
-                    'username': (User.query.get(a.user_id).username
-                                 if User.query.get(a.user_id) else 'Unknown'),
-                }
-                for a in assignments
-            ],
-        })
-    return render_template('/crew/event_detail.html',
-                           event=event, all_users=all_users,
-                           schedules=schedules, shifts_data=shifts_data)
+            'assignments': by_shift.get(shift.id, []),
+        }
+        for shift, assigned_cnt in shifts
+    ]
 
 
 @events_bp.route('/events/<int:id>', methods=['DELETE'])
@@ -86,6 +116,11 @@ def delete_event(id):
     if not current_user.is_admin:
         return jsonify({'error': 'Admin access required'}), 403
     event = Event.query.get_or_404(id)
+    if event.recurrence_id is not None:
+        # Otherwise the occurrence would be generated again on the next read
+        series = db.session.get(Event, event.recurring_event_id)
+        if series is not None:
+            recurrence.add_exdate(series, event.recurrence_id)
     db.session.delete(event)
     db.session.commit()
     return jsonify({'success': True})
@@ -100,13 +135,25 @@ def edit_event(id):
     event.title       = data.get('title',       event.title)
     event.description = data.get('description', event.description)
     event.location    = data.get('location',    event.location)
-    if data.get('event_date'):
+    old_date          = event.event_date
+    if data.get('event_date') and recurrence.is_series(event):
+        # The series row is its own first slot: moving it moves the whole series,
+        # materialised occurrences and their reminders included
+        shift = datetime.fromisoformat(data['event_date']) - event.event_date
+        try:
+            recurrence.edit_following(event, event.event_date, {}, shift)
+        except IntegrityError:
+            db.session.rollback()
+            return jsonify({'error': 'Occurrences would be moved onto each other'}), 409
+    elif data.get('event_date'):
         event.event_date = datetime.fromisoformat(data['event_date'])
+        if not data.get('event_end_date'):
+            event.event_end_date = event.event_date + timedelta(hours=3)
     if data.get('event_end_date'):
         event.event_end_date = datetime.fromisoformat(data['event_end_date'])
-    elif data.get('event_date'):
-        event.event_end_date = event.event_date + timedelta(hours=3)
     db.session.commit()
+    if event.event_date != old_date:
+        schedule_event_notifications(event)
     return jsonify({'success': True})
 
 
@@ -332,6 +379,8 @@ def create_recurring_event():
     if not current_user.is_admin:
         return jsonify({'error': 'Admin access required'}), 403
     data = request.json
+    if data.get('recurrence_pattern') not in RECURRENCE_PATTERNS:
+        return jsonify({'error': 'Invalid recurrence pattern'}), 400
     try:
         start = datetime.fromisoformat(data['event_date'])
         end   = (datetime.fromisoformat(data['event_end_date'])
@@ -348,7 +397,6 @@ def create_recurring_event():
         )
         db.session.add(event)
         db.session.commit()
-        _generate_recurring_instances(event)
         send_discord_event_announcement(event)
         return jsonify({'success': True, 'id': event.id})
     except Exception as exc:
@@ -356,47 +404,80 @@ def create_recurring_event():
         return jsonify({'error': str(exc)}), 400
 
 
-def _generate_recurring_instances(parent: Event) -> None:
-    if not parent.recurrence_pattern:
-        return
-    current = parent.event_date
-    count   = 0
-    while True:
-        count += 1
-        if parent.recurrence_count and count > parent.recurrence_count:
-            break
-        if parent.recurrence_end_date and current > parent.recurrence_end_date:
-            break
-        if count > 1:
-            duration = ((parent.event_end_date - parent.event_date)
-                        if parent.event_end_date else timedelta(hours=3))
-            db.session.add(Event(
-                title=parent.title, description=parent.description,
-                event_date=current, event_end_date=current + duration,
-                location=parent.location, created_by=parent.created_by,
-                is_recurring_instance=True, recurring_event_id=parent.id,
-            ))
-        p = parent.recurrence_pattern
-        i = parent.recurrence_interval or 1
-        if p == 'daily':
-            current += timedelta(days=i)
-        elif p == 'weekly':
-            current += timedelta(weeks=i)
-        elif p == 'biweekly':
-            current += timedelta(weeks=2*i)
-        elif p == 'monthly':
-            try:
-                m = current.month + i
-                y = current.year + (m-1) // 12
-                current = current.replace(year=y, month=((m-1) % 12) + 1)
-            except ValueError:
-                current = (current.replace(day=28) + timedelta(days=4))
-                current = current - timedelta(days=current.day)
-        elif p == 'yearly':
-            current = current.replace(year=current.year + i)
-        if count > 1000:
-            break
+@events_bp.route('/events/<int:series_id>/occurrences/<slot>', methods=['GET'])
+@login_required
+@crew_required
+def occurrence_detail(series_id, slot):
+    """Open one occurrence of a series, giving it a row so crew and notes can be attached."""
+    occ = recurrence.find_occurrence(recurrence.occurrence_ref(series_id, _parse_slot(slot)))
+    if occ is None:
+        abort(404)
+    return redirect(url_for('events.event_detail', id=recurrence.materialise(occ).id))
+
+
+@events_bp.route('/events/<int:series_id>/occurrences/<slot>', methods=['DELETE'])
+@login_required
+@crew_required
+def cancel_occurrence(series_id, slot):
+    if not current_user.is_admin:
+        return jsonify({'error': 'Admin access required'}), 403
+    series = Event.query.get_or_404(series_id)
+    slot   = _parse_slot(slot)
+    if recurrence.find_occurrence(recurrence.occurrence_ref(series_id, slot)) is None:
+        abort(404)
+    recurrence.cancel_occurrence(series, slot)
     db.session.commit()
+    return jsonify({'success': True})
+
+
+@events_bp.route('/events/<ref>/following', methods=['PUT'])
+@login_required
+@crew_required
+def edit_series_following(ref):
+    """Edit an occurrence and every later one in its series: title, description, location, shift_minutes."""
+    position = _series_position(ref)
+    data     = request.json or {}
+    changes  = {k: data[k] for k in recurrence.EDITABLE_FIELDS if k in data}
+    if 'title' in changes and not changes['title']:
+        return jsonify({'error': 'Title required'}), 400
+    try:
+        shift = timedelta(minutes=int(data.get('shift_minutes') or 0))
+    except (TypeError, ValueError):
+        return jsonify({'error': 'shift_minutes must be a whole number'}), 400
+    try:
+        series = recurrence.edit_following(*position, changes, shift)
+        db.session.commit()
+    except IntegrityError:
+        db.session.rollback()
+        return jsonify({'error': 'Occurrences would be moved onto each other'}), 409
+    return jsonify({'success': True, 'series_id': series.id})
+
+
+@events_bp.route('/events/<ref>/following', methods=['DELETE'])
+@login_required
+@crew_required
+def delete_series_following(ref):
+    if not current_user.is_admin:
+        return jsonify({'error': 'Admin access required'}), 403
+    deleted = recurrence.delete_following(*_series_position(ref))
+    db.session.commit()
+    return jsonify({'success': True, 'deleted_rows': deleted})
+
+
+def _series_position(ref: str):
+    """``(series, slot)`` for an event id or occurrence ref; 404 unless it belongs to a series."""
+    event    = recurrence.find_occurrence(ref)
+    position = recurrence.series_position(event) if event is not None else None
+    if position is None:
+        abort(404)
+    return position
+
+
+def _parse_slot(slot: str) -> datetime:
+    try:
+        return datetime.strptime(slot, recurrence.SLOT_FORMAT)
+    except ValueError:
+        abort(404)
 
 
 # ---------------------------------------------------------------------------
@@ -407,12 +488,17 @@ def _generate_recurring_instances(parent: Event) -> None:
 @login_required
 @crew_required
 def export_event_pdf(event_id):
-    """Export event brief as a PDF."""
-    from services.report_service import generate_event_pdf
+    """Export event brief as a PDF, streamed from the brief cache with an ETag."""
+    from services.report_service import event_brief
     try:
-        pdf_buffer, filename = generate_event_pdf(event_id)
-        return send_file(pdf_buffer, mimetype='application/pdf',
-                         as_attachment=True, download_name=filename)
+        path, filename, version = event_brief(event_id)
+        response = send_file(path, mimetype='application/pdf', as_attachment=True,
+                             download_name=filename, etag=version, conditional=True,
+                             max_age=0)
+        response.headers['Cache-Control'] = 'private, no-cache'
+        return response
+    except HTTPException:
+        raise
     except Exception as exc:
         import traceback; traceback.print_exc()
         return jsonify({'error': str(exc)}), 500
@@ -19,7 +19,6 @@ def picklist():
     items    = PickListItem.query.filter_by(event_id=event_id).all() if event_id \
                else PickListItem.query.filter_by(event_id=None).all()
     events          = Event.query.order_by(Event.event_date.desc()).all()
-    all_equipment   = Equipment.query.all()
     hired_equipment = HiredEquipment.query.filter_by(is_returned=False).order_by(HiredEquipment.return_date).all()
 
     template = '/crew/picklist_mobile.html' if _is_mobile(request.user_agent.string) else '/crew/picklist.html'
@@ -29,9 +28,6 @@ def picklist():
         items=items,
         events=events,
         current_event=event,
-        all_equipment=all_equipment,
-        all_equipment_json=[e.to_dict() for e in all_equipment],
-        equipment_json=[e.to_dict() for e in all_equipment],   # ← add this
         hired_equipment=hired_equipment,
     )
 
@@ -15,13 +15,13 @@ def api_rocketchat_info():
     except ImportError:
         return jsonify({'success': False, 'error': 'Rocket.Chat client not available', 'connected': False}), 503
 
-    if not rc.is_connected():
+    if not rc.is_configured():
         return jsonify({'success': False, 'error': 'Rocket.Chat is not available', 'connected': False}), 503
 
     try:
-        rc_user_id = rc.get_or_create_user(
-            current_user.username, email=current_user.email, name=current_user.username
-        )
+        # Answered from rocketchat_user; only a user the sync hasn't reached yet costs a lookup
+        from services.rocketchat_sync import rocketchat_user_id
+        rc_user_id = rocketchat_user_id(current_user, rc)
         if not rc_user_id:
             return jsonify({'success': False, 'error': 'Could not create Rocket.Chat user', 'connected': False}), 500
         return jsonify({
@@ -31,3 +31,17 @@ def api_rocketchat_info():
         })
     except Exception as exc:
         return jsonify({'success': False, 'error': str(exc), 'connected': False}), 500
+
+
+@rocketchat_bp.route('/api/rocketchat/sync', methods=['POST'])
+@login_required
+def api_rocketchat_sync():
+    """Provision Rocket.Chat accounts for every user that has none mapped yet."""
+    if not current_user.is_admin:
+        return jsonify({'error': 'Admin access required'}), 403
+    from rocketchat_client import get_rocketchat_client
+    from services.rocketchat_sync import sync_rocketchat_users
+    rc = get_rocketchat_client()
+    if not rc.is_configured():
+        return jsonify({'success': False, 'error': 'Rocket.Chat is not configured'}), 503
+    return jsonify({'success': True, **sync_rocketchat_users(rc)})
@@ -1,15 +1,20 @@
 """routes/shifts.py — Shift management, assignments, notes, tasks."""
 
-from datetime import datetime
+from datetime import datetime, timedelta
 from flask import Blueprint, render_template, request, jsonify
 from flask_login import login_required, current_user
+from sqlalchemy.exc import IntegrityError
 from extensions import db
 from models import Event, Shift, ShiftAssignment, ShiftNote, ShiftTask, User
 from decorators import crew_required
+from services import recurrence
+from services.conflicts import booking_conflicts, conflict_payload, shift_window
 from services.email_service import send_shift_assignment_email
 
 shifts_bp = Blueprint('shifts', __name__)
 
+PLANNING_AHEAD = timedelta(days=90)   # how far ahead occurrences without a row are offered for new shifts
+
 
 @shifts_bp.route('/shifts/management')
 @login_required
@@ -18,10 +23,15 @@ def shift_management():
         from flask import flash, redirect, url_for
         flash('Admin access required', 'error')
         return redirect(url_for('calendar.calendar'))
+    now    = datetime.now()
     events = Event.query.order_by(Event.event_date).all()
+    # A shift can go on an occurrence that has no row yet; adding it materialises the occurrence
+    pickable = sorted(events + recurrence.virtual_occurrences(now, now + PLANNING_AHEAD),
+                      key=lambda e: (e.event_date, str(e.id)))
     shifts = Shift.query.join(Event).order_by(Event.event_date, Shift.shift_date).all()
     users  = User.query.filter_by(user_role='crew').all()
-    return render_template('/admin/shift_management.html', events=events, shifts=shifts, users=users)
+    return render_template('/admin/shift_management.html', events=events, pickable_events=pickable,
+                           shifts=shifts, users=users)
 
 
 @shifts_bp.route('/api/shifts', methods=['GET'])
@@ -59,10 +69,14 @@ def get_shifts():
 def add_shift():
     if not current_user.is_admin:
         return jsonify({'error': 'Admin access required'}), 403
-    data = request.json
+    data  = request.json
+    event = recurrence.find_occurrence(data.get('event_id'))     # an event id or an occurrence ref
+    if event is None:
+        return jsonify({'error': 'Event not found'}), 404
     try:
+        # Fields first: a bad request must not leave a materialised occurrence behind
         shift = Shift(
-            event_id=data['event_id'], title=data.get('title', ''),
+            title=data.get('title', ''),
             description=data.get('description', ''),
             shift_date=datetime.fromisoformat(data['shift_date']),
             shift_end_date=datetime.fromisoformat(data['shift_end_date']),
@@ -71,9 +85,13 @@ def add_shift():
             role=data.get('role', ''), is_open=data.get('is_open', True),
             created_by=current_user.username,
         )
+        shift.event_id = recurrence.materialise(event, commit=False).id
         db.session.add(shift)
         db.session.commit()
         return jsonify({'success': True, 'id': shift.id})
+    except IntegrityError:
+        db.session.rollback()
+        return jsonify({'error': 'The occurrence was just changed; try again'}), 409
     except Exception as exc:
         db.session.rollback()
         return jsonify({'error': str(exc)}), 400
@@ -129,6 +147,10 @@ def assign_shift(shift_id):
         user = User.query.get_or_404(data['user_id'])
         if ShiftAssignment.query.filter_by(shift_id=shift_id, user_id=user.id).first():
             return jsonify({'error': 'User already assigned to this shift'}), 409
+        if not data.get('override'):
+            conflicts = booking_conflicts(user.id, *shift_window(shift), event_id=shift.event_id, shift_id=shift.id)
+            if conflicts:
+                return jsonify(conflict_payload(conflicts)), 409
         assignment = ShiftAssignment(
             shift_id=shift_id, user_id=user.id,
             assigned_by=current_user.username, status='pending',
@@ -165,6 +187,9 @@ def claim_shift(shift_id):
     confirmed = ShiftAssignment.query.filter_by(shift_id=shift_id, status='confirmed').count()
     if confirmed >= shift.positions_needed:
         return jsonify({'error': 'This shift is already full'}), 400
+    conflicts = booking_conflicts(current_user.id, *shift_window(shift), event_id=shift.event_id, shift_id=shift.id)
+    if conflicts:
+        return jsonify(conflict_payload(conflicts)), 409
     try:
         db.session.add(ShiftAssignment(
             shift_id=shift_id, user_id=current_user.id,
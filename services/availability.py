@@ -0,0 +1,159 @@
+"""services/availability.py — Who is unavailable when, for any date window.
+
+All one-off (``UserUnavailability``) and recurring (``RecurringUnavailability``)
+rows overlapping the window are loaded for every user in two queries. The
+window's days are laid out once, with indexes by weekday and by day of the
+month, so a recurring rule jumps straight to the days it matches instead of
+testing every day: a weekly rule over a season touches only its own
+weekdays, and a monthly rule one day per month. Each rule's ``days_of_week``
+and times are parsed once.
+"""
+
+from bisect import bisect_left, bisect_right
+from collections import defaultdict
+from datetime import datetime, timedelta
+from typing import NamedTuple
+
+from extensions import db
+from models import RecurringUnavailability, User, UserUnavailability
+
+ONE_DAY = timedelta(days=1)
+
+
+class Busy(NamedTuple):
+    """One interval a user is unavailable. ``day`` is set for recurring occurrences."""
+    user_id:     int
+    username:    str
+    start:       datetime
+    end:         datetime
+    kind:        str            # 'unavailability' | 'recurring_unavailability'
+    source_id:   int
+    title:       str
+    description: str | None
+    is_all_day:  bool | None
+    day:         object = None  # date of the occurrence (recurring only)
+
+
+class Window:
+    """The days ``start, start + 1 day, …`` before ``end``, indexed for rule lookups.
+
+    Weekdays follow the stored ``days_of_week`` convention (0 = Sunday).
+    """
+
+    def __init__(self, start: datetime, end: datetime):
+        self.start, self.end = start, end
+        self.days  = []
+        current = start
+        while current < end:
+            self.days.append(current)
+            current += ONE_DAY
+        self.dates       = [d.date() for d in self.days]
+        self.by_weekday  = defaultdict(list)
+        self.by_monthday = defaultdict(list)
+        for i, d in enumerate(self.dates):
+            self.by_weekday[(d.weekday() + 1) % 7].append(i)
+            self.by_monthday[d.day].append(i)
+
+    def span(self, first_date, last_date=None) -> tuple[int, int]:
+        """Index range ``[lo, hi)`` of window days between two dates (inclusive)."""
+        lo = bisect_left(self.dates, first_date)
+        hi = len(self.dates) if last_date is None else bisect_right(self.dates, last_date)
+        return lo, hi
+
+    def matching(self, rule) -> list[int]:
+        """Indexes of the window days *rule* falls on, within its own start/end dates."""
+        lo, hi = self.span(rule.start_date.date(), rule.end_date.date() if rule.end_date else None)
+        if lo >= hi:
+            return []
+        if rule.pattern_type == 'daily':
+            return list(range(lo, hi))
+        if rule.pattern_type == 'weekly':
+            picked = []
+            for weekday in parse_weekdays(rule.days_of_week):
+                idx = self.by_weekday.get(weekday, ())
+                picked.extend(idx[bisect_left(idx, lo):bisect_left(idx, hi)])
+            return sorted(picked)
+        if rule.pattern_type == 'monthly':
+            idx = self.by_monthday.get(rule.day_of_month, ())
+            return idx[bisect_left(idx, lo):bisect_left(idx, hi)]
+        return []
+
+
+def parse_weekdays(days_of_week: str | None) -> set[int]:
+    days = set()
+    for part in (days_of_week or '').split(','):
+        part = part.strip()
+        if part.isdigit():
+            days.add(int(part))
+    return days
+
+
+def parse_time(value: str) -> tuple[int, int]:
+    hour, minute = value.split(':')[:2]
+    return int(hour), int(minute)
+
+
+def expand_rule(rule, window: Window, user_id: int, username: str) -> list[Busy]:
+    """Occurrences of one recurring rule inside *window*.
+
+    A rule whose end time is not after its start time runs past midnight and
+    ends the next day.
+    """
+    sh, sm = parse_time(rule.start_time)
+    eh, em = parse_time(rule.end_time)
+    overnight = (eh, em) <= (sh, sm)
+    out = []
+    for i in window.matching(rule):
+        day   = window.days[i]
+        start = day.replace(hour=sh, minute=sm, second=0)
+        end   = day.replace(hour=eh, minute=em, second=0)
+        if overnight:
+            end += ONE_DAY
+        out.append(Busy(user_id, username, start, end, 'recurring_unavailability', rule.id,
+                        rule.title, rule.description, False, window.dates[i]))
+    return out
+
+
+def busy_intervals(start: datetime, end: datetime, user_ids=None, role: str | None = None) -> dict:
+    """``{user_id: [Busy, …]}`` for everyone (or *user_ids*, or users with *role*) in the window.
+
+    Each user's list holds one-off rows first, then recurring occurrences
+    rule by rule in date order.
+    """
+    one_off = (db.session.query(UserUnavailability, User.username)
+               .join(User, User.id == UserUnavailability.user_id)
+               .filter(UserUnavailability.start_date <= end, UserUnavailability.end_date >= start))
+    recurring = (db.session.query(RecurringUnavailability, User.username)
+                 .join(User, User.id == RecurringUnavailability.user_id)
+                 .filter(RecurringUnavailability.is_active == True,
+                         RecurringUnavailability.start_date <= end,
+                         (RecurringUnavailability.end_date >= start) | (RecurringUnavailability.end_date == None)))
+    if user_ids is not None:
+        one_off   = one_off.filter(UserUnavailability.user_id.in_(user_ids))
+        recurring = recurring.filter(RecurringUnavailability.user_id.in_(user_ids))
+    if role is not None:
+        one_off   = one_off.filter(User.user_role == role)
+        recurring = recurring.filter(User.user_role == role)
+
+    busy = defaultdict(list)
+    for u, username in one_off.order_by(User.id, UserUnavailability.id):
+        busy[u.user_id].append(Busy(u.user_id, username, u.start_date, u.end_date, 'unavailability',
+                                    u.id, u.title, u.description, u.is_all_day))
+
+    rules = recurring.order_by(User.id, RecurringUnavailability.id).all()
+    if rules:
+        window = Window(start, end)
+        for rule, username in rules:
+            busy[rule.user_id].extend(expand_rule(rule, window, rule.user_id, username))
+    return dict(busy)
+
+
+def to_dict(b: Busy) -> dict:
+    """The shape /api/unavailabilities-week has always returned."""
+    return {
+        'id': b.source_id if b.day is None else f'rec-{b.source_id}-{b.day}',
+        'username': b.username, 'title': b.title,
+        'start': b.start.isoformat(), 'end': b.end.isoformat(),
+        'description': b.description, 'is_all_day': b.is_all_day,
+        'type': b.kind,
+    }
@@ -0,0 +1,80 @@
+"""services/calendar_service.py — Date-windowed calendar data."""
+
+from datetime import datetime
+
+from sqlalchemy.orm import selectinload
+
+from extensions import db
+from models import Event, Shift, ShiftAssignment, User
+from services.recurrence import Occurrence, events_in_window, is_series
+
+
+def parse_window(start_str: str, end_str: str) -> tuple[datetime, datetime]:
+    """Parse ISO *start*/*end* query args into naive datetimes. Raises ValueError."""
+    start = datetime.fromisoformat(start_str.replace('Z', '+00:00')).replace(tzinfo=None)
+    end   = datetime.fromisoformat(end_str.replace('Z', '+00:00')).replace(tzinfo=None)
+    if end <= start:
+        raise ValueError('end must be after start')
+    return start, end
+
+
+def get_calendar_window(start: datetime, end: datetime) -> dict:
+    """Events, shifts and assigned users with a start in [start, end).
+
+    A fixed number of queries whatever the window size or series length:
+    events (+ their crew via selectinload) with recurring series expanded
+    over the window (services.recurrence), shifts, and one joined query for
+    accepted/confirmed users. Occurrences without a row of their own have a
+    string id and ``virtual`` set; opening their ``url`` materialises them.
+    """
+    events = events_in_window(start, end, options=(selectinload(Event.crew_assignments),))
+    shifts = (
+        Shift.query
+        .filter(Shift.shift_date >= start, Shift.shift_date < end)
+        .order_by(Shift.shift_date)
+        .all()
+    )
+
+    assigned = {}
+    if shifts:
+        for shift_id, username in (
+            db.session.query(ShiftAssignment.shift_id, User.username)
+            .join(User, User.id == ShiftAssignment.user_id)
+            .filter(ShiftAssignment.shift_id.in_([s.id for s in shifts]),
+                    ShiftAssignment.status.in_(('accepted', 'confirmed')))
+            .order_by(ShiftAssignment.id)
+        ):
+            assigned.setdefault(shift_id, []).append(username)
+
+    return {
+        'events': [
+            {
+                'id': e.id,
+                'series_id': e.id if is_series(e) else e.recurring_event_id,
+                'virtual': isinstance(e, Occurrence),
+                'url': e.url if isinstance(e, Occurrence) else f'/events/{e.id}',
+                'title': e.title,
+                'start': e.event_date.isoformat(),
+                'end': e.event_end_date.isoformat() if e.event_end_date else None,
+                'location': e.location or '',
+                'description': e.description or '',
+                'crew': [a.crew_member for a in e.crew_assignments],
+                'crew_roles': {a.crew_member: a.role or 'Crew Member' for a in e.crew_assignments},
+            }
+            for e in events
+        ],
+        'shifts': [
+            {
+                'id': s.id,
+                'event_id': s.event_id,
+                'shift_date': s.shift_date.isoformat(),
+                'title': s.title,
+                'role': s.role,
+                'positions_needed': s.positions_needed,
+                'assigned_count': len(assigned.get(s.id, [])),
+                'is_open': s.is_open,
+                'assigned_users': assigned.get(s.id, []),
+            }
+            for s in shifts
+        ],
+    }
@@ -0,0 +1,260 @@
+"""services/conflicts.py — Double-booking and availability checks over an interval index.
+
+Everything that ties a user up — shift assignments that were not rejected,
+event crew assignments, one-off unavailability and expanded recurring
+unavailability (services.availability) — is kept per user in an
+:class:`IntervalIndex`: intervals sorted by start with a running maximum of
+their end times. "Does anything overlap [a, b)?" is then one bisect and one
+comparison, and listing the overlaps walks back only over intervals that can
+still reach *a*.
+
+:func:`schedule_index` caches one index over a horizon for the "who is free"
+and "does this conflict" APIs and drops it as soon as a shift, assignment,
+event, user or unavailability row changes in this process. Assignment
+endpoints don't rely on the cache: :func:`booking_conflicts` checks the one
+user being booked straight from the database.
+"""
+
+import threading, time
+from bisect import bisect_left
+from collections import defaultdict
+from datetime import datetime, timedelta
+from itertools import accumulate
+from typing import NamedTuple
+
+from sqlalchemy import and_, event as sa_event, func, or_
+from sqlalchemy.orm import Session, object_session
+
+from extensions import db
+from models import (
+    CrewAssignment, Event, RecurringUnavailability, Shift, ShiftAssignment, User,
+    UserUnavailability,
+)
+from services.availability import ONE_DAY, busy_intervals
+
+# Events saved without an end time last three hours (as routes/events.py assumes)
+EVENT_DEFAULT_LENGTH = timedelta(hours=3)
+
+
+class Commitment(NamedTuple):
+    """One interval a user is already spoken for."""
+    user_id:   int
+    kind:      str              # 'shift' | 'event' | 'unavailability' | 'recurring_unavailability'
+    start:     datetime
+    end:       datetime
+    source_id: int              # shift / event / unavailability / recurring rule id
+    event_id:  int | None
+    title:     str
+
+    def to_dict(self) -> dict:
+        return {
+            'kind': self.kind, 'id': self.source_id, 'event_id': self.event_id,
+            'title': self.title, 'start': self.start.isoformat(), 'end': self.end.isoformat(),
+        }
+
+
+class IntervalIndex:
+    """Half-open intervals sorted by start, with a prefix maximum of end times."""
+
+    __slots__ = ('items', 'starts', 'reach')
+
+    def __init__(self, items):
+        self.items  = sorted(items, key=lambda c: (c.start, c.end))
+        self.starts = [c.start for c in self.items]
+        self.reach  = list(accumulate((c.end for c in self.items), max))
+
+    def __len__(self):
+        return len(self.items)
+
+    def overlaps(self, start: datetime, end: datetime) -> bool:
+        hi = bisect_left(self.starts, end)
+        return hi > 0 and self.reach[hi - 1] > start
+
+    def overlapping(self, start: datetime, end: datetime) -> list:
+        """Items overlapping ``[start, end)``, in start order."""
+        out = []
+        i = bisect_left(self.starts, end) - 1
+        while i >= 0 and self.reach[i] > start:
+            if self.items[i].end > start:
+                out.append(self.items[i])
+            i -= 1
+        out.reverse()
+        return out
+
+
+def _same_booking(c: Commitment, event_id, shift_id) -> bool:
+    """Whether *c* is part of the booking being checked rather than a clash with it.
+
+    Booking a shift ignores the user's crew assignment for that shift's event
+    (other shifts of the event still count). Joining an event ignores the
+    user's shifts within it.
+    """
+    if c.kind == 'shift' and shift_id is not None:
+        return c.source_id == shift_id
+    if c.kind in ('event', 'shift'):
+        return event_id is not None and c.event_id == event_id
+    return False
+
+
+class ScheduleIndex:
+    """Commitments of many users over ``[start, end)``, one :class:`IntervalIndex` each."""
+
+    def __init__(self, start: datetime, end: datetime, commitments, users: dict):
+        self.start, self.end = start, end
+        self.users    = users           # user_id -> (username, user_role)
+        self.built_at = time.monotonic()
+        grouped = defaultdict(list)
+        for c in commitments:
+            grouped[c.user_id].append(c)
+        self.by_user = {uid: IntervalIndex(items) for uid, items in grouped.items()}
+
+    def covers(self, start: datetime, end: datetime) -> bool:
+        return self.start <= start and end <= self.end
+
+    def conflicts(self, user_id: int, start: datetime, end: datetime,
+                  event_id: int | None = None, shift_id: int | None = None) -> list[Commitment]:
+        idx = self.by_user.get(user_id)
+        if idx is None or not idx.overlaps(start, end):
+            return []
+        return [c for c in idx.overlapping(start, end) if not _same_booking(c, event_id, shift_id)]
+
+    def availability(self, start: datetime, end: datetime, roles=None,
+                     event_id: int | None = None, shift_id: int | None = None) -> tuple[list, list]:
+        """``(free, busy)``: user ids with no conflict, and ``(user_id, conflicts)`` pairs."""
+        free, busy = [], []
+        for uid, (_, role) in sorted(self.users.items(), key=lambda kv: kv[1][0].lower()):
+            if roles and role not in roles:
+                continue
+            clash = self.conflicts(uid, start, end, event_id, shift_id)
+            if clash:
+                busy.append((uid, clash))
+            else:
+                free.append(uid)
+        return free, busy
+
+
+# ---------------------------------------------------------------------------
+# Building
+# ---------------------------------------------------------------------------
+
+def event_window(event) -> tuple[datetime, datetime]:
+    return event.event_date, event.event_end_date or event.event_date + EVENT_DEFAULT_LENGTH
+
+
+def shift_window(shift) -> tuple[datetime, datetime]:
+    return shift.shift_date, shift.shift_end_date
+
+
+def build_index(start: datetime, end: datetime, user_ids=None) -> ScheduleIndex:
+    """Load every commitment overlapping ``[start, end)`` (for *user_ids*, or everyone).
+
+    Five queries however many users and rows: users, shift assignments,
+    event assignments, and the two unavailability queries.
+    """
+    users = db.session.query(User.id, User.username, User.user_role)
+    shifts = (db.session.query(ShiftAssignment.user_id, Shift.id, Shift.event_id, Shift.title,
+                               Shift.shift_date, Shift.shift_end_date)
+              .join(Shift, Shift.id == ShiftAssignment.shift_id)
+              .filter(func.coalesce(ShiftAssignment.status, '') != 'rejected',
+                      Shift.shift_date < end, Shift.shift_end_date > start))
+    events = (db.session.query(User.id, Event.id, Event.title, Event.event_date, Event.event_end_date)
+              .select_from(Event)
+              .join(CrewAssignment, CrewAssignment.event_id == Event.id)
+              .join(User, func.lower(User.username) == func.lower(CrewAssignment.crew_member))
+              .filter(Event.event_date < end,
+                      or_(Event.event_end_date > start,
+                          and_(Event.event_end_date.is_(None),
+                               Event.event_date > start - EVENT_DEFAULT_LENGTH))))
+    if user_ids is not None:
+        users  = users.filter(User.id.in_(user_ids))
+        shifts = shifts.filter(ShiftAssignment.user_id.in_(user_ids))
+        events = events.filter(User.id.in_(user_ids))
+
+    commitments = [Commitment(uid, 'shift', s, e, sid, eid, title)
+                   for uid, sid, eid, title, s, e in shifts]
+    commitments += [Commitment(uid, 'event', s, e or s + EVENT_DEFAULT_LENGTH, eid, eid, title)
+                    for uid, eid, title, s, e in events]
+    # A day earlier so rules running past midnight into the window are included
+    for uid, items in busy_intervals(start - ONE_DAY, end, user_ids=user_ids).items():
+        commitments += [Commitment(uid, b.kind, b.start, b.end, b.source_id, None, b.title)
+                        for b in items]
+    return ScheduleIndex(start, end, commitments, {uid: (name, role) for uid, name, role in users})
+
+
+def booking_conflicts(user_id: int, start: datetime, end: datetime,
+                      event_id: int | None = None, shift_id: int | None = None) -> list[Commitment]:
+    """Fresh check for one user, straight from the database — call before writing an assignment."""
+    return build_index(start, end, user_ids=[user_id]).conflicts(user_id, start, end, event_id, shift_id)
+
+
+def conflict_payload(conflicts: list[Commitment]) -> dict:
+    """The 409 body assignment endpoints return: a readable error plus the clashes."""
+    labels = {'shift': 'shift', 'event': 'event',
+              'unavailability': 'unavailable', 'recurring_unavailability': 'unavailable'}
+    parts = [f"{c.title} ({labels.get(c.kind, c.kind)}, "
+             f"{c.start.strftime('%b %d %H:%M')}–{c.end.strftime('%H:%M')})" for c in conflicts]
+    return {'error': 'Scheduling conflict: ' + '; '.join(parts),
+            'conflicts': [c.to_dict() for c in conflicts]}
+
+
+# ---------------------------------------------------------------------------
+# Cached index
+# ---------------------------------------------------------------------------
+
+_cached: ScheduleIndex | None = None
+_generation = 0
+_cache_lock = threading.Lock()
+
+
+def schedule_index(start: datetime, end: datetime, ttl: int = 0, horizon_days: int = 45) -> ScheduleIndex:
+    """An index covering ``[start, end)``.
+
+    With *ttl* > 0 one index, spanning at least *horizon_days* from the day
+    *start* falls on, is kept for that many seconds and reused by every
+    query it covers.
+    """
+    global _cached
+    if ttl <= 0:
+        return build_index(start, end)
+    with _cache_lock:
+        idx, generation = _cached, _generation
+    if idx is not None and idx.covers(start, end) and time.monotonic() - idx.built_at < ttl:
+        return idx
+
+    lo  = start.replace(hour=0, minute=0, second=0, microsecond=0)
+    idx = build_index(lo, max(end, lo + timedelta(days=horizon_days)))
+    with _cache_lock:
+        if generation == _generation:       # nothing changed while it was being built
+            _cached = idx
+    return idx
+
+
+def invalidate_schedule_index() -> None:
+    global _cached, _generation
+    with _cache_lock:
+        _cached = None
+        _generation += 1
+
+
+# ---------------------------------------------------------------------------
+# Cache invalidation
+# ---------------------------------------------------------------------------
+
+def _on_change(mapper, connection, target):
+    invalidate_schedule_index()
+    session = object_session(target)
+    if session is not None:
+        session.info['schedule_changed'] = True
+
+
+def _on_commit(session):
+    # Again once committed, in case another request rebuilt from the old rows meanwhile
+    if session.info.pop('schedule_changed', False):
+        invalidate_schedule_index()
+
+
+for _model in (Shift, ShiftAssignment, CrewAssignment, Event, User,
+               UserUnavailability, RecurringUnavailability):
+    for _evt in ('after_insert', 'after_update', 'after_delete'):
+        sa_event.listen(_model, _evt, _on_change)
+sa_event.listen(Session, 'after_commit', _on_commit)
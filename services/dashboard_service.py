@@ -0,0 +1,163 @@
+"""services/dashboard_service.py — Crew dashboard data in a fixed number of queries."""
+
+import threading, time
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+
+from sqlalchemy import case, distinct, event as sa_event, func
+
+from extensions import db
+from models import Event, CrewAssignment, TodoItem
+from services.recurrence import own_slot_cancelled, virtual_occurrences
+
+UPCOMING_LIMIT   = 10
+UPCOMING_HORIZON = timedelta(days=90)   # how far ahead recurring series are expanded when few rows follow
+
+# user_id -> (expires_at, username_lower, data)
+_cache: dict = {}
+_cache_lock = threading.Lock()
+
+
+def get_dashboard_data(user, now: datetime | None = None, ttl: int = 0) -> dict:
+    """Return the dashboard context for *user*.
+
+    Always six queries regardless of how many events exist: upcoming events,
+    occurrences of recurring series that have no row yet (two), crew counts +
+    "mine" flags for the events, this week's totals, and the pending todos.
+    Usernames are matched case-insensitively in SQL.
+
+    With *ttl* > 0 the result is cached per user for that many seconds and
+    dropped as soon as a relevant assignment, event or todo changes.
+    """
+    if ttl > 0:
+        with _cache_lock:
+            hit = _cache.get(user.id)
+        if hit and hit[0] > time.monotonic():
+            return hit[2]
+
+    data = _load_dashboard_data(user, now or datetime.now())
+
+    if ttl > 0:
+        with _cache_lock:
+            _cache[user.id] = (time.monotonic() + ttl, user.username.lower(), data)
+    return data
+
+
+def invalidate_dashboard_cache(username: str | None = None, user_id: int | None = None) -> None:
+    """Drop cached dashboards for *username* / *user_id*, or everything if neither is given."""
+    with _cache_lock:
+        if username is None and user_id is None:
+            _cache.clear()
+            return
+        name = (username or '').lower()
+        for uid in [k for k, v in _cache.items() if k == user_id or v[1] == name]:
+            _cache.pop(uid, None)
+
+
+def _load_dashboard_data(user, now: datetime) -> dict:
+    me       = func.lower(CrewAssignment.crew_member) == user.username.lower()
+    week_end = now + timedelta(days=7)
+
+    # 1. Next events (columns only — rendered straight into the template)
+    rows = (
+        db.session.query(Event.id, Event.title, Event.description, Event.event_date,
+                         Event.event_end_date, Event.location)
+        .filter(Event.event_date >= now, ~own_slot_cancelled())
+        .order_by(Event.event_date)
+        .limit(UPCOMING_LIMIT)
+        .all()
+    )
+    horizon = max(week_end, rows[-1].event_date if len(rows) == UPCOMING_LIMIT
+                            else now + UPCOMING_HORIZON)
+    virtual = virtual_occurrences(now, horizon + timedelta(microseconds=1))
+
+    # 2. Crew counts and "am I on it" for those events, one GROUP BY
+    counts = {}
+    if rows:
+        counts = {
+            event_id: (crew_count, mine or 0)
+            for event_id, crew_count, mine in db.session.query(
+                CrewAssignment.event_id,
+                func.count(CrewAssignment.id),
+                func.sum(case((me, 1), else_=0)),
+            )
+            .filter(CrewAssignment.event_id.in_([r.id for r in rows]))
+            .group_by(CrewAssignment.event_id)
+        }
+
+    upcoming_events    = []
+    my_upcoming_events = []
+    for r in rows:
+        crew_count, mine = counts.get(r.id, (0, 0))
+        ev = SimpleNamespace(
+            id=r.id, title=r.title, description=r.description,
+            event_date=r.event_date, event_end_date=r.event_end_date,
+            location=r.location, crew_count=crew_count, url=None,
+        )
+        upcoming_events.append(ev)
+        if mine:
+            my_upcoming_events.append(ev)
+    # Nobody is crewing an occurrence until it has a row, so they only join the full list
+    upcoming_events += [
+        SimpleNamespace(id=o.id, title=o.title, description=o.description,
+                        event_date=o.event_date, event_end_date=o.event_end_date,
+                        location=o.location, crew_count=0, url=o.url)
+        for o in virtual
+    ]
+    upcoming_events = sorted(upcoming_events, key=lambda e: e.event_date)[:UPCOMING_LIMIT]
+
+    # 3. This week's totals: all events and the ones I'm assigned to
+    events_this_week, my_events_this_week = (
+        db.session.query(
+            func.count(distinct(Event.id)),
+            func.count(distinct(case((me, Event.id)))),
+        )
+        .select_from(Event)
+        .outerjoin(CrewAssignment, CrewAssignment.event_id == Event.id)
+        .filter(Event.event_date >= now, Event.event_date <= week_end, ~own_slot_cancelled())
+        .one()
+    )
+    events_this_week += sum(1 for o in virtual if o.event_date <= week_end)
+
+    # 4. Pending todos
+    pending_tasks = [
+        SimpleNamespace(id=t.id, title=t.title, priority=t.priority,
+                        due_date=t.due_date, event_id=t.event_id)
+        for t in db.session.query(TodoItem.id, TodoItem.title, TodoItem.priority,
+                                  TodoItem.due_date, TodoItem.event_id)
+        .filter(TodoItem.user_id == user.id, TodoItem.is_completed == False)
+        .order_by(TodoItem.due_date)
+    ]
+
+    return {
+        'upcoming_events':     upcoming_events,
+        'my_upcoming_events':  my_upcoming_events,
+        'pending_tasks':       pending_tasks,
+        'pending_tasks_count': len(pending_tasks),
+        'events_this_week':    events_this_week,
+        'my_events_this_week': my_events_this_week,
+        'next_event':          my_upcoming_events[0] if my_upcoming_events else None,
+        'now':                 now,
+    }
+
+
+# ---------------------------------------------------------------------------
+# Cache invalidation
+# ---------------------------------------------------------------------------
+
+def _on_assignment_change(mapper, connection, target):
+    invalidate_dashboard_cache(username=target.crew_member)
+
+
+def _on_todo_change(mapper, connection, target):
+    invalidate_dashboard_cache(user_id=target.user_id)
+
+
+def _on_event_change(mapper, connection, target):
+    invalidate_dashboard_cache()
+
+
+for _evt in ('after_insert', 'after_update', 'after_delete'):
+    sa_event.listen(CrewAssignment, _evt, _on_assignment_change)
+    sa_event.listen(TodoItem,       _evt, _on_todo_change)
+    sa_event.listen(Event,          _evt, _on_event_change)
@@ -0,0 +1,142 @@
+"""services/discord_service.py — What the Discord bot can read and change.
+
+Each function takes the request payload (``{}`` for lookups) plus any URL
+arguments and returns ``(data, status)``. routes/discord.py exposes them
+over HTTP for remote bots; a bot running next to the app calls them
+directly through its own app context (see discord_client.InProcessClient).
+"""
+
+from datetime import datetime
+
+from sqlalchemy import func
+from werkzeug.security import generate_password_hash, check_password_hash
+
+from extensions import db
+from models import User, Event, CrewAssignment, Equipment, PickListItem
+from services import recurrence
+from services.conflicts import booking_conflicts, conflict_payload, event_window
+
+
+def join_event(data: dict):
+    event = recurrence.find_occurrence(data.get('event_id'))     # an event id or an occurrence ref
+    if not event:
+        return {'error': 'Event not found'}, 404
+    user = User.query.filter_by(discord_id=data.get('discord_id')).first()
+    if not user:
+        return {'error': 'Discord account not linked'}, 400
+    own_row = isinstance(event, Event)
+    if own_row and CrewAssignment.query.filter_by(event_id=event.id, crew_member=user.username).first():
+        return {'error': 'Already assigned'}, 400
+    conflicts = booking_conflicts(user.id, *event_window(event), event_id=event.id if own_row else None)
+    if conflicts:
+        return conflict_payload(conflicts), 409
+    event = recurrence.materialise(event)
+    db.session.add(CrewAssignment(event_id=event.id, crew_member=user.username, assigned_via='discord'))
+    db.session.commit()
+    return {'success': True}, 200
+
+
+def leave_event(data: dict):
+    user = User.query.filter_by(discord_id=data.get('discord_id')).first()
+    if not user:
+        return {'error': 'User not found'}, 404
+    assignment = CrewAssignment.query.filter_by(event_id=data.get('event_id'), crew_member=user.username).first()
+    if assignment:
+        db.session.delete(assignment)
+        db.session.commit()
+    return {'success': True}, 200
+
+
+def link_existing(data: dict):
+    user = User.query.filter_by(username=data.get('username')).first()
+    if not user or not check_password_hash(user.password_hash, data.get('password', '')):
+        return {'error': 'Invalid username or password'}, 401
+    user.discord_id       = data.get('discord_id')
+    user.discord_username = data.get('discord_username')
+    db.session.commit()
+    return {'success': True, 'username': user.username}, 200
+
+
+def check_link(data: dict, discord_id: str):
+    user = User.query.filter_by(discord_id=discord_id).first()
+    if user:
+        return {'linked': True, 'username': user.username,
+                'event_count': CrewAssignment.query.filter_by(crew_member=user.username).count()}, 200
+    return {'linked': False}, 404
+
+
+def user_events(data: dict, discord_id: str):
+    user = User.query.filter_by(discord_id=discord_id).first()
+    if not user:
+        return {'error': 'User not found'}, 404
+    rows = (db.session.query(Event, CrewAssignment.role)
+            .join(CrewAssignment, CrewAssignment.event_id == Event.id)
+            .filter(CrewAssignment.crew_member == user.username)
+            .order_by(CrewAssignment.id))
+    return {'events': [{'id': e.id, 'title': e.title,
+                        'date': e.event_date.strftime('%B %d, %Y at %I:%M %p'),
+                        'location': e.location or 'TBD', 'role': role or 'Crew Member'}
+                       for e, role in rows]}, 200
+
+
+def list_events(data: dict):
+    events = recurrence.upcoming(datetime.now(), 10)
+    ids    = [e.id for e in events if isinstance(e, Event)]
+    counts = dict(db.session.query(CrewAssignment.event_id, func.count(CrewAssignment.id))
+                  .filter(CrewAssignment.event_id.in_(ids))
+                  .group_by(CrewAssignment.event_id)) if ids else {}
+    return {'events': [{'id': e.id, 'title': e.title,
+                        'date': e.event_date.strftime('%B %d, %Y at %I:%M %p'),
+                        'location': e.location or 'TBD',
+                        'crew_count': counts.get(e.id, 0)} for e in events]}, 200
+
+
+def event_crew(data: dict, event_id: int):
+    event = db.session.get(Event, event_id)
+    if not event:
+        return {'error': 'Event not found'}, 404
+    return {'event_title': event.title,
+            'crew': [{'name': a.crew_member, 'role': a.role or 'Crew Member'}
+                     for a in event.crew_assignments]}, 200
+
+
+def add_event(data: dict):
+    try:
+        event_date = datetime.strptime(data['date'], '%Y-%m-%d %H:%M')
+        event      = Event(title=data['title'], event_date=event_date,
+                           location=data.get('location', 'TBD'), created_by='Discord Bot')
+        db.session.add(event)
+        db.session.commit()
+        return {'success': True, 'event_id': event.id}, 200
+    except Exception as exc:
+        db.session.rollback()
+        return {'error': str(exc)}, 400
+
+
+def create_account(data: dict):
+    username = data.get('username')
+    if User.query.filter_by(username=username).first():
+        return {'error': 'Username already exists'}, 400
+    user = User(username=username, password_hash=generate_password_hash(data.get('password', '')), is_admin=False)
+    db.session.add(user)
+    db.session.commit()
+    return {'success': True, 'username': username}, 200
+
+
+def search_equipment(data: dict, query: str):
+    items = Equipment.query.filter(
+        (Equipment.name.contains(query)) | (Equipment.barcode.contains(query))
+    ).limit(10).all()
+    return {'equipment': [e.to_dict() for e in items]}, 200
+
+
+def pick_list(data: dict, event_id: int):
+    event = db.session.get(Event, event_id)
+    if not event:
+        return {'error': 'Event not found'}, 404
+    items = PickListItem.query.filter_by(event_id=event_id).all()
+    return {'event_title': event.title, 'items': [{
+        'id': i.id, 'name': i.item_name, 'quantity': i.quantity, 'is_checked': i.is_checked,
+        'location': i.equipment.location if i.equipment else 'N/A',
+        'category': i.equipment.category if i.equipment else 'N/A',
+    } for i in items]}, 200
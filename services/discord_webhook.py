@@ -0,0 +1,281 @@
+"""services/discord_webhook.py — Rate-limit-aware Discord webhook dispatcher.
+
+Every webhook post goes through one background thread per process that owns
+a persistent ``requests.Session``. A token bucket follows Discord's
+``X-RateLimit-*`` headers and ``429 retry_after`` so bursts are paced instead
+of dropped. Plain announcements (embeds, no content) queued close together
+are coalesced into messages of up to ten embeds. Transient failures are
+retried with backoff; a post that still fails is written to
+``discord_dead_letter`` so it can be redelivered later.
+"""
+
+import json, queue, threading, time
+from concurrent.futures import Future
+
+import requests
+
+MAX_EMBEDS       = 10          # Discord's per-message limit
+MAX_EMBED_CHARS  = 6000        # total characters across a message's embeds
+LINGER_SECONDS   = 0.5         # gather announcements this long before posting
+MAX_ATTEMPTS     = 5
+BACKOFF_SECONDS  = 1.0         # doubled per attempt for 5xx / network errors
+TIMEOUT          = (3.05, 10)  # connect, read
+DEFAULT_LIMIT    = 5           # requests per window until headers say otherwise
+DEFAULT_WINDOW   = 2.0
+
+_dispatcher = None
+_dispatcher_lock = threading.Lock()
+
+
+class _Bucket:
+    """Token bucket seeded with defaults and corrected from each response's headers."""
+
+    def __init__(self, limit: int = DEFAULT_LIMIT, window: float = DEFAULT_WINDOW, sleep=time.sleep):
+        self.limit     = limit
+        self.window    = window
+        self.remaining = limit
+        self.reset_at  = 0.0
+        self._sleep    = sleep
+
+    def acquire(self) -> None:
+        now = time.monotonic()
+        if self.remaining <= 0 and now < self.reset_at:
+            self._sleep(self.reset_at - now)
+            now = time.monotonic()
+        if now >= self.reset_at:
+            self.remaining = self.limit
+            self.reset_at  = now + self.window
+        self.remaining -= 1
+
+    def update(self, headers) -> None:
+        try:
+            if 'X-RateLimit-Limit' in headers:
+                self.limit = max(1, int(headers['X-RateLimit-Limit']))
+            if 'X-RateLimit-Remaining' in headers:
+                self.remaining = int(headers['X-RateLimit-Remaining'])
+            if 'X-RateLimit-Reset-After' in headers:
+                self.reset_at = time.monotonic() + float(headers['X-RateLimit-Reset-After'])
+        except (TypeError, ValueError):
+            pass
+
+    def block_for(self, seconds: float) -> None:
+        """A 429's ``retry_after`` is authoritative, whatever our window says."""
+        self.remaining = 0
+        self.reset_at  = time.monotonic() + seconds
+
+
+class _Post:
+    __slots__ = ('payload', 'future', 'dead_letter')
+
+    def __init__(self, payload: dict, dead_letter: bool):
+        self.payload     = payload
+        self.future      = Future()
+        self.dead_letter = dead_letter
+
+
+class WebhookDispatcher:
+    """Queue of webhook payloads drained by one sender thread."""
+
+    def __init__(self, url: str, app=None, session=None, linger: float = LINGER_SECONDS,
+                 max_attempts: int = MAX_ATTEMPTS, backoff: float = BACKOFF_SECONDS,
+                 sleep=time.sleep):
+        self.url          = url
+        self.app          = app
+        self.session      = session or requests.Session()
+        self.linger       = linger
+        self.max_attempts = max_attempts
+        self.backoff      = backoff
+        self.bucket       = _Bucket(sleep=sleep)
+        self.stats        = {'posted': 0, 'messages': 0, 'rate_limited': 0, 'retried': 0, 'dead_lettered': 0}
+        self._sleep       = sleep
+        self._queue       = queue.Queue()
+        self._busy        = False
+        self._stop        = threading.Event()
+        self._thread      = threading.Thread(target=self._run, name='discord-webhook', daemon=True)
+        self._thread.start()
+
+    def post(self, payload: dict, dead_letter: bool = True) -> Future:
+        """Queue *payload*; the future resolves to ``(ok, error)``.
+
+        Pass ``dead_letter=False`` when the caller keeps its own retry state.
+        """
+        item = _Post(payload, dead_letter)
+        self._queue.put(item)
+        return item.future
+
+    def flush(self, timeout: float = 10.0) -> bool:
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            if self._queue.unfinished_tasks == 0 and not self._busy:
+                return True
+            time.sleep(0.01)
+        return False
+
+    def close(self, timeout: float = 5.0) -> None:
+        self.flush(timeout)
+        self._stop.set()
+        self._queue.put(None)
+        self._thread.join(timeout=1.0)
+        self.session.close()
+
+    # -- worker ------------------------------------------------------------
+
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            first = self._queue.get()
+            if first is None:
+                self._queue.task_done()
+                continue
+            self._busy = True
+            items, deadline = [first], time.monotonic() + self.linger
+            while True:
+                try:
+                    nxt = self._queue.get(timeout=max(0.0, deadline - time.monotonic()))
+                except queue.Empty:
+                    break
+                if nxt is None:
+                    self._queue.task_done()
+                    break
+                items.append(nxt)
+            for _ in items:
+                self._queue.task_done()
+
+            for payload, group in coalesce(items):
+                try:
+                    result = self._send(payload)
+                except Exception as exc:              # keep the worker alive
+                    result = (False, str(exc))
+                if not result[0]:
+                    self._dead_letter(payload, group, result[1])
+                for item in group:
+                    item.future.set_result(result)
+            self._busy = False
+
+    def _send(self, payload: dict) -> tuple[bool, str | None]:
+        error = None
+        for attempt in range(1, self.max_attempts + 1):
+            self.bucket.acquire()
+            try:
+                r = self.session.post(self.url, json=payload, timeout=TIMEOUT)
+            except requests.RequestException as exc:
+                error = str(exc)
+                self._retry_wait(attempt)
+                continue
+
+            self.bucket.update(r.headers)
+            if 200 <= r.status_code < 300:
+                self.stats['messages'] += 1
+                self.stats['posted']   += len(payload.get('embeds') or [None])
+                return True, None
+            if r.status_code == 429:
+                self.stats['rate_limited'] += 1
+                self.bucket.block_for(_retry_after(r))
+                error = 'rate limited'
+                continue
+            error = f"HTTP {r.status_code}: {r.text[:200]}"
+            if r.status_code < 500:
+                return False, error            # bad payload or webhook gone — retrying won't help
+            self._retry_wait(attempt)
+        return False, error
+
+    def _retry_wait(self, attempt: int) -> None:
+        if attempt < self.max_attempts:
+            self.stats['retried'] += 1
+            self._sleep(self.backoff * (2 ** (attempt - 1)))
+
+    def _dead_letter(self, payload: dict, group: list, error: str | None) -> None:
+        if not any(item.dead_letter for item in group):
+            return
+        self.stats['dead_lettered'] += 1
+        print(f"❌ Discord webhook post failed, kept as dead letter: {error}")
+        if self.app is None:
+            return
+        try:
+            from extensions import db
+            from models import DiscordDeadLetter
+            with self.app.app_context():
+                db.session.add(DiscordDeadLetter(payload=json.dumps(payload), error=error,
+                                                 attempts=self.max_attempts))
+                db.session.commit()
+        except Exception as exc:
+            print(f"⚠️  Could not record Discord dead letter: {exc}")
+
+
+def coalesce(items: list) -> list:
+    """Group queued posts into messages: plain embed posts are merged (≤10 embeds,
+    ≤6000 chars), anything with content or other fields is sent on its own."""
+    messages, current, current_chars = [], None, 0
+    for item in items:
+        payload = item.payload
+        embeds  = payload.get('embeds') or []
+        if set(payload) != {'embeds'} or not embeds:
+            messages.append((payload, [item]))
+            continue
+        size = len(json.dumps(embeds))
+        if (current is None or len(current[0]['embeds']) + len(embeds) > MAX_EMBEDS
+                or current_chars + size > MAX_EMBED_CHARS):
+            current, current_chars = ({'embeds': []}, []), 0
+            messages.append(current)
+        current[0]['embeds'].extend(embeds)
+        current[1].append(item)
+        current_chars += size
+    return messages
+
+
+def _retry_after(response) -> float:
+    try:
+        return float(response.json().get('retry_after'))
+    except Exception:
+        pass
+    try:
+        return float(response.headers.get('Retry-After', 1))
+    except (TypeError, ValueError):
+        return 1.0
+
+
+# ---------------------------------------------------------------------------
+# Module-level API
+# ---------------------------------------------------------------------------
+
+def get_webhook(url: str, app=None) -> WebhookDispatcher:
+    """The process-wide dispatcher for *url*, created on first use.
+
+    When the URL changes the previous dispatcher is closed, which delivers
+    what it still has queued and stops its worker and HTTP session.
+    """
+    global _dispatcher
+    previous = None
+    with _dispatcher_lock:
+        if _dispatcher is None or _dispatcher.url != url:
+            if app is None:
+                try:
+                    from flask import current_app
+                    app = current_app._get_current_object()
+                except RuntimeError:
+                    app = None
+            previous, _dispatcher = _dispatcher, WebhookDispatcher(url, app=app)
+        current = _dispatcher
+    if previous is not None:
+        previous.close()
+    return current
+
+
+def redeliver_dead_letters(url: str, limit: int = 100) -> dict:
+    """Re-post stored dead letters (oldest first); delivered ones are deleted."""
+    from extensions import db
+    from models import DiscordDeadLetter
+    dispatcher = get_webhook(url)
+    letters = DiscordDeadLetter.query.order_by(DiscordDeadLetter.id).limit(limit).all()
+    pending = [(letter, dispatcher.post(json.loads(letter.payload), dead_letter=False))
+               for letter in letters]
+    delivered = 0
+    for letter, future in pending:
+        ok, error = future.result(timeout=120)
+        if ok:
+            db.session.delete(letter)
+            delivered += 1
+        else:
+            letter.error    = error
+            letter.attempts = (letter.attempts or 0) + dispatcher.max_attempts
+    db.session.commit()
+    return {'delivered': delivered, 'remaining': len(letters) - delivered}
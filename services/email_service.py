@@ -8,8 +8,8 @@ app.py should only call the public functions at the bottom of this file.
 
 Template files live in the  email_templates/  folder.
 Each template is a plain HTML file using {{ variable }} placeholders.
-A tiny regex-based renderer is used so you don't need Jinja2 loaded separately
-(Flask's Jinja env is used when available, falling back to simple substitution).
+A tiny built-in renderer is used so you don't need Jinja2 loaded separately;
+templates are compiled once and cached, reloading when the file changes.
 
 Usage in app.py:
     from email_service import (
@@ -43,9 +43,12 @@ from __future__ import annotations
 import os
 import re
 import json
+import threading
 from datetime import datetime
 from typing import Optional
 
+from services.mail_queue import enqueue_message, get_dispatcher, init_mail_queue
+
 # Flask-Mail is injected at init time via init_email_service()
 _mail = None
 _app  = None
@@ -68,11 +71,29 @@ def init_email_service(app, mail):
     global _mail, _app
     _app  = app
     _mail = mail
+    init_mail_queue(app, mail)
 
 
 # ---------------------------------------------------------------------------
 # Template loading & rendering
 # ---------------------------------------------------------------------------
+#
+# Each template is parsed once into a small node tree and cached; the file's
+# mtime is checked on every render so edits are picked up without a restart.
+# Nodes are tuples:
+#   (_TEXT, text)  (_VAR, key)  (_IF, [(negate, key, body), ...], else_body)
+#   (_FOR, var, iterable, body)
+
+_TEXT, _VAR, _IF, _FOR = range(4)
+
+_TOKEN_RE = re.compile(r"\{\{\s*(\w+)\s*\}\}|\{%-?\s*(.*?)\s*-?%\}", re.DOTALL)
+_FOR_RE   = re.compile(r"for\s+(\w+)\s+in\s+(\w+)$")
+_IF_RE    = re.compile(r"(if|elif)\s+(.+)$", re.DOTALL)
+
+# template name -> (mtime_ns, nodes)
+_compiled: dict = {}
+_compiled_lock = threading.Lock()
+
 
 def _load_template(name: str) -> str:
     """Load an HTML template file from email_templates/."""
@@ -87,93 +108,116 @@ def _render(template_name: str, context: dict) -> str:
     """Render a template with the given context dictionary.
 
     Supports:
-      - {{ variable }}          — simple substitution
+      - {{ variable }}          — simple substitution (unknown keys render empty)
       - {% if condition %} ... {% elif ... %} ... {% else %} ... {% endif %}
-      - {% for item in list %} ... {% endfor %}  (basic, no nested loops)
+      - {% for item in list %} ... {% endfor %}
+    Conditions are ``name`` or ``not name``.
     """
-    html = _load_template(template_name)
-
-    # ---- for loops ----------------------------------------------------------
-    def replace_for(match):
-        var, iterable_name, body = match.group(1), match.group(2), match.group(3)
-        items = context.get(iterable_name, [])
-        result = []
-        for item in items:
-            inner_ctx = {**context, var: item}
-            result.append(_simple_substitute(body, inner_ctx))
-        return "".join(result)
-
-    html = re.sub(
-        r"\{%-?\s*for\s+(\w+)\s+in\s+(\w+)\s*-?%\}(.*?)\{%-?\s*endfor\s*-?%\}",
-        replace_for,
-        html,
-        flags=re.DOTALL,
-    )
-
-    # ---- if / elif / else / endif -------------------------------------------
-    def replace_if(match):
-        full = match.group(0)
-        # Tokenise the block into (condition, body) pairs + optional else body
-        # Supports: {% if X %} ... {% elif Y %} ... {% else %} ... {% endif %}
-        tokens = re.split(
-            r"\{%-?\s*(?:elif\s+(.*?)|else)\s*-?%\}",
-            full[full.index("%}") + 2 : full.rfind("{%")],
-        )
-        conditions_raw = re.findall(
-            r"\{%-?\s*if\s+(.*?)\s*-?%\}|\{%-?\s*elif\s+(.*?)\s*-?%\}",
-            full,
-        )
-        conds = [c[0] or c[1] for c in conditions_raw]
-
-        for idx, cond in enumerate(conds):
-            if _eval_condition(cond, context):
-                parts = re.split(
-                    r"\{%-?\s*(?:elif\b.*?|else)\s*-?%\}",
-                    full[full.index("%}") + 2 :],
-                    flags=re.DOTALL,
-                )
-                return parts[idx] if idx < len(parts) else ""
-
-        # Try else branch
-        else_match = re.search(
-            r"\{%-?\s*else\s*-?%\}(.*?)\{%-?\s*endif\s*-?%\}",
-            full,
-            flags=re.DOTALL,
-        )
-        if else_match:
-            return else_match.group(1)
-        return ""
-
-    html = re.sub(
-        r"\{%-?\s*if\b.*?\{%-?\s*endif\s*-?%\}",
-        replace_if,
-        html,
-        flags=re.DOTALL,
-    )
-
-    # ---- simple {{ variable }} substitution ---------------------------------
-    html = _simple_substitute(html, context)
-    return html
+    out: list = []
+    _emit(_get_compiled(template_name), context, out)
+    return "".join(out)
 
 
-def _simple_substitute(text: str, ctx: dict) -> str:
-    """Replace {{ key }} with ctx[key], leaving unknown keys empty."""
-    def replacer(m):
-        key = m.group(1).strip()
-        val = ctx.get(key, "")
-        return str(val) if val is not None else ""
-
-    return re.sub(r"\{\{\s*(\w+)\s*\}\}", replacer, text)
-
-
-def _eval_condition(cond: str, ctx: dict) -> bool:
-    """Very simple condition evaluator for template if-blocks.
-    Supports:  variable_name  and  not variable_name
-    """
+def _get_compiled(name: str) -> list:
+    path = os.path.join(TEMPLATES_DIR, name)
+    try:
+        mtime = os.stat(path).st_mtime_ns
+    except FileNotFoundError:
+        raise FileNotFoundError(f"Email template not found: {path}") from None
+
+    hit = _compiled.get(name)
+    if hit is not None and hit[0] == mtime:
+        return hit[1]
+    with _compiled_lock:
+        hit = _compiled.get(name)
+        if hit is None or hit[0] != mtime:
+            hit = _compiled[name] = (mtime, _compile(_load_template(name), name))
+    return hit[1]
+
+
+def clear_template_cache() -> None:
+    with _compiled_lock:
+        _compiled.clear()
+
+
+def _compile(source: str, name: str = "<template>") -> list:
+    """Parse *source* into a node list. Unknown ``{% %}`` tags are kept as text."""
+    root: list = []
+    body  = root
+    stack: list = []            # (node, body to resume) for open if/for blocks
+    pos   = 0
+
+    for m in _TOKEN_RE.finditer(source):
+        if m.start() > pos:
+            body.append((_TEXT, source[pos:m.start()]))
+        pos = m.end()
+
+        if m.group(1):
+            body.append((_VAR, m.group(1)))
+            continue
+
+        tag = m.group(2).strip()
+        for_m, if_m = _FOR_RE.match(tag), _IF_RE.match(tag)
+        if for_m:
+            node = (_FOR, for_m.group(1), for_m.group(2), [])
+            body.append(node)
+            stack.append((node, body))
+            body = node[3]
+        elif if_m and if_m.group(1) == "if":
+            node = (_IF, [_condition(if_m.group(2), [])], [])
+            body.append(node)
+            stack.append((node, body))
+            body = node[1][0][2]
+        elif if_m or tag == "else":
+            if not stack or stack[-1][0][0] != _IF:
+                raise ValueError(f"{name}: '{{% {tag} %}}' outside an if block")
+            node = stack[-1][0]
+            if tag == "else":
+                body = node[2]
+            else:
+                node[1].append(_condition(if_m.group(2), []))
+                body = node[1][-1][2]
+        elif tag in ("endif", "endfor"):
+            kind = _IF if tag == "endif" else _FOR
+            if not stack or stack[-1][0][0] != kind:
+                raise ValueError(f"{name}: unexpected '{{% {tag} %}}'")
+            body = stack.pop()[1]
+        else:
+            body.append((_TEXT, m.group(0)))
+
+    if stack:
+        raise ValueError(f"{name}: unclosed block")
+    if pos < len(source):
+        body.append((_TEXT, source[pos:]))
+    return root
+
+
+def _condition(cond: str, body: list) -> tuple:
     cond = cond.strip()
     if cond.startswith("not "):
-        return not bool(ctx.get(cond[4:].strip()))
-    return bool(ctx.get(cond))
+        return (True, cond[4:].strip(), body)
+    return (False, cond, body)
+
+
+def _emit(nodes: list, ctx: dict, out: list) -> None:
+    for node in nodes:
+        kind = node[0]
+        if kind == _TEXT:
+            out.append(node[1])
+        elif kind == _VAR:
+            val = ctx.get(node[1])
+            if val is not None:
+                out.append(str(val))
+        elif kind == _IF:
+            for negate, key, body in node[1]:
+                if bool(ctx.get(key)) is not negate:
+                    _emit(body, ctx, out)
+                    break
+            else:
+                _emit(node[2], ctx, out)
+        else:
+            for item in ctx.get(node[2]) or ():
+                _emit(node[3], {**ctx, node[1]: item}, out)
 
 
 # ---------------------------------------------------------------------------
@@ -189,8 +233,7 @@ def send_email(subject: str, recipient: str, body: str) -> bool:
         from flask_mail import Message
         msg = Message(subject, recipients=[recipient])
         msg.body = body
-        _mail.send(msg)
-        return True
+        return _deliver(msg)
     except Exception as exc:
         print(f"❌ Failed to send email to {recipient}: {exc}")
         return False
@@ -212,13 +255,20 @@ def send_html_email(
         msg.html = html_body
         if text_body:
             msg.body = text_body
-        _mail.send(msg)
-        return True
+        return _deliver(msg)
     except Exception as exc:
         print(f"❌ Failed to send HTML email to {recipient}: {exc}")
         return False
 
 
+def _deliver(msg) -> bool:
+    """Hand *msg* to the background dispatcher, or send inline when it is disabled."""
+    if get_dispatcher() is not None:
+        return enqueue_message(msg) is not None
+    _mail.send(msg)
+    return True
+
+
 def _org_defaults(org: Optional[dict] = None) -> dict:
     if org is None:
         org = {}
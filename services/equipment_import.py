@@ -0,0 +1,177 @@
+"""services/equipment_import.py — Streaming bulk CSV import for equipment.
+
+Rows are read straight off the upload, validated against a header mapping
+resolved once, and written in ``executemany`` batches with a commit per
+batch, so a large inventory neither sits in memory nor holds one giant
+transaction. Existing barcodes are loaded once into a dict.
+"""
+
+import codecs, csv, io
+
+from sqlalchemy import insert, update
+
+from extensions import db
+from models import Equipment
+
+BATCH_SIZE  = 500
+MAX_ERRORS  = 200           # per-row errors returned to the caller
+SNIFF_BYTES = 64 * 1024
+
+# canonical field -> accepted header names (case-insensitive)
+HEADER_ALIASES = {
+    'barcode':        ('barcode',),
+    'name':           ('name',),
+    'quantity_owned': ('quantity_owned', 'quantity', 'qty'),
+    'category':       ('category',),
+    'location':       ('location',),
+    'notes':          ('notes',),
+}
+MAX_LENGTHS = {'barcode': 100, 'name': 200, 'category': 100, 'location': 200}
+
+MODES = ('insert', 'upsert')
+
+
+class CSVImportError(ValueError):
+    """The file as a whole can't be imported (bad header, wrong mode)."""
+
+
+def import_equipment_csv(raw_stream, mode: str = 'insert', dry_run: bool = False,
+                         batch_size: int | None = None) -> dict:
+    """Import equipment from a binary CSV stream.
+
+    *mode* ``insert`` skips barcodes that already exist; ``upsert`` updates
+    them in bulk. With *dry_run* every row is validated and counted but
+    nothing is written. Returns counts plus up to ``MAX_ERRORS`` row errors.
+    """
+    if mode not in MODES:
+        raise CSVImportError(f"mode must be one of {', '.join(MODES)}")
+    batch_size = batch_size or BATCH_SIZE
+
+    reader  = csv.reader(_text_stream(raw_stream))
+    columns = _resolve_header(next(reader, None))
+    existing = dict(db.session.query(Equipment.barcode, Equipment.id))
+
+    stats = {'imported': 0, 'updated': 0, 'skipped': 0, 'error_count': 0,
+             'errors': [], 'dry_run': dry_run, 'mode': mode}
+    seen, inserts, updates = set(), [], []
+
+    def error(row_num, message):
+        stats['error_count'] += 1
+        stats['skipped'] += 1
+        if len(stats['errors']) < MAX_ERRORS:
+            stats['errors'].append({'row': row_num, 'error': message})
+
+    def flush():
+        if not dry_run:
+            _write_batch(inserts, updates, stats, error)
+        else:
+            stats['imported'] += len(inserts)
+            stats['updated']  += len(updates)
+        inserts.clear()
+        updates.clear()
+
+    for row_num, row in enumerate(reader, start=2):
+        if not any(cell.strip() for cell in row):
+            continue
+        values = {field: (row[i].strip() if i < len(row) else '') for field, i in columns.items()}
+        barcode, name = values.get('barcode', ''), values.get('name', '')
+
+        if not barcode or not name:
+            error(row_num, 'barcode and name are required')
+            continue
+        too_long = [f for f, limit in MAX_LENGTHS.items() if len(values.get(f, '')) > limit]
+        if too_long:
+            error(row_num, f"{', '.join(too_long)} too long")
+            continue
+        if barcode in seen:
+            error(row_num, f'duplicate barcode {barcode!r} in file')
+            continue
+        seen.add(barcode)
+
+        record = {
+            'barcode':        barcode,
+            'name':           name,
+            'category':       values.get('category', ''),
+            'location':       values.get('location', ''),
+            'notes':          values.get('notes', ''),
+            'quantity_owned': _quantity(values.get('quantity_owned', '')),
+            '_row':           row_num,
+        }
+
+        if barcode in existing:
+            if mode == 'upsert':
+                # Only overwrite the columns the file actually has
+                updates.append({'id': existing[barcode], '_row': row_num,
+                                **{f: record[f] for f in columns if f != 'barcode'}})
+            else:
+                stats['skipped'] += 1
+        else:
+            inserts.append(record)
+
+        if len(inserts) + len(updates) >= batch_size:
+            flush()
+
+    flush()
+    return stats
+
+
+def _text_stream(raw_stream):
+    """Decode the upload incrementally: UTF-8 (BOM-aware) if the head decodes, else latin-1."""
+    raw_stream = io.BufferedReader(raw_stream) if not hasattr(raw_stream, 'peek') else raw_stream
+    head = raw_stream.peek(SNIFF_BYTES)[:SNIFF_BYTES]
+    try:
+        codecs.getincrementaldecoder('utf-8')().decode(head, final=False)
+        encoding = 'utf-8-sig'
+    except UnicodeDecodeError:
+        encoding = 'latin-1'
+    return io.TextIOWrapper(raw_stream, encoding=encoding, errors='replace', newline='')
+
+
+def _resolve_header(header) -> dict:
+    if not header:
+        raise CSVImportError('CSV file is empty')
+    normalised = [h.strip().lower() for h in header]
+    columns = {}
+    for field, aliases in HEADER_ALIASES.items():
+        for alias in aliases:
+            if alias in normalised:
+                columns[field] = normalised.index(alias)
+                break
+    missing = [f for f in ('barcode', 'name') if f not in columns]
+    if missing:
+        raise CSVImportError(f"CSV header is missing: {', '.join(missing)}")
+    return columns
+
+
+def _quantity(raw: str) -> int:
+    try:
+        return max(1, int(raw)) if raw else 1
+    except ValueError:
+        return 1
+
+
+def _write_batch(inserts, updates, stats, error) -> None:
+    """One executemany per kind, one commit. A failing batch is retried row by row."""
+    strip = lambda rows: [{k: v for k, v in r.items() if k != '_row'} for r in rows]
+    try:
+        if inserts:
+            db.session.execute(insert(Equipment), strip(inserts))
+        if updates:
+            db.session.execute(update(Equipment), strip(updates))
+        db.session.commit()
+        stats['imported'] += len(inserts)
+        stats['updated']  += len(updates)
+        return
+    except Exception:
+        db.session.rollback()
+
+    for kind, rows in (('imported', inserts), ('updated', updates)):
+        stmt = insert(Equipment) if kind == 'imported' else update(Equipment)
+        for r in rows:
+            try:
+                db.session.execute(stmt, strip([r]))
+                db.session.commit()
+                stats[kind] += 1
+            except Exception as exc:
+                db.session.rollback()
+                error(r['_row'], str(getattr(exc, 'orig', exc)))
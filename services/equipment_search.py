@@ -0,0 +1,153 @@
+"""services/equipment_search.py — Paginated, indexed equipment search.
+
+On SQLite the inventory is mirrored into an FTS5 table (kept in sync by
+triggers) so free-text search is an index lookup rather than a scan of every
+row. Other engines — or SQLite builds without FTS5 — fall back to
+case-insensitive LIKE matching over the same columns.
+"""
+
+import re, threading, weakref
+
+from sqlalchemy import func, literal_column, or_, table, column, text
+
+from extensions import db
+from models import Equipment
+
+DEFAULT_PER_PAGE = 25
+MAX_PER_PAGE     = 200
+SORT_COLUMNS     = {
+    'name':           Equipment.name,
+    'barcode':        Equipment.barcode,
+    'quantity_owned': Equipment.quantity_owned,
+    'category':       Equipment.category,
+    'location':       Equipment.location,
+}
+
+_FTS_DDL = [
+    "CREATE VIRTUAL TABLE IF NOT EXISTS equipment_fts USING fts5("
+    "name, barcode, category, location, content='equipment', content_rowid='id')",
+    "CREATE TRIGGER IF NOT EXISTS equipment_fts_ai AFTER INSERT ON equipment BEGIN "
+    "INSERT INTO equipment_fts(rowid, name, barcode, category, location) "
+    "VALUES (new.id, new.name, new.barcode, new.category, new.location); END",
+    "CREATE TRIGGER IF NOT EXISTS equipment_fts_ad AFTER DELETE ON equipment BEGIN "
+    "INSERT INTO equipment_fts(equipment_fts, rowid, name, barcode, category, location) "
+    "VALUES ('delete', old.id, old.name, old.barcode, old.category, old.location); END",
+    "CREATE TRIGGER IF NOT EXISTS equipment_fts_au AFTER UPDATE ON equipment BEGIN "
+    "INSERT INTO equipment_fts(equipment_fts, rowid, name, barcode, category, location) "
+    "VALUES ('delete', old.id, old.name, old.barcode, old.category, old.location); "
+    "INSERT INTO equipment_fts(rowid, name, barcode, category, location) "
+    "VALUES (new.id, new.name, new.barcode, new.category, new.location); END",
+]
+
+_fts = table('equipment_fts', column('rowid'), column('rank'))
+
+# engine -> bool (FTS5 index available)
+_fts_ready = weakref.WeakKeyDictionary()
+_fts_lock  = threading.Lock()
+
+
+def ensure_search_index(engine=None) -> bool:
+    """Create and backfill the FTS5 index if this is SQLite. Returns True when usable."""
+    engine = engine or db.engine
+    with _fts_lock:
+        if engine in _fts_ready:
+            return _fts_ready[engine]
+        ready = False
+        if engine.dialect.name == 'sqlite':
+            try:
+                with engine.begin() as conn:
+                    existed = conn.execute(text(
+                        "SELECT 1 FROM sqlite_master WHERE type='table' AND name='equipment_fts'"
+                    )).first() is not None
+                    for ddl in _FTS_DDL:
+                        conn.execute(text(ddl))
+                    if not existed:
+                        conn.execute(text("INSERT INTO equipment_fts(equipment_fts) VALUES ('rebuild')"))
+                ready = True
+            except Exception as exc:
+                if 'fts5' not in str(exc).lower():
+                    return False      # e.g. tables not created yet — try again next time
+                print(f"⚠️  SQLite has no FTS5, equipment search falls back to LIKE: {exc}")
+        _fts_ready[engine] = ready
+        return ready
+
+
+def search_equipment(q: str = '', category: str | None = None, location: str | None = None,
+                     sort: str | None = None, descending: bool = False,
+                     page: int = 1, per_page: int = DEFAULT_PER_PAGE) -> dict:
+    """One page of equipment matching *q* (prefix match per word) and the exact filters.
+
+    Without an explicit *sort*, text searches are ordered by relevance and
+    everything else by name.
+    """
+    per_page = max(1, min(per_page, MAX_PER_PAGE))
+    page     = max(1, page)
+
+    query, ranked = _filtered(q, category, location)
+    total = query.order_by(None).with_entities(func.count(Equipment.id)).scalar()
+
+    sort_col = SORT_COLUMNS.get(sort)
+    if sort_col is not None:
+        query = query.order_by(sort_col.desc() if descending else sort_col.asc(), Equipment.id)
+    elif ranked:
+        query = query.order_by(_fts.c.rank, Equipment.name, Equipment.id)
+    else:
+        query = query.order_by(Equipment.name, Equipment.id)
+
+    items = query.offset((page - 1) * per_page).limit(per_page).all()
+    return {
+        'items':    [e.to_dict() for e in items],
+        'total':    total,
+        'page':     page,
+        'per_page': per_page,
+        'pages':    (total + per_page - 1) // per_page,
+        'has_more': page * per_page < total,
+    }
+
+
+def search_equipment_ids(q: str = '', category: str | None = None,
+                         location: str | None = None) -> list[int]:
+    """Every matching id — used to "select all" without loading the rows."""
+    query, _ = _filtered(q, category, location)
+    return [row[0] for row in query.with_entities(Equipment.id).order_by(Equipment.id)]
+
+
+def equipment_facets() -> dict:
+    """Distinct categories/locations plus item and unit totals, for filters and stats."""
+    total_items, total_units = db.session.query(
+        func.count(Equipment.id), func.coalesce(func.sum(func.coalesce(Equipment.quantity_owned, 1)), 0)
+    ).one()
+    categories = [c for (c,) in db.session.query(Equipment.category).distinct()
+                  .filter(Equipment.category.isnot(None), Equipment.category != '')
+                  .order_by(Equipment.category)]
+    locations  = [l for (l,) in db.session.query(Equipment.location).distinct()
+                  .filter(Equipment.location.isnot(None), Equipment.location != '')
+                  .order_by(Equipment.location)]
+    return {'total_items': total_items, 'total_units': total_units,
+            'categories': categories, 'locations': locations}
+
+
+def _filtered(q, category, location):
+    """Base query with filters applied; second value says whether FTS ranking is joined in."""
+    query  = Equipment.query
+    terms  = re.findall(r'\w+', q or '')
+    ranked = False
+
+    if terms and ensure_search_index():
+        match = ' AND '.join(f'"{t}"*' for t in terms)
+        query = (query.join(_fts, _fts.c.rowid == Equipment.id)
+                 .filter(literal_column('equipment_fts').op('MATCH')(match)))
+        ranked = True
+    else:
+        for term in terms:
+            like = f'%{term}%'
+            query = query.filter(or_(
+                Equipment.name.ilike(like), Equipment.barcode.ilike(like),
+                Equipment.category.ilike(like), Equipment.location.ilike(like),
+            ))
+
+    if category:
+        query = query.filter(Equipment.category == category)
+    if location:
+        query = query.filter(Equipment.location == location)
+    return query, ranked
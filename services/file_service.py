@@ -1,76 +1,114 @@
 """services/file_service.py — File uploads and barcode PDF generation."""
 import io
-import os
 import tempfile
 from datetime import datetime
 
 from constants import BARCODE_SIZES
 
+QUIET_MODULES = 10               # Code128 quiet zone each side, in bar modules
+STREAM_CHUNK  = 64 * 1024
+SPOOL_LIMIT   = 8 * 1024 * 1024  # larger sheets are spooled to disk while streaming
+
 
 def generate_barcode_pdf(equipment_items, barcode_size: str = 'medium'):
     """Generate a PDF of barcodes for *equipment_items*. Returns (BytesIO, filename)."""
+    pdf_buffer = io.BytesIO()
+    _render_barcode_sheet(pdf_buffer, equipment_items, barcode_size)
+    pdf_buffer.seek(0)
+    return pdf_buffer, _barcode_filename()
+
+
+def iter_barcode_pdf(equipment_items, barcode_size: str = 'medium'):
+    """Same sheet as :func:`generate_barcode_pdf`, for very large selections.
+
+    *equipment_items* can be any iterable (e.g. a ``yield_per`` query). Each
+    page is finished and compressed as soon as it fills, the document is
+    spooled to disk past ``SPOOL_LIMIT``, and the result is yielded in
+    ``STREAM_CHUNK`` pieces for a streamed response.
+    """
+    with tempfile.SpooledTemporaryFile(max_size=SPOOL_LIMIT) as spool:
+        _render_barcode_sheet(spool, equipment_items, barcode_size)
+        spool.seek(0)
+        while True:
+            chunk = spool.read(STREAM_CHUNK)
+            if not chunk:
+                break
+            yield chunk
+
+
+def _barcode_filename() -> str:
+    return f"equipment_barcodes_{datetime.now().strftime('%Y%m%d_%H%M%S')}.pdf"
+
+
+def _render_barcode_sheet(out, equipment_items, barcode_size: str) -> int:
+    """Lay out vector Code128 labels on A4 pages written to *out*. Returns the label count."""
     from reportlab.lib.pagesizes import A4
     from reportlab.lib.units import mm
     from reportlab.pdfgen import canvas
-    from barcode import Code128
-    from barcode.writer import ImageWriter
 
-    barcode_width_mm, barcode_height_mm, font_size = BARCODE_SIZES.get(barcode_size, BARCODE_SIZES['medium'])
-    barcode_width = barcode_width_mm * mm
-    barcode_height = barcode_height_mm * mm
+    label_w_mm, label_h_mm, font_size = BARCODE_SIZES.get(barcode_size, BARCODE_SIZES['medium'])
+    label_w = label_w_mm * mm
+    label_h = label_h_mm * mm
 
-    pdf_buffer = io.BytesIO()
-    c = canvas.Canvas(pdf_buffer, pagesize=A4)
+    c = canvas.Canvas(out, pagesize=A4, pageCompression=1)
     page_width, page_height = A4
 
-    margin = 10 * mm
-    x_spacing = barcode_width + 5 * mm
-    y_spacing = barcode_height + 5 * mm
-    cols = int((page_width - 2 * margin) / x_spacing)
-
-    x_start = margin
-    y_start = page_height - margin - barcode_height
-    current_x, current_y = x_start, y_start
-    item_count = 0
+    margin    = 10 * mm
+    x_spacing = label_w + 5 * mm
+    y_spacing = label_h + 5 * mm
+    cols = max(1, int((page_width - 2 * margin + 5 * mm) / x_spacing))
+    rows = max(1, int((page_height - 2 * margin + 5 * mm) / y_spacing))
 
+    count = 0
     for item in equipment_items:
         if not item.barcode:
             continue
+        col, row = count % cols, (count // cols) % rows
+        if count and col == 0 and row == 0:
+            c.showPage()
         try:
-            code128 = Code128(item.barcode, writer=ImageWriter())
-            with tempfile.NamedTemporaryFile(delete=False, suffix='.png') as tmp_file:
-                barcode_path = tmp_file.name[:-4]
-                code128.save(barcode_path)
-                image_path = barcode_path + '.png'
-
-            c.drawImage(image_path, current_x, current_y,
-                        width=barcode_width, height=barcode_height - 20 * mm, preserveAspectRatio=True, mask='auto')
-
-            c.setFont('Helvetica-Bold', font_size)
-            text_w = c.stringWidth(item.name, 'Helvetica-Bold', font_size)
-            c.drawString(current_x + (barcode_width - text_w) / 2, current_y + barcode_height - 15 * mm, item.name)
-
-            c.setFont('Helvetica', font_size - 2)
-            num_w = c.stringWidth(item.barcode, 'Helvetica', font_size - 2)
-            c.drawString(current_x + (barcode_width - num_w) / 2, current_y - 5 * mm, item.barcode)
-
-            try:
-                os.remove(image_path)
-            except Exception:
-                pass
+            _draw_label(c, item, margin + col * x_spacing,
+                        page_height - margin - label_h - row * y_spacing,
+                        label_w, label_h, font_size)
         except Exception as e:
             print(f"❌ Error drawing barcode for item {item.id}: {e}")
-
-        item_count += 1
-        current_x += x_spacing
-        if item_count % cols == 0:
-            current_x = x_start
-            current_y -= y_spacing
-            if current_y < margin:
-                c.showPage()
-                current_y = y_start
+        count += 1
 
     c.save()
-    pdf_buffer.seek(0)
-    filename = f"equipment_barcodes_{datetime.now().strftime('%Y%m%d_%H%M%S')}.pdf"
-    return pdf_buffer, filename
+    return count
+
+
+def _draw_label(c, item, x: float, y: float, w: float, h: float, font_size: int) -> None:
+    """Name on top, Code128 bars scaled to the label width, barcode text underneath."""
+    from reportlab.graphics.barcode.code128 import Code128
+    from reportlab.lib.units import mm
+
+    pad       = 1.5 * mm
+    name_size = font_size
+    num_size  = max(5, font_size - 2)
+    name_h    = name_size * 1.25
+    num_h     = num_size * 1.25
+    bars_h    = max(4 * mm, h - name_h - num_h - 2 * pad)
+
+    name = _fit_text(c, item.name or '', 'Helvetica-Bold', name_size, w - 2 * pad)
+    c.setFont('Helvetica-Bold', name_size)
+    c.drawCentredString(x + w / 2, y + h - pad - name_size, name)
+
+    # Code128 width is linear in barWidth: measure at 1pt, then scale to fit
+    modules   = Code128(item.barcode, barWidth=1, barHeight=bars_h, quiet=False).width
+    bar_width = (w - 2 * pad) / (modules + 2 * QUIET_MODULES)
+    bars = Code128(item.barcode, barWidth=bar_width, barHeight=bars_h,
+                   quiet=False, humanReadable=False)
+    bars.drawOn(c, x + (w - bars.width) / 2, y + pad + num_h)
+
+    c.setFont('Helvetica', num_size)
+    c.drawCentredString(x + w / 2, y + pad + num_size * 0.25,
+                        _fit_text(c, item.barcode, 'Helvetica', num_size, w - 2 * pad))
+
+
+def _fit_text(c, text: str, font: str, size: float, width: float) -> str:
+    if c.stringWidth(text, font, size) <= width:
+        return text
+    while text and c.stringWidth(text + '…', font, size) > width:
+        text = text[:-1]
+    return text + '…'
@@ -0,0 +1,244 @@
+"""services/ics_service.py — Streamed, versioned ICS feeds (shared and per-user).
+
+In the shared feed a recurring series is one VEVENT with an RRULE, and each
+occurrence that has its own row (services.recurrence) is an override of it
+(same UID plus RECURRENCE-ID), so the feed grows with what was actually
+scheduled rather than with series length. Per-user feeds list the
+occurrences the user is crewing as plain events.
+"""
+
+import hashlib, threading
+from datetime import datetime, timedelta
+
+from sqlalchemy import func, select
+from sqlalchemy.orm import joinedload, selectinload
+
+from extensions import db
+from constants import RECURRENCE_PATTERNS
+from models import Event, CrewAssignment, EventSchedule, Shift, ShiftAssignment
+from services.recurrence import exdates, rrule
+
+TZID            = 'Australia/Sydney'
+FETCH_BATCH     = 200     # events pulled from the DB per round trip while streaming
+BODY_CACHE_SIZE = 64      # rendered feeds kept per process
+SHIFT_STATUSES  = ('pending', 'accepted', 'confirmed')
+
+_VTIMEZONE = (
+    "BEGIN:VTIMEZONE\r\nTZID:Australia/Sydney\r\n"
+    "BEGIN:STANDARD\r\nDTSTART:20240407T030000\r\nTZOFFSETFROM:+1100\r\n"
+    "TZOFFSETTO:+1000\r\nTZNAME:AEST\r\nEND:STANDARD\r\n"
+    "BEGIN:DAYLIGHT\r\nDTSTART:20241006T020000\r\nTZOFFSETFROM:+1000\r\n"
+    "TZOFFSETTO:+1100\r\nTZNAME:AEDT\r\nEND:DAYLIGHT\r\nEND:VTIMEZONE\r\n"
+)
+
+# feed key -> (etag, body)
+_bodies: dict = {}
+_bodies_lock = threading.Lock()
+
+
+def feed_version(user=None) -> tuple[str, datetime | None]:
+    """Return ``(etag, last_modified)`` for the shared feed, or *user*'s feed.
+
+    One aggregate query: row counts and max ids catch inserts and deletes,
+    the latest timestamps catch edits. Per-user feeds also fold in the
+    user's shift assignments and the shifts they point at.
+    """
+    def scalar(expr, *where):
+        return select(expr).where(*where).scalar_subquery()
+
+    columns = [
+        scalar(func.count(Event.id)),
+        scalar(func.max(func.coalesce(Event.updated_at, Event.created_at))),
+        scalar(func.count(EventSchedule.id)),
+        scalar(func.max(EventSchedule.id)),
+        scalar(func.max(EventSchedule.created_at)),
+        scalar(func.count(CrewAssignment.id)),
+        scalar(func.max(CrewAssignment.id)),
+        scalar(func.max(CrewAssignment.assigned_at)),
+    ]
+    if user is not None:
+        mine = ShiftAssignment.user_id == user.id
+        columns += [
+            scalar(func.count(ShiftAssignment.id), mine),
+            scalar(func.max(ShiftAssignment.id), mine),
+            scalar(func.max(ShiftAssignment.updated_at), mine),
+            scalar(func.max(Shift.updated_at),
+                   Shift.id.in_(select(ShiftAssignment.shift_id).where(mine))),
+        ]
+    row = tuple(db.session.execute(select(*columns)).one())
+
+    key    = repr((user.username if user is not None else None,) + row)
+    etag   = hashlib.sha1(key.encode()).hexdigest()
+    stamps = [v for v in row if isinstance(v, datetime)]
+    last_modified = max(stamps).replace(microsecond=0) if stamps else None
+    return etag, last_modified
+
+
+def iter_feed(user=None, etag: str | None = None, last_modified: datetime | None = None):
+    """Yield the feed in chunks, serving and refreshing a per-process body cache.
+
+    A body rendered for *etag* is replayed as-is; otherwise the feed is
+    generated incrementally and remembered once fully sent.
+    """
+    cache_key = user.id if user is not None else None
+    if etag is not None:
+        with _bodies_lock:
+            hit = _bodies.get(cache_key)
+        if hit and hit[0] == etag:
+            yield hit[1]
+            return
+
+    parts = []
+    for chunk in _generate(user, last_modified or datetime.utcnow()):
+        parts.append(chunk)
+        yield chunk
+
+    if etag is not None:
+        with _bodies_lock:
+            _bodies.pop(cache_key, None)
+            _bodies[cache_key] = (etag, ''.join(parts))
+            while len(_bodies) > BODY_CACHE_SIZE:
+                _bodies.pop(next(iter(_bodies)))
+
+
+def clear_feed_cache() -> None:
+    with _bodies_lock:
+        _bodies.clear()
+
+
+# ---------------------------------------------------------------------------
+# Rendering
+# ---------------------------------------------------------------------------
+
+def _esc(text) -> str:
+    return (str(text or '').replace('\\', '\\\\').replace('\n', '\\n')
+            .replace(',', '\\,').replace(';', '\\;'))
+
+
+def _fmt(dt: datetime) -> str:
+    return dt.strftime('%Y%m%dT%H%M%S')
+
+
+def _vevent(uid, dtstamp, start, end, summary, description=None, location=None,
+            status='CONFIRMED', extra=()) -> str:
+    lines = [
+        "BEGIN:VEVENT",
+        f"UID:{uid}",
+        f"DTSTAMP:{dtstamp}",
+        f"DTSTART;TZID={TZID}:{_fmt(start)}",
+        f"DTEND;TZID={TZID}:{_fmt(end)}",
+        *extra,
+        f"SUMMARY:{summary}",
+    ]
+    if description:
+        lines.append(f"DESCRIPTION:{description}")
+    if location:
+        lines.append(f"LOCATION:{_esc(location)}")
+    lines += [f"STATUS:{status}", "END:VEVENT"]
+    return '\r\n'.join(lines) + '\r\n'
+
+
+def _rule_lines(series) -> list:
+    lines = [f"RRULE:{rrule(series)}"]
+    cancelled = sorted(exdates(series))
+    if cancelled:
+        lines.append(f"EXDATE;TZID={TZID}:" + ','.join(_fmt(d) for d in cancelled))
+    return lines
+
+
+def _event_chunk(event, dtstamp: str, series_ids=frozenset()) -> str:
+    """VEVENTs for *event* and its schedule.
+
+    Ids in *series_ids* are emitted as rules; rows materialised from one of
+    them become overrides of that rule's occurrence.
+    """
+    schedules = sorted(event.schedules, key=lambda s: s.scheduled_time)
+
+    desc_parts = [_esc(event.description)] if event.description else []
+    if schedules:
+        desc_parts.append("\\n\\n--- SCHEDULE ---")
+        for s in schedules:
+            desc_parts.append(f"\\n• {s.scheduled_time.strftime('%I:%M %p')} - {_esc(s.title)}")
+    if event.crew_assignments:
+        desc_parts.append("\\n\\n--- CREW ---")
+        for a in event.crew_assignments:
+            desc_parts.append(f"\\n• {_esc(a.crew_member)}" + (f" ({_esc(a.role)})" if a.role else ""))
+
+    end = event.event_end_date or event.event_date + timedelta(hours=3)
+    uid = f"{event.id}-showwise@localhost"
+    if event.id in series_ids:
+        chunk = _vevent(uid, dtstamp, event.event_date, end, _esc(event.title),
+                        _esc(event.description), event.location, extra=_rule_lines(event))
+        if schedules or event.crew_assignments:
+            # Crew and schedule belong to the first occurrence only
+            chunk += _vevent(uid, dtstamp, event.event_date, end, _esc(event.title),
+                             ''.join(desc_parts), event.location,
+                             extra=[f"RECURRENCE-ID;TZID={TZID}:{_fmt(event.event_date)}"])
+    elif event.recurrence_id is not None and event.recurring_event_id in series_ids:
+        chunk = _vevent(f"{event.recurring_event_id}-showwise@localhost", dtstamp,
+                        event.event_date, end, _esc(event.title), ''.join(desc_parts), event.location,
+                        extra=[f"RECURRENCE-ID;TZID={TZID}:{_fmt(event.recurrence_id)}"])
+    else:
+        chunk = _vevent(uid, dtstamp, event.event_date, end, _esc(event.title),
+                        ''.join(desc_parts), event.location)
+    for s in schedules:
+        chunk += _vevent(
+            f"{event.id}-schedule-{s.id}@localhost", dtstamp,
+            s.scheduled_time, s.scheduled_time + timedelta(minutes=30),
+            f"{_esc(event.title)} - {_esc(s.title)}", _esc(s.description),
+        )
+    return chunk
+
+
+def _shift_chunk(shift, status: str, dtstamp: str) -> str:
+    title = f"{_esc(shift.event.title)} - {_esc(shift.title)}"
+    if shift.role:
+        title += f" ({_esc(shift.role)})"
+    return _vevent(
+        f"shift-{shift.id}-showwise@localhost", dtstamp,
+        shift.shift_date, shift.shift_end_date, title, _esc(shift.description),
+        shift.location or shift.event.location,
+        status='TENTATIVE' if status == 'pending' else 'CONFIRMED',
+    )
+
+
+def _generate(user, stamp: datetime):
+    dtstamp = stamp.strftime('%Y%m%dT%H%M%SZ')
+    name    = f"ShowWise - {user.username}" if user is not None else "ShowWise sync"
+    yield (
+        "BEGIN:VCALENDAR\r\nVERSION:2.0\r\nPRODID:-//ShowWise//EN\r\n"
+        "CALSCALE:GREGORIAN\r\nMETHOD:PUBLISH\r\n"
+        f"X-WR-CALNAME:{_esc(name)}\r\nX-WR-TIMEZONE:{TZID}\r\n"
+        "REFRESH-INTERVAL;VALUE=DURATION:PT1H\r\n" + _VTIMEZONE
+    )
+
+    events = (
+        Event.query
+        .options(selectinload(Event.crew_assignments), selectinload(Event.schedules))
+        .order_by(Event.event_date, Event.id)
+    )
+    series_ids = frozenset()
+    if user is not None:
+        events = events.filter(Event.id.in_(
+            select(CrewAssignment.event_id)
+            .where(func.lower(CrewAssignment.crew_member) == user.username.lower())
+        ))
+    else:
+        series_ids = frozenset(db.session.scalars(
+            select(Event.id).where(Event.recurrence_pattern.in_(RECURRENCE_PATTERNS))))
+    for event in events.yield_per(FETCH_BATCH):
+        yield _event_chunk(event, dtstamp, series_ids)
+
+    if user is not None:
+        shifts = (
+            db.session.query(Shift, ShiftAssignment.status)
+            .join(ShiftAssignment, ShiftAssignment.shift_id == Shift.id)
+            .filter(ShiftAssignment.user_id == user.id,
+                    ShiftAssignment.status.in_(SHIFT_STATUSES))
+            .options(joinedload(Shift.event))
+            .order_by(Shift.shift_date, Shift.id)
+        )
+        for shift, status in shifts.yield_per(FETCH_BATCH):
+            yield _shift_chunk(shift, status, dtstamp)
+
+    yield "END:VCALENDAR\r\n"
@@ -0,0 +1,330 @@
+"""services/mail_queue.py — Background outbound mail dispatcher.
+
+Request handlers only build the message and enqueue it. A daemon thread per
+process drains a bounded queue in batches, sending each batch over a single
+SMTP connection (``mail.connect()``), so assigning a whole crew costs one
+handshake rather than one per person. Transient SMTP failures are retried
+with exponential backoff; every message has a status record and a metrics
+hook reports queue depth and send latency.
+"""
+
+import atexit, heapq, itertools, os, queue, smtplib, threading, time, uuid
+from collections import OrderedDict
+
+STATUS_HISTORY = 500       # per-message status records kept per process
+LINGER_SECONDS = 0.05      # wait this long for more messages before sending a batch
+
+_dispatcher = None
+_metrics_hook = None
+
+
+class _Outgoing:
+    __slots__ = ('id', 'msg', 'queued_at', 'attempts')
+
+    def __init__(self, msg):
+        self.id        = uuid.uuid4().hex
+        self.msg       = msg
+        self.queued_at = time.monotonic()
+        self.attempts  = 0
+
+
+class MailDispatcher:
+    """Bounded queue plus one sender thread, started on first use in each process."""
+
+    def __init__(self, app, mail, maxsize: int = 1000, batch_size: int = 50,
+                 max_retries: int = 4, backoff: float = 2.0, enqueue_timeout: float = 2.0):
+        self.app             = app
+        self.mail            = mail
+        self.batch_size      = max(1, batch_size)
+        self.max_retries     = max_retries
+        self.backoff         = backoff
+        self.enqueue_timeout = enqueue_timeout
+
+        self._queue    = queue.Queue(maxsize=maxsize)
+        self._retry    = []                    # heap of (due, seq, _Outgoing)
+        self._seq      = itertools.count()
+        self._status   = OrderedDict()         # id -> status dict
+        self._counters = {'sent': 0, 'failed': 0, 'retried': 0, 'dropped': 0, 'batches': 0}
+        self._latency  = []                    # recent send latencies (seconds)
+        self._lock     = threading.Lock()
+        self._busy     = 0
+        self._stopping = threading.Event()
+        self._thread   = None
+        self._pid      = None
+
+    # -- producer side -----------------------------------------------------
+
+    def enqueue(self, msg) -> str | None:
+        """Queue *msg* for delivery. Returns its id, or None if the queue stayed full."""
+        item = _Outgoing(msg)
+        self._set_status(item, 'queued')
+        self._ensure_worker()
+        try:
+            self._queue.put(item, timeout=self.enqueue_timeout)
+        except queue.Full:
+            self._set_status(item, 'failed', error='mail queue full')
+            self._count('dropped')
+            print(f"⚠️  Mail queue full – dropped: {getattr(msg, 'subject', '')}")
+            return None
+        _emit('mail.queue_depth', self.depth())
+        return item.id
+
+    def status(self, message_id: str) -> dict | None:
+        with self._lock:
+            record = self._status.get(message_id)
+            return dict(record) if record else None
+
+    def recent(self, limit: int = 50) -> list[dict]:
+        with self._lock:
+            return [dict(r) for r in list(self._status.values())[-limit:]][::-1]
+
+    def depth(self) -> int:
+        with self._lock:
+            return self._queue.qsize() + len(self._retry)
+
+    def stats(self) -> dict:
+        with self._lock:
+            lat = sorted(self._latency)
+            return {
+                **self._counters,
+                'queue_depth':    self._queue.qsize() + len(self._retry),
+                'retry_pending':  len(self._retry),
+                'in_flight':      self._busy,
+                'avg_latency_ms': round(1000 * sum(lat) / len(lat), 1) if lat else None,
+                'p95_latency_ms': round(1000 * lat[int(0.95 * (len(lat) - 1))], 1) if lat else None,
+                'worker_alive':   bool(self._thread and self._thread.is_alive()),
+            }
+
+    def flush(self, timeout: float = 10.0, include_retries: bool = True) -> bool:
+        """Block until everything queued has been handled. Returns False on timeout."""
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            with self._lock:
+                idle = (self._queue.unfinished_tasks == 0 and not self._busy
+                        and (not include_retries or not self._retry))
+            if idle:
+                return True
+            time.sleep(0.01)
+        return False
+
+    def shutdown(self, timeout: float = 5.0) -> None:
+        """Send what is already queued (retries excluded), then stop the worker."""
+        if not self._thread or not self._thread.is_alive():
+            return
+        self.flush(timeout, include_retries=False)
+        self._stopping.set()
+        self._thread.join(timeout=1.0)
+
+    # -- worker side -------------------------------------------------------
+
+    def _ensure_worker(self) -> None:
+        with self._lock:
+            # A worker started before a fork doesn't exist in the child
+            if self._thread and self._thread.is_alive() and self._pid == os.getpid():
+                return
+            self._pid = os.getpid()
+            self._stopping.clear()
+            self._thread = threading.Thread(target=self._run, name='mail-dispatcher', daemon=True)
+            self._thread.start()
+
+    def _run(self) -> None:
+        while not self._stopping.is_set():
+            batch = self._next_batch()
+            if not batch:
+                continue
+            try:
+                with self.app.app_context():
+                    self._send_batch(batch)
+            except Exception as exc:             # never let the worker die
+                print(f"❌ Mail dispatcher error: {exc}")
+                for item in batch:
+                    self._failed(item, exc)
+            finally:
+                with self._lock:
+                    self._busy -= len(batch)
+                _emit('mail.queue_depth', self.depth())
+
+    def _next_batch(self) -> list:
+        """Due retries first, then up to ``batch_size`` queued messages."""
+        batch, now = [], time.monotonic()
+        with self._lock:
+            while self._retry and self._retry[0][0] <= now and len(batch) < self.batch_size:
+                batch.append(heapq.heappop(self._retry)[2])
+            wait = (self._retry[0][0] - now) if self._retry else 0.5
+            self._busy += len(batch)
+
+        timeout = 0 if batch else max(0.01, min(wait, 0.5))
+        deadline = time.monotonic() + LINGER_SECONDS
+        while len(batch) < self.batch_size:
+            try:
+                item = self._queue.get(timeout=timeout)
+            except queue.Empty:
+                break
+            with self._lock:
+                self._busy += 1
+            self._queue.task_done()
+            batch.append(item)
+            timeout = max(0.0, deadline - time.monotonic())
+        return batch
+
+    def _send_batch(self, batch: list) -> None:
+        """Send *batch* over as few connections as possible.
+
+        A dropped connection re-queues the rest of the batch for a fresh
+        connection without charging them an attempt.
+        """
+        with self._lock:
+            self._counters['batches'] += 1
+        pending = list(batch)
+        while pending:
+            try:
+                conn_cm = self.mail.connect()
+                conn = conn_cm.__enter__()
+            except Exception as exc:
+                # A refused or timed-out connection counts as an attempt, so an
+                # outage backs off and ends in 'failed' after max_retries
+                for item in pending:
+                    item.attempts += 1
+                    self._failed(item, exc)
+                return
+
+            reconnect = False
+            try:
+                while pending:
+                    item = pending[0]
+                    self._set_status(item, 'sending')
+                    try:
+                        item.attempts += 1
+                        conn.send(item.msg)
+                    except Exception as exc:
+                        pending.pop(0)
+                        self._failed(item, exc)
+                        if _connection_lost(exc):
+                            reconnect = True
+                            break
+                        continue
+                    pending.pop(0)
+                    self._sent(item)
+            finally:
+                try:
+                    conn_cm.__exit__(None, None, None)
+                except Exception:
+                    pass
+            if not reconnect:
+                return
+
+    def _sent(self, item) -> None:
+        latency = time.monotonic() - item.queued_at
+        with self._lock:
+            self._counters['sent'] += 1
+            self._latency.append(latency)
+            del self._latency[:-STATUS_HISTORY]
+        self._set_status(item, 'sent')
+        _emit('mail.send_latency', latency)
+
+    def _failed(self, item, exc) -> None:
+        error = str(exc) or exc.__class__.__name__
+        if _is_transient(exc) and item.attempts < self.max_retries:
+            delay = self.backoff * (2 ** max(0, item.attempts - 1))
+            with self._lock:
+                heapq.heappush(self._retry, (time.monotonic() + delay, next(self._seq), item))
+                self._counters['retried'] += 1
+            self._set_status(item, 'retrying', error=error)
+            return
+        self._count('failed')
+        self._set_status(item, 'failed', error=error)
+        _emit('mail.failed', 1)
+        print(f"❌ Failed to send email to {', '.join(getattr(item.msg, 'recipients', []) or [])}: {error}")
+
+    def _count(self, name: str) -> None:
+        with self._lock:
+            self._counters[name] += 1
+
+    def _set_status(self, item, status: str, error: str | None = None) -> None:
+        with self._lock:
+            record = self._status.pop(item.id, None) or {
+                'id':         item.id,
+                'subject':    getattr(item.msg, 'subject', ''),
+                'recipients': list(getattr(item.msg, 'recipients', []) or []),
+            }
+            record.update(status=status, attempts=item.attempts, error=error,
+                          updated_at=time.time())
+            self._status[item.id] = record
+            while len(self._status) > STATUS_HISTORY:
+                self._status.popitem(last=False)
+
+
+def _connection_lost(exc) -> bool:
+    return isinstance(exc, (smtplib.SMTPServerDisconnected, ConnectionError, TimeoutError))
+
+
+def _is_transient(exc) -> bool:
+    """Connection problems and 4xx replies are worth retrying; 5xx and bad messages are not."""
+    if isinstance(exc, smtplib.SMTPRecipientsRefused):
+        codes = [code for code, _ in exc.recipients.values()]
+        return bool(codes) and all(400 <= code < 500 for code in codes)
+    if isinstance(exc, smtplib.SMTPResponseException):
+        return 400 <= exc.smtp_code < 500
+    return isinstance(exc, (smtplib.SMTPServerDisconnected, smtplib.SMTPConnectError, OSError))
+
+
+def _emit(metric: str, value: float) -> None:
+    if _metrics_hook is None:
+        return
+    try:
+        _metrics_hook(metric, value)
+    except Exception:
+        pass
+
+
+# ---------------------------------------------------------------------------
+# Module-level API
+# ---------------------------------------------------------------------------
+
+def init_mail_queue(app, mail) -> MailDispatcher | None:
+    """Create the process dispatcher from config, or None when ``MAIL_ASYNC`` is off."""
+    global _dispatcher
+    if _dispatcher is not None:
+        _dispatcher.shutdown()
+    if not app.config.get('MAIL_ASYNC', True):
+        _dispatcher = None
+        return None
+    _dispatcher = MailDispatcher(
+        app, mail,
+        maxsize=app.config.get('MAIL_QUEUE_SIZE', 1000),
+        batch_size=app.config.get('MAIL_BATCH_SIZE', 50),
+        max_retries=app.config.get('MAIL_MAX_RETRIES', 4),
+        backoff=app.config.get('MAIL_RETRY_BACKOFF', 2.0),
+    )
+    return _dispatcher
+
+
+def get_dispatcher() -> MailDispatcher | None:
+    return _dispatcher
+
+
+def enqueue_message(msg) -> str | None:
+    return _dispatcher.enqueue(msg) if _dispatcher else None
+
+
+def message_status(message_id: str) -> dict | None:
+    return _dispatcher.status(message_id) if _dispatcher else None
+
+
+def mail_queue_stats() -> dict:
+    if not _dispatcher:
+        return {'enabled': False}
+    return {'enabled': True, **_dispatcher.stats()}
+
+
+def set_metrics_hook(hook) -> None:
+    """Register ``hook(metric, value)``; called with ``mail.queue_depth``,
+    ``mail.send_latency`` (seconds) and ``mail.failed``."""
+    global _metrics_hook
+    _metrics_hook = hook
+
+
+@atexit.register
+def _drain_on_exit() -> None:
+    if _dispatcher is not None:
+        _dispatcher.shutdown()
@@ -1,10 +1,42 @@
-"""services/notification_service.py — Discord notifications and scheduled reminders."""
+"""services/notification_service.py — Discord notifications and scheduled reminders.
 
-import os, threading, requests
+Reminders are rows in ``event_reminder`` (one per event and kind), written
+when an event is created or its date changes. A single scheduler thread per
+process sleeps until the next reminder is due, then claims it with a
+conditional UPDATE so only one process — of however many gunicorn workers —
+delivers it. Nothing is lost on restart: pending rows are simply picked up
+by the next loop. Occurrences of recurring series that have no Event row
+get theirs in ``occurrence_reminder``, keyed by series and slot, once they
+are about a week out (see :func:`sync_occurrence_reminders`). Posts go
+through the shared webhook dispatcher (services/discord_webhook.py), which
+handles rate limits and batching.
+"""
+
+import os, socket, threading
 from datetime import datetime, timedelta
 
+from sqlalchemy import and_, func, or_, update
+
+from extensions import db
+from services.discord_webhook import get_webhook
+
 DISCORD_WEBHOOK_URL = os.environ.get('DISCORD_WEBHOOK_URL', '')
-notification_tracker: dict = {}
+
+# kind -> (embed colour, title, description)
+REMINDER_KINDS = {
+    '1_week_before': (16776960, "📅 Event in 1 Week: {title}", "Your event is coming up next week!"),
+    '1_day_before':  (16753920, "⏰ Event Tomorrow: {title}",  "Your event is happening tomorrow!"),
+    'event_today':   (16711680, "🎭 EVENT TODAY: {title}",    "Your event is happening RIGHT NOW!"),
+}
+MAX_ATTEMPTS  = 5
+RETRY_DELAY   = timedelta(minutes=2)     # multiplied by the attempt number
+CLAIM_TIMEOUT = timedelta(minutes=5)     # a claim older than this is assumed abandoned
+MAX_SLEEP     = 60                       # seconds; also how soon other workers' new rows are noticed
+POST_TIMEOUT  = 120                      # seconds to wait for the dispatcher's verdict on a reminder
+BACKFILL_EVERY = timedelta(hours=1)      # how often upcoming events are checked for missing reminders
+REMINDER_LEAD  = timedelta(days=7)       # earliest reminder before an event
+
+_scheduler = None
 
 
 def send_discord_event_announcement(event) -> bool:
@@ -22,67 +54,276 @@ def send_discord_event_announcement(event) -> bool:
             ],
             "footer": {"text": f"Event ID: {event.id}"},
         }
-        r = requests.post(DISCORD_WEBHOOK_URL, json={"embeds": [embed]})
-        if r.status_code == 204:
-            notification_tracker.setdefault(event.id, {})['created'] = True
-            print(f"✓ Posted new event to Discord: {event.title}")
-            return True
+        get_webhook(DISCORD_WEBHOOK_URL).post({"embeds": [embed]})
+        print(f"✓ Queued new event for Discord: {event.title}")
+        return True
     except Exception as exc:
         print(f"❌ Discord announcement error: {exc}")
     return False
 
 
+# ---------------------------------------------------------------------------
+# Reminder rows
+# ---------------------------------------------------------------------------
+
+def reminder_due_times(event_date: datetime) -> dict:
+    """When each reminder kind fires for an event starting at *event_date*."""
+    return {
+        '1_week_before': event_date - timedelta(days=7),
+        '1_day_before':  event_date - timedelta(days=1),
+        'event_today':   min(event_date.replace(hour=8, minute=0, second=0, microsecond=0), event_date),
+    }
+
+
 def schedule_event_notifications(event) -> None:
+    """Create or recompute *event*'s reminders. Call after add/edit has committed."""
     if not DISCORD_WEBHOOK_URL:
         return
+    sync_event_reminders(event)
+    db.session.commit()
+    if _scheduler is not None:
+        _scheduler.wake()
+
+
+def sync_event_reminders(event, now: datetime | None = None) -> None:
+    """Bring the event's reminder rows in line with its date (no commit).
+
+    Rows whose due time moved are reset, so a rescheduled event is reminded
+    again for its new date; reminders that would now be in the past are
+    marked ``skipped``.
+    """
+    from models import EventReminder
+    now      = now or datetime.now()
+    existing = {r.kind: r for r in EventReminder.query.filter_by(event_id=event.id)}
+
+    for kind, due_at in reminder_due_times(event.event_date).items():
+        reminder = existing.get(kind)
+        if reminder is None:
+            if due_at > now:
+                db.session.add(EventReminder(event_id=event.id, kind=kind, due_at=due_at))
+            continue
+        if reminder.due_at == due_at:
+            continue
+        reminder.due_at     = due_at
+        reminder.status     = 'pending' if due_at > now else 'skipped'
+        reminder.attempts   = 0
+        reminder.claimed_by = reminder.claimed_at = reminder.sent_at = reminder.last_error = None
+
+
+def backfill_reminders(now: datetime | None = None) -> int:
+    """Create rows for upcoming events that have none (e.g. created before this table).
+
+    Also adds reminders for recurring occurrences that come into range
+    before the next backfill. Returns the number of events backfilled.
+    """
+    from models import Event
+    from services.recurrence import own_slot_cancelled
+    now    = now or datetime.now()
+    events = Event.query.filter(Event.event_date > now, ~Event.reminders.any(), ~own_slot_cancelled()).all()
+    for event in events:
+        sync_event_reminders(event, now)
+    sync_occurrence_reminders(now)
+    db.session.commit()
+    return len(events)
+
+
+def sync_occurrence_reminders(now: datetime | None = None, series_ids=None) -> int:
+    """Add reminder rows for occurrences without an Event row that start soon (no commit).
+
+    Covers occurrences whose week-before reminder is due before the next
+    backfill, of *series_ids* or every series. Nothing is written to the
+    events table. Returns the number of rows added.
+    """
+    from models import OccurrenceReminder
+    from services.recurrence import virtual_occurrences
+    now   = now or datetime.now()
+    occs  = [o for o in virtual_occurrences(now, now + REMINDER_LEAD + BACKFILL_EVERY)
+             if series_ids is None or o.recurring_event_id in series_ids]
+    if not occs:
+        return 0
+    existing = set(db.session.query(OccurrenceReminder.series_id, OccurrenceReminder.slot, OccurrenceReminder.kind)
+                   .filter(OccurrenceReminder.series_id.in_({o.recurring_event_id for o in occs}),
+                           OccurrenceReminder.slot >= now))
+    added = 0
+    for occ in occs:
+        for kind, due_at in reminder_due_times(occ.event_date).items():
+            if due_at > now and (occ.recurring_event_id, occ.event_date, kind) not in existing:
+                db.session.add(OccurrenceReminder(series_id=occ.recurring_event_id, slot=occ.event_date,
+                                                  kind=kind, due_at=due_at))
+                added += 1
+    return added
+
+
+# ---------------------------------------------------------------------------
+# Scheduler loop
+# ---------------------------------------------------------------------------
+
+class ReminderScheduler:
+    """One thread per process that delivers due reminders and sleeps until the next one."""
+
+    def __init__(self, app, max_sleep: float = MAX_SLEEP):
+        self.app       = app
+        self.max_sleep = max_sleep
+        self.worker_id = f"{socket.gethostname()}:{os.getpid()}"
+        self._wake     = threading.Event()
+        self._stop     = threading.Event()
+        self._thread   = None
+
+    def start(self) -> None:
+        self._thread = threading.Thread(target=self._run, name='reminder-scheduler', daemon=True)
+        self._thread.start()
 
-    def _send(event_id, notification_type):
-        try:
-            from flask import current_app
-            # Import inside thread to avoid app-context issues
-            from app import app as _app
-            with _app.app_context():
-                from models import Event, User, CrewAssignment
-                ev = Event.query.get(event_id)
-                if not ev:
-                    return
-                crew_names = [a.crew_member for a in ev.crew_assignments]
-                mentions   = []
-                for name in crew_names:
-                    u = User.query.filter_by(username=name).first()
-                    if u and u.discord_id:
-                        mentions.append(f"<@{u.discord_id}>")
-                if notification_tracker.get(event_id, {}).get(notification_type):
-                    return
-                colour_map = {
-                    '1_week_before': (16776960, f"📅 Event in 1 Week: {ev.title}",   "Your event is coming up next week!"),
-                    '1_day_before':  (16753920, f"⏰ Event Tomorrow: {ev.title}",    "Your event is happening tomorrow!"),
-                    'event_today':   (16711680, f"🎭 EVENT TODAY: {ev.title}",      "Your event is happening RIGHT NOW!"),
-                }
-                colour, title, desc = colour_map[notification_type]
-                embed = {
-                    "title": title, "description": desc, "color": colour,
-                    "fields": [
-                        {"name": "📅 Date & Time", "value": ev.event_date.strftime('%B %d, %Y at %I:%M %p'), "inline": False},
-                        {"name": "📍 Location",    "value": ev.location or "TBD", "inline": False},
-                    ],
-                }
-                content = " ".join(mentions) if mentions else "(no crew members linked to Discord)"
-                r = requests.post(DISCORD_WEBHOOK_URL, json={"content": content, "embeds": [embed]})
-                if r.status_code == 204:
-                    notification_tracker.setdefault(event_id, {})[notification_type] = True
-        except Exception as exc:
-            print(f"❌ Notification error ({notification_type}): {exc}")
-
-    now        = datetime.utcnow()
-    event_time = event.event_date
-    delays = {
-        '1_week_before': (event_time - timedelta(days=7)   - now).total_seconds(),
-        '1_day_before':  (event_time - timedelta(days=1)   - now).total_seconds(),
-        'event_today':   (event_time.replace(hour=8, minute=0, second=0) - now).total_seconds(),
+    def stop(self) -> None:
+        self._stop.set()
+        self._wake.set()
+
+    def wake(self) -> None:
+        """Re-check the next due time now (a reminder was added or moved)."""
+        self._wake.set()
+
+    def _run(self) -> None:
+        next_backfill = datetime.now()
+        while not self._stop.is_set():
+            with self.app.app_context():
+                if datetime.now() >= next_backfill:
+                    try:
+                        backfill_reminders()
+                    except Exception as exc:
+                        db.session.rollback()
+                        print(f"⚠️  Reminder backfill failed: {exc}")
+                    next_backfill = datetime.now() + BACKFILL_EVERY
+                try:
+                    delay = self.run_due()
+                except Exception as exc:
+                    print(f"❌ Reminder scheduler error: {exc}")
+                    delay = self.max_sleep
+                finally:
+                    db.session.remove()
+            self._wake.wait(delay)
+            self._wake.clear()
+
+    def run_due(self, now: datetime | None = None) -> float:
+        """Deliver every reminder due at *now*; return seconds until the next one."""
+        now = now or datetime.now()
+
+        next_due = []
+        for model in _reminder_models():
+            due_ids = [rid for (rid,) in db.session.query(model.id)
+                       .filter(_claimable(now, model)).order_by(model.due_at).limit(100)]
+            for rid in due_ids:
+                if self._claim(rid, now, model):
+                    self._deliver(rid, now, model)
+            next_due.append(db.session.query(func.min(model.due_at))
+                            .filter(model.status == 'pending').scalar())
+
+        next_due = [d for d in next_due if d is not None]
+        if not next_due:
+            return self.max_sleep
+        return max(0.0, min((min(next_due) - datetime.now()).total_seconds(), self.max_sleep))
+
+    def _claim(self, reminder_id: int, now: datetime, model=None) -> bool:
+        """Atomically take ownership; exactly one process sees rowcount 1."""
+        model  = model or _reminder_models()[0]
+        result = db.session.execute(
+            update(model)
+            .where(model.id == reminder_id, _claimable(now, model))
+            .values(status='claimed', claimed_by=self.worker_id, claimed_at=now,
+                    attempts=model.attempts + 1)
+            .execution_options(synchronize_session=False)
+        )
+        db.session.commit()
+        return result.rowcount == 1
+
+    def _deliver(self, reminder_id: int, now: datetime, model=None) -> None:
+        model    = model or _reminder_models()[0]
+        reminder = db.session.get(model, reminder_id, populate_existing=True)
+        event    = _reminded_event(reminder) if reminder else None
+
+        if event is None or event.event_date < now:
+            values = {'status': 'skipped'}
+        else:
+            ok, error = _post_reminder(event, reminder.kind)
+            if ok:
+                values = {'status': 'sent', 'sent_at': now, 'last_error': None}
+            elif reminder.attempts >= MAX_ATTEMPTS:
+                values = {'status': 'failed', 'last_error': error}
+                print(f"❌ Reminder {reminder.kind} for event {event.id} failed: {error}")
+            else:
+                values = {'status': 'pending', 'last_error': error,
+                          'due_at': now + RETRY_DELAY * reminder.attempts}
+
+        # Only the claimant may finish it (the row might have been rescheduled meanwhile)
+        db.session.execute(
+            update(model)
+            .where(model.id == reminder_id, model.status == 'claimed',
+                   model.claimed_by == self.worker_id)
+            .values(**values)
+            .execution_options(synchronize_session=False)
+        )
+        db.session.commit()
+
+
+def _reminder_models() -> tuple:
+    from models import EventReminder, OccurrenceReminder
+    return EventReminder, OccurrenceReminder
+
+
+def _reminded_event(reminder):
+    """The event a reminder row is for; None if it no longer needs this reminder.
+
+    An occurrence that was cancelled, moved or given its own row (which has
+    its own reminders) is not reminded through the series, and a series
+    whose own first occurrence was cancelled is not reminded at all.
+    """
+    from models import EventReminder
+    from services.recurrence import Occurrence, exdates, find_occurrence, is_series, occurrence_ref
+    if isinstance(reminder, EventReminder):
+        event = reminder.event
+        if event is not None and is_series(event) and event.event_date in exdates(event):
+            return None
+        return event
+    occ = find_occurrence(occurrence_ref(reminder.series_id, reminder.slot))
+    return occ if isinstance(occ, Occurrence) else None
+
+
+def _claimable(now: datetime, model=None):
+    model = model or _reminder_models()[0]
+    return or_(
+        and_(model.status == 'pending', model.due_at <= now),
+        and_(model.status == 'claimed', model.claimed_at < now - CLAIM_TIMEOUT),
+    )
+
+
+def _post_reminder(event, kind: str) -> tuple[bool, str | None]:
+    """Post one reminder embed mentioning the event's crew. Returns (ok, error)."""
+    from models import User
+    if not DISCORD_WEBHOOK_URL:
+        return False, 'DISCORD_WEBHOOK_URL not set'
+    names    = {a.crew_member for a in event.crew_assignments}
+    mentions = [f"<@{discord_id}>" for (discord_id,) in db.session.query(User.discord_id)
+                .filter(User.username.in_(names), User.discord_id.isnot(None), User.discord_id != '')
+                ] if names else []
+
+    colour, title, desc = REMINDER_KINDS[kind]
+    embed = {
+        "title": title.format(title=event.title), "description": desc, "color": colour,
+        "fields": [
+            {"name": "📅 Date & Time", "value": event.event_date.strftime('%B %d, %Y at %I:%M %p'), "inline": False},
+            {"name": "📍 Location",    "value": event.location or "TBD", "inline": False},
+        ],
     }
-    for ntype, delay in delays.items():
-        if delay > 0:
-            t = threading.Timer(delay, _send, args=[event.id, ntype])
-            t.daemon = True
-            t.start()
+    content = " ".join(mentions) if mentions else "(no crew members linked to Discord)"
+    # The reminder row keeps its own retry state, so no dead letter here
+    future = get_webhook(DISCORD_WEBHOOK_URL).post({"content": content, "embeds": [embed]},
+                                                   dead_letter=False)
+    try:
+        return future.result(timeout=POST_TIMEOUT)
+    except Exception as exc:
+        return False, str(exc) or 'timed out'
+
+
+def start_reminder_scheduler(app) -> ReminderScheduler:
+    global _scheduler
+    _scheduler = ReminderScheduler(app)
+    _scheduler.start()
+    return _scheduler
@@ -0,0 +1,325 @@
+"""services/qr_tags.py — QR equipment tag sheets.
+
+QR codes are drawn straight onto the reportlab canvas as vector modules (one
+filled path per code), so there are no PNGs, temp files or raster scaling.
+Encoded matrices are cached per ``(base_url, equipment id)``; when a job has
+many codes that aren't cached yet, the encoding — the expensive, pure-Python
+part — is spread across a process pool while the page layout stays on one
+canvas, so the result is a single PDF without any merging.
+"""
+
+import atexit, io, os, threading, time
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+import multiprocessing
+
+CACHE_SIZE         = 20000   # encoded QR matrices kept per process
+PARALLEL_MIN_CODES = 300     # below this many uncached codes, encode inline
+ENCODE_CHUNK       = 100
+
+# (base_url, equipment_id) -> (modules_per_side, runs)
+_cache: OrderedDict = OrderedDict()
+_cache_lock = threading.Lock()
+
+_pool      = None
+_pool_lock = threading.Lock()
+
+
+def tag_url(base_url: str, equipment_id: int) -> str:
+    return f"{base_url}/equipment/{equipment_id}/view"
+
+
+def encode_qr(url: str) -> tuple[int, tuple]:
+    """Encode *url* and return ``(n, runs)``: the side length in modules
+    (quiet zone included) and ``(row, col, length)`` runs of dark modules."""
+    import qrcode
+    qr = qrcode.QRCode(version=1, border=2, error_correction=qrcode.constants.ERROR_CORRECT_M)
+    qr.add_data(url)
+    qr.make(fit=True)
+    matrix = qr.get_matrix()
+    runs = []
+    for r, row in enumerate(matrix):
+        c, n = 0, len(row)
+        while c < n:
+            if row[c]:
+                start = c
+                while c < n and row[c]:
+                    c += 1
+                runs.append((r, start, c - start))
+            else:
+                c += 1
+    return len(matrix), tuple(runs)
+
+
+def _encode_many(urls: list[str]) -> list[tuple[int, tuple]]:
+    return [encode_qr(u) for u in urls]
+
+
+def qr_modules(base_url: str, ids: list[int], workers: int | None = None) -> dict:
+    """Encoded matrices for *ids*, from the cache or freshly encoded (in parallel when worth it)."""
+    out, missing = {}, []
+    with _cache_lock:
+        for i in ids:
+            hit = _cache.get((base_url, i))
+            if hit is None:
+                missing.append(i)
+            else:
+                _cache.move_to_end((base_url, i))
+                out[i] = hit
+
+    if missing:
+        urls = [tag_url(base_url, i) for i in missing]
+        pool = _get_pool(workers) if len(missing) >= PARALLEL_MIN_CODES else None
+        if pool is not None:
+            chunks  = [urls[k:k + ENCODE_CHUNK] for k in range(0, len(urls), ENCODE_CHUNK)]
+            encoded = [m for chunk in pool.map(_encode_many, chunks) for m in chunk]
+        else:
+            encoded = _encode_many(urls)
+
+        with _cache_lock:
+            for i, modules in zip(missing, encoded):
+                out[i] = _cache[(base_url, i)] = modules
+            while len(_cache) > CACHE_SIZE:
+                _cache.popitem(last=False)
+    return out
+
+
+def clear_qr_cache() -> None:
+    with _cache_lock:
+        _cache.clear()
+
+
+def _get_pool(workers: int | None):
+    """Shared encoding pool, or None when only one CPU is available."""
+    global _pool
+    workers = workers or os.cpu_count() or 1
+    if workers < 2:
+        return None
+    with _pool_lock:
+        if _pool is None:
+            # spawn: the web process runs scheduler threads, which fork() doesn't mix with
+            _pool = ProcessPoolExecutor(max_workers=workers,
+                                        mp_context=multiprocessing.get_context('spawn'))
+            atexit.register(shutdown_pool)
+        return _pool
+
+
+def shutdown_pool() -> None:
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.shutdown(wait=False, cancel_futures=True)
+            _pool = None
+
+
+def draw_qr(c, modules, x: float, y: float, size: float) -> None:
+    """Draw an encoded QR code as vector modules in the square (x, y, size)."""
+    n, runs = modules
+    c.saveState()
+    c.setFillColorRGB(1, 1, 1)
+    c.rect(x, y, size, size, stroke=0, fill=1)
+    # One unit per module, origin top-left: the path is just small integers
+    c.translate(x, y + size)
+    c.scale(size / n, -size / n)
+    path = c.beginPath()
+    for r, col, length in runs:
+        path.rect(col, r, length, 1)
+    c.setFillColorRGB(0, 0, 0)
+    c.drawPath(path, stroke=0, fill=1)
+    c.restoreState()
+
+
+# ---------------------------------------------------------------------------
+# Tag sheet
+# ---------------------------------------------------------------------------
+
+def render_tag_sheet(items, layout: str, card_w_mm: float, card_h_mm: float,
+                     base_url: str, org_name: str, workers: int | None = None) -> tuple[bytes, dict]:
+    """Render tags for *items* (objects with id, name, barcode) onto A4 pages.
+
+    Returns the PDF bytes and ``{'tags', 'seconds', 'tags_per_second'}``.
+    """
+    from reportlab.lib.pagesizes import A4
+    from reportlab.pdfgen import canvas as rl_canvas
+    from reportlab.lib.units import mm
+    from reportlab.lib import colors
+
+    started = time.perf_counter()
+    modules = qr_modules(base_url, [item.id for item in items], workers)
+
+    card_w = card_w_mm * mm
+    card_h = card_h_mm * mm
+    gap    = 4 * mm
+    margin = 8 * mm
+    pw, ph = A4
+
+    cols = max(1, int((pw - 2 * margin + gap) / (card_w + gap)))
+    rows = max(1, int((ph - 2 * margin + gap) / (card_h + gap)))
+
+    pdf_buffer = io.BytesIO()
+    c = rl_canvas.Canvas(pdf_buffer, pagesize=A4)
+
+    BLACK    = colors.black
+    MID_GREY = colors.HexColor('#666666')
+    QR_BG    = colors.HexColor('#eeeeee')
+    DIVIDER  = colors.HexColor('#cccccc')
+
+    def _truncate(text, max_chars):
+        return text[:max_chars] + ('…' if len(text) > max_chars else '')
+
+    def _centred_string(text, font, size, cx, y, width):
+        c.setFont(font, size)
+        tw = c.stringWidth(text, font, size)
+        c.drawString(cx + (width - tw) / 2, y, text)
+
+    # ── PORTRAIT ────────────────────────────────────────────────────────
+    #
+    #  ┌──────────────────────┐
+    #  │                      │
+    #  │     Item Name        │  ← bold, centred, top
+    #  │                      │
+    #  │  ┌────────────────┐  │
+    #  │  │                │  │
+    #  │  │    QR CODE     │  │  ← large, centred, rounded bg
+    #  │  │                │  │
+    #  │  └────────────────┘  │
+    #  │                      │
+    #  │      # ASSET-001     │  ← centred asset number
+    #  │                      │
+    #  ├──────────────────────┤  ← thin divider
+    #  │     Organisation     │  ← small grey footer
+    #  └──────────────────────┘
+    #
+    def _draw_portrait(cx, cy, item, qr):
+        pad      = 3   * mm
+        footer_h = 6.5 * mm
+        name_h   = 8   * mm
+        asset_h  = 6   * mm
+        border_r = 4   * mm
+
+        # Card outline — thick enough to feel like a tag
+        c.setStrokeColor(BLACK)
+        c.setLineWidth(1.2)
+        c.roundRect(cx, cy, card_w, card_h, border_r, stroke=1, fill=0)
+
+        # ── Item name (top, bold, centred) ──
+        name_str  = _truncate(item.name, 26)
+        name_size = max(8, min(13, int(card_w / 5.5)))
+        c.setFillColor(BLACK)
+        _centred_string(name_str, 'Helvetica-Bold', name_size,
+                        cx, cy + card_h - pad - name_h + 2 * mm, card_w)
+
+        # ── QR code (centred, with rounded light-grey background) ──
+        body_h   = card_h - name_h - footer_h - asset_h - 2 * pad
+        qr_size  = min(card_w - 6 * pad, body_h - 2 * pad)
+        qr_x     = cx + (card_w - qr_size) / 2
+        qr_y     = cy + footer_h + asset_h + (body_h - qr_size) / 2 + pad * 0.5
+
+        bg_pad = 2 * mm
+        c.setFillColor(QR_BG)
+        c.roundRect(qr_x - bg_pad, qr_y - bg_pad,
+                    qr_size + 2 * bg_pad, qr_size + 2 * bg_pad,
+                    3 * mm, stroke=0, fill=1)
+        draw_qr(c, qr, qr_x, qr_y, qr_size)
+
+        # ── Asset number (centred, under QR) ──
+        asset_label = f'# {_truncate(item.barcode or f"ID-{item.id}", 24)}'
+        c.setFillColor(MID_GREY)
+        _centred_string(asset_label, 'Helvetica', 7, cx, cy + footer_h + pad * 0.8, card_w)
+
+        # ── Divider above footer ──
+        c.setStrokeColor(DIVIDER)
+        c.setLineWidth(0.5)
+        c.line(cx + pad, cy + footer_h - 0.8 * mm,
+               cx + card_w - pad, cy + footer_h - 0.8 * mm)
+
+        # ── Organisation footer (centred, grey) ──
+        c.setFillColor(MID_GREY)
+        _centred_string(org_name, 'Helvetica', 6.5, cx, cy + 2 * mm, card_w)
+
+    # ── LANDSCAPE ───────────────────────────────────────────────────────
+    #
+    #  ┌──────────────────────────────────────┐
+    #  │        │   Item Name (bold)           │
+    #  │   QR   │                              │
+    #  │        │   # ASSET-001 (centred-ish)  │
+    #  ├────────┴─────────────────────────────┤
+    #  │              Organisation             │
+    #  └──────────────────────────────────────┘
+    #
+    def _draw_landscape(cx, cy, item, qr):
+        pad      = 2.5 * mm
+        footer_h = 5.5 * mm
+        border_r = 4   * mm
+
+        body_h = card_h - footer_h
+
+        # Card outline
+        c.setStrokeColor(BLACK)
+        c.setLineWidth(1.2)
+        c.roundRect(cx, cy, card_w, card_h, border_r, stroke=1, fill=0)
+
+        # ── QR with rounded grey background (left) ──
+        qr_size = body_h - 2 * pad
+        qr_x    = cx + pad
+        qr_y    = cy + footer_h + (body_h - qr_size) / 2
+
+        bg_pad = 1.5 * mm
+        c.setFillColor(QR_BG)
+        c.roundRect(qr_x - bg_pad, qr_y - bg_pad,
+                    qr_size + 2 * bg_pad, qr_size + 2 * bg_pad,
+                    2.5 * mm, stroke=0, fill=1)
+        draw_qr(c, qr, qr_x, qr_y, qr_size)
+
+        # ── Text block (right of QR) ──
+        text_x  = cx + qr_size + 3 * pad
+        text_w  = card_w - (qr_size + 4 * pad)
+        mid_y   = cy + footer_h + body_h / 2
+
+        # Item name — bold, centred in text column
+        name_str  = _truncate(item.name, 24)
+        name_size = max(8, min(12, int(text_w / 6)))
+        c.setFillColor(BLACK)
+        _centred_string(name_str, 'Helvetica-Bold', name_size, text_x, mid_y + 2 * mm, text_w)
+
+        # Asset number — centred in text column, below name
+        asset_label = f'# {_truncate(item.barcode or f"ID-{item.id}", 20)}'
+        c.setFillColor(MID_GREY)
+        _centred_string(asset_label, 'Helvetica', 7, text_x, mid_y - 4 * mm, text_w)
+
+        # ── Divider above footer ──
+        c.setStrokeColor(DIVIDER)
+        c.setLineWidth(0.5)
+        c.line(cx + pad, cy + footer_h - 0.5 * mm,
+               cx + card_w - pad, cy + footer_h - 0.5 * mm)
+
+        # ── Organisation footer ──
+        c.setFillColor(MID_GREY)
+        _centred_string(org_name, 'Helvetica', 6.5, cx, cy + 1.5 * mm, card_w)
+
+    draw = _draw_landscape if layout == 'landscape' else _draw_portrait
+
+    # ── Paginate and render ───────────────────────────────────────────────
+    col_idx = 0
+    row_idx = 0
+    for item in items:
+        cx = margin + col_idx * (card_w + gap)
+        cy = ph - margin - card_h - row_idx * (card_h + gap)
+        try:
+            draw(cx, cy, item, modules[item.id])
+        except Exception as exc:
+            print(f"QR tag error for item {item.id}: {exc}")
+
+        col_idx += 1
+        if col_idx >= cols:
+            col_idx = 0
+            row_idx += 1
+            if row_idx >= rows:
+                c.showPage()
+                row_idx = 0
+
+    c.save()
+    seconds = time.perf_counter() - started
+    stats = {'tags': len(items), 'seconds': round(seconds, 3),
+             'tags_per_second': round(len(items) / seconds, 1) if seconds else None}
+    return pdf_buffer.getvalue(), stats
@@ -0,0 +1,631 @@
+"""services/recurrence.py — Recurring event series, expanded on read.
+
+A series is a single Event row carrying the rule (``recurrence_pattern``,
+``_interval``, ``_count``, ``_end_date``); its own date is the first
+occurrence. Later occurrences are never written up front: the n-th start is
+arithmetic on the first, so finding the occurrences in a date window costs
+the same for a ten-week run as for a thousand-day one.
+
+An occurrence becomes a real Event row (``recurring_event_id`` = the series,
+``recurrence_id`` = the slot it was generated for) only when it needs its
+own crew, shifts, notes or changes — see :func:`materialise`. Cancelled
+slots are listed on the series in ``recurrence_exdates``.
+
+"This and following" edits split the series at the chosen occurrence and
+touch the rows already materialised after it with single set-based
+statements (:func:`edit_following`, :func:`delete_following`).
+"""
+
+import calendar
+from datetime import datetime, timedelta
+from typing import NamedTuple
+
+from sqlalchemy import and_, delete, func, insert, or_, update
+from sqlalchemy.exc import IntegrityError
+
+from constants import RECURRENCE_PATTERNS
+from extensions import db
+from models import Event, EventReminder, OccurrenceReminder
+from services.notification_service import (
+    reminder_due_times, sync_event_reminders, sync_occurrence_reminders,
+)
+
+MAX_OCCURRENCES = 1000                 # series with no count or end date stop here
+DEFAULT_LENGTH  = timedelta(hours=3)   # events saved without an end time
+SLOT_FORMAT     = '%Y%m%dT%H%M%S'
+
+
+def is_series(event) -> bool:
+    return getattr(event, 'recurrence_pattern', None) in RECURRENCE_PATTERNS
+
+
+# ---------------------------------------------------------------------------
+# Rule arithmetic
+# ---------------------------------------------------------------------------
+
+def _step(series) -> tuple[timedelta | None, int]:
+    """``(delta, 0)`` for daily/weekly patterns, ``(None, months)`` for monthly/yearly."""
+    i = max(series.recurrence_interval or 1, 1)
+    p = series.recurrence_pattern
+    if p == 'daily':
+        return timedelta(days=i), 0
+    if p == 'weekly':
+        return timedelta(weeks=i), 0
+    if p == 'biweekly':
+        return timedelta(weeks=2 * i), 0
+    if p == 'monthly':
+        return None, i
+    return None, 12 * i
+
+
+def occurrence_start(series, n: int) -> datetime:
+    """Start of occurrence *n* (0 = the series row itself).
+
+    Monthly and yearly series keep the first event's day of the month,
+    falling back to the month's last day where it has fewer days.
+    """
+    first = series.event_date
+    delta, months = _step(series)
+    if delta is not None:
+        return first + n * delta
+    total = first.month - 1 + n * months
+    year, month = first.year + total // 12, total % 12 + 1
+    return first.replace(year=year, month=month, day=min(first.day, calendar.monthrange(year, month)[1]))
+
+
+def first_index(series, when: datetime) -> int:
+    """Smallest *n* whose occurrence starts at or after *when* (ignoring the series' end)."""
+    first = series.event_date
+    if when <= first:
+        return 0
+    delta, months = _step(series)
+    if delta is not None:
+        return -((first - when) // delta)
+    n = ((when.year - first.year) * 12 + when.month - first.month) // months
+    while occurrence_start(series, n) < when:
+        n += 1
+    return n
+
+
+def occurrence_count(series) -> int:
+    """How many occurrences the series has, the first included."""
+    count = min(series.recurrence_count or MAX_OCCURRENCES, MAX_OCCURRENCES)
+    if series.recurrence_end_date is not None:
+        count = min(count, first_index(series, series.recurrence_end_date + timedelta(microseconds=1)))
+    return max(count, 1)
+
+
+def duration(series) -> timedelta:
+    return series.event_end_date - series.event_date if series.event_end_date else DEFAULT_LENGTH
+
+
+def exdates(series) -> set[datetime]:
+    """Cancelled slots of *series*."""
+    return {datetime.strptime(s, SLOT_FORMAT) for s in (series.recurrence_exdates or '').split(',') if s}
+
+
+def _set_exdates(series, slots) -> None:
+    series.recurrence_exdates = ','.join(sorted(d.strftime(SLOT_FORMAT) for d in slots)) or None
+
+
+def add_exdate(series, slot: datetime) -> None:
+    _set_exdates(series, exdates(series) | {slot})
+
+
+# ---------------------------------------------------------------------------
+# Virtual occurrences
+# ---------------------------------------------------------------------------
+
+def occurrence_ref(series_id: int, slot: datetime) -> str:
+    """Stable id for an occurrence that has no row yet, e.g. ``12@20250512T190000``."""
+    return f"{series_id}@{slot.strftime(SLOT_FORMAT)}"
+
+
+def parse_ref(ref) -> tuple[int, datetime] | None:
+    """``(series_id, slot)`` for an occurrence ref, None for anything else."""
+    if not isinstance(ref, str) or '@' not in ref:
+        return None
+    series_id, _, slot = ref.partition('@')
+    try:
+        return int(series_id), datetime.strptime(slot, SLOT_FORMAT)
+    except ValueError:
+        return None
+
+
+def occurrence_path(series_id: int, slot: datetime) -> str:
+    return f"/events/{series_id}/occurrences/{slot.strftime(SLOT_FORMAT)}"
+
+
+class Occurrence(NamedTuple):
+    """An occurrence without a row of its own; reads like an Event when rendering."""
+    series:     Event
+    event_date: datetime
+
+    @property
+    def id(self) -> str:
+        return occurrence_ref(self.series.id, self.event_date)
+
+    @property
+    def recurring_event_id(self) -> int:
+        return self.series.id
+
+    is_recurring_instance = True
+
+    @property
+    def recurrence_id(self) -> datetime:
+        return self.event_date
+
+    @property
+    def event_end_date(self) -> datetime:
+        return self.event_date + duration(self.series)
+
+    @property
+    def url(self) -> str:
+        return occurrence_path(self.series.id, self.event_date)
+
+    title            = property(lambda self: self.series.title)
+    description      = property(lambda self: self.series.description)
+    location         = property(lambda self: self.series.location)
+    created_by       = property(lambda self: self.series.created_by)
+    cast_description = property(lambda self: self.series.cast_description)
+    crew_assignments = property(lambda self: [])
+    schedules        = property(lambda self: [])
+
+
+def occurrences(series, start: datetime, end: datetime | None, skip=(), limit: int | None = None) -> list[Occurrence]:
+    """Virtual occurrences of *series* starting in ``[start, end)``, at most *limit* of them.
+
+    The first occurrence is the series row itself and is never returned;
+    cancelled slots and slots in *skip* (those with rows) are left out.
+    With no *end* the walk stops at the end of the series or at *limit*.
+    """
+    total     = occurrence_count(series)
+    cancelled = exdates(series)
+    out = []
+    n = max(first_index(series, start), 1)
+    while n < total and len(out) != limit:
+        slot = occurrence_start(series, n)
+        if end is not None and slot >= end:
+            break
+        if slot not in cancelled and slot not in skip:
+            out.append(Occurrence(series, slot))
+        n += 1
+    return out
+
+
+def own_slot_cancelled():
+    """SQL: the row is a series whose own (first) occurrence has been cancelled."""
+    if db.session.get_bind().dialect.name == 'sqlite':
+        slot = func.strftime('%Y%m%dT%H%M%S', Event.event_date)
+    else:
+        slot = func.to_char(Event.event_date, 'YYYYMMDD"T"HH24MISS')
+    return and_(func.coalesce(Event.recurrence_pattern, '').in_(RECURRENCE_PATTERNS),
+                func.coalesce(Event.recurrence_exdates, '').contains(slot))
+
+
+def _slot_column():
+    # Instance rows written before recurrence_id existed are keyed by their date
+    return func.coalesce(Event.recurrence_id, Event.event_date)
+
+
+def virtual_occurrences(start: datetime, end: datetime | None, limit: int | None = None) -> list[Occurrence]:
+    """Occurrences starting in ``[start, end)`` that have no row, in no particular order.
+
+    Two queries however long the series: series that may reach into the
+    window, and which of their slots in it already have rows. *limit* caps
+    what each series contributes, which is what makes an open *end* usable.
+    """
+    series = Event.query.filter(Event.recurrence_pattern.in_(RECURRENCE_PATTERNS),
+                                or_(Event.recurrence_end_date.is_(None), Event.recurrence_end_date >= start))
+    slots  = db.session.query(Event.recurring_event_id, _slot_column()).filter(_slot_column() >= start)
+    if end is not None:
+        series = series.filter(Event.event_date < end)
+        slots  = slots.filter(_slot_column() < end)
+    series = series.all()
+    if not series:
+        return []
+    taken = {}
+    for series_id, slot in slots.filter(Event.recurring_event_id.in_([s.id for s in series])):
+        taken.setdefault(series_id, set()).add(slot)
+    return [occ for s in series for occ in occurrences(s, start, end, taken.get(s.id, ()), limit)]
+
+
+def events_in_window(start: datetime, end: datetime, options=()) -> list:
+    """Event rows and virtual occurrences starting in ``[start, end)``, in start order.
+
+    Three queries: events in the window (with *options* applied) plus
+    :func:`virtual_occurrences`.
+    """
+    rows = (Event.query.options(*options)
+            .filter(Event.event_date >= start, Event.event_date < end, ~own_slot_cancelled())
+            .all())
+    return sorted(rows + virtual_occurrences(start, end), key=lambda e: (e.event_date, str(e.id)))
+
+
+def upcoming(start: datetime, limit: int, options=()) -> list:
+    """The first *limit* events from *start*, Event rows and virtual occurrences alike, in start order."""
+    rows = (Event.query.options(*options)
+            .filter(Event.event_date >= start, ~own_slot_cancelled())
+            .order_by(Event.event_date).limit(limit)
+            .all())
+    # Nothing after the limit-th row can make the list
+    end  = rows[-1].event_date if len(rows) == limit else None
+    return sorted(rows + virtual_occurrences(start, end, limit), key=lambda e: (e.event_date, str(e.id)))[:limit]
+
+
+# ---------------------------------------------------------------------------
+# Lookup and materialisation
+# ---------------------------------------------------------------------------
+
+def find_occurrence(ref):
+    """The Event row, or virtual :class:`Occurrence`, for an event id or occurrence ref.
+
+    A ref whose slot already has a row resolves to that row; the first slot
+    resolves to the series itself. None when there is no such event.
+    """
+    parsed = parse_ref(ref)
+    if parsed is None:
+        try:
+            return db.session.get(Event, int(ref))
+        except (TypeError, ValueError):
+            return None
+
+    series_id, slot = parsed
+    series = db.session.get(Event, series_id)
+    if series is None or not is_series(series):
+        return None
+    row = Event.query.filter(Event.recurring_event_id == series.id, _slot_column() == slot).first()
+    if row is not None:
+        return row
+    n = first_index(series, slot)
+    if n >= occurrence_count(series) or occurrence_start(series, n) != slot or slot in exdates(series):
+        return None
+    return series if n == 0 else Occurrence(series, slot)
+
+
+def materialise(occurrence, commit: bool = True) -> Event:
+    """The row for *occurrence*, writing (and committing) it if it is still virtual.
+
+    With ``commit=False`` the row is only flushed and goes in with the
+    caller's own commit; a concurrent materialise of the same slot then
+    surfaces as IntegrityError there.
+    """
+    if isinstance(occurrence, Event):
+        return occurrence
+    series, slot = occurrence.series, occurrence.event_date
+    row = Event(
+        title=series.title, description=series.description,
+        event_date=slot, event_end_date=occurrence.event_end_date,
+        location=series.location, created_by=series.created_by,
+        cast_description=series.cast_description,
+        is_recurring_instance=True, recurring_event_id=series.id, recurrence_id=slot,
+    )
+    db.session.add(row)
+    try:
+        db.session.flush()
+        # Reminders already scheduled for the occurrence move to the row
+        handed = db.session.execute(delete(OccurrenceReminder).where(
+            OccurrenceReminder.series_id == series.id, OccurrenceReminder.slot == slot)).rowcount
+        if handed:
+            sync_event_reminders(row)
+        if commit:
+            db.session.commit()
+    except IntegrityError:          # another request got there first
+        if not commit:
+            raise
+        db.session.rollback()
+        row = Event.query.filter_by(recurring_event_id=series.id, recurrence_id=slot).one()
+    return row
+
+
+def cancel_occurrence(series, slot: datetime) -> None:
+    """Drop one occurrence: its slot is excluded and any row it had is deleted (no commit).
+
+    The first occurrence is the series row itself, which stays as the rule;
+    only its pending reminders are skipped.
+    """
+    add_exdate(series, slot)
+    db.session.execute(delete(OccurrenceReminder).where(
+        OccurrenceReminder.series_id == series.id, OccurrenceReminder.slot == slot))
+    if slot == series.event_date:
+        db.session.execute(update(EventReminder)
+                           .where(EventReminder.event_id == series.id, EventReminder.status == 'pending')
+                           .values(status='skipped'),
+                           execution_options={'synchronize_session': False})
+    row = Event.query.filter(Event.recurring_event_id == series.id, _slot_column() == slot).first()
+    if row is not None:
+        db.session.delete(row)
+
+
+# ---------------------------------------------------------------------------
+# iCalendar
+# ---------------------------------------------------------------------------
+
+_FREQ = {'daily': ('DAILY', 1), 'weekly': ('WEEKLY', 1), 'biweekly': ('WEEKLY', 2),
+         'monthly': ('MONTHLY', 1), 'yearly': ('YEARLY', 1)}
+
+
+def rrule(series) -> str:
+    """RRULE value generating exactly the occurrences :func:`occurrence_start` does."""
+    freq, mult = _FREQ[series.recurrence_pattern]
+    parts = [f"FREQ={freq}", f"INTERVAL={mult * max(series.recurrence_interval or 1, 1)}"]
+    first = series.event_date
+    if freq == 'MONTHLY' and first.day > 28:
+        # "the 31st, or the month's last day if earlier"
+        parts += ['BYMONTHDAY=' + ','.join(str(d) for d in range(28, first.day + 1)), 'BYSETPOS=-1']
+    elif freq == 'YEARLY' and (first.month, first.day) == (2, 29):
+        parts += ['BYMONTH=2', 'BYMONTHDAY=28,29', 'BYSETPOS=-1']
+    parts.append(f"COUNT={occurrence_count(series)}")
+    return ';'.join(parts)
+
+
+# ---------------------------------------------------------------------------
+# "This and following"
+# ---------------------------------------------------------------------------
+
+EDITABLE_FIELDS = ('title', 'description', 'location')
+
+
+def series_position(event) -> tuple[Event, datetime] | None:
+    """``(series, slot)`` for a series, a materialised or a virtual occurrence; None for other events."""
+    if isinstance(event, Occurrence):
+        return event.series, event.event_date
+    if is_series(event):
+        return event, event.event_date
+    if event.recurrence_id is not None and event.recurring_event_id is not None:
+        series = db.session.get(Event, event.recurring_event_id)
+        if series is not None and is_series(series):
+            return series, event.recurrence_id
+    return None
+
+
+def _following(series, slot):
+    """Rows materialised for occurrences of *series* from *slot* on."""
+    return and_(Event.recurring_event_id == series.id, _slot_column() >= slot)
+
+
+def _plus(column, delta: timedelta):
+    """SQL for ``column + delta``. SQLite keeps datetimes as text, so it goes through strftime."""
+    if db.session.get_bind().dialect.name == 'sqlite':
+        modifier = f"{int(delta.total_seconds()):+d} seconds"
+        # strftime drops the fraction SQLAlchemy stores; keep the original's
+        return func.strftime('%Y-%m-%d %H:%M:%S', column, modifier, type_=db.String) + func.substr(column, 20)
+    return column + delta
+
+
+def _as_generated(row, series, slot: datetime) -> bool:
+    """Whether *row* still reads as *series* would generate its occurrence at *slot*."""
+    return (row.event_date == slot and row.event_end_date == slot + duration(series)
+            and all(getattr(row, f) == getattr(series, f) for f in EDITABLE_FIELDS))
+
+
+def _split(series, slot: datetime, n: int) -> Event:
+    """End *series* before its *n*-th occurrence (at *slot*) and start a new series there.
+
+    The occurrence's own row, if it has one, becomes the new series so its
+    crew and notes stay put. A row edited on its own (another time, title…)
+    can't be the rule for what follows; it is kept as the override of the
+    new series' first slot instead.
+    """
+    total = occurrence_count(series)
+    later = {d for d in exdates(series) if d > slot}
+    _set_exdates(series, exdates(series) - later)
+    series.recurrence_count = n
+
+    head = Event.query.filter(Event.recurring_event_id == series.id, _slot_column() == slot).first()
+    if head is None or not _as_generated(head, series, slot):
+        if head is not None:
+            later.add(slot)         # the row stands in for the series row's own date
+        head = Event(title=series.title, description=series.description, location=series.location,
+                     created_by=series.created_by, cast_description=series.cast_description,
+                     event_date=slot, event_end_date=slot + duration(series))
+        db.session.add(head)
+    head.is_recurring_instance = False
+    head.recurring_event_id    = head.recurrence_id = None
+    head.recurrence_pattern    = series.recurrence_pattern
+    head.recurrence_interval   = series.recurrence_interval
+    head.recurrence_count      = total - n
+    head.recurrence_end_date   = series.recurrence_end_date
+    _set_exdates(head, later)
+    return head
+
+
+def _drop_occurrence_reminders(series, slot: datetime) -> int:
+    """Delete reminders of *series*' occurrences from *slot* on; returns how many there were."""
+    return db.session.execute(delete(OccurrenceReminder).where(
+        OccurrenceReminder.series_id == series.id, OccurrenceReminder.slot >= slot)).rowcount
+
+
+def _reschedule_reminders(event_ids, now: datetime | None = None) -> None:
+    """Recompute reminders of moved events that had any: one DELETE and one INSERT."""
+    now = now or datetime.now()
+    had = [eid for (eid,) in db.session.query(EventReminder.event_id)
+           .filter(EventReminder.event_id.in_(event_ids)).distinct()]
+    if not had:
+        return
+    db.session.execute(delete(EventReminder).where(EventReminder.event_id.in_(had)))
+    rows = [{'event_id': eid, 'kind': kind, 'due_at': due_at, 'status': 'pending', 'attempts': 0}
+            for eid, start in db.session.query(Event.id, Event.event_date).filter(Event.id.in_(had))
+            for kind, due_at in reminder_due_times(start).items() if due_at > now]
+    if rows:
+        db.session.execute(insert(EventReminder), rows)
+
+
+def edit_following(series, slot: datetime, changes: dict, shift: timedelta = timedelta(0)) -> Event:
+    """Apply *changes* and move by *shift* every occurrence of *series* from *slot* on (no commit).
+
+    From the first slot the series is edited in place; from a later one it
+    is split and the new series is returned. Rows already materialised in
+    the range are changed by one UPDATE keyed on series and slot, and their
+    reminders recomputed in the same transaction.
+    """
+    changes = {k: v for k, v in changes.items() if k in EDITABLE_FIELDS}
+    n    = first_index(series, slot)
+    head = _split(series, slot, n) if n else series
+    for field, value in changes.items():
+        setattr(head, field, value)
+    if shift:
+        head.event_date += shift
+        if head.event_end_date is not None:
+            head.event_end_date += shift
+        if head.recurrence_end_date is not None:
+            head.recurrence_end_date += shift
+        _set_exdates(head, {d + shift for d in exdates(head)})
+    db.session.flush()
+
+    values = dict(changes)
+    if n:
+        values['recurring_event_id'] = head.id
+    if shift:
+        values.update(event_date=_plus(Event.event_date, shift),
+                      event_end_date=_plus(Event.event_end_date, shift),
+                      recurrence_id=_plus(_slot_column(), shift))
+    moved = [eid for (eid,) in db.session.query(Event.id).filter(_following(series, slot))]
+    if values and moved:
+        db.session.execute(update(Event).where(_following(series, slot)).values(**values),
+                           execution_options={'synchronize_session': False})
+    if shift:
+        _reschedule_reminders(moved + [head.id])
+    if (shift or n) and _drop_occurrence_reminders(series, slot):
+        # Reminders were being kept for these occurrences; carry on from their new slots
+        sync_event_reminders(head)
+        sync_occurrence_reminders(series_ids={head.id})
+    return head
+
+
+def delete_following(series, slot: datetime) -> int:
+    """Remove every occurrence of *series* from *slot* on (no commit); returns rows deleted.
+
+    From the first slot that is the whole series. Reminders of the rows in
+    the range go in one DELETE; the rows themselves are deleted through the
+    session so their crew, shifts and notes cascade as they do for a single
+    event.
+    """
+    n    = first_index(series, slot)
+    rows = Event.query.filter(_following(series, slot)).all()
+    if n:
+        series.recurrence_count = n
+        _set_exdates(series, {d for d in exdates(series) if d < slot})
+    else:
+        rows.append(series)
+    db.session.execute(delete(EventReminder).where(EventReminder.event_id.in_([e.id for e in rows])))
+    _drop_occurrence_reminders(series, slot)
+    for row in rows:
+        db.session.delete(row)
+    return len(rows)
+
+
+# ---------------------------------------------------------------------------
+# Migration
+# ---------------------------------------------------------------------------
+
+# Tables whose rows are derived from the event rather than added to it
+_DERIVED_TABLES = {'event_reminder'}
+
+
+def _legacy_dates(series) -> list[datetime]:
+    """Dates the old eager expansion wrote rows for, the series' own date first.
+
+    Kept as it was, month-end quirks included, so migrated rows can be
+    matched to the position they were generated for.
+    """
+    current, out = series.event_date, []
+    step = max(series.recurrence_interval or 1, 1)
+    while len(out) < (series.recurrence_count or MAX_OCCURRENCES + 1) and len(out) <= MAX_OCCURRENCES:
+        if series.recurrence_end_date and current > series.recurrence_end_date:
+            break
+        out.append(current)
+        p = series.recurrence_pattern
+        if p == 'daily':
+            current += timedelta(days=step)
+        elif p == 'weekly':
+            current += timedelta(weeks=step)
+        elif p == 'biweekly':
+            current += timedelta(weeks=2 * step)
+        elif p == 'monthly':
+            try:
+                m = current.month + step
+                current = current.replace(year=current.year + (m - 1) // 12, month=(m - 1) % 12 + 1)
+            except ValueError:
+                current = current.replace(day=28) + timedelta(days=4)
+                current = current - timedelta(days=current.day)
+        else:
+            current = current.replace(year=current.year + step)
+    return out
+
+
+def collapse_instances() -> tuple[int, int]:
+    """Fold rows generated per occurrence by the old eager expansion back into their series.
+
+    Each row is keyed by the position it was generated for, not by its
+    date, which may have been edited or put elsewhere by the old generator.
+    Rows still as generated that nothing else references are deleted (they
+    are generated on read now); the rest keep their row as the override of
+    their slot, their own edits included. Positions whose row was deleted
+    stay cancelled. Returns ``(kept, removed)``.
+    """
+    instances = (Event.query
+                 .filter(Event.is_recurring_instance == True, Event.recurring_event_id.isnot(None),
+                         Event.recurrence_id.is_(None))
+                 .all())
+    if not instances:
+        return 0, 0
+    series_by_id = {s.id: s for s in Event.query.filter(
+        Event.id.in_({e.recurring_event_id for e in instances}),
+        Event.recurrence_pattern.in_(RECURRENCE_PATTERNS))}
+
+    referenced, derived = set(), []
+    for table in db.metadata.sorted_tables:
+        for fk in table.foreign_keys:
+            if fk.column.table.name == Event.__tablename__:
+                if table.name in _DERIVED_TABLES:
+                    derived.append((table, fk.parent))
+                else:
+                    referenced |= {eid for (eid,) in db.session.execute(
+                        db.select(fk.parent).where(fk.parent.isnot(None)).distinct())}
+
+    by_series = {}
+    for e in instances:
+        by_series.setdefault(e.recurring_event_id, []).append(e)
+
+    kept = removed = 0
+    for series_id, rows in by_series.items():
+        series = series_by_id.get(series_id)
+        if series is None:
+            for e in rows:
+                e.recurrence_id = e.event_date
+            kept += len(rows)
+            continue
+        legacy    = _legacy_dates(series)
+        positions = {}
+        for m, d in enumerate(legacy):
+            positions.setdefault(d, []).append(m)
+        total    = occurrence_count(series)
+        taken, n = set(), 0
+        # Rows were written in order, so a row whose date no longer matches goes after the one before it
+        for e in sorted(rows, key=lambda e: e.id):
+            at = next((m for m in positions.get(e.event_date, ()) if m > n), None)
+            n  = at if at is not None else n + 1
+            if n >= total:
+                e.recurrence_id = e.event_date          # past the end of the rule; stays a plain row
+                kept += 1
+                continue
+            taken.add(n)
+            slot      = occurrence_start(series, n)
+            untouched = (at is not None and e.event_end_date == e.event_date + duration(series)
+                         and all(getattr(e, f) == getattr(series, f) for f in EDITABLE_FIELDS))
+            if untouched and e.id not in referenced:
+                for table, column in derived:
+                    db.session.execute(table.delete().where(column == e.id))
+                db.session.delete(e)
+                removed += 1
+                continue
+            if untouched:
+                # Only the old generator put it on another date; it belongs on the rule's
+                e.event_date, e.event_end_date = slot, slot + duration(series)
+            e.recurrence_id = slot
+            kept += 1
+        _set_exdates(series, exdates(series) | {occurrence_start(series, m)
+                                                for m in range(1, min(len(legacy), total)) if m not in taken})
+    db.session.commit()
+    return kept, removed
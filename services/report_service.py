@@ -1,8 +1,17 @@
-"""services/report_service.py — PDF generation for event briefs."""
+"""services/report_service.py — PDF generation for event briefs.
 
-import io, os, re
+Rendered briefs are cached on disk, keyed by event id and a content version
+hashed from everything the brief shows (event fields, schedule, notes, crew
+and their emails). Any change produces a new version, so the brief is
+rendered once per change and every other download is a file read.
+"""
+
+import functools, hashlib, io, os, re, tempfile, threading
 from datetime import datetime
 
+from flask import current_app
+from sqlalchemy.orm import selectinload
+
 from reportlab.platypus import (
     SimpleDocTemplate, Table, TableStyle, Paragraph,
     Spacer, PageBreak, Image, HRFlowable,
@@ -13,12 +22,138 @@ from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
 from reportlab.lib.units import inch, mm
 from reportlab.lib.enums import TA_CENTER
 
+# Bump when the layout changes so cached briefs are re-rendered
+LAYOUT_VERSION = 2
+
+# event id -> lock, so concurrent downloads of a stale brief render it once
+_render_locks: dict = {}
+_render_locks_guard = threading.Lock()
+
 
 def generate_event_pdf(event_id: int):
     """Return (BytesIO, filename) for an event brief PDF."""
+    path, filename, _ = event_brief(event_id)
+    with open(path, 'rb') as f:
+        return io.BytesIO(f.read()), filename
+
+
+def event_brief(event_id: int) -> tuple[str, str, str]:
+    """Return ``(path, filename, version)`` of the cached brief, rendering it if stale."""
+    event, crew_emails = _load(event_id)
+    version    = _content_version(event, crew_emails)
+    path       = os.path.join(_cache_dir(), f"brief_{event.id}_{version}.pdf")
+    safe_title = re.sub(r'\W+', '_', event.title)
+    filename   = f"{safe_title}_Event_Brief_{event.event_date.strftime('%Y%m%d')}.pdf"
+
+    if not os.path.exists(path):
+        with _render_lock(event.id):
+            if not os.path.exists(path):
+                _write_brief(path, event, crew_emails)
+    return path, filename, version
+
+
+def clear_brief_cache() -> None:
+    """Remove every cached brief (used by tests and after layout changes)."""
+    directory = _cache_dir()
+    for name in os.listdir(directory):
+        if name.startswith('brief_') and name.endswith('.pdf'):
+            _unlink(os.path.join(directory, name))
+
+
+def _cache_dir() -> str:
+    directory = (current_app.config.get('REPORT_CACHE_DIR')
+                 or os.path.join(tempfile.gettempdir(), 'showwise-briefs'))
+    os.makedirs(directory, exist_ok=True)
+    return directory
+
+
+def _render_lock(event_id: int) -> threading.Lock:
+    with _render_locks_guard:
+        return _render_locks.setdefault(event_id, threading.Lock())
+
+
+def _unlink(path: str) -> None:
+    try:
+        os.remove(path)
+    except OSError:
+        pass
+
+
+def _load(event_id: int):
+    """The event with schedule, notes and crew in three IN queries, plus crew emails in one."""
+    from extensions import db
     from models import Event, User
-    event = Event.query.get_or_404(event_id)
+    event = (Event.query
+             .options(selectinload(Event.schedules), selectinload(Event.notes),
+                      selectinload(Event.crew_assignments))
+             .filter_by(id=event_id)
+             .first_or_404())
+    names = {a.crew_member for a in event.crew_assignments}
+    crew_emails = dict(db.session.query(User.username, User.email)
+                       .filter(User.username.in_(names))) if names else {}
+    return event, crew_emails
+
+
+def _content_version(event, crew_emails: dict) -> str:
+    """Hash of every value the brief renders."""
+    content = (
+        LAYOUT_VERSION,
+        event.id, event.title, event.description, event.event_date, event.event_end_date,
+        event.location, event.created_by, event.created_at,
+        sorted((s.id, s.scheduled_time, s.title, s.description) for s in event.schedules),
+        sorted((n.id, n.created_by, n.created_at, n.content) for n in event.notes),
+        [(a.id, a.crew_member, a.role, crew_emails.get(a.crew_member))
+         for a in sorted(event.crew_assignments, key=lambda a: a.id)],
+    )
+    return hashlib.sha1(repr(content).encode()).hexdigest()[:20]
+
+
+def _write_brief(path: str, event, crew_emails: dict) -> None:
+    """Render to a temp file, move it into place, then drop older versions of this brief."""
+    directory = os.path.dirname(path)
+    fd, tmp = tempfile.mkstemp(dir=directory, suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            _render(f, event, crew_emails)
+        os.replace(tmp, path)
+    except Exception:
+        _unlink(tmp)
+        raise
+
+    prefix = f"brief_{event.id}_"
+    for name in os.listdir(directory):
+        if name.startswith(prefix) and os.path.join(directory, name) != path:
+            _unlink(os.path.join(directory, name))
 
+
+@functools.lru_cache(maxsize=1)
+def _styles() -> dict:
+    """Paragraph styles shared by every brief; built once per process."""
+    styles = getSampleStyleSheet()
+    return {
+        'title':  ParagraphStyle('Title', parent=styles['Heading1'], fontSize=28,
+                                 textColor=colors.HexColor('#6366f1'), spaceAfter=8,
+                                 spaceBefore=20, alignment=TA_CENTER, fontName='Helvetica-Bold'),
+        'sub':    ParagraphStyle('Sub', parent=styles['Normal'], fontSize=11,
+                                 textColor=colors.HexColor('#6b7280'), spaceAfter=20,
+                                 alignment=TA_CENTER),
+        'sec':    ParagraphStyle('Sec', parent=styles['Heading2'], fontSize=14,
+                                 textColor=colors.HexColor('#1f2937'), spaceAfter=12,
+                                 spaceBefore=20, fontName='Helvetica-Bold'),
+        'body':   ParagraphStyle('Body', parent=styles['Normal'], fontSize=10,
+                                 leading=14, textColor=colors.HexColor('#374151')),
+        'wrap':   ParagraphStyle('Wrap', parent=styles['Normal'], fontSize=9,
+                                 leading=12, textColor=colors.HexColor('#374151')),
+        'small':  ParagraphStyle('Small', parent=styles['Normal'], fontSize=8,
+                                 leading=11, textColor=colors.HexColor('#4b5563')),
+        'note_h': ParagraphStyle('NoteH', parent=styles['Normal'], fontSize=9,
+                                 textColor=colors.HexColor('#78350f'), fontName='Helvetica-Bold'),
+        'note_b': ParagraphStyle('NoteB', parent=styles['Normal'], fontSize=9,
+                                 leading=12, textColor=colors.HexColor('#78350f')),
+    }
+
+
+def _render(out, event, crew_emails: dict) -> None:
     def add_header_footer(canvas, doc):
         canvas.saveState()
         canvas.setFillColorRGB(0.39, 0.49, 0.94)
@@ -30,38 +165,21 @@ def generate_event_pdf(event_id: int):
         canvas.drawRightString(letter[0] - 20 * mm, letter[1] - 25, f"Event ID: {event.id}")
         canvas.setFillColorRGB(0.5, 0.5, 0.5)
         canvas.setFont('Helvetica', 8)
-        canvas.drawString(20 * mm, 15 * mm, f"Generated: {datetime.now().strftime('%B %d, %Y at %I:%M %p')}")
+        canvas.drawString(20 * mm, 15 * mm, f"Generated: {generated}")
         canvas.drawRightString(letter[0] - 20 * mm, 15 * mm, f"Page {canvas.getPageNumber()}")
         canvas.setStrokeColorRGB(0.8, 0.8, 0.8)
         canvas.line(20 * mm, 20 * mm, letter[0] - 20 * mm, 20 * mm)
         canvas.restoreState()
 
-    pdf_buffer = io.BytesIO()
-    doc        = SimpleDocTemplate(pdf_buffer, pagesize=letter,
-                                   topMargin=50, bottomMargin=30,
-                                   leftMargin=20*mm, rightMargin=20*mm)
-    story  = []
-    styles = getSampleStyleSheet()
-
-    title_style = ParagraphStyle('Title', parent=styles['Heading1'], fontSize=28,
-                                  textColor=colors.HexColor('#6366f1'), spaceAfter=8,
-                                  spaceBefore=20, alignment=TA_CENTER, fontName='Helvetica-Bold')
-    sub_style   = ParagraphStyle('Sub', parent=styles['Normal'], fontSize=11,
-                                  textColor=colors.HexColor('#6b7280'), spaceAfter=20,
-                                  alignment=TA_CENTER)
-    sec_style   = ParagraphStyle('Sec', parent=styles['Heading2'], fontSize=14,
-                                  textColor=colors.HexColor('#1f2937'), spaceAfter=12,
-                                  spaceBefore=20, fontName='Helvetica-Bold')
-    body_style  = ParagraphStyle('Body', parent=styles['Normal'], fontSize=10,
-                                  leading=14, textColor=colors.HexColor('#374151'))
-    wrap_style  = ParagraphStyle('Wrap', parent=styles['Normal'], fontSize=9,
-                                  leading=12, textColor=colors.HexColor('#374151'))
-    small_style = ParagraphStyle('Small', parent=styles['Normal'], fontSize=8,
-                                  leading=11, textColor=colors.HexColor('#4b5563'))
-    note_h_sty  = ParagraphStyle('NoteH', parent=styles['Normal'], fontSize=9,
-                                  textColor=colors.HexColor('#78350f'), fontName='Helvetica-Bold')
-    note_b_sty  = ParagraphStyle('NoteB', parent=styles['Normal'], fontSize=9,
-                                  leading=12, textColor=colors.HexColor('#78350f'))
+    generated = datetime.now().strftime('%B %d, %Y at %I:%M %p')
+    doc       = SimpleDocTemplate(out, pagesize=letter,
+                                  topMargin=50, bottomMargin=30,
+                                  leftMargin=20*mm, rightMargin=20*mm)
+    story = []
+    st    = _styles()
+    title_style, sub_style, sec_style   = st['title'], st['sub'], st['sec']
+    body_style, wrap_style, small_style = st['body'], st['wrap'], st['small']
+    note_h_sty, note_b_sty              = st['note_h'], st['note_b']
 
     story.append(Spacer(1, 0.3*inch))
     story.append(Paragraph(event.title, title_style))
@@ -149,11 +267,10 @@ def generate_event_pdf(event_id: int):
                  Paragraph('<b>Role</b>', wrap_style),
                  Paragraph('<b>Contact</b>', wrap_style)]]
         for a in event.crew_assignments:
-            u = User.query.filter_by(username=a.crew_member).first()
             rows.append([
                 Paragraph(a.crew_member, wrap_style),
                 Paragraph(a.role or 'Crew Member', wrap_style),
-                Paragraph(u.email if u and u.email else 'N/A', small_style),
+                Paragraph(crew_emails.get(a.crew_member) or 'N/A', small_style),
             ])
         t = Table(rows, colWidths=[2*inch, 2*inch, 2*inch])
         t.setStyle(TableStyle([
@@ -169,7 +286,3 @@ def generate_event_pdf(event_id: int):
         story.append(Spacer(1, 0.2*inch))
 
     doc.build(story, onFirstPage=add_header_footer, onLaterPages=add_header_footer)
-    pdf_buffer.seek(0)
-    safe_title = re.sub(r'\W+', '_', event.title)
-    filename   = f"{safe_title}_Event_Brief_{event.event_date.strftime('%Y%m%d')}.pdf"
-    return pdf_buffer, filename
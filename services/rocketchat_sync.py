@@ -0,0 +1,71 @@
+"""services/rocketchat_sync.py — ShowWise users ↔ Rocket.Chat accounts.
+
+Each ShowWise username's Rocket.Chat user id is stored in ``rocketchat_user``,
+so the chat info endpoint answers from the database instead of calling
+``users.info`` on every page that embeds chat. ``sync_rocketchat_users``
+pre-provisions everyone: it pages through ``users.list`` once to pick up
+accounts that already exist, then creates only the missing ones.
+"""
+
+from sqlalchemy.exc import IntegrityError
+
+from extensions import db
+from models import RocketChatUser, User
+
+PAGE_SIZE = 100
+
+
+def rocketchat_user_id(user, rc=None) -> str | None:
+    """Mapped Rocket.Chat id for *user*, provisioning (once) if there is none yet."""
+    rc_user_id = (db.session.query(RocketChatUser.rc_user_id)
+                  .filter_by(username=user.username).scalar())
+    if rc_user_id:
+        return rc_user_id
+    if rc is None:
+        from rocketchat_client import get_rocketchat_client
+        rc = get_rocketchat_client()
+    rc_user_id = rc.get_or_create_user(user.username, email=user.email, name=user.username)
+    if rc_user_id:
+        _remember(user.username, rc_user_id)
+    return rc_user_id
+
+
+def sync_rocketchat_users(rc=None, page_size: int = PAGE_SIZE) -> dict:
+    """Map every ShowWise user that has no Rocket.Chat id yet. Returns counts."""
+    if rc is None:
+        from rocketchat_client import get_rocketchat_client
+        rc = get_rocketchat_client()
+    counts  = {'linked': 0, 'created': 0, 'failed': 0}
+    missing = (User.query
+               .filter(~db.session.query(RocketChatUser.id)
+                       .filter(RocketChatUser.username == User.username).exists())
+               .order_by(User.id).all())
+    if not missing:
+        return counts
+
+    existing, offset = {}, 0
+    while True:
+        page, total = rc.list_users(page_size, offset)
+        existing.update(page)
+        offset += page_size
+        if not page or offset >= total:
+            break
+
+    for user in missing:
+        rc_user_id = existing.get(user.username)
+        if rc_user_id:
+            counts['linked'] += 1
+        else:
+            rc_user_id = rc.get_or_create_user(user.username, email=user.email, name=user.username)
+            counts['created' if rc_user_id else 'failed'] += 1
+        if rc_user_id:
+            _remember(user.username, rc_user_id)
+    return counts
+
+
+def _remember(username: str, rc_user_id: str) -> None:
+    try:
+        db.session.add(RocketChatUser(username=username, rc_user_id=rc_user_id))
+        db.session.commit()
+    except IntegrityError:
+        db.session.rollback()           # another worker mapped it first
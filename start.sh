@@ -3,5 +3,8 @@
 # Start the web app in the background
 python app.py &
 
-# Start the Discord bot
+# Start the Discord bot. Both run on this host, so the bot can skip HTTP and
+# call the app's service layer directly; unset this (or use 'http') when the
+# bot runs elsewhere and reaches the app through WEB_APP_URL.
+export DISCORD_BOT_MODE=${DISCORD_BOT_MODE:-inprocess}
 python discord_bot.py
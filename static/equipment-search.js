@@ -0,0 +1,85 @@
+/* static/equipment-search.js — Client for /api/equipment/search.
+ *
+ * Shared by the equipment list, barcode and pick list pages so none of them
+ * has to embed the whole inventory in the HTML.
+ */
+(function () {
+  function query(params) {
+    const qs = new URLSearchParams();
+    Object.entries(params || {}).forEach(([k, v]) => {
+      if (v !== undefined && v !== null && v !== '') qs.set(k, v);
+    });
+    return fetch('/api/equipment/search?' + qs.toString(), { credentials: 'same-origin' })
+      .then(r => r.json());
+  }
+
+  function debounce(fn, ms) {
+    let t = null;
+    return function (...args) {
+      clearTimeout(t);
+      t = setTimeout(() => fn.apply(this, args), ms || 200);
+    };
+  }
+
+  /* A result list fed page by page. `params()` returns the current filters;
+     `onPage(data, append)` renders. Stale responses (the user kept typing)
+     are dropped. When `sentinel` scrolls into view the next page is loaded. */
+  function pager({ params, onPage, perPage, sentinel }) {
+    let seq = 0, page = 1, hasMore = false, loading = false;
+
+    function load(append) {
+      const mine = ++seq;
+      loading = true;
+      return query({ per_page: perPage || 25, ...params(), page }).then(data => {
+        if (mine !== seq) return;
+        loading = false;
+        hasMore = !!data.has_more;
+        onPage(data, append);
+      }).catch(() => { if (mine === seq) loading = false; });
+    }
+
+    if (sentinel && 'IntersectionObserver' in window) {
+      new IntersectionObserver(entries => {
+        if (entries.some(e => e.isIntersecting) && hasMore && !loading) { page += 1; load(true); }
+      }, { rootMargin: '300px' }).observe(sentinel);
+    }
+
+    return {
+      reset() { page = 1; return load(false); },
+      goTo(p) { page = p; return load(false); },
+      more()  { if (hasMore && !loading) { page += 1; return load(true); } },
+    };
+  }
+
+  /* Typeahead: search as the user types, show up to `limit` matches in
+     `resultsEl`, and call `onPick(item)` when one is chosen. */
+  function typeahead({ input, resultsEl, onPick, render, limit }) {
+    let seq = 0;
+    const run = debounce(() => {
+      const q = input.value.trim();
+      if (!q) { resultsEl.innerHTML = ''; resultsEl.style.display = 'none'; return; }
+      const mine = ++seq;
+      query({ q, per_page: limit || 15 }).then(data => {
+        if (mine !== seq) return;
+        resultsEl.innerHTML = '';
+        (data.items || []).forEach(item => {
+          const row = document.createElement('button');
+          row.type = 'button';
+          row.innerHTML = render(item);
+          row.onclick = () => { resultsEl.style.display = 'none'; onPick(item); };
+          resultsEl.appendChild(row);
+        });
+        if (!resultsEl.children.length) resultsEl.innerHTML = '<div class="eqs-none">No matches</div>';
+        resultsEl.style.display = 'block';
+      });
+    }, 180);
+    input.addEventListener('input', run);
+  }
+
+  function esc(s) {
+    return String(s == null ? '' : s).replace(/[&<>"']/g,
+      c => ({ '&': '&amp;', '<': '&lt;', '>': '&gt;', '"': '&quot;', "'": '&#39;' }[c]));
+  }
+
+  window.EquipmentSearch = { query, debounce, pager, typeahead, esc };
+})();
@@ -0,0 +1,128 @@
+"""Availability engine: recurrence expansion, bounds, and the unavailabilities-week endpoint."""
+
+from datetime import datetime
+
+import pytest
+from sqlalchemy import event
+
+from app import create_app
+from extensions import db
+from models import RecurringUnavailability, User, UserUnavailability
+from services.availability import Window, busy_intervals
+
+MONDAY = datetime(2025, 3, 3)
+
+
+def _rule(user, pattern, **kw):
+    kw.setdefault('start_date', datetime(2025, 1, 1))
+    kw.setdefault('start_time', '09:00')
+    kw.setdefault('end_time', '11:30')
+    return RecurringUnavailability(user_id=user.id, title=pattern, pattern_type=pattern, **kw)
+
+
+@pytest.fixture
+def app():
+    app = create_app('testing')
+    with app.app_context():
+        db.create_all()
+        yield app
+        db.session.remove()
+        db.drop_all()
+
+
+@pytest.fixture
+def crew(app):
+    alice = User(username='alice', email='alice@example.com', user_role='crew')
+    bob   = User(username='bob', email='bob@example.com', user_role='crew')
+    admin = User(username='root', email='root@example.com', user_role='admin')
+    db.session.add_all([alice, bob, admin])
+    db.session.commit()
+    return alice, bob, admin
+
+
+def test_window_indexes_weekdays_from_sunday():
+    w = Window(MONDAY, datetime(2025, 3, 10))
+    assert len(w.days) == 7
+    assert w.by_weekday[1] == [0] and w.by_weekday[0] == [6]        # Monday, Sunday
+    assert w.by_monthday[9] == [6]
+
+
+def test_expansion_by_pattern_and_bounds(crew):
+    alice, bob, admin = crew
+    db.session.add_all([
+        _rule(alice, 'weekly', days_of_week='1, 3'),                  # Mon + Wed
+        _rule(alice, 'monthly', day_of_month=15),
+        _rule(bob, 'daily', start_date=datetime(2025, 3, 12), end_date=datetime(2025, 3, 14)),
+        _rule(bob, 'daily', is_active=False),
+        _rule(admin, 'daily'),
+        UserUnavailability(user_id=bob.id, title='Holiday', start_date=datetime(2025, 3, 20),
+                           end_date=datetime(2025, 3, 22)),
+    ])
+    db.session.commit()
+
+    busy = busy_intervals(MONDAY, datetime(2025, 3, 31), role='crew')
+    assert set(busy) == {alice.id, bob.id}
+
+    days = lambda uid, kind: [b.start.day for b in busy[uid] if b.title == kind]
+    assert days(alice.id, 'weekly') == [3, 5, 10, 12, 17, 19, 24, 26]
+    assert days(alice.id, 'monthly') == [15]
+    assert days(bob.id, 'daily') == [12, 13, 14]
+    assert busy[bob.id][0].kind == 'unavailability'
+
+    first = busy[alice.id][0]
+    assert (first.start, first.end) == (datetime(2025, 3, 3, 9), datetime(2025, 3, 3, 11, 30))
+
+    only_bob = busy_intervals(MONDAY, datetime(2025, 3, 31), user_ids=[bob.id])
+    assert set(only_bob) == {bob.id}
+
+
+def test_overnight_rule_ends_next_day(crew):
+    alice = crew[0]
+    db.session.add(_rule(alice, 'daily', start_time='22:00', end_time='02:00'))
+    db.session.commit()
+    (b,) = busy_intervals(MONDAY, datetime(2025, 3, 4))[alice.id]
+    assert (b.start, b.end) == (datetime(2025, 3, 3, 22), datetime(2025, 3, 4, 2))
+
+
+def test_loads_everyone_in_two_queries(crew):
+    for user in crew:
+        db.session.add(_rule(user, 'daily'))
+        db.session.add(UserUnavailability(user_id=user.id, title='Away', start_date=MONDAY,
+                                          end_date=datetime(2025, 3, 4)))
+    db.session.commit()
+    db.session.expire_all()
+
+    statements = []
+    listener = lambda *args: statements.append(args[2])
+    event.listen(db.engine, 'before_cursor_execute', listener)
+    try:
+        busy = busy_intervals(MONDAY, datetime(2025, 3, 10))
+    finally:
+        event.remove(db.engine, 'before_cursor_execute', listener)
+    assert len(statements) == 2
+    assert sum(len(v) for v in busy.values()) == 3 * (1 + 7)
+
+
+def test_week_endpoint_shape(app, crew):
+    alice = crew[0]
+    db.session.add(_rule(alice, 'weekly', days_of_week='1'))
+    db.session.add(UserUnavailability(user_id=alice.id, title='Dentist', start_date=datetime(2025, 3, 4, 8),
+                                      end_date=datetime(2025, 3, 4, 10)))
+    db.session.commit()
+    rule_id = RecurringUnavailability.query.one().id
+
+    client = app.test_client()
+    with client.session_transaction() as sess:
+        sess['_user_id'] = str(alice.id)
+        sess['_fresh']   = True
+
+    assert client.get('/api/unavailabilities-week').status_code == 400
+    data = client.get('/api/unavailabilities-week?start=2025-03-03T00:00:00&end=2025-03-10T00:00:00').get_json()
+    assert data['success'] is True
+    one_off, recurring = data['unavailabilities']
+    assert one_off['type'] == 'unavailability' and one_off['title'] == 'Dentist'
+    assert recurring == {
+        'id': f'rec-{rule_id}-2025-03-03', 'username': 'alice', 'title': 'weekly',
+        'start': '2025-03-03T09:00:00', 'end': '2025-03-03T11:30:00',
+        'description': None, 'is_all_day': False, 'type': 'recurring_unavailability',
+    }
@@ -0,0 +1,271 @@
+"""tests/test_backend_integration.py — Backend client helpers (local stub server only)."""
+
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from backend_integration import ShowWiseBackend, KillSwitchMonitor, LogShipper, OrgConfigCache
+
+
+class FakeBackend(ShowWiseBackend):
+    def __init__(self, result):
+        super().__init__('http://backend.invalid', 'key', 'test-org')
+        self.result = result
+        self.calls  = 0
+
+    def fetch_kill_switch(self):
+        self.calls += 1
+        return self.result
+
+
+def test_kill_switch_state_is_in_memory(tmp_path):
+    backend = FakeBackend((True, 'Unpaid invoice'))
+    monitor = KillSwitchMonitor(backend, poll_interval=30, state_file=str(tmp_path / 'ks.json'))
+    assert monitor.state == (False, '')
+    assert monitor.refresh() == (True, 'Unpaid invoice')
+    for _ in range(100):
+        assert monitor.state == (True, 'Unpaid invoice')
+    assert backend.calls == 1
+
+
+def test_kill_switch_shared_between_workers(tmp_path):
+    state_file = str(tmp_path / 'ks.json')
+    first  = FakeBackend((True, 'Suspended'))
+    second = FakeBackend((False, ''))
+    KillSwitchMonitor(first, poll_interval=30, state_file=state_file).refresh()
+
+    # A new worker adopts the shared state at startup and on its next poll
+    monitor = KillSwitchMonitor(second, poll_interval=30, state_file=state_file)
+    assert monitor.state == (True, 'Suspended')
+    assert monitor.refresh() == (True, 'Suspended')
+    assert second.calls == 0
+
+
+def test_kill_switch_fail_modes(tmp_path):
+    open_mon   = KillSwitchMonitor(FakeBackend(None), poll_interval=30, fail_mode='open',
+                                   state_file=str(tmp_path / 'open.json'))
+    closed_mon = KillSwitchMonitor(FakeBackend(None), poll_interval=30, fail_mode='closed',
+                                   state_file=str(tmp_path / 'closed.json'))
+    assert open_mon.refresh() == (False, '')
+    assert closed_mon.refresh()[0] is True
+
+
+def test_kill_switch_keeps_last_verified_state_until_stale(tmp_path):
+    backend = FakeBackend((False, ''))
+    monitor = KillSwitchMonitor(backend, poll_interval=1, fail_mode='closed',
+                                state_file=str(tmp_path / 'ks.json'))
+    monitor.refresh()
+    backend.result = None
+    time.sleep(0.6)
+    assert monitor.refresh() == (False, '')
+
+    monitor._record['verified_at'] -= monitor.poll_interval * KillSwitchMonitor.STALE_INTERVALS
+    monitor._write_shared({**monitor._record, 'checked_at': 0})
+    assert monitor.refresh()[0] is True
+
+
+def _wait_for(predicate, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if predicate():
+            return True
+        time.sleep(0.01)
+    return False
+
+
+def test_log_is_queued_not_sent_inline():
+    sent, gate = [], threading.Event()
+    backend = ShowWiseBackend('http://backend.invalid', 'key', 'test-org')
+    backend.shipper = LogShipper(lambda entry: gate.wait(5) and not sent.append(entry),
+                                 batch_size=10, flush_interval=0.05)
+
+    started = time.monotonic()
+    for i in range(5):
+        assert backend.log(f'login {i}', log_type='auth') is True
+    assert time.monotonic() - started < 0.5 and sent == []
+
+    gate.set()
+    assert backend.shipper.flush(5)
+    assert [e['message'] for e in sent] == [f'login {i}' for i in range(5)]
+    stats = backend.shipper.stats()
+    assert stats['sent'] == 5 and stats['dropped'] == 0 and stats['avg_latency_ms'] is not None
+    backend.shipper.stop()
+
+
+def test_log_shipper_spills_under_backpressure_and_replays(tmp_path):
+    sent, gate = [], threading.Event()
+    shipper = LogShipper(lambda entry: gate.wait(5) and not sent.append(entry['n']),
+                         max_queue=2, batch_size=1, flush_interval=0.05,
+                         spill_file=str(tmp_path / 'spill.jsonl'))
+    assert all(shipper.submit({'n': n}) for n in range(10))
+    assert shipper.stats()['spilled'] > 0
+
+    gate.set()
+    assert _wait_for(lambda: len(sent) == 10)
+    assert sorted(sent) == list(range(10))
+    assert shipper.stats()['dropped'] == 0
+    shipper.stop()
+
+
+def test_log_shipper_keeps_batch_when_backend_fails(tmp_path):
+    sent, calls = [], []
+
+    def send(entry):
+        calls.append(entry['n'])
+        if len(calls) == 2:                # backend hiccups on the second entry
+            return False
+        sent.append(entry['n'])
+        return True
+
+    shipper = LogShipper(send, batch_size=5, flush_interval=0.05,
+                         spill_file=str(tmp_path / 'spill.jsonl'))
+    shipper.UNHEALTHY_REPLAY = 0.05
+    for n in range(5):
+        shipper.submit({'n': n})
+    assert _wait_for(lambda: sorted(sent) == list(range(5)))
+    stats = shipper.stats()
+    assert stats['failed'] == 1 and stats['replayed'] == 4 and stats['dropped'] == 0
+    shipper.stop()
+
+
+def test_log_shipper_drops_without_spill_file():
+    shipper = LogShipper(lambda entry: False, batch_size=3, flush_interval=0.05)
+    for n in range(3):
+        shipper.submit({'n': n})
+    assert shipper.flush(5)
+    assert shipper.stats()['dropped'] == 3
+    shipper.stop()
+
+
+class StubBackend:
+    """Answers every request with `status` and `body`; records client ports and paths."""
+
+    def __init__(self):
+        self.status, self.body = 200, {'success': True}
+        self.paths, self.ports = [], set()
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+
+            def _answer(self):
+                length = int(self.headers.get('Content-Length') or 0)
+                self.rfile.read(length)
+                stub.paths.append(self.path)
+                stub.ports.add(self.client_address[1])
+                payload = json.dumps(stub.body).encode()
+                self.send_response(stub.status)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(payload)))
+                self.end_headers()
+                self.wfile.write(payload)
+
+            do_GET = do_POST = _answer
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        self.url = f'http://127.0.0.1:{self.server.server_port}'
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+    def close(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+@pytest.fixture
+def stub():
+    s = StubBackend()
+    yield s
+    s.close()
+
+
+def test_backend_reuses_one_connection(stub):
+    backend = ShowWiseBackend(stub.url, 'key', 'test-org')
+    for _ in range(5):
+        assert backend.send_heartbeat()
+        assert backend.send_log({'message': 'hi'})
+    assert len(stub.paths) == 10
+    assert len(stub.ports) == 1
+
+
+def test_circuit_breaker_stops_calls_then_retries_after_cooldown(stub):
+    backend = ShowWiseBackend(stub.url, 'key', 'test-org', failure_threshold=3, cooldown=0.2)
+    stub.status = 500
+    for _ in range(10):
+        assert backend.send_heartbeat() is False
+    assert len(stub.paths) == 3 and backend.breaker.state == 'open'
+
+    time.sleep(0.25)
+    stub.status = 200
+    assert backend.send_heartbeat() is True          # the half-open trial call
+    assert backend.breaker.state == 'closed'
+    assert len(stub.paths) == 4
+
+
+def test_org_config_served_stale_when_backend_fails(stub, tmp_path):
+    backend = ShowWiseBackend(stub.url, 'key', 'test-org')
+    backend.org_cache = OrgConfigCache(backend, cache_file=str(tmp_path / 'org.json'))
+    stub.body = {'success': True, 'organization': {'name': 'Theatre Co'},
+                 'kill_switch_enabled': False}
+    assert backend.get_organization()['name'] == 'Theatre Co'
+    assert backend.fetch_kill_switch() == (False, 'Service suspended')
+
+    stub.status = 503
+    assert backend.get_organization(force_refresh=True)['name'] == 'Theatre Co'
+    # The kill switch must report "unknown" so the monitor's fail mode applies
+    assert backend.fetch_kill_switch() is None
+
+
+class OrgBackend(ShowWiseBackend):
+    """fetch_organization returns `org` (None = backend down) after `delay` seconds."""
+
+    def __init__(self, org=None, delay=0.0):
+        super().__init__('http://backend.invalid', 'key', 'test-org')
+        self.org, self.delay, self.calls = org, delay, 0
+
+    def fetch_organization(self):
+        self.calls += 1
+        time.sleep(self.delay)
+        return self.org
+
+
+def test_org_config_expired_copy_served_while_refreshing(tmp_path):
+    backend = OrgBackend({'name': 'Old'})
+    cache = OrgConfigCache(backend, ttl=0.05, cache_file=str(tmp_path / 'org.json'))
+    assert cache.get() == {'name': 'Old'}                  # first fetch on this host blocks
+    assert backend.calls == 1
+
+    time.sleep(0.06)
+    backend.org, backend.delay = {'name': 'New'}, 0.3
+    started = time.monotonic()
+    assert cache.get() == {'name': 'Old'}                  # expired, but no waiting
+    assert time.monotonic() - started < 0.1
+    assert _wait_for(lambda: cache._record['org'] == {'name': 'New'})
+    assert cache.get() == {'name': 'New'}
+    assert backend.calls == 2
+
+
+def test_org_config_shared_between_workers_and_survives_outage(tmp_path):
+    cache_file = str(tmp_path / 'org.json')
+    first = OrgBackend({'name': 'Theatre Co'})
+    OrgConfigCache(first, cache_file=cache_file).refresh()
+
+    # Another worker, or a restart, reads the copy on disk without calling the backend
+    second = OrgBackend({'name': 'ignored'})
+    assert OrgConfigCache(second, cache_file=cache_file).get() == {'name': 'Theatre Co'}
+    assert second.calls == 0
+
+    # Backend down and the copy expired: it is still served at once
+    down = OrgBackend(None, delay=0.3)
+    cache = OrgConfigCache(down, ttl=0, cache_file=cache_file)
+    started = time.monotonic()
+    assert cache.get() == {'name': 'Theatre Co'}
+    assert time.monotonic() - started < 0.1
+    assert _wait_for(lambda: not cache._refreshing)
+    assert down.calls == 1 and cache.get() == {'name': 'Theatre Co'}
+    assert down.calls == 1                                  # failed refreshes are throttled
@@ -0,0 +1,156 @@
+"""Conflict checks: the interval index, assignment endpoints and the availability APIs."""
+
+import random
+from datetime import datetime, timedelta
+
+import pytest
+
+from app import create_app
+from extensions import db
+from models import (
+    CrewAssignment, Event, RecurringUnavailability, Shift, ShiftAssignment, User,
+    UserUnavailability,
+)
+from services import conflicts
+from services.conflicts import Commitment, IntervalIndex
+
+DAY = datetime(2025, 5, 12)
+
+
+@pytest.fixture
+def app():
+    app = create_app('testing')
+    with app.app_context():
+        db.create_all()
+        conflicts.invalidate_schedule_index()
+        yield app
+        db.session.remove()
+        db.drop_all()
+
+
+@pytest.fixture
+def world(app):
+    """Two crew, an admin, and two evening events with one shift each."""
+    admin = User(username='boss', is_admin=True, user_role='admin')
+    alice = User(username='alice', user_role='crew')
+    bob   = User(username='bob', user_role='crew')
+    gala  = Event(title='Gala', event_date=DAY.replace(hour=18), event_end_date=DAY.replace(hour=23))
+    panto = Event(title='Panto', event_date=DAY.replace(hour=19))              # no end: 3 hours
+    db.session.add_all([admin, alice, bob, gala, panto])
+    db.session.flush()
+    db.session.add_all([
+        Shift(event_id=gala.id, title='Gala load-in', created_by='boss',
+              shift_date=DAY.replace(hour=16), shift_end_date=DAY.replace(hour=20)),
+        Shift(event_id=panto.id, title='Panto fly', created_by='boss',
+              shift_date=DAY.replace(hour=19), shift_end_date=DAY.replace(hour=22)),
+    ])
+    db.session.commit()
+    return admin, alice, bob, gala, panto
+
+
+def _client(app, user):
+    client = app.test_client()
+    with client.session_transaction() as sess:
+        sess['_user_id'] = str(user.id)
+        sess['_fresh']   = True
+    return client
+
+
+def _shift(title):
+    return Shift.query.filter_by(title=title).one()
+
+
+def test_interval_index_matches_brute_force():
+    rng = random.Random(3)
+    items = []
+    for i in range(300):
+        start = DAY + timedelta(minutes=rng.randrange(0, 60 * 24 * 30))
+        items.append(Commitment(1, 'shift', start, start + timedelta(minutes=rng.randrange(1, 60 * 72)),
+                                i, None, f's{i}'))
+    idx = IntervalIndex(items)
+    for _ in range(500):
+        a = DAY + timedelta(minutes=rng.randrange(-600, 60 * 24 * 31))
+        b = a + timedelta(minutes=rng.randrange(1, 600))
+        expected = sorted((c for c in items if c.start < b and c.end > a), key=lambda c: (c.start, c.end))
+        assert idx.overlapping(a, b) == expected
+        assert idx.overlaps(a, b) == bool(expected)
+
+
+def test_assign_shift_rejects_double_booking_unless_overridden(app, world):
+    admin, alice, bob, gala, panto = world
+    db.session.add(ShiftAssignment(shift_id=_shift('Gala load-in').id, user_id=alice.id, status='pending'))
+    db.session.commit()
+
+    client = _client(app, admin)
+    fly = _shift('Panto fly')
+    r = client.post(f'/shifts/{fly.id}/assign', json={'user_id': alice.id})
+    assert r.status_code == 409
+    body = r.get_json()
+    assert [c['title'] for c in body['conflicts']] == ['Gala load-in']
+    assert body['error'].startswith('Scheduling conflict: Gala load-in (shift')
+
+    assert client.post(f'/shifts/{fly.id}/assign', json={'user_id': bob.id}).status_code == 200
+    assert client.post(f'/shifts/{fly.id}/assign', json={'user_id': alice.id, 'override': True}).status_code == 200
+
+
+def test_rejected_assignments_and_own_event_do_not_conflict(app, world):
+    admin, alice, bob, gala, panto = world
+    db.session.add(ShiftAssignment(shift_id=_shift('Panto fly').id, user_id=alice.id, status='rejected'))
+    db.session.add(CrewAssignment(event_id=gala.id, crew_member='Alice'))       # matched case-insensitively
+    db.session.commit()
+
+    client = _client(app, alice)
+    assert client.post(f"/shifts/{_shift('Gala load-in').id}/claim").status_code == 200
+
+    r = client.post('/crew/join-event', json={'event_id': panto.id})
+    assert r.status_code == 409                                     # Gala (event) overlaps the Panto
+    assert {c['kind'] for c in r.get_json()['conflicts']} == {'event', 'shift'}
+
+
+def test_claim_blocked_by_recurring_unavailability(app, world):
+    admin, alice, bob, gala, panto = world
+    db.session.add(RecurringUnavailability(
+        user_id=bob.id, title='Night class', start_time='21:00', end_time='23:00',
+        pattern_type='weekly', days_of_week='1', start_date=DAY - timedelta(days=30)))   # Mondays
+    db.session.commit()
+
+    r = _client(app, bob).post(f"/shifts/{_shift('Panto fly').id}/claim")
+    assert r.status_code == 409
+    assert r.get_json()['conflicts'][0]['kind'] == 'recurring_unavailability'
+    assert ShiftAssignment.query.count() == 0
+
+
+def test_assign_crew_checks_the_event_window(app, world):
+    admin, alice, bob, gala, panto = world
+    db.session.add(UserUnavailability(user_id=bob.id, title='Dentist',
+                                      start_date=DAY.replace(hour=21), end_date=DAY.replace(hour=21, minute=30)))
+    db.session.commit()
+    client = _client(app, admin)
+
+    r = client.post('/crew/assign', json={'event_id': panto.id, 'crew_member': 'bob'})
+    assert r.status_code == 409 and r.get_json()['conflicts'][0]['title'] == 'Dentist'
+    r = client.post('/crew/assign', json={'event_id': panto.id, 'crew_member': 'bob', 'override': True})
+    assert r.status_code == 200
+    assert CrewAssignment.query.filter_by(crew_member='bob').count() == 1
+
+
+def test_free_and_conflict_apis_follow_changes(app, world):
+    admin, alice, bob, gala, panto = world
+    client = _client(app, admin)
+    fly = _shift('Panto fly')
+
+    free = client.get(f'/api/availability/free?shift_id={fly.id}&role=crew').get_json()
+    assert [u['username'] for u in free['free']] == ['alice', 'bob'] and free['busy'] == []
+
+    # Cached index is dropped as soon as a relevant row changes
+    db.session.add(UserUnavailability(user_id=alice.id, title='Wedding', start_date=DAY,
+                                      end_date=DAY + timedelta(days=1)))
+    db.session.commit()
+    free = client.get(f'/api/availability/free?shift_id={fly.id}&role=crew').get_json()
+    assert [u['username'] for u in free['free']] == ['bob']
+    assert free['busy'][0]['conflicts'][0]['title'] == 'Wedding'
+
+    r = client.get(f'/api/availability/conflicts?user_id={alice.id}'
+                   f'&start={DAY.replace(hour=9).isoformat()}&end={DAY.replace(hour=10).isoformat()}')
+    assert r.get_json()['conflict'] is True
+    assert client.get('/api/availability/conflicts').status_code == 400
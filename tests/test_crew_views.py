@@ -0,0 +1,287 @@
+"""tests/test_crew_views.py — Crew pages: correctness and constant query counts."""
+
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import event as sa_event
+
+from app import create_app
+from extensions import db
+from models import User, Event, CrewAssignment, TodoItem
+
+
+@pytest.fixture
+def app():
+    app = create_app('testing')
+    with app.app_context():
+        db.create_all()
+        yield app
+        db.session.remove()
+        db.drop_all()
+
+
+@pytest.fixture
+def user(app):
+    u = User(username='Alice', email='alice@example.com', user_role='crew')
+    db.session.add(u)
+    db.session.commit()
+    return u
+
+
+@pytest.fixture
+def client(app, user):
+    client = app.test_client()
+    with client.session_transaction() as sess:
+        sess['_user_id'] = str(user.id)
+        sess['_fresh']   = True
+    return client
+
+
+@contextmanager
+def count_queries():
+    statements = []
+
+    def _record(conn, cursor, statement, *args):
+        statements.append(statement)
+
+    db.session.expire_all()   # the test client shares this session; start cold
+    sa_event.listen(db.engine, 'before_cursor_execute', _record)
+    try:
+        yield statements
+    finally:
+        sa_event.remove(db.engine, 'before_cursor_execute', _record)
+
+
+def _add_events(n, assign_to=None, start=None):
+    start = start or datetime.now() + timedelta(hours=1)
+    for i in range(n):
+        ev = Event(title=f'Show {i}', event_date=start + timedelta(hours=i), created_by='admin')
+        db.session.add(ev)
+        db.session.flush()
+        db.session.add(CrewAssignment(event_id=ev.id, crew_member='someone', role='LX'))
+        if assign_to:
+            db.session.add(CrewAssignment(event_id=ev.id, crew_member=assign_to, role='Sound'))
+    db.session.commit()
+
+
+# ---------------------------------------------------------------------------
+# Dashboard
+# ---------------------------------------------------------------------------
+
+def test_dashboard_data_matches_case_insensitively(app, user):
+    from services.dashboard_service import get_dashboard_data
+    _add_events(3, assign_to='alice')
+    _add_events(2, start=datetime.now() + timedelta(days=2))
+    db.session.add(TodoItem(user_id=user.id, title='Tape the stage'))
+    db.session.commit()
+
+    data = get_dashboard_data(user)
+    assert len(data['upcoming_events']) == 5
+    assert [e.title for e in data['my_upcoming_events']] == ['Show 0', 'Show 1', 'Show 2']
+    assert data['my_events_this_week'] == 3
+    assert data['events_this_week'] == 5
+    assert data['pending_tasks_count'] == 1
+    assert data['upcoming_events'][0].crew_count == 2
+
+
+def test_dashboard_query_count_is_constant(client):
+    _add_events(2, assign_to='Alice')
+    with count_queries() as small:
+        assert client.get('/dashboard').status_code == 200
+    _add_events(30, assign_to='Alice')
+    with count_queries() as large:
+        assert client.get('/dashboard').status_code == 200
+    assert len(large) == len(small)
+
+
+def test_dashboard_cache_invalidated_on_assignment(app, user):
+    from services.dashboard_service import get_dashboard_data, invalidate_dashboard_cache
+    invalidate_dashboard_cache()
+    _add_events(1)
+    assert get_dashboard_data(user, ttl=60)['my_upcoming_events'] == []
+
+    event_id = Event.query.first().id
+    db.session.add(CrewAssignment(event_id=event_id, crew_member='Alice'))
+    db.session.commit()
+    assert len(get_dashboard_data(user, ttl=60)['my_upcoming_events']) == 1
+
+
+# ---------------------------------------------------------------------------
+# My schedule
+# ---------------------------------------------------------------------------
+
+def _add_shifts(user, n_assigned, n_open):
+    from models import Shift, ShiftAssignment
+    start = datetime.now() + timedelta(days=1)
+    ev = Event(title='Season', event_date=start, created_by='admin')
+    db.session.add(ev)
+    db.session.flush()
+    db.session.add(CrewAssignment(event_id=ev.id, crew_member=user.username, role='LX'))
+    for i in range(n_assigned + n_open):
+        shift = Shift(event_id=ev.id, title=f'Shift {i}', shift_date=start,
+                      shift_end_date=start + timedelta(hours=4), positions_needed=2,
+                      created_by='admin')
+        db.session.add(shift)
+        db.session.flush()
+        if i < n_assigned:
+            db.session.add(ShiftAssignment(shift_id=shift.id, user_id=user.id, status='confirmed'))
+    db.session.commit()
+
+
+def test_my_schedule_query_count_is_constant(client, user):
+    _add_shifts(user, n_assigned=1, n_open=2)
+    with count_queries() as small:
+        assert client.get('/crew/my-schedule').status_code == 200
+    _add_shifts(user, n_assigned=50, n_open=300)
+    with count_queries() as large:
+        r = client.get('/crew/my-schedule')
+        assert r.status_code == 200
+    assert len(large) == len(small)
+    assert b'Shift 349' in r.data
+
+
+# ---------------------------------------------------------------------------
+# Event detail
+# ---------------------------------------------------------------------------
+
+def test_event_detail_query_count_is_constant(client, user):
+    from models import Shift, ShiftAssignment
+
+    def _event_with_shifts(n):
+        start = datetime.now() + timedelta(days=1)
+        ev = Event(title='Gala', event_date=start, created_by='admin')
+        db.session.add(ev)
+        db.session.flush()
+        for i in range(n):
+            shift = Shift(event_id=ev.id, title=f'Shift {i}', shift_date=start,
+                          shift_end_date=start + timedelta(hours=4), created_by='admin')
+            db.session.add(shift)
+            db.session.flush()
+            db.session.add(ShiftAssignment(shift_id=shift.id, user_id=user.id, status='accepted'))
+        db.session.commit()
+        return ev.id
+
+    small_id, large_id = _event_with_shifts(1), _event_with_shifts(25)
+    with count_queries() as small:
+        assert client.get(f'/events/{small_id}').status_code == 200
+    with count_queries() as large:
+        r = client.get(f'/events/{large_id}')
+        assert r.status_code == 200
+    assert len(large) == len(small)
+    assert b'Alice' in r.data
+
+
+# ---------------------------------------------------------------------------
+# Calendar
+# ---------------------------------------------------------------------------
+
+def test_calendar_api_returns_only_the_window(client, user):
+    from models import Shift, ShiftAssignment
+    for month in (1, 2, 3):
+        ev = Event(title=f'Show {month}', event_date=datetime(2031, month, 10, 19), created_by='admin')
+        db.session.add(ev)
+        db.session.flush()
+        shift = Shift(event_id=ev.id, title='Bump in', role='LX', created_by='admin',
+                      shift_date=datetime(2031, month, 10, 9), shift_end_date=datetime(2031, month, 10, 17))
+        db.session.add(shift)
+        db.session.flush()
+        db.session.add(ShiftAssignment(shift_id=shift.id, user_id=user.id, status='confirmed'))
+    db.session.commit()
+
+    r = client.get('/api/calendar?start=2031-02-01&end=2031-03-01')
+    data = r.get_json()
+    assert [e['title'] for e in data['events']] == ['Show 2']
+    assert len(data['shifts']) == 1
+    assert data['shifts'][0]['assigned_users'] == ['Alice']
+
+    assert client.get('/api/calendar?start=2031-03-01&end=2031-02-01').status_code == 400
+    assert client.get('/api/calendar').status_code == 400
+    assert b'Show 2' not in client.get('/calendar').data
+
+
+def test_ics_feed_conditional_and_invalidated(client, user):
+    from services.ics_service import clear_feed_cache
+    clear_feed_cache()
+    _add_events(3)
+    r = client.get('/calendar/ics')
+    assert r.status_code == 200
+    body = r.get_data(as_text=True)
+    assert body.count('BEGIN:VEVENT') == 3 and body.endswith('END:VCALENDAR\r\n')
+    etag = r.headers['ETag']
+
+    with count_queries() as queries:
+        r = client.get('/calendar/ics', headers={'If-None-Match': etag})
+    assert r.status_code == 304 and len(queries) == 1
+    assert client.get('/calendar/ics').get_data(as_text=True) == body
+
+    event = Event.query.first()
+    event.title = 'Renamed'
+    db.session.commit()
+    r = client.get('/calendar/ics', headers={'If-None-Match': etag})
+    assert r.status_code == 200 and 'Renamed' in r.get_data(as_text=True)
+
+    db.session.delete(CrewAssignment.query.first())
+    db.session.commit()
+    assert client.get('/calendar/ics', headers={'If-None-Match': r.headers['ETag']}).status_code == 200
+
+
+def test_personal_ics_feed_only_has_my_events_and_shifts(client, user):
+    _add_events(2, assign_to='alice')
+    _add_events(2, start=datetime.now() + timedelta(days=3))
+    _add_shifts(user, n_assigned=1, n_open=1)
+
+    url = client.post('/calendar/feed-token').get_json()['url']
+    assert client.post('/calendar/feed-token').get_json()['url'] == url
+    token = url.rsplit('/', 1)[1]
+
+    body = client.get(f'/calendar/ics/{token}').get_data(as_text=True)
+    assert body.count('SUMMARY:Show') == 2
+    assert 'SUMMARY:Season - Shift 0' in body and 'Shift 1' not in body
+
+    new_url = client.post('/calendar/feed-token', json={'reset': True}).get_json()['url']
+    assert new_url != url
+    assert client.get(f'/calendar/ics/{token}').status_code == 404
+
+
+# ---------------------------------------------------------------------------
+# Event brief PDF
+# ---------------------------------------------------------------------------
+
+def test_event_brief_cached_until_content_changes(app, client, user, tmp_path, monkeypatch):
+    from models import EventNote
+    from services import report_service
+
+    app.config['REPORT_CACHE_DIR'] = str(tmp_path)
+    _add_events(1, assign_to='Alice')
+    ev = Event.query.first()
+    url = f'/events/{ev.id}/export-pdf'
+
+    renders = []
+    real_render = report_service._render
+    monkeypatch.setattr(report_service, '_render',
+                        lambda *a: (renders.append(1), real_render(*a))[1])
+
+    first = client.get(url)
+    assert first.status_code == 200 and first.data.startswith(b'%PDF')
+    etag = first.headers['ETag']
+    assert client.get(url).data == first.data
+    assert client.get(url, headers={'If-None-Match': etag}).status_code == 304
+    assert len(renders) == 1
+
+    # crew emails come from one query, not one per assignment
+    with count_queries() as statements:
+        client.get(url)
+    assert sum('FROM user' in s for s in statements) <= 2
+
+    db.session.add(EventNote(event_id=ev.id, content='Bring gaff tape', created_by='Alice'))
+    db.session.commit()
+    changed = client.get(url, headers={'If-None-Match': etag})
+    assert changed.status_code == 200 and changed.headers['ETag'] != etag
+    assert len(renders) == 2
+    assert len(list(tmp_path.glob(f'brief_{ev.id}_*.pdf'))) == 1
+
+    user.email = 'alice@new.example.com'
+    db.session.commit()
+    assert client.get(url).headers['ETag'] != changed.headers['ETag']
+    assert len(renders) == 3
@@ -0,0 +1,104 @@
+"""Discord bot calls: the in-process client answers exactly like the HTTP routes."""
+
+import asyncio
+from datetime import datetime, timedelta
+
+import pytest
+
+import discord_client
+from app import create_app
+from discord_client import InProcessClient
+from extensions import db
+from models import CrewAssignment, Event, User
+from routes.discord import DISCORD_BOT_SECRET
+
+
+@pytest.fixture
+def app():
+    app = create_app('testing', background_services=False)
+    with app.app_context():
+        db.create_all()
+        db.session.add(User(username='alice', password_hash='x', discord_id='42'))
+        db.session.add(Event(title='Gala', created_by='admin', location='Main hall',
+                             event_date=datetime.now() + timedelta(days=3)))
+        db.session.commit()
+        yield app
+        db.session.remove()
+        db.drop_all()
+
+
+def _both(app, calls):
+    """Run *calls* through the test client and the in-process client."""
+    http = app.test_client()
+    over_http = []
+    for method, path, payload in calls:
+        r = http.open(path, method=method, json=payload)
+        over_http.append((r.status_code, r.get_json()))
+
+    async def scenario():
+        client = InProcessClient(app, concurrency=2, cache_ttl=0)
+        try:
+            return [await (client.post_json(path, payload) if method == 'POST'
+                           else client.get_json(path)) for method, path, payload in calls]
+        finally:
+            await client.close()
+
+    return over_http, asyncio.run(scenario())
+
+
+def test_inprocess_matches_http(app):
+    event_id = Event.query.one().id
+    join = {'secret': DISCORD_BOT_SECRET, 'event_id': event_id, 'discord_id': '42'}
+    leave = dict(join)
+    calls = [
+        ('GET',  '/discord/check-link/42', None),
+        ('GET',  '/discord/check-link/nobody', None),
+        ('POST', '/discord/join-event', join),
+        ('POST', '/discord/join-event', join),                     # already assigned
+        ('GET',  '/discord/list-events', None),
+        ('GET',  f'/discord/event-crew/{event_id}', None),
+        ('GET',  '/discord/user-events/42', None),
+        ('GET',  '/discord/event-crew/999', None),
+        ('GET',  '/discord/search-equipment/a%20b', None),
+        ('POST', '/discord/join-event', {'event_id': event_id, 'discord_id': '42'}),   # no secret
+        ('POST', '/discord/leave-event', leave),
+    ]
+    over_http, in_process = _both(app, calls)
+
+    assert in_process == over_http
+    assert in_process[0] == (200, {'linked': True, 'username': 'alice', 'event_count': 0})
+    assert in_process[3] == (400, {'error': 'Already assigned'})
+    assert in_process[4][1]['events'][0]['crew_count'] == 1
+    assert in_process[7] == (404, {'error': 'Event not found'})
+    assert in_process[9][0] == 401
+    assert CrewAssignment.query.count() == 0
+
+
+def test_inprocess_rejects_unknown_paths_and_honours_kill_switch(app, monkeypatch):
+    client = InProcessClient(app, concurrency=1)
+    assert client.call('GET', '/login')[0] == 404                  # not a bot endpoint
+    assert client.call('GET', '/discord/nope')[0] == 404
+    assert client.call('GET', '/discord/join-event')[0] == 405
+
+    monkeypatch.setattr(discord_client, '_suspension', lambda: 'billing')
+    assert client.call('GET', '/discord/list-events') == (
+        503, {'error': 'Service suspended', 'reason': 'billing'})
+
+
+def test_cancelled_leading_call_releases_shared_waiters():
+    class SlowClient(discord_client._CachedClient):
+        async def _request(self, method, path, **kwargs):
+            await asyncio.sleep(10)
+
+    async def scenario():
+        client = SlowClient(concurrency=2, cache_ttl=30)
+        leader = asyncio.create_task(client.get_json('/api/events', cache=True))
+        await asyncio.sleep(0)
+        waiter = asyncio.create_task(client.get_json('/api/events', cache=True))
+        await asyncio.sleep(0)
+        leader.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await asyncio.wait_for(waiter, timeout=1)
+        return client._inflight
+
+    assert asyncio.run(scenario()) == {}
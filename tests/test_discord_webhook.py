@@ -0,0 +1,136 @@
+"""Discord webhook dispatcher against a local stub webhook server."""
+
+import json, threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from app import create_app
+from extensions import db
+from models import DiscordDeadLetter
+from services import discord_webhook
+from services.discord_webhook import WebhookDispatcher
+
+
+class StubWebhook:
+    """Records posted bodies; `responses` is a list of (status, headers, body) served in order."""
+
+    def __init__(self):
+        self.bodies, self.responses = [], []
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_POST(self):
+                body = self.rfile.read(int(self.headers['Content-Length']))
+                stub.bodies.append(json.loads(body))
+                status, headers, payload = (stub.responses.pop(0) if stub.responses
+                                            else (204, {'X-RateLimit-Limit': '5',
+                                                        'X-RateLimit-Remaining': '4',
+                                                        'X-RateLimit-Reset-After': '0.01'}, b''))
+                self.send_response(status)
+                for k, v in headers.items():
+                    self.send_header(k, v)
+                self.send_header('Content-Length', str(len(payload)))
+                self.end_headers()
+                self.wfile.write(payload)
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        self.url    = f'http://127.0.0.1:{self.server.server_port}/webhook'
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+    def close(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+@pytest.fixture
+def stub():
+    s = StubWebhook()
+    yield s
+    s.close()
+
+
+@pytest.fixture
+def app():
+    app = create_app('testing')
+    with app.app_context():
+        db.create_all()
+        yield app
+        db.session.remove()
+        db.drop_all()
+
+
+def _announcement(i):
+    return {'embeds': [{'title': f'New Event: Show {i}', 'color': 6366239}]}
+
+
+def test_burst_is_coalesced_into_ten_embed_messages(stub):
+    dispatcher = WebhookDispatcher(stub.url, linger=0.2)
+    futures = [dispatcher.post(_announcement(i)) for i in range(25)]
+    reminder = dispatcher.post({'content': '<@1>', 'embeds': [{'title': 'Tomorrow'}]})
+    assert all(f.result(timeout=10) == (True, None) for f in futures + [reminder])
+
+    sizes = sorted(len(b['embeds']) for b in stub.bodies)
+    assert sizes == [1, 5, 10, 10]
+    assert [b for b in stub.bodies if 'content' in b][0]['content'] == '<@1>'
+    titles = [e['title'] for b in stub.bodies if 'content' not in b for e in b['embeds']]
+    assert titles == [f'New Event: Show {i}' for i in range(25)]
+    dispatcher.close()
+
+
+def test_429_retry_after_is_honoured(stub):
+    slept = []
+    stub.responses = [(429, {'Content-Type': 'application/json'},
+                       json.dumps({'retry_after': 0.05, 'global': False}).encode())]
+    dispatcher = WebhookDispatcher(stub.url, linger=0, sleep=lambda s: slept.append(s))
+    assert dispatcher.post(_announcement(1)).result(timeout=10) == (True, None)
+    assert len(stub.bodies) == 2
+    assert dispatcher.stats['rate_limited'] == 1
+    assert slept and 0 < slept[0] <= 0.05
+    dispatcher.close()
+
+
+def test_bucket_waits_when_headers_say_window_is_exhausted(stub):
+    slept = []
+    stub.responses = [(204, {'X-RateLimit-Remaining': '0', 'X-RateLimit-Reset-After': '0.3'}, b'')]
+    dispatcher = WebhookDispatcher(stub.url, linger=0, sleep=lambda s: slept.append(s))
+    dispatcher.post(_announcement(1)).result(timeout=10)
+    dispatcher.post(_announcement(2)).result(timeout=10)
+    assert slept and slept[0] > 0.2
+    dispatcher.close()
+
+
+def test_permanent_failure_is_dead_lettered_and_redelivered(app, stub, monkeypatch):
+    stub.responses = [(500, {}, b'oops'), (500, {}, b'oops'), (400, {}, b'{"message": "bad"}')]
+    dispatcher = WebhookDispatcher(stub.url, app=app, linger=0, backoff=0.001)
+    ok, error = dispatcher.post(_announcement(1)).result(timeout=10)
+    assert not ok and 'HTTP 400' in error
+    assert len(stub.bodies) == 3 and dispatcher.stats['retried'] == 2
+
+    assert DiscordDeadLetter.query.count() == 1
+    assert json.loads(DiscordDeadLetter.query.first().payload) == _announcement(1)
+
+    # not dead-lettered when the caller tracks retries itself
+    stub.responses = [(404, {}, b'')]
+    assert dispatcher.post(_announcement(2), dead_letter=False).result(timeout=10)[0] is False
+    assert DiscordDeadLetter.query.count() == 1
+
+    monkeypatch.setattr(discord_webhook, '_dispatcher', dispatcher)
+    assert discord_webhook.redeliver_dead_letters(stub.url) == {'delivered': 1, 'remaining': 0}
+    assert DiscordDeadLetter.query.count() == 0
+    dispatcher.close()
+
+
+def test_changing_url_closes_the_old_dispatcher(app, stub, monkeypatch):
+    monkeypatch.setattr(discord_webhook, '_dispatcher', None)
+    old = discord_webhook.get_webhook(stub.url + '?old', app=app)
+    pending = old.post(_announcement(1))
+
+    new = discord_webhook.get_webhook(stub.url, app=app)
+    assert new is not old and discord_webhook.get_webhook(stub.url) is new
+    assert pending.done() and pending.result()[0] is True      # drained, not dropped
+    assert not old._thread.is_alive()
+    new.close()
@@ -0,0 +1,56 @@
+"""Compiled email template renderer."""
+
+import os
+
+import pytest
+
+from services import email_service
+from services.email_service import _render
+
+
+@pytest.fixture
+def templates(tmp_path, monkeypatch):
+    monkeypatch.setattr(email_service, 'TEMPLATES_DIR', str(tmp_path))
+    email_service.clear_template_cache()
+    yield tmp_path
+    email_service.clear_template_cache()
+
+
+def test_blocks_render_like_the_template_language(templates):
+    (templates / 't.html').write_text(
+        "Hi {{ name }}{{ missing }}!"
+        "{% if vip %}VIP{% elif not guest %}crew{% else %}guest{% endif %}"
+        "{% for r in roles %}[{{ r }}{% if name %}:{{ name }}{% endif %}]{% endfor %}"
+        "{{ item.name }}{% cycle %}"
+    )
+    assert _render('t.html', {'name': 'Sam', 'vip': 1, 'roles': ['LX', 'SX']}) == \
+        "Hi Sam!VIP[LX:Sam][SX:Sam]{{ item.name }}{% cycle %}"
+    assert _render('t.html', {'name': None, 'guest': True}) == \
+        "Hi !guest{{ item.name }}{% cycle %}"
+    assert _render('t.html', {}).startswith("Hi !crew")
+
+
+def test_template_is_compiled_once_and_reloaded_when_changed(templates, monkeypatch):
+    path = templates / 't.html'
+    path.write_text("one {{ x }}")
+    compiled = []
+    real_compile = email_service._compile
+    monkeypatch.setattr(email_service, '_compile',
+                        lambda *a: (compiled.append(1), real_compile(*a))[1])
+
+    for _ in range(5):
+        assert _render('t.html', {'x': 1}) == "one 1"
+    assert len(compiled) == 1
+
+    path.write_text("two {{ x }}")
+    st = os.stat(path)
+    os.utime(path, ns=(st.st_atime_ns, st.st_mtime_ns + 1_000_000))
+    assert _render('t.html', {'x': 2}) == "two 2"
+    assert len(compiled) == 2
+
+
+def test_shipped_templates_compile_without_leaking_tags():
+    email_service.clear_template_cache()
+    for name in os.listdir(email_service.TEMPLATES_DIR):
+        html = _render(name, {'event_description': 'Dress run', 'description': 'Gloves'})
+        assert '{%' not in html and '{{' not in html, name
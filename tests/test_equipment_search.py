@@ -0,0 +1,178 @@
+"""tests/test_equipment_search.py — Equipment search API and the pages that use it."""
+
+import pytest
+
+from app import create_app
+from extensions import db
+from models import User, Equipment
+from services import equipment_search
+
+
+@pytest.fixture
+def app():
+    app = create_app('testing')
+    with app.app_context():
+        db.create_all()
+        yield app
+        db.session.remove()
+        db.drop_all()
+
+
+@pytest.fixture
+def client(app):
+    user = User(username='Alice', email='alice@example.com', user_role='crew')
+    db.session.add(user)
+    for i in range(120):
+        db.session.add(Equipment(
+            barcode=f'LX-{i:03d}', name=f'Par Can {i}' if i % 2 else f'Cable {i}',
+            category='Lighting' if i % 2 else 'Cables',
+            location='Store A' if i < 60 else 'Store B',
+        ))
+    db.session.commit()
+    client = app.test_client()
+    with client.session_transaction() as sess:
+        sess['_user_id'] = str(user.id)
+        sess['_fresh']   = True
+    return client
+
+
+def test_search_paginates_and_filters(client):
+    data = client.get('/api/equipment/search?q=par&per_page=25').get_json()
+    assert data['total'] == 60 and len(data['items']) == 25 and data['has_more']
+    assert all('Par Can' in e['name'] for e in data['items'])
+
+    last = client.get('/api/equipment/search?q=par&per_page=25&page=3').get_json()
+    assert len(last['items']) == 10 and not last['has_more']
+
+    data = client.get('/api/equipment/search?category=Cables&location=Store+B').get_json()
+    assert data['total'] == 30
+
+    data = client.get('/api/equipment/search?q=LX-007').get_json()
+    assert [e['barcode'] for e in data['items']] == ['LX-007']
+
+    ids = client.get('/api/equipment/search?q=cable&ids_only=1').get_json()['ids']
+    assert len(ids) == 60
+
+
+@pytest.mark.parametrize('use_fts', [True, False])
+def test_search_index_tracks_edits(client, monkeypatch, use_fts):
+    if use_fts:
+        assert equipment_search.ensure_search_index()
+    else:
+        monkeypatch.setattr(equipment_search, 'ensure_search_index', lambda engine=None: False)
+    item = Equipment.query.filter_by(barcode='LX-001').one()
+    item.name = 'Fresnel'
+    db.session.commit()
+    data = client.get('/api/equipment/search?q=fresn').get_json()
+    assert [e['barcode'] for e in data['items']] == ['LX-001']
+
+    db.session.delete(item)
+    db.session.commit()
+    assert client.get('/api/equipment/search?q=fresnel').get_json()['total'] == 0
+
+
+def test_pages_no_longer_embed_the_inventory(client):
+    for url in ('/equipment', '/picklist'):
+        body = client.get(url).get_data(as_text=True)
+        assert 'LX-042' not in body
+    assert 'LX-042' in client.get('/equipment/export.csv').get_data(as_text=True)
+
+
+# ---------------------------------------------------------------------------
+# CSV import
+# ---------------------------------------------------------------------------
+
+def _upload(client, text, **form):
+    import io
+    data = {'file': (io.BytesIO(text.encode('utf-8')), 'equipment.csv'), **form}
+    return client.post('/equipment/import-csv', data=data, content_type='multipart/form-data')
+
+
+@pytest.fixture
+def admin_client(client):
+    User.query.filter_by(username='Alice').one().is_admin = True
+    db.session.commit()
+    return client
+
+
+def test_csv_import_inserts_in_batches_and_reports_row_errors(admin_client, monkeypatch):
+    from services import equipment_import
+    monkeypatch.setattr(equipment_import, 'BATCH_SIZE', 7)
+    rows = ['Barcode,Name,Qty,Category']
+    rows += [f'NEW-{i},Item {i},{i % 3},Props' for i in range(30)]
+    rows += ['LX-000,Already there,1,', ',No barcode,1,', 'NEW-1,Duplicate,1,']
+    res = _upload(admin_client, '\n'.join(rows)).get_json()
+
+    assert res['success'] and res['imported'] == 30
+    assert res['skipped'] == 3 and res['error_count'] == 2
+    assert [e['row'] for e in res['errors']] == [33, 34]
+    assert Equipment.query.filter_by(barcode='NEW-2').one().quantity_owned == 2
+
+
+def test_csv_import_dry_run_and_upsert(admin_client):
+    csv_text = 'barcode,name,location\nLX-000,Renamed,Dock\nNEW-X,Brand new,Dock\n'
+
+    res = _upload(admin_client, csv_text, mode='upsert', dry_run='1').get_json()
+    assert (res['imported'], res['updated'], res['dry_run']) == (1, 1, True)
+    assert Equipment.query.filter_by(barcode='NEW-X').first() is None
+
+    res = _upload(admin_client, csv_text, mode='upsert').get_json()
+    assert (res['imported'], res['updated']) == (1, 1)
+    db.session.expire_all()
+    item = Equipment.query.filter_by(barcode='LX-000').one()
+    assert (item.name, item.location, item.category) == ('Renamed', 'Dock', 'Cables')
+
+    assert _upload(admin_client, 'title,qty\nx,1\n').status_code == 400
+
+
+# ---------------------------------------------------------------------------
+# QR tag sheets
+# ---------------------------------------------------------------------------
+
+def test_qr_tags_render_as_vectors_from_cache(admin_client, monkeypatch):
+    import tempfile
+    from services import qr_tags
+    qr_tags.clear_qr_cache()
+    monkeypatch.setattr(tempfile, 'NamedTemporaryFile', None)   # no temp-file round trips
+
+    ids = [e.id for e in Equipment.query.limit(30)]
+    r = admin_client.post('/equipment/generate-qrcodes',
+                          json={'equipment_ids': ids, 'layout': 'landscape', 'base_url': 'http://crew'})
+    assert r.status_code == 200 and r.data.startswith(b'%PDF')
+    assert b'/Subtype /Image' not in r.data
+    assert float(r.headers['X-Tags-Per-Second']) > 0
+
+    calls = []
+    monkeypatch.setattr(qr_tags, 'encode_qr', lambda url: calls.append(url))
+    assert len(qr_tags.qr_modules('http://crew', ids)) == 30 and calls == []
+
+
+def test_qr_encoding_in_worker_processes_matches_inline(monkeypatch):
+    from services import qr_tags
+    qr_tags.clear_qr_cache()
+    monkeypatch.setattr(qr_tags, 'PARALLEL_MIN_CODES', 1)
+    try:
+        pooled = qr_tags.qr_modules('http://crew', list(range(1, 6)), workers=2)
+    finally:
+        qr_tags.shutdown_pool()
+        qr_tags.clear_qr_cache()
+    assert pooled[3] == qr_tags.encode_qr(qr_tags.tag_url('http://crew', 3))
+
+
+def test_code128_sheet_is_vector_and_streamed(admin_client):
+    from constants import BARCODE_SIZES
+    from services.file_service import generate_barcode_pdf, iter_barcode_pdf
+
+    items = Equipment.query.order_by(Equipment.id).all()
+    for size in BARCODE_SIZES:
+        buf, filename = generate_barcode_pdf(items, size)
+        pdf = buf.getvalue()
+        assert pdf.startswith(b'%PDF') and b'/Subtype /Image' not in pdf
+        assert filename.endswith('.pdf')
+    assert b''.join(iter_barcode_pdf(iter(items), 'small')).startswith(b'%PDF')
+
+    ids = [e.id for e in items[:40]]
+    r = admin_client.post('/equipment/generate-code128', json={'equipment_ids': ids, 'size': 'large'})
+    assert r.status_code == 200 and r.is_streamed and r.data.startswith(b'%PDF')
+    assert admin_client.post('/equipment/generate-code128',
+                             json={'equipment_ids': ids, 'size': 'huge'}).status_code == 400
@@ -0,0 +1,173 @@
+"""Background mail dispatcher: batching, retries, status and metrics."""
+
+import smtplib, threading
+
+import pytest
+from flask_mail import Message
+
+from app import create_app
+from extensions import db
+from models import Event, User
+from services import mail_queue
+from services.mail_queue import MailDispatcher
+
+
+class FakeSMTP:
+    """Stands in for Flask-Mail: counts connections and can fail on demand."""
+
+    def __init__(self, fail=None):
+        self.connections = 0
+        self.sent        = []
+        self.fail        = fail or (lambda msg, attempt: None)
+        self.attempts    = {}
+        self.lock        = threading.Lock()
+
+    def connect(self):
+        fake = self
+
+        class _Conn:
+            def __enter__(self):
+                with fake.lock:
+                    fake.connections += 1
+                return self
+
+            def __exit__(self, *exc):
+                return False
+
+            def send(self, msg):
+                n = fake.attempts[msg.subject] = fake.attempts.get(msg.subject, 0) + 1
+                exc = fake.fail(msg, n)
+                if exc:
+                    raise exc
+                fake.sent.append(msg.subject)
+
+        return _Conn()
+
+
+@pytest.fixture
+def app():
+    app = create_app('testing')
+    app.config['MAIL_DEFAULT_SENDER'] = 'noreply@example.com'
+    with app.app_context():
+        db.create_all()
+        yield app
+        db.session.remove()
+        db.drop_all()
+
+
+def _msg(subject):
+    return Message(subject, recipients=['crew@example.com'], body='hi',
+                   sender='noreply@example.com')
+
+
+def test_batches_share_one_connection_and_report_metrics(app, monkeypatch):
+    metrics = []
+    monkeypatch.setattr(mail_queue, '_metrics_hook', lambda name, value: metrics.append(name))
+    smtp = FakeSMTP()
+    dispatcher = MailDispatcher(app, smtp, batch_size=50)
+
+    # fill the queue before the worker starts so it drains in one batch
+    dispatcher._ensure_worker = lambda: None
+    ids = [dispatcher.enqueue(_msg(f'm{i}')) for i in range(30)]
+    del dispatcher._ensure_worker
+    dispatcher._ensure_worker()
+    assert dispatcher.flush(5)
+
+    assert sorted(smtp.sent) == sorted(f'm{i}' for i in range(30))
+    assert smtp.connections == 1
+    assert all(dispatcher.status(i)['status'] == 'sent' for i in ids)
+    stats = dispatcher.stats()
+    assert stats['sent'] == 30 and stats['queue_depth'] == 0 and stats['avg_latency_ms'] is not None
+    assert 'mail.queue_depth' in metrics and 'mail.send_latency' in metrics
+    dispatcher.shutdown()
+
+
+def test_transient_failures_retry_with_backoff_permanent_ones_fail(app):
+    def fail(msg, attempt):
+        if msg.subject == 'flaky' and attempt < 3:
+            return smtplib.SMTPResponseException(421, b'try later')
+        if msg.subject == 'bad':
+            return smtplib.SMTPRecipientsRefused({'x@example.com': (550, b'no such user')})
+
+    smtp = FakeSMTP(fail)
+    dispatcher = MailDispatcher(app, smtp, backoff=0.01, max_retries=4)
+    flaky, bad = dispatcher.enqueue(_msg('flaky')), dispatcher.enqueue(_msg('bad'))
+    assert dispatcher.flush(5)
+
+    assert dispatcher.status(flaky)['status'] == 'sent'
+    assert dispatcher.status(flaky)['attempts'] == 3
+    assert dispatcher.status(bad)['status'] == 'failed'
+    assert smtp.attempts['bad'] == 1
+    assert dispatcher.stats()['retried'] == 2
+    dispatcher.shutdown()
+
+
+def test_dropped_connection_resends_rest_of_batch_on_new_connection(app):
+    smtp = FakeSMTP(lambda msg, n: smtplib.SMTPServerDisconnected('gone')
+                    if msg.subject == 'm1' and n == 1 else None)
+    dispatcher = MailDispatcher(app, smtp, backoff=0.01)
+    dispatcher._ensure_worker = lambda: None
+    for i in range(4):
+        dispatcher.enqueue(_msg(f'm{i}'))
+    del dispatcher._ensure_worker
+    dispatcher._ensure_worker()
+    assert dispatcher.flush(5)
+    assert sorted(smtp.sent) == ['m0', 'm1', 'm2', 'm3']
+    dispatcher.shutdown()
+
+
+def test_refused_connections_back_off_and_end_in_failed(app):
+    class RefusingSMTP:
+        connections = 0
+
+        def connect(self):
+            RefusingSMTP.connections += 1
+            raise ConnectionRefusedError(111, 'Connection refused')
+
+    dispatcher = MailDispatcher(app, RefusingSMTP(), backoff=0.01, max_retries=3)
+    mid = dispatcher.enqueue(_msg('outage'))
+    assert dispatcher.flush(5)
+
+    status = dispatcher.status(mid)
+    assert status['status'] == 'failed' and status['attempts'] == 3
+    assert RefusingSMTP.connections == 3
+    stats = dispatcher.stats()
+    assert stats['retried'] == 2 and stats['failed'] == 1
+    dispatcher.shutdown()
+
+
+def test_full_queue_drops_instead_of_blocking(app):
+    dispatcher = MailDispatcher(app, FakeSMTP(), maxsize=1, enqueue_timeout=0.01)
+    dispatcher._ensure_worker = lambda: None
+    assert dispatcher.enqueue(_msg('a'))
+    assert dispatcher.enqueue(_msg('b')) is None
+    assert dispatcher.stats()['dropped'] == 1
+
+
+def test_assign_all_crew_only_enqueues(app, monkeypatch):
+    app.config['MAIL_USERNAME'] = 'mailer'
+    smtp = FakeSMTP()
+    dispatcher = MailDispatcher(app, smtp)
+    monkeypatch.setattr(mail_queue, '_dispatcher', dispatcher)
+
+    admin = User(username='boss', email='boss@example.com', user_role='crew', is_admin=True)
+    db.session.add(admin)
+    db.session.add_all(User(username=f'c{i}', email=f'c{i}@example.com', user_role='crew')
+                       for i in range(12))
+    from datetime import datetime
+    ev = Event(title='Gala', event_date=datetime(2030, 1, 1, 19), created_by='boss')
+    db.session.add(ev)
+    db.session.commit()
+
+    client = app.test_client()
+    with client.session_transaction() as sess:
+        sess['_user_id'] = str(admin.id)
+        sess['_fresh']   = True
+    r = client.post('/crew/assign-all', json={'event_id': ev.id})
+    assert r.get_json()['added'] == 13
+
+    assert dispatcher.flush(5)
+    assert len(smtp.sent) == 13 and smtp.connections <= 2
+    r = client.get('/admin/mail-queue')
+    assert r.get_json()['stats']['sent'] == 13
+    dispatcher.shutdown()
@@ -0,0 +1,453 @@
+"""Recurring series stored as a rule: expansion, materialising occurrences, feeds and migration."""
+
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import event as sa_event
+
+from app import create_app
+from extensions import db
+from models import CrewAssignment, Event, EventReminder, OccurrenceReminder, User
+from services import conflicts, recurrence
+from services.recurrence import Occurrence, occurrence_ref
+
+MON = datetime(2025, 5, 12, 19, 0)
+
+
+@pytest.fixture
+def app():
+    app = create_app('testing')
+    with app.app_context():
+        db.create_all()
+        conflicts.invalidate_schedule_index()
+        yield app
+        db.session.remove()
+        db.drop_all()
+
+
+@pytest.fixture
+def admin(app):
+    user = User(username='boss', is_admin=True, user_role='admin')
+    db.session.add(user)
+    db.session.commit()
+    return user
+
+
+def _client(app, user):
+    client = app.test_client()
+    with client.session_transaction() as sess:
+        sess['_user_id'] = str(user.id)
+        sess['_fresh']   = True
+    return client
+
+
+def _series(pattern='weekly', start=MON, **kw):
+    ev = Event(title='Rehearsal', created_by='boss', event_date=start,
+               event_end_date=start + timedelta(hours=2), recurrence_pattern=pattern, **kw)
+    db.session.add(ev)
+    db.session.commit()
+    return ev
+
+
+def _calendar(client, start, end):
+    r = client.get(f'/api/calendar?start={start.date().isoformat()}&end={end.date().isoformat()}')
+    assert r.status_code == 200
+    return r.get_json()['events']
+
+
+def _slot(dt):
+    return dt.strftime(recurrence.SLOT_FORMAT)
+
+
+def test_monthly_and_yearly_keep_their_day():
+    monthly = Event(event_date=datetime(2025, 1, 31, 20), recurrence_pattern='monthly')
+    assert [recurrence.occurrence_start(monthly, n).date().isoformat() for n in range(4)] == \
+        ['2025-01-31', '2025-02-28', '2025-03-31', '2025-04-30']
+    leap = Event(event_date=datetime(2024, 2, 29, 20), recurrence_pattern='yearly')
+    assert [recurrence.occurrence_start(leap, n).date().isoformat() for n in range(5)] == \
+        ['2024-02-29', '2025-02-28', '2026-02-28', '2027-02-28', '2028-02-29']
+    assert recurrence.rrule(monthly).startswith('FREQ=MONTHLY;INTERVAL=1;BYMONTHDAY=28,29,30,31;BYSETPOS=-1')
+
+
+@pytest.mark.parametrize('pattern,interval', [('daily', 3), ('weekly', 1), ('biweekly', 2),
+                                              ('monthly', 2), ('yearly', 1)])
+def test_window_expansion_matches_walking_the_series(pattern, interval):
+    series = Event(id=1, event_date=datetime(2024, 1, 31, 9), recurrence_pattern=pattern,
+                   recurrence_interval=interval, recurrence_end_date=datetime(2031, 6, 1))
+    every = [recurrence.occurrence_start(series, n) for n in range(recurrence.occurrence_count(series))]
+    assert every[-1] <= series.recurrence_end_date < recurrence.occurrence_start(series, len(every))
+    for lo, hi in ((datetime(2024, 3, 1), datetime(2024, 4, 1)), (datetime(2027, 2, 20), datetime(2028, 3, 1)),
+                   (datetime(2031, 5, 1), datetime(2032, 1, 1))):
+        got = [o.event_date for o in recurrence.occurrences(series, lo, hi)]
+        assert got == [d for d in every[1:] if lo <= d < hi]
+
+
+def test_creating_a_series_writes_one_row(app, admin):
+    client = _client(app, admin)
+    r = client.post('/events/create-recurring', json={
+        'title': 'Rehearsal', 'event_date': MON.isoformat(), 'recurrence_pattern': 'daily',
+        'recurrence_count': 1000})
+    assert r.status_code == 200
+    assert Event.query.count() == 1
+
+    late = MON + timedelta(days=900)
+    events = _calendar(client, late, late + timedelta(days=7))
+    assert len(events) == 7 and all(e['virtual'] and e['series_id'] == r.get_json()['id'] for e in events)
+    assert events[0]['id'] == occurrence_ref(r.get_json()['id'], late.replace(hour=19))
+    assert client.post('/events/create-recurring', json={
+        'title': 'x', 'event_date': MON.isoformat(), 'recurrence_pattern': 'hourly'}).status_code == 400
+
+
+def test_opening_an_occurrence_materialises_it_once(app, admin):
+    series = _series(recurrence_count=10)
+    client = _client(app, admin)
+    second = MON + timedelta(weeks=1)
+
+    r = client.get(f'/events/{series.id}/occurrences/{_slot(second)}')
+    assert r.status_code == 302
+    row = Event.query.filter_by(recurring_event_id=series.id).one()
+    assert r.headers['Location'].endswith(f'/events/{row.id}')
+    assert (row.recurrence_id, row.event_end_date) == (second, second + timedelta(hours=2))
+    assert client.get(f'/events/{series.id}/occurrences/{_slot(second)}').headers['Location'] == r.headers['Location']
+    assert Event.query.count() == 2
+
+    events = _calendar(client, MON, MON + timedelta(weeks=3))
+    assert [(e['id'], e['virtual']) for e in events] == [
+        (series.id, False), (row.id, False), (occurrence_ref(series.id, MON + timedelta(weeks=2)), True)]
+    assert client.get(f'/events/{series.id}/occurrences/{_slot(MON + timedelta(weeks=10))}').status_code == 404
+    assert client.get(f'/events/{series.id}/occurrences/{_slot(second + timedelta(hours=1))}').status_code == 404
+
+
+def test_cancelled_occurrences_stay_gone(app, admin):
+    series = _series()
+    client = _client(app, admin)
+    week2, week3 = MON + timedelta(weeks=2), MON + timedelta(weeks=3)
+
+    assert client.delete(f'/events/{series.id}/occurrences/{_slot(week2)}').status_code == 200
+    row = recurrence.materialise(recurrence.find_occurrence(occurrence_ref(series.id, week3)))
+    assert client.delete(f'/events/{row.id}').status_code == 200
+
+    starts = [e['start'] for e in _calendar(client, MON, MON + timedelta(weeks=5))]
+    assert starts == [d.isoformat() for d in (MON, MON + timedelta(weeks=1), MON + timedelta(weeks=4))]
+    assert recurrence.exdates(db.session.get(Event, series.id)) == {week2, week3}
+
+
+def test_cancelling_the_first_occurrence_hides_the_series_row(app, admin, monkeypatch):
+    from services import notification_service
+    from services.dashboard_service import get_dashboard_data
+    from services.notification_service import ReminderScheduler, sync_event_reminders
+    posted = []
+    monkeypatch.setattr(notification_service, '_post_reminder',
+                        lambda event, kind: (posted.append((event.id, kind)), (True, None))[1])
+    start  = datetime.now().replace(microsecond=0) + timedelta(days=3)
+    series = _series(start=start, recurrence_count=3)
+    sync_event_reminders(series)
+    db.session.commit()
+    client = _client(app, admin)
+
+    assert client.delete(f'/events/{series.id}/occurrences/{_slot(start)}').status_code == 200
+    assert {r.status for r in EventReminder.query.filter_by(event_id=series.id)} == {'skipped'}
+    assert notification_service.backfill_reminders() == 0
+
+    # A reminder left pending (e.g. by an older cancel) is still not posted
+    EventReminder.query.filter_by(event_id=series.id).update({'status': 'pending'})
+    db.session.commit()
+    ReminderScheduler(app).run_due(start - timedelta(minutes=1))
+    assert posted == [] and {r.status for r in EventReminder.query.filter_by(event_id=series.id)} == {'skipped'}
+
+    later = [(start + timedelta(weeks=n)).isoformat() for n in (1, 2)]
+    assert [e['start'] for e in _calendar(client, start - timedelta(days=1), start + timedelta(weeks=3))] == later
+    dashboard = get_dashboard_data(admin, now=start - timedelta(days=1))
+    assert [e.event_date.isoformat() for e in dashboard['upcoming_events']] == later
+    assert dashboard['events_this_week'] == 0                    # the next one is a week out
+    assert [e.event_date for e in recurrence.upcoming(start - timedelta(days=1), 5)] == \
+        [start + timedelta(weeks=n) for n in (1, 2)]
+
+
+def test_joining_an_occurrence_gives_it_a_row(app):
+    series = _series('daily')
+    crew = User(username='alice', user_role='crew')
+    db.session.add(crew)
+    db.session.commit()
+
+    ref = occurrence_ref(series.id, MON + timedelta(days=3))
+    r = _client(app, crew).post('/crew/join-event', json={'event_id': ref})
+    assert r.status_code == 200
+    row = Event.query.filter_by(recurring_event_id=series.id).one()
+    assert CrewAssignment.query.filter_by(event_id=row.id, crew_member='alice').count() == 1
+    assert recurrence.find_occurrence(ref) == row
+
+
+def test_discord_lists_and_joins_occurrences(app):
+    from services import discord_service
+    start = datetime.now().replace(microsecond=0) + timedelta(hours=1)
+    series = _series('daily', start=start)
+    db.session.add(Event(title='Get-in', created_by='boss', event_date=start + timedelta(days=2, hours=1)))
+    crew = User(username='alice', user_role='crew', discord_id='42')
+    db.session.add(crew)
+    db.session.commit()
+
+    data, status = discord_service.list_events({})
+    assert status == 200
+    listed = data['events']
+    assert [e['title'] for e in listed[:4]] == ['Rehearsal', 'Rehearsal', 'Rehearsal', 'Get-in']
+    assert len(listed) == 10 and listed[1]['id'] == occurrence_ref(series.id, start + timedelta(days=1))
+
+    assert discord_service.join_event({'event_id': listed[1]['id'], 'discord_id': '42'}) == ({'success': True}, 200)
+    row = Event.query.filter_by(recurring_event_id=series.id).one()
+    assert CrewAssignment.query.filter_by(event_id=row.id, crew_member='alice').count() == 1
+    assert discord_service.list_events({})[0]['events'][1] == dict(listed[1], id=row.id, crew_count=1)
+
+
+def test_upcoming_lists_include_occurrences(app, admin):
+    start = datetime.now().replace(microsecond=0) + timedelta(hours=1)
+    series = _series('weekly', start=start, recurrence_count=3)
+    client = _client(app, admin)
+
+    page = client.get('/admin/overview').get_data(as_text=True)
+    assert page.count('Rehearsal') == 3
+    assert recurrence.occurrence_path(series.id, start + timedelta(weeks=2)) in page
+
+    ref = occurrence_ref(series.id, start + timedelta(weeks=1))
+    assert ref in client.get('/shifts/management').get_data(as_text=True)
+    shift_start = start + timedelta(weeks=1)
+    r = client.post('/shifts/add', json={'event_id': ref, 'title': 'Load-in', 'shift_date': 'soon',
+                                         'shift_end_date': shift_start.isoformat()})
+    assert r.status_code == 400 and Event.query.count() == 1     # nothing materialised
+    commits = []
+    on_commit = commits.append
+    sa_event.listen(db.session, 'after_commit', on_commit)
+    r = client.post('/shifts/add', json={'event_id': ref, 'title': 'Load-in',
+                                         'shift_date': shift_start.isoformat(),
+                                         'shift_end_date': (shift_start + timedelta(hours=2)).isoformat()})
+    sa_event.remove(db.session, 'after_commit', on_commit)
+    assert r.status_code == 200 and len(commits) == 1           # the row and its shift together
+    row = Event.query.filter_by(recurring_event_id=series.id).one()
+    assert (row.recurrence_id, [s.title for s in row.shifts]) == (shift_start, ['Load-in'])
+
+
+def test_shared_feed_has_one_rule_with_overrides(app, admin):
+    series = _series(recurrence_count=6)
+    recurrence.add_exdate(series, MON + timedelta(weeks=4))
+    row = recurrence.materialise(Occurrence(series, MON + timedelta(weeks=1)))
+    row.event_date = row.event_date + timedelta(hours=1)              # moved to 20:00
+    db.session.add(CrewAssignment(event_id=row.id, crew_member='alice'))
+    db.session.commit()
+
+    body = app.test_client().get('/calendar/ics').get_data(as_text=True)
+    assert body.count('BEGIN:VEVENT') == 2
+    assert f'UID:{row.id}-showwise' not in body and body.count(f'UID:{series.id}-showwise') == 2
+    assert 'RRULE:FREQ=WEEKLY;INTERVAL=1;COUNT=6' in body
+    assert 'EXDATE;TZID=Australia/Sydney:20250609T190000' in body
+    assert 'RECURRENCE-ID;TZID=Australia/Sydney:20250519T190000' in body
+    assert 'DTSTART;TZID=Australia/Sydney:20250519T200000' in body
+
+
+def test_occurrences_are_reminded_without_rows(app, monkeypatch):
+    from services import notification_service
+    from services.notification_service import ReminderScheduler
+    monkeypatch.setattr(notification_service, 'DISCORD_WEBHOOK_URL', 'https://discord.invalid/hook')
+    posted = []
+    monkeypatch.setattr(notification_service, '_post_reminder',
+                        lambda event, kind: (posted.append((event.id, kind)), (True, None))[1])
+    now = datetime.now().replace(microsecond=0)
+    series = _series('daily', start=now - timedelta(days=30) + timedelta(minutes=30))
+
+    notification_service.backfill_reminders(now)
+    notification_service.backfill_reminders(now)                    # idempotent
+    assert Event.query.count() == 1
+    reminders = OccurrenceReminder.query.order_by(OccurrenceReminder.slot).all()
+    # Today's occurrence has nothing left to send
+    assert len({r.slot for r in reminders}) == 7 and reminders[0].slot > now + timedelta(days=1)
+    assert {r.kind for r in reminders if r.slot == reminders[-1].slot} == {'1_week_before', '1_day_before', 'event_today'}
+
+    # Opening an occurrence hands its reminders over to the new row
+    tomorrow = reminders[0].slot + timedelta(days=1)
+    row = recurrence.materialise(recurrence.find_occurrence(occurrence_ref(series.id, tomorrow)))
+    assert OccurrenceReminder.query.filter_by(slot=tomorrow).count() == 0
+    assert {r.kind for r in EventReminder.query.filter_by(event_id=row.id)} == {'1_day_before', 'event_today'}
+
+    first = reminders[0]
+    ReminderScheduler(app).run_due(first.due_at + timedelta(seconds=1))
+    assert (occurrence_ref(series.id, first.slot), first.kind) in posted
+    assert db.session.get(OccurrenceReminder, first.id).status == 'sent'
+
+
+def _legacy_rows(series, dates):
+    """Rows as the old eager expansion wrote them for *series*."""
+    rows = [Event(title=series.title, event_date=d, event_end_date=d + recurrence.duration(series),
+                  created_by=series.created_by, is_recurring_instance=True, recurring_event_id=series.id)
+            for d in dates]
+    db.session.add_all(rows)
+    db.session.flush()
+    return rows
+
+
+def test_collapse_instances_keeps_only_rows_with_their_own_data(app):
+    series = _series(recurrence_count=4)
+    bare, crewed, last = _legacy_rows(series, [MON + timedelta(weeks=n) for n in (1, 2, 3)])
+    db.session.add_all([CrewAssignment(event_id=crewed.id, crew_member='alice'),
+                        EventReminder(event_id=bare.id, kind='1_day_before', due_at=MON)])
+    db.session.commit()
+
+    assert recurrence.collapse_instances() == (1, 2)
+    assert [e.id for e in Event.query.order_by(Event.id)] == [series.id, crewed.id]
+    assert crewed.recurrence_id == crewed.event_date
+    assert [e.event_date for e in recurrence.events_in_window(MON, MON + timedelta(weeks=5))] == \
+        [MON + timedelta(weeks=n) for n in range(4)]
+
+
+def test_collapse_instances_keys_rows_by_position_and_keeps_edits(app):
+    weekly  = _series(recurrence_count=5)
+    rows    = _legacy_rows(weekly, [MON + timedelta(weeks=n) for n in (1, 2, 4)])   # week 3 was deleted
+    moved, renamed, _ = rows
+    moved.event_date += timedelta(hours=1)
+    moved.event_end_date += timedelta(hours=1)
+    renamed.location = 'Studio'
+    db.session.add(CrewAssignment(event_id=moved.id, crew_member='alice'))
+
+    jan31   = datetime(2025, 1, 31, 19)
+    monthly = _series('monthly', start=jan31, recurrence_count=3)
+    feb, mar = _legacy_rows(monthly, recurrence._legacy_dates(monthly)[1:])
+    assert (feb.event_date, mar.event_date) == (jan31, jan31)          # what the old generator wrote
+    db.session.add(CrewAssignment(event_id=mar.id, crew_member='alice'))
+    db.session.commit()
+
+    assert recurrence.collapse_instances() == (3, 2)
+    assert (moved.recurrence_id, renamed.recurrence_id) == (MON + timedelta(weeks=1), MON + timedelta(weeks=2))
+    assert recurrence.exdates(weekly) == {MON + timedelta(weeks=3)}
+    assert [(e.event_date, e.location) for e in recurrence.events_in_window(MON, MON + timedelta(weeks=6))
+            if e.recurring_event_id in (None, weekly.id) and e.event_date >= MON] == \
+        [(MON, None), (MON + timedelta(weeks=1, hours=1), None), (MON + timedelta(weeks=2), 'Studio'),
+         (MON + timedelta(weeks=4), None)]
+
+    # The third row is the third occurrence, whatever date the old generator gave it
+    assert (mar.recurrence_id, mar.event_date) == (datetime(2025, 3, 31, 19),) * 2
+    assert db.session.get(Event, feb.id) is None
+    assert [e.event_date for e in recurrence.events_in_window(jan31, jan31 + timedelta(days=60))] == \
+        [jan31, datetime(2025, 2, 28, 19), datetime(2025, 3, 31, 19)]
+
+
+def test_edit_following_splits_the_series(app, admin):
+    series = _series(recurrence_count=6, location='Hall')
+    client = _client(app, admin)
+    week1, week3, week4 = (MON + timedelta(weeks=n) for n in (1, 3, 4))
+    early = recurrence.materialise(Occurrence(series, week1))
+    late  = recurrence.materialise(Occurrence(series, week4))
+    db.session.add_all([EventReminder(event_id=late.id, kind='1_day_before', due_at=week4 - timedelta(days=1),
+                                      status='sent'),
+                        EventReminder(event_id=early.id, kind='1_day_before', due_at=week1 - timedelta(days=1))])
+    recurrence.add_exdate(series, MON + timedelta(weeks=5))
+    db.session.commit()
+
+    r = client.put(f'/events/{occurrence_ref(series.id, week3)}/following',
+                   json={'location': 'Studio', 'shift_minutes': 30})
+    assert r.status_code == 200
+    head = db.session.get(Event, r.get_json()['series_id'])
+    assert (head.event_date, head.recurrence_count, recurrence.exdates(head)) == \
+        (week3 + timedelta(minutes=30), 3, {MON + timedelta(weeks=5, minutes=30)})
+    assert db.session.get(Event, series.id).recurrence_count == 3
+
+    late, early = db.session.get(Event, late.id), db.session.get(Event, early.id)
+    assert (late.recurring_event_id, late.recurrence_id, late.event_date, late.location) == \
+        (head.id, week4 + timedelta(minutes=30), week4 + timedelta(minutes=30), 'Studio')
+    assert (early.event_date, early.location) == (week1, 'Hall')
+    assert [(e.event_date.isoformat(), e.location) for e in recurrence.events_in_window(MON, MON + timedelta(weeks=7))] \
+        == [(MON.isoformat(), 'Hall'), (week1.isoformat(), 'Hall'), ((MON + timedelta(weeks=2)).isoformat(), 'Hall'),
+            ((week3 + timedelta(minutes=30)).isoformat(), 'Studio'), ((week4 + timedelta(minutes=30)).isoformat(), 'Studio')]
+    # Moved rows get their reminders recomputed (the past one is dropped); earlier rows keep theirs
+    assert EventReminder.query.filter_by(event_id=late.id).count() == 0
+    assert EventReminder.query.filter_by(event_id=early.id).one().due_at == week1 - timedelta(days=1)
+
+
+def test_splitting_at_a_row_edited_on_its_own_keeps_it_as_an_override(app, admin):
+    series = _series(recurrence_count=6)
+    week1, week3 = MON + timedelta(weeks=1), MON + timedelta(weeks=3)
+    moved = recurrence.materialise(Occurrence(series, week1))
+    recurrence.materialise(Occurrence(series, week3))
+    db.session.add(CrewAssignment(event_id=moved.id, crew_member='alice'))
+    moved.event_date, moved.event_end_date = week1 + timedelta(hours=1), week1 + timedelta(hours=3)
+    db.session.commit()
+
+    head = recurrence.edit_following(*recurrence.series_position(moved), {'title': 'New'})
+    db.session.commit()
+    assert head.id != moved.id and (head.event_date, recurrence.exdates(head)) == (week1, {week1})
+    moved = db.session.get(Event, moved.id)
+    assert (moved.recurring_event_id, moved.recurrence_id, moved.title) == (head.id, week1, 'New')
+    assert [c.crew_member for c in moved.crew_assignments] == ['alice']
+    # Only the title changed: every other week keeps its time and shows once
+    assert [(e.event_date, e.title) for e in recurrence.events_in_window(MON, MON + timedelta(weeks=7))] == \
+        [(MON, 'Rehearsal'), (week1 + timedelta(hours=1), 'New')] + \
+        [(MON + timedelta(weeks=n), 'New') for n in range(2, 6)]
+    assert recurrence.find_occurrence(occurrence_ref(head.id, week1)) == moved
+
+
+def test_edit_following_from_the_first_occurrence_edits_in_place(app, admin):
+    series = _series(recurrence_count=4)
+    row = recurrence.materialise(Occurrence(series, MON + timedelta(weeks=2)))
+    soon = datetime.now() + timedelta(days=30)
+    db.session.add(EventReminder(event_id=row.id, kind='1_week_before', due_at=soon))
+    db.session.commit()
+
+    r = _client(app, admin).put(f'/events/{series.id}/following', json={'title': 'Tech', 'shift_minutes': -60})
+    assert r.get_json()['series_id'] == series.id
+    assert Event.query.count() == 2
+    row = db.session.get(Event, row.id)
+    assert (row.title, row.event_date, row.recurrence_id) == \
+        ('Tech', MON + timedelta(weeks=2, hours=-1), MON + timedelta(weeks=2, hours=-1))
+    assert [e.title for e in recurrence.events_in_window(MON - timedelta(days=1), MON + timedelta(weeks=5))] == ['Tech'] * 4
+
+
+def test_editing_the_series_date_moves_every_occurrence(app, admin):
+    series = _series(recurrence_count=6)
+    row = recurrence.materialise(Occurrence(series, MON + timedelta(weeks=2)))
+    moved = MON + timedelta(days=1)
+
+    r = _client(app, admin).put(f'/events/{series.id}/edit', json={'event_date': moved.isoformat()})
+    assert r.status_code == 200
+    row = db.session.get(Event, row.id)
+    assert (row.event_date, row.recurrence_id) == (moved + timedelta(weeks=2),) * 2
+    assert series.event_end_date == moved + timedelta(hours=2)
+    starts = [e['start'] for e in _calendar(_client(app, admin), MON - timedelta(days=1), MON + timedelta(weeks=7))]
+    assert starts == [(moved + timedelta(weeks=n)).isoformat() for n in range(6)]
+
+
+def test_delete_following(app, admin):
+    series = _series(recurrence_count=8)
+    client = _client(app, admin)
+    kept = recurrence.materialise(Occurrence(series, MON + timedelta(weeks=1)))
+    gone = recurrence.materialise(Occurrence(series, MON + timedelta(weeks=5)))
+    db.session.add_all([CrewAssignment(event_id=gone.id, crew_member='alice'),
+                        EventReminder(event_id=gone.id, kind='event_today', due_at=MON)])
+    db.session.commit()
+
+    r = client.delete(f'/events/{occurrence_ref(series.id, MON + timedelta(weeks=3))}/following')
+    assert r.get_json() == {'success': True, 'deleted_rows': 1}
+    assert [e.id for e in Event.query.order_by(Event.id)] == [series.id, kept.id]
+    assert CrewAssignment.query.count() == EventReminder.query.count() == 0
+    assert len(recurrence.events_in_window(MON, MON + timedelta(weeks=10))) == 3
+
+    assert client.delete(f'/events/{series.id}/following').get_json()['deleted_rows'] == 2
+    assert Event.query.count() == 0
+    plain = Event(title='One-off', event_date=MON)
+    db.session.add(plain)
+    db.session.commit()
+    assert client.delete(f'/events/{plain.id}/following').status_code == 404
+
+
+def test_splitting_a_series_moves_its_occurrence_reminders(app, admin):
+    now = datetime.now().replace(second=0, microsecond=0)
+    series = _series('daily', start=now - timedelta(days=2) + timedelta(hours=1))
+    from services.notification_service import sync_occurrence_reminders
+    sync_occurrence_reminders(now)
+    db.session.commit()
+    pivot = series.event_date + timedelta(days=5)
+
+    r = _client(app, admin).put(f'/events/{occurrence_ref(series.id, pivot)}/following', json={'shift_minutes': 60})
+    head_id = r.get_json()['series_id']
+    by_series = {}
+    for rem in OccurrenceReminder.query:
+        by_series.setdefault(rem.series_id, set()).add(rem.slot)
+    assert max(by_series[series.id]) < pivot
+    assert min(by_series[head_id]) == pivot + timedelta(days=1, hours=1)
+    assert EventReminder.query.filter_by(event_id=head_id).count() == 2     # its own; a week out is past
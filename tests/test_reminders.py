@@ -0,0 +1,110 @@
+"""Persistent event reminders: rows, recompute on edit, atomic claim."""
+
+from datetime import datetime, timedelta
+
+import pytest
+
+from app import create_app
+from extensions import db
+from models import Event, EventReminder, User
+from services import notification_service
+from services.notification_service import ReminderScheduler, sync_event_reminders
+
+
+@pytest.fixture
+def app(monkeypatch):
+    monkeypatch.setattr(notification_service, 'DISCORD_WEBHOOK_URL', 'https://discord.invalid/hook')
+    app = create_app('testing')
+    with app.app_context():
+        db.create_all()
+        yield app
+        db.session.remove()
+        db.drop_all()
+
+
+@pytest.fixture
+def posted(monkeypatch):
+    calls = []
+    monkeypatch.setattr(notification_service, '_post_reminder',
+                        lambda event, kind: (calls.append((event.id, kind)), (True, None))[1])
+    return calls
+
+
+def _event(days_ahead=10):
+    ev = Event(title='Gala', created_by='admin',
+               event_date=(datetime.now() + timedelta(days=days_ahead)).replace(hour=19, minute=0))
+    db.session.add(ev)
+    db.session.commit()
+    return ev
+
+
+def _reminders(ev):
+    return {r.kind: r for r in EventReminder.query.filter_by(event_id=ev.id)}
+
+
+def test_edit_event_recomputes_reminders(app):
+    admin = User(username='boss', user_role='crew', is_admin=True)
+    db.session.add(admin)
+    ev = _event(10)
+    notification_service.schedule_event_notifications(ev)
+    assert set(_reminders(ev)) == {'1_week_before', '1_day_before', 'event_today'}
+
+    client = app.test_client()
+    with client.session_transaction() as sess:
+        sess['_user_id'] = str(admin.id)
+        sess['_fresh']   = True
+    new_date = ev.event_date + timedelta(days=3)
+    assert client.put(f'/events/{ev.id}/edit', json={'event_date': new_date.isoformat()}).status_code == 200
+
+    rows = _reminders(ev)
+    assert rows['1_day_before'].due_at == new_date - timedelta(days=1)
+    assert rows['1_week_before'].due_at == new_date - timedelta(days=7)
+    assert all(r.status == 'pending' for r in rows.values())
+
+
+def test_due_reminders_are_sent_once_across_processes(app, posted):
+    ev = _event(3)
+    sync_event_reminders(ev)
+    db.session.commit()
+    rows = _reminders(ev)
+    assert '1_week_before' not in rows          # already in the past when scheduled
+
+    at = rows['1_day_before'].due_at + timedelta(seconds=1)
+    a, b = ReminderScheduler(app), ReminderScheduler(app)
+    b.worker_id = 'other-host:1'
+
+    rid = rows['1_day_before'].id
+    assert a._claim(rid, at) is True
+    assert b._claim(rid, at) is False           # the other worker loses the race
+    a._deliver(rid, at)
+    assert b.run_due(at) >= 0 and posted == [(ev.id, '1_day_before')]
+
+    db.session.expire_all()
+    assert _reminders(ev)['1_day_before'].status == 'sent'
+    assert _reminders(ev)['event_today'].status == 'pending'
+
+
+def test_failed_delivery_is_retried_then_abandoned_claims_reclaimed(app, monkeypatch):
+    monkeypatch.setattr(notification_service, '_post_reminder', lambda e, k: (False, 'HTTP 500'))
+    ev = _event(3)
+    sync_event_reminders(ev)
+    db.session.commit()
+    r  = _reminders(ev)['1_day_before']
+    at = r.due_at + timedelta(seconds=1)
+
+    ReminderScheduler(app).run_due(at)
+    db.session.expire_all()
+    r = _reminders(ev)['1_day_before']
+    assert r.status == 'pending' and r.attempts == 1 and r.due_at > at
+
+    # a worker that died mid-send leaves a stale claim that another picks up
+    r.status, r.claimed_by, r.claimed_at = 'claimed', 'dead:1', at - timedelta(hours=1)
+    db.session.commit()
+    assert ReminderScheduler(app)._claim(r.id, at) is True
+
+
+def test_backfill_creates_rows_for_upcoming_events(app):
+    ev = _event(20)
+    assert notification_service.backfill_reminders() == 1
+    assert len(_reminders(ev)) == 3
+    assert notification_service.backfill_reminders() == 0
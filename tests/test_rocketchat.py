@@ -0,0 +1,140 @@
+"""Rocket.Chat: lazy login, token refresh on 401, user-id map and bulk sync (stub server)."""
+
+import json, threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+import pytest
+
+import rocketchat_client
+from app import create_app
+from extensions import db
+from models import RocketChatUser, User
+from rocketchat_client import RocketChatClient
+from services.rocketchat_sync import sync_rocketchat_users
+
+
+class StubRocketChat:
+    """Minimal Rocket.Chat API: login, users.info/create/list. Records every path."""
+
+    def __init__(self):
+        self.users  = {'bob': 'rc-bob'}          # username -> _id already on the server
+        self.tokens = set()
+        self.logins = 0
+        self.calls  = []
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def _reply(self, status, body):
+                payload = json.dumps(body).encode()
+                self.send_response(status)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(payload)))
+                self.end_headers()
+                self.wfile.write(payload)
+
+            def _handle(self):
+                length = int(self.headers.get('Content-Length') or 0)
+                body   = json.loads(self.rfile.read(length) or b'{}')
+                url    = urlparse(self.path)
+                stub.calls.append(url.path)
+                if url.path == '/api/v1/login':
+                    stub.logins += 1
+                    token = f'token-{stub.logins}'
+                    stub.tokens.add(token)
+                    return self._reply(200, {'status': 'success',
+                                             'data': {'authToken': token, 'userId': 'admin'}})
+                if self.headers.get('X-Auth-Token') not in stub.tokens:
+                    return self._reply(401, {'success': False})
+                if url.path == '/api/v1/users.info':
+                    name = parse_qs(url.query)['username'][0]
+                    if name in stub.users:
+                        return self._reply(200, {'success': True, 'user': {'_id': stub.users[name]}})
+                    return self._reply(400, {'success': False})
+                if url.path == '/api/v1/users.create':
+                    stub.users[body['username']] = f"rc-{body['username']}"
+                    return self._reply(200, {'success': True, 'user': {'_id': stub.users[body['username']]}})
+                if url.path == '/api/v1/users.list':
+                    q = parse_qs(url.query)
+                    count, offset = int(q['count'][0]), int(q['offset'][0])
+                    names = sorted(stub.users)[offset:offset + count]
+                    return self._reply(200, {'success': True, 'total': len(stub.users),
+                                             'users': [{'_id': stub.users[n], 'username': n} for n in names]})
+                return self._reply(404, {'success': False})
+
+            do_GET = do_POST = _handle
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        self.url    = f'http://127.0.0.1:{self.server.server_port}'
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+    def close(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+@pytest.fixture
+def stub(monkeypatch):
+    s = StubRocketChat()
+    monkeypatch.setenv('ROCKETCHAT_URL', s.url)
+    monkeypatch.setenv('ROCKETCHAT_ADMIN_USER', 'admin')
+    monkeypatch.setenv('ROCKETCHAT_ADMIN_PASSWORD', 'secret')
+    yield s
+    s.close()
+
+
+@pytest.fixture
+def app():
+    app = create_app('testing')
+    with app.app_context():
+        db.create_all()
+        yield app
+        db.session.remove()
+        db.drop_all()
+
+
+def test_login_is_lazy_and_refreshed_on_401(stub):
+    rc = RocketChatClient()
+    assert stub.calls == [] and rc.is_configured()
+
+    assert rc.get_or_create_user('bob') == 'rc-bob'
+    assert stub.calls == ['/api/v1/login', '/api/v1/users.info']
+
+    stub.tokens.clear()                                 # server revokes the session
+    assert rc.get_or_create_user('bob') == 'rc-bob'
+    assert stub.calls[2:] == ['/api/v1/users.info', '/api/v1/login', '/api/v1/users.info']
+
+
+def test_info_endpoint_answers_from_the_map(app, stub, monkeypatch):
+    monkeypatch.setattr(rocketchat_client, '_rc_client', RocketChatClient())
+    user = User(username='carol', email='carol@example.com')
+    db.session.add(user)
+    db.session.commit()
+    client = app.test_client()
+    with client.session_transaction() as sess:
+        sess['_user_id'] = str(user.id)
+        sess['_fresh']   = True
+
+    first = client.get('/api/rocketchat/info').get_json()
+    assert first['user_id'] == 'rc-carol'
+    calls = len(stub.calls)
+
+    for _ in range(3):
+        assert client.get('/api/rocketchat/info').get_json()['user_id'] == 'rc-carol'
+    assert len(stub.calls) == calls                     # no Rocket.Chat traffic once mapped
+
+
+def test_bulk_sync_links_existing_and_creates_missing(app, stub):
+    db.session.add_all([User(username=n, email=f'{n}@example.com') for n in ('bob', 'dave', 'erin')])
+    db.session.commit()
+
+    counts = sync_rocketchat_users(RocketChatClient(), page_size=1)
+    assert counts == {'linked': 1, 'created': 2, 'failed': 0}
+    assert {r.username: r.rc_user_id for r in RocketChatUser.query} == {
+        'bob': 'rc-bob', 'dave': 'rc-dave', 'erin': 'rc-erin'}
+    assert stub.calls.count('/api/v1/users.info') == 2     # only for users not already on the server
+
+    assert sync_rocketchat_users(RocketChatClient()) == {'linked': 0, 'created': 0, 'failed': 0}